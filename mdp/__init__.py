@@ -145,8 +145,9 @@ class MDPDeprecationWarning(DeprecationWarning, MDPWarning):
 
 from .signal_node_online import (OnlineNode, PreserveDimOnlineNode, OnlineNodeException)
 
-from .linear_flows import (Flow, CheckpointFlow,
-                          CheckpointFunction, CheckpointSaveFunction)
+from .linear_flows import (Flow, FlowPlan, CheckpointFlow,
+                          CheckpointFunction, CheckpointSaveFunction,
+                          AsyncCheckpointSaveFunction)
 
 from .linear_flows_online import (OnlineFlow, CircularOnlineFlow, OnlineFlowException,
                                   CircularOnlineFlowException)
@@ -154,6 +155,12 @@ class MDPDeprecationWarning(DeprecationWarning, MDPWarning):
 # import helper functions:
 from .helper_funcs import pca, fastica
 
+# floating point precision policy
+from .utils import precision, set_precision
+
+# import the archive format
+from .utils._archive import save, load
+
 # import extension mechanism
 from .extension import (ExtensionException, extension_method,
                        extension_setup, extension_teardown,
@@ -168,14 +175,17 @@ class MDPDeprecationWarning(DeprecationWarning, MDPWarning):
 from .classifier_node import (ClassifierNode, ClassifierCumulator)
 
 # import our modules
+from . import graph
 from . import nodes
 from . import hinet
+from . import fusion
 from . import parallel
 from .test import test
 
 
 # explicitly set __all__, mainly needed for epydoc
 __all__ = ['config',
+           'AsyncCheckpointSaveFunction',
            'CheckpointFlow',
            'CheckpointFunction',
            'CheckpointSaveFunction',
@@ -188,6 +198,7 @@ class MDPDeprecationWarning(DeprecationWarning, MDPWarning):
            'Flow',
            'FlowException',
            'FlowExceptionCR',
+           'FlowPlan',
            'OnlineFlow',
            'CircularOnlineFlow',
            'OnlineFlowException',
@@ -216,10 +227,16 @@ class MDPDeprecationWarning(DeprecationWarning, MDPWarning):
            'get_extensions',
            'graph',
            'hinet',
+           'load',
            'nodes',
            'parallel',
            'pca',
+           'precision',
+           'set_precision',
+           'profiling',
+           'save',
            'fastica',
+           'fusion',
            'utils',
            'with_extension',
            ]
@@ -228,7 +245,9 @@ class MDPDeprecationWarning(DeprecationWarning, MDPWarning):
     from . import caching
     __all__ += ['caching']
 
-utils.fixup_namespace(__name__, __all__,
+# profiling is left out, since accessing it would import it
+utils.fixup_namespace(__name__, [_name for _name in __all__
+                                 if _name != 'profiling'],
                       ('signal_node',
                        'signal_node_online',
                        'linear_flows',
@@ -238,5 +257,22 @@ class MDPDeprecationWarning(DeprecationWarning, MDPWarning):
                        'configuration',
                        'repo_revision',
                        'extension',
+                       'utils._precision',
+                       'utils._archive',
                        ),('extension',
-                          'configuration'))
+                          'configuration',
+                          'utils._precision',
+                          'utils._archive'))
+
+# mdp.profiling is imported on the first access, Python < 3.7 does not
+# support module __getattr__
+import sys as _sys
+if _sys.version_info >= (3, 7):
+    def __getattr__(name):
+        if name == 'profiling':
+            from importlib import import_module
+            return import_module(__name__ + '.profiling')
+        raise AttributeError("module '%s' has no attribute '%s'" %
+                             (__name__, name))
+else:
+    from . import profiling
@@ -32,6 +32,12 @@ def _label(self, x, *args, **kargs):
         raise NotImplementedError
 
     def _prob(self, x, *args, **kargs):
+        """Default implementation as a view on _prob_array."""
+        labels = self.labels_
+        return [dict(list(zip(labels, p)))
+                for p in self._prob_array(x, *args, **kargs)]
+
+    def _prob_array(self, x, *args, **kargs):
         raise NotImplementedError
 
     ### User interface to the overwritten methods
@@ -57,6 +63,36 @@ def prob(self, x, *args, **kwargs):
         self._pre_execution_checks(x)
         return self._prob(self._refcast(x), *args, **kwargs)
 
+    def prob_array(self, x, *args, **kwargs):
+        """Returns the probability for each datapoint and label as an array
+        with shape (x.shape[0], len(self.labels_)).
+
+        The columns are ordered as the labels in the 'labels_' attribute.
+        Subclasses that overwrite _prob_array must provide 'labels_'. The
+        docstring of the '_prob_array' method overwrites this docstring.
+        """
+        self._pre_execution_checks(x)
+        return self._prob_array(self._refcast(x), *args, **kwargs)
+
+    def rank_array(self, x, threshold=None):
+        """Returns an array with the indices of all labels in 'labels_'
+        ordered according to prob_array(x) (e.g., [[2 0 1], [1 0 2], ...]).
+
+        The optional threshold parameter is used to exclude labels having equal
+        or less probability, their indices are replaced by -1 (at the end of
+        each row).
+        """
+        return self._rank_prob_array(self.prob_array(x), threshold)
+
+    def _rank_prob_array(self, prob, threshold):
+        """Return the ranking array for the probabilities of prob_array."""
+        # stable sort, labels with equal probability keep their order
+        ranking = (-prob).argsort(axis=1, kind="mergesort")
+        if threshold is not None:
+            rows = numx.arange(len(prob))[:, numx.newaxis]
+            ranking[prob[rows, ranking] <= threshold] = -1
+        return ranking
+
     def rank(self, x, threshold=None):
         """Returns ordered list with all labels ordered according to prob(x)
         (e.g., [[3 1 2], [2 1 3], ...]).
@@ -65,6 +101,29 @@ def rank(self, x, threshold=None):
         or less probability. E.g. threshold=0 excludes all labels with zero
         probability.
         """
+        if not self._prob_is_array_view():
+            return self._rank_from_prob(x, threshold)
+        labels = self.labels_
+        return [[labels[i] for i in indices if i >= 0]
+                for indices in self.rank_array(x, threshold=threshold)]
+
+    def _prob_is_array_view(self):
+        """Return True if the dictionaries of prob are a view on prob_array.
+
+        This is the case unless _prob is overwritten in a subclass of the
+        class that implements _prob_array. Only then rank can use rank_array,
+        since the labels with equal probability are ranked in the order of
+        the prob dictionaries.
+        """
+        mro = type(self).__mro__
+        def defining_class(name):
+            for i, cls in enumerate(mro):
+                if name in cls.__dict__:
+                    return i
+        return defining_class('_prob_array') <= defining_class('_prob')
+
+    def _rank_from_prob(self, x, threshold):
+        """Rank the labels based on the dictionaries returned by prob."""
         all_ranking = []
         prob = self.prob(x)
         for p in prob:
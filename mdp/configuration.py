@@ -7,6 +7,8 @@
 import os
 import tempfile
 import inspect
+import hashlib
+import json
 import mdp
 from .repo_revision import get_git_revision
 import io as StringIO
@@ -24,6 +26,13 @@ def __str__(self):
     def __repr__(self):
         return self.info()
 
+    def __getattr__(self, name):
+        # the deferred dependencies are probed on the first query
+        if name.startswith('has_') and name[4:] in self._deferred:
+            self._resolve(name[4:])
+            return type.__getattribute__(self, name)
+        raise AttributeError(name)
+
 class config(with_metaclass(MetaConfig, object)):
     """Provide information about optional dependencies.
 
@@ -44,6 +53,12 @@ class methods `ExternalDepFound` and `ExternalDepFailed`.
     Dependency parameters are numbered in the order of creation,
     so the output is predictable.
 
+    The optional dependencies are probed on the first query of their
+    ``has_<dependency>`` attribute (or by ``info()``), so that the
+    libraries which are not used are never imported. The results of the
+    probes can be cached across interpreters in a file, see
+    ``MDP_CONFIG_CACHE`` below.
+
     The selection of the numerical backend (`numpy` or `scipy`) can be
     forced by setting the environment variable MDPNUMX.  The loading
     of an optional dependency can be inhibited by setting the
@@ -73,9 +88,19 @@ class methods `ExternalDepFound` and `ExternalDepFailed`.
       ``MDP_DISABLE_MONKEYPATCH_PP``
         disable automatic monkeypatching of parallel python worker script,
         otherwise a work around for debian bug #620551 is activated.
+      ``MDP_CONFIG_CACHE``
+        path of a file in which the results of the dependency probes
+        are stored, so that they are not repeated by other interpreters.
+        The cache is invalidated when the Python or MDP version, the
+        ``sys.path`` entries (or their modification times) or the
+        ``MDP_DISABLE_<DEPNAME>`` variables change. The parallel python
+        probe, which starts a server, is never cached.
     """
 
     _HAS_NUMBER = 0
+    # dependencies which are not probed yet,
+    # name -> (probe function, cacheable, order)
+    _deferred = {}
 
     class _ExternalDep(object):
         def __init__(self, name, version=None, failmsg=None):
@@ -135,6 +160,28 @@ def ExternalDepFound(cls, name, version):
         """
         return cls._ExternalDep(name, version=version)
 
+    @classmethod
+    def _defer(cls, name, probe, cacheable):
+        """Register the function probing an optional dependency, which is
+        called on the first query of ``has_<name>``."""
+        if 'has_' + name not in cls.__dict__:
+            cls._deferred[name] = (probe, cacheable, cls._HAS_NUMBER)
+            cls._HAS_NUMBER += 1
+
+    @classmethod
+    def _resolve(cls, name):
+        """Probe the deferred dependency name."""
+        probe, cacheable, order = cls._deferred.pop(name)
+        cached = _read_probe_cache().get(name) if cacheable else None
+        if cached is not None:
+            cls._ExternalDep(name, **cached)
+        else:
+            probe()
+        dep = type.__getattribute__(cls, 'has_' + name)
+        dep.order = order
+        if cacheable and cached is None:
+            _write_probe_cache(name, dep)
+
     @classmethod
     def info(cls):
         """Return nicely formatted info about MDP.
@@ -153,6 +200,8 @@ def info(cls):
         This function is used to provide the py.test report header and
         footer.
         """
+        for name in list(cls._deferred):
+            cls._resolve(name)
         listable_features = [(f[4:].replace('_', ' '), getattr(cls, f))
                              for f in dir(cls) if f.startswith('has_')]
         maxlen = max(len(f[0]) for f in listable_features)
@@ -309,16 +358,75 @@ def _pp_needs_monkeypatching():
 
     return mdp._pp_needs_monkeypatching
 
-def set_configuration():
-    # set python version
-    config.ExternalDepFound('python', '.'.join([str(x)
-                                                for x in sys.version_info]))
-    version = mdp.__version__
-    if mdp.__revision__:
-        version += ', ' + mdp.__revision__
-    config.ExternalDepFound('mdp', version)
+# deferred dependency probes, in the order of the info() output,
+# (name, probe function, cacheable)
+_PROBES = []
+
+def _dependency_probe(name, cacheable=True):
+    """Decorator to register the probe of the optional dependency name.
 
-    # parallel python dependency
+    The probe has to call `config.ExternalDepFound` or
+    `config.ExternalDepFailed` for name. It should only be cacheable if
+    it has no side effect except for setting ``config.has_<name>``.
+    """
+    def register(probe):
+        _PROBES.append((name, probe, cacheable))
+        return probe
+    return register
+
+def _probe_cache_key():
+    """Return the key of the probe results in the cache file."""
+    parts = [sys.version, mdp.__version__]
+    parts += ['%s=%s' % (var, os.getenv(var, '')) for var in
+              sorted(var for var in os.environ
+                     if var.startswith('MDP_DISABLE_'))]
+    for path in sys.path:
+        try:
+            mtime = os.stat(path or os.curdir).st_mtime
+        except OSError:
+            mtime = None
+        parts.append('%s:%s' % (path, mtime))
+    return hashlib.md5('\n'.join(parts).encode('utf-8')).hexdigest()
+
+def _read_probe_cache():
+    """Return the cached probe results for the current key, as a dict
+    name -> keyword arguments of `config._ExternalDep`."""
+    filename = os.getenv('MDP_CONFIG_CACHE')
+    if not filename:
+        return {}
+    try:
+        with open(filename) as cache_file:
+            cache = json.load(cache_file)
+    except (IOError, ValueError):
+        return {}
+    if cache.get('key') != _probe_cache_key():
+        return {}
+    return cache.get('deps', {})
+
+def _write_probe_cache(name, dep):
+    """Add the probe result dep to the cache file (if it is enabled)."""
+    filename = os.getenv('MDP_CONFIG_CACHE')
+    if not filename:
+        return
+    deps = _read_probe_cache()
+    if dep:
+        deps[name] = {'version': dep.version}
+    else:
+        deps[name] = {'failmsg': dep.failmsg}
+    cache = {'key': _probe_cache_key(), 'deps': deps}
+    # write to a temporary file first, the cache may be shared by
+    # concurrent processes
+    try:
+        fd, tmpname = tempfile.mkstemp(dir=os.path.dirname(
+                                           os.path.abspath(filename)))
+        with os.fdopen(fd, 'w') as cache_file:
+            json.dump(cache, cache_file)
+        os.rename(tmpname, filename)
+    except (IOError, OSError):
+        pass
+
+@_dependency_probe('parallel_python', cacheable=False)
+def _probe_parallel_python():
     try:
         import pp
         # set pp secret if not there already
@@ -358,7 +466,11 @@ def set_configuration():
                 else:
                     config.ExternalDepFound('parallel_python', pp.version)
 
-    # shogun
+@_dependency_probe('shogun')
+def _probe_shogun():
+    if os.getenv('MDP_DISABLE_SHOGUN'):
+        config.ExternalDepFailed('shogun', 'disabled')
+        return
     try:
         import shogun
         from shogun import (Kernel as sgKernel,
@@ -367,24 +479,25 @@ def set_configuration():
     except ImportError as exc:
         config.ExternalDepFailed('shogun', exc)
     else:
-        if os.getenv('MDP_DISABLE_SHOGUN'):
-            config.ExternalDepFailed('shogun', 'disabled')
+        # From now on just support shogun < 2.0
+        # Between 0.10 to 1.0 or beyond there are too many API changes...
+        try:
+            version = sgKernel.Version_get_version_release()
+        except AttributeError:
+            config.ExternalDepFailed('shogun',
+                                     'only shogun v1 is supported')
         else:
-            # From now on just support shogun < 2.0
-            # Between 0.10 to 1.0 or beyond there are too many API changes...
-            try:
-                version = sgKernel.Version_get_version_release()
-            except AttributeError:
+            if not version.startswith('v1.'):
                 config.ExternalDepFailed('shogun',
                                          'only shogun v1 is supported')
             else:
-                if not version.startswith('v1.'):
-                    config.ExternalDepFailed('shogun',
-                                             'only shogun v1 is supported')
-                else:
-                    config.ExternalDepFound('shogun', version)
+                config.ExternalDepFound('shogun', version)
 
-    # libsvm
+@_dependency_probe('libsvm')
+def _probe_libsvm():
+    if os.getenv('MDP_DISABLE_LIBSVM'):
+        config.ExternalDepFailed('libsvm', 'disabled')
+        return
     try:
         import svm as libsvm
         libsvm.libsvm
@@ -393,27 +506,30 @@ def set_configuration():
     except AttributeError as exc:
         config.ExternalDepFailed('libsvm', 'libsvm version >= 2.91 required')
     else:
-        if os.getenv('MDP_DISABLE_LIBSVM'):
-            config.ExternalDepFailed('libsvm', 'disabled')
-        else:
-            config.ExternalDepFound('libsvm', libsvm.libsvm._name)
+        config.ExternalDepFound('libsvm', libsvm.libsvm._name)
 
-    # joblib
+@_dependency_probe('joblib')
+def _probe_joblib():
+    if os.getenv('MDP_DISABLE_JOBLIB'):
+        config.ExternalDepFailed('joblib', 'disabled')
+        return
     try:
         import joblib
     except ImportError as exc:
         config.ExternalDepFailed('joblib', exc)
     else:
         version = joblib.__version__
-        if os.getenv('MDP_DISABLE_JOBLIB'):
-            config.ExternalDepFailed('joblib', 'disabled')
-        elif _version_too_old(version, (0,4,3)):
+        if _version_too_old(version, (0,4,3)):
             config.ExternalDepFailed('joblib',
                                      'version %s is too old' % version)
         else:
             config.ExternalDepFound('joblib', version)
 
-    # sklearn
+@_dependency_probe('sklearn')
+def _probe_sklearn():
+    if os.getenv('MDP_DISABLE_SKLEARN'):
+        config.ExternalDepFailed('sklearn', 'disabled')
+        return
     try:
         try:
             import sklearn
@@ -425,10 +541,21 @@ def set_configuration():
     except AttributeError as exc:
         config.ExternalDepFailed('sklearn', exc)
     else:
-        if os.getenv('MDP_DISABLE_SKLEARN'):
-            config.ExternalDepFailed('sklearn', 'disabled')
-        elif _version_too_old(version, (0,6)):
+        if _version_too_old(version, (0,6)):
             config.ExternalDepFailed('sklearn',
                                      'version %s is too old' % version)
         else:
             config.ExternalDepFound('sklearn', version)
+
+def set_configuration():
+    # set python version
+    config.ExternalDepFound('python', '.'.join([str(x)
+                                                for x in sys.version_info]))
+    version = mdp.__version__
+    if mdp.__revision__:
+        version += ', ' + mdp.__revision__
+    config.ExternalDepFound('mdp', version)
+
+    # the optional dependencies are probed on the first query
+    for name, probe, cacheable in _PROBES:
+        config._defer(name, probe, cacheable)
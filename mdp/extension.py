@@ -24,6 +24,8 @@
 from builtins import str
 from builtins import object
 
+from importlib import import_module
+
 from mdp import MDPException, NodeMetaclass
 from future.utils import with_metaclass
 
@@ -60,6 +62,9 @@
 _extensions = dict()
 # set containing the names of the currently activated extensions
 _active_extensions = set()
+# extensions defined in the packages which are only imported on the first
+# access, maps the extension name to the name of the package
+_lazy_extensions = {"profile": "mdp.profiling"}
 
 
 class ExtensionException(MDPException):
@@ -289,6 +294,10 @@ def get_active_extensions():
 
 def activate_extension(extension_name, verbose=False):
     """Activate the extension by injecting the extension methods."""
+    if (extension_name not in _extensions and
+        extension_name in _lazy_extensions):
+        # the package registers the extension when it is imported
+        import_module(_lazy_extensions[extension_name])
     if extension_name not in list(_extensions.keys()):
         err = "Unknown extension name: %s"%str(extension_name)
         raise ExtensionException(err)
@@ -0,0 +1,238 @@
+"""
+Fusion of consecutive affine nodes.
+
+Many trained nodes compute an affine map of their input (e.g. PCANode,
+SFANode or LinearRegressionNode). A chain of such nodes can be replaced by
+a single AffineNode, which saves the intermediate arrays and the
+per-node overhead during execution. This is used by ``Flow.compile``.
+
+The affine map of a node class is given by a function registered with
+``register_affine_map``. It is only used for instances whose ``_execute``
+method is the one of the registered class, so that subclasses which
+change the execution (e.g. SFA2Node) are not fused by mistake.
+"""
+from builtins import range
+
+import mdp
+from mdp import numx
+from mdp.utils import mult
+from mdp.signal_node import _method_function
+
+# registered classes and their affine map functions
+_AFFINE_MAPS = {}
+
+
+def register_affine_map(node_class):
+    """Decorator to register the affine map function of node_class.
+
+    The function takes a trained node and returns a tuple
+    ``(matrix, bias)``, such that the node output is
+    ``x * matrix + bias``. The bias can be None. The function can return
+    None if the node is not affine in its current configuration.
+    """
+    def register(func):
+        _AFFINE_MAPS[node_class] = func
+        return func
+    return register
+
+
+def get_affine_map(node):
+    """Return the affine map ``(matrix, bias)`` of node, or None if the
+    node is not (known to be) affine or is not fully trained."""
+    if node.input_dim is None or node.output_dim is None:
+        return None
+    if node.is_trainable() and node.is_training():
+        return None
+    for klass in type(node).__mro__:
+        if klass in _AFFINE_MAPS:
+            if (_method_function(type(node), '_execute') is not
+                _method_function(klass, '_execute')):
+                return None
+            return _AFFINE_MAPS[klass](node)
+    return None
+
+
+def compose_affine_maps(maps):
+    """Return the affine map equivalent to applying the maps in order."""
+    matrix, bias = maps[0]
+    for next_matrix, next_bias in maps[1:]:
+        if bias is not None:
+            bias = mult(bias, next_matrix)
+        matrix = mult(matrix, next_matrix)
+        if next_bias is not None:
+            bias = next_bias if bias is None else bias + next_bias
+    return matrix, bias
+
+
+def fuse_nodes(nodes):
+    """Return a list of nodes equivalent to nodes (for execution), in which
+    consecutive affine nodes are replaced by AffineNode instances.
+
+    A run of affine nodes is only fused where this does not increase the
+    number of multiplications per sample, e.g. a dimensionality reduction
+    followed by an expansion is kept as two nodes. The nodes which are not
+    fused are not copied.
+    """
+    result = []
+    run = []
+    for node in nodes:
+        affine = get_affine_map(node)
+        if affine is None:
+            result.extend(_fuse_run(run))
+            run = []
+            result.append(node)
+        else:
+            run.append((node, affine))
+    result.extend(_fuse_run(run))
+    return result
+
+
+def _fuse_run(run):
+    """Split a run of (node, affine map) into segments that minimize the
+    number of multiplications and fuse each segment."""
+    n = len(run)
+    if n < 2:
+        return [node for node, _ in run]
+    dims = [node.input_dim for node, _ in run] + [run[-1][0].output_dim]
+    # cost[j] is the minimal cost of the first j nodes, start[j] the start
+    # of the last segment in the corresponding split
+    cost = [0] + [None] * n
+    start = [0] * (n + 1)
+    for j in range(1, n + 1):
+        for i in range(j):
+            # prefer longer segments for equal costs
+            candidate = cost[i] + dims[i] * dims[j]
+            if cost[j] is None or candidate <= cost[j]:
+                cost[j] = candidate
+                start[j] = i
+    segments = []
+    j = n
+    while j > 0:
+        segments.append((start[j], j))
+        j = start[j]
+    fused = []
+    for i, j in reversed(segments):
+        if j - i == 1:
+            fused.append(run[i][0])
+        else:
+            matrix, bias = compose_affine_maps([affine for _, affine
+                                                in run[i:j]])
+            fused.append(mdp.nodes.AffineNode(matrix, bias,
+                                              dtype=run[j-1][0].dtype))
+    return fused
+
+
+## affine maps of the MDP nodes ##
+
+@register_affine_map(mdp.nodes.IdentityNode)
+def _identity_map(node):
+    return numx.eye(node.input_dim), None
+
+@register_affine_map(mdp.nodes.AffineNode)
+def _affine_map(node):
+    return node.matrix, node.bias
+
+@register_affine_map(mdp.nodes.PCANode)
+def _pca_map(node):
+    return node.v, -mult(node.avg, node.v).ravel()
+
+@register_affine_map(mdp.nodes.FDANode)
+def _fda_map(node):
+    return node.v, -mult(node.avg, node.v).ravel()
+
+@register_affine_map(mdp.nodes.SFANode)
+def _sfa_map(node):
+    return node.sf, -node._bias.ravel()
+
+@register_affine_map(mdp.nodes.NormalizeNode)
+def _normalize_map(node):
+    return numx.diag(1. / node.s), -(node.m / node.s).ravel()
+
+@register_affine_map(mdp.nodes.LinearRegressionNode)
+def _linear_regression_map(node):
+    if node.with_bias:
+        return node.beta[1:], node.beta[0]
+    return node.beta, None
+
+def _whitened_map(node, matrix):
+    # map of nodes that apply matrix after an optional whitening node
+    if node.whitened:
+        return matrix, None
+    white = get_affine_map(node.white)
+    if white is None:
+        return None
+    return compose_affine_maps([white, (matrix, None)])
+
+@register_affine_map(mdp.nodes.ICANode)
+def _ica_map(node):
+    return _whitened_map(node, node.filters)
+
+@register_affine_map(mdp.nodes.ISFANode)
+def _isfa_map(node):
+    return _whitened_map(node, node.RP)
+
+## mdp.hinet nodes ##
+
+@register_affine_map(mdp.hinet.Switchboard)
+def _switchboard_map(node):
+    matrix = numx.zeros((node.input_dim, node.output_dim))
+    matrix[node.connections, numx.arange(node.output_dim)] = 1.
+    return matrix, None
+
+@register_affine_map(mdp.hinet.FlowNode)
+def _flownode_map(node):
+    maps = [get_affine_map(child) for child in node.flow]
+    if None in maps:
+        return None
+    return compose_affine_maps(maps)
+
+def _child_maps(layer):
+    maps = [get_affine_map(child) for child in layer.nodes]
+    if None in maps:
+        return None
+    return maps
+
+@register_affine_map(mdp.hinet.Layer)
+def _layer_map(node):
+    maps = _child_maps(node)
+    if maps is None:
+        return None
+    # block diagonal matrix
+    matrix = numx.zeros((node.input_dim, node.output_dim))
+    bias = numx.zeros(node.output_dim)
+    in_start = out_start = 0
+    for child, (child_matrix, child_bias) in zip(node.nodes, maps):
+        in_stop = in_start + child.input_dim
+        out_stop = out_start + child.output_dim
+        matrix[in_start:in_stop, out_start:out_stop] = child_matrix
+        if child_bias is not None:
+            bias[out_start:out_stop] = child_bias
+        in_start, out_start = in_stop, out_stop
+    return matrix, bias
+
+@register_affine_map(mdp.hinet.CloneLayer)
+def _clonelayer_map(node):
+    maps = _child_maps(node)
+    if maps is None:
+        return None
+    child_matrix, child_bias = maps[0]
+    n_clones = len(node.nodes)
+    matrix = numx.kron(numx.eye(n_clones), child_matrix)
+    if child_bias is None:
+        return matrix, None
+    return matrix, numx.tile(child_bias, n_clones)
+
+@register_affine_map(mdp.hinet.SameInputLayer)
+def _sameinputlayer_map(node):
+    maps = _child_maps(node)
+    if maps is None:
+        return None
+    matrix = numx.hstack([child_matrix for child_matrix, _ in maps])
+    bias = numx.zeros(node.output_dim)
+    out_start = 0
+    for child, (_, child_bias) in zip(node.nodes, maps):
+        out_stop = out_start + child.output_dim
+        if child_bias is not None:
+            bias[out_start:out_stop] = child_bias
+        out_start = out_stop
+    return matrix, bias
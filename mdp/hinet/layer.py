@@ -14,6 +14,14 @@
 # TODO: Find a better way to deal with additional args for train/execute?
 #    Maybe split them by default, but can be disabled via switch?
 
+def _execute_child_into(node, x, out):
+    """Write the output of the internal node for x into out."""
+    if node._can_execute_into():
+        node._execute_into(node._refcast(x), out)
+    else:
+        out[:] = node.execute(x)
+
+
 class Layer(mdp.Node):
     """Layers are nodes which consist of multiple horizontally parallel nodes.
 
@@ -200,6 +208,18 @@ def _execute(self, x, *args, **kwargs):
                                                         *args, **kwargs)
         return y
 
+    def _execute_into(self, x, out):
+        in_stop = 0
+        out_stop = 0
+        for node in self.nodes:
+            in_start = in_stop
+            in_stop += node.input_dim
+            out_start = out_stop
+            out_stop += node.output_dim
+            _execute_child_into(node, x[:, in_start:in_stop],
+                                out[:, out_start:out_stop])
+        return out
+
     def _inverse(self, x, *args, **kwargs):
         """Combine the inverse of all the internal nodes."""
         in_start = 0
@@ -270,13 +290,23 @@ def _stop_training(self, *args, **kwargs):
 
     def _execute(self, x, *args, **kwargs):
         n_samples = x.shape[0]
-        x = x.reshape(n_samples * x.shape[1] / self.node.input_dim, self.node.input_dim)
+        x = x.reshape(n_samples * x.shape[1] // self.node.input_dim, self.node.input_dim)
         y = self.node.execute(x)
         return y.reshape(n_samples, self.output_dim)
 
+    def _execute_into(self, x, out):
+        if not out.flags.c_contiguous:
+            # reshaping out would create a copy
+            out[:] = self._execute(x)
+            return out
+        x = x.reshape(-1, self.node.input_dim)
+        _execute_child_into(self.node, x,
+                            out.reshape(-1, self.node.output_dim))
+        return out
+
     def _inverse(self, x, *args, **kwargs):
         n_samples = x.shape[0]
-        x = x.reshape(n_samples * x.shape[1] / self.node.output_dim, self.node.output_dim)
+        x = x.reshape(n_samples * x.shape[1] // self.node.output_dim, self.node.output_dim)
         y = self.node.inverse(x)
         return y.reshape(n_samples, self.input_dim)
 
@@ -361,3 +391,11 @@ def _execute(self, x, *args, **kwargs):
             else:
                 y[:, out_start:out_stop] = node.execute(x, *args, **kwargs)
         return y
+
+    def _execute_into(self, x, out):
+        out_stop = 0
+        for node in self.nodes:
+            out_start = out_stop
+            out_stop += node.output_dim
+            _execute_child_into(node, x, out[:, out_start:out_stop])
+        return out
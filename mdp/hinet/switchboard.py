@@ -71,6 +71,9 @@ def __init__(self, input_dim, connections):
     def _execute(self, x):
         return x[:, self.connections]
 
+    def _execute_into(self, x, out):
+        return numx.take(x, self.connections, axis=1, out=out)
+
     @staticmethod
     def is_trainable():
         return False
@@ -13,8 +13,12 @@
 import pickle as _cPickle
 import tempfile as _tempfile
 import copy as _copy
+import queue as _queue
+import threading as _threading
 
 from mdp import numx
+from mdp.signal_node import _method_function
+from mdp.utils._archive import _atomic_open
 
 class CrashRecoveryException(mdp.MDPException):
     """Class to handle crash recovery """
@@ -408,6 +412,31 @@ def inverse(self, iterable):
             raise FlowException(errstr)
         return numx.concatenate(res)
 
+    def compile(self):
+        """Return a flow for execution in which consecutive trained affine
+        nodes (e.g. PCANode, SFANode, LinearRegressionNode, Switchboard)
+        are fused into single AffineNode instances.
+
+        The returned flow computes the same output as this flow up to
+        numerical precision, but can not be trained or inverted. Nodes which
+        are not fused are shared with this flow. See mdp.fusion for how to
+        add the affine map of other node classes.
+        """
+        return Flow(mdp.fusion.fuse_nodes(self.flow),
+                    crash_recovery=self._crash_recovery,
+                    verbose=self.verbose)
+
+    def plan(self, batch_shape, dtype=None):
+        """Return a FlowPlan for the repeated execution of input arrays
+        with shape batch_shape.
+
+        All nodes must be trained. The input dimensions, dtypes and the
+        training state are checked once here instead of at each call.
+        dtype is the dtype of the input arrays (the dtype of the first node
+        by default). See FlowPlan for details.
+        """
+        return FlowPlan(self, batch_shape, dtype=dtype)
+
     def copy(self, protocol=None):
         """Return a deep copy of the flow.
 
@@ -423,7 +452,8 @@ def save(self, filename, protocol=-1):
         If 'filename' is None, return a string.
 
         Note: the pickled Flow is not guaranteed to be upward or
-        backward compatible."""
+        backward compatible. Use 'mdp.save' to store the flow in the
+        versioned MDP archive format, which can be memory-mapped."""
         if filename is None:
             return _cPickle.dumps(self, protocol)
         else:
@@ -432,6 +462,21 @@ def save(self, filename, protocol=-1):
             with open(filename, mode) as flh:
                 _cPickle.dump(self, flh, protocol)
 
+    @classmethod
+    def load(cls, filename, mmap=False):
+        """Load a flow saved with 'save' or 'mdp.save' from 'filename'.
+
+        If 'mmap' is True, the arrays of an MDP archive are mapped read-only
+        from the file instead of being read into memory, so that several
+        processes loading the same flow share the memory (see 'mdp.load').
+        """
+        flow = mdp.load(filename, mmap=mmap)
+        if not isinstance(flow, cls):
+            err = ("The file %s contains a %s, not a %s." %
+                   (filename, type(flow).__name__, cls.__name__))
+            raise FlowException(err)
+        return flow
+
     def __call__(self, iterable, nodenr = None):
         """Calling an instance is equivalent to call its 'execute' method."""
         return self.execute(iterable, nodenr=nodenr)
@@ -573,6 +618,144 @@ def pop(self, i = -1):
         del self[i]
         return x
 
+class FlowPlan(object):
+    """A static execution plan of a trained flow for input arrays of a
+    fixed shape, e.g. for an online loop that executes the same flow on
+    many chunks of data.
+
+    The plan is created with ``Flow.plan``. It checks the input dimensions,
+    dtypes and training state of the nodes once and then calls the
+    ``_execute`` method of the nodes directly. Nodes which implement
+    ``_execute_into(x, out)`` (see ``Node._can_execute_into``) write their
+    output into two preallocated buffers, which are used alternately by
+    consecutive nodes. The buffers have the same memory layout as the
+    arrays returned by ``execute``. The other nodes allocate their output as usual.
+    Nodes which override ``execute`` itself (e.g. because of an active
+    extension) are executed with ``execute``.
+
+    Note that the returned array can be one of the buffers, so its
+    content is overwritten by the next call (copy it if it is needed
+    later). The plan does not notice if the nodes are changed (e.g.
+    retrained) after its creation, in this case a new plan must be created.
+    """
+
+    def __init__(self, flow, batch_shape, dtype=None):
+        """
+        flow -- the trained flow
+        batch_shape -- the shape (n_samples, input_dim) of the input arrays
+        dtype -- dtype of the input arrays (default is the dtype of the
+                 first node, or 'd' if it is not set)
+        """
+        nodes = flow.flow
+        if len(nodes) == 0:
+            raise FlowException("Can not plan the execution of an empty flow.")
+        batch_shape = tuple(batch_shape)
+        if len(batch_shape) != 2:
+            err = "batch_shape must have length 2, got %s" % str(batch_shape)
+            raise FlowException(err)
+        if dtype is None:
+            dtype = nodes[0].dtype or 'd'
+        for i, node in enumerate(nodes):
+            if node.is_training():
+                err = ("Node #%d (%s) must be trained before the execution "
+                       "can be planned." % (i, str(node)))
+                raise FlowException(err)
+        self.flow = flow
+        self.batch_shape = batch_shape
+        self.dtype = numx.dtype(dtype)
+        # execute zeros once to check the input and to determine the shape
+        # and dtype of the output of each node
+        x = numx.zeros(batch_shape, dtype=self.dtype)
+        in_dtype = self.dtype
+        # stages are tuples (node index, function, use buffer, cast dtype)
+        stages = []
+        buffer_specs = []
+        for i, node in enumerate(nodes):
+            try:
+                x = node.execute(x)
+            except Exception as e:
+                flow._propagate_exception(e, i)
+            cast = None if in_dtype == node.dtype else node.dtype
+            in_dtype = x.dtype
+            if (_method_function(type(node), 'execute') is not
+                _method_function(mdp.Node, 'execute')):
+                stages.append((i, node.execute, False, None))
+            elif node._can_execute_into():
+                stages.append((i, node._execute_into, True, cast))
+                fortran = x.flags.f_contiguous and not x.flags.c_contiguous
+                buffer_specs.append((i, x.shape, x.dtype, fortran))
+            else:
+                stages.append((i, node._execute, False, cast))
+        self._stages, self._buffers = self._allocate_buffers(stages,
+                                                             buffer_specs)
+
+    @staticmethod
+    def _allocate_buffers(stages, buffer_specs):
+        """Assign the ping-pong buffers to the stages.
+
+        A node writes into the buffer which does not contain its input.
+        The output of a node without buffer can be a view of its input, so
+        in this case the next buffer is not switched.
+        """
+        specs = dict((spec[0], spec[1:]) for spec in buffer_specs)
+        nbytes = [0, 0]
+        assignment = {}
+        current = 1
+        for i, _, use_buffer, _ in stages:
+            if use_buffer:
+                current = 1 - current
+                shape, dtype, _ = specs[i]
+                size = int(numx.prod(shape)) * dtype.itemsize
+                nbytes[current] = max(nbytes[current], size)
+                assignment[i] = current
+        pools = [numx.empty(size, dtype='uint8') for size in nbytes]
+        planned = []
+        buffers = []
+        for i, func, use_buffer, cast in stages:
+            out = None
+            if use_buffer:
+                shape, dtype, fortran = specs[i]
+                size = int(numx.prod(shape)) * dtype.itemsize
+                pool = pools[assignment[i]][:size].view(dtype)
+                if fortran:
+                    out = pool.reshape(shape[::-1]).T
+                else:
+                    out = pool.reshape(shape)
+                buffers.append(out)
+            planned.append((i, func, out, cast))
+        return planned, buffers
+
+    def execute(self, x):
+        """Process the array x (with shape batch_shape) through the flow.
+
+        The returned array can be overwritten by the next call.
+        """
+        if x.shape != self.batch_shape:
+            err = ("Expected input with shape %s, got %s." %
+                   (str(self.batch_shape), str(x.shape)))
+            raise FlowException(err)
+        if x.dtype != self.dtype:
+            x = x.astype(self.dtype)
+        for i, func, out, cast in self._stages:
+            try:
+                if cast is not None:
+                    x = x.astype(cast)
+                if out is None:
+                    x = func(x)
+                else:
+                    x = func(x, out)
+            except Exception as e:
+                self.flow._propagate_exception(e, i)
+        return x
+
+    def __call__(self, x):
+        """Calling an instance is equivalent to call its 'execute' method."""
+        return self.execute(x)
+
+    def __str__(self):
+        return "FlowPlan(%s, %s)" % (str(self.flow), str(self.batch_shape))
+
+
 class CheckpointFlow(Flow):
     """Subclass of Flow class that allows user-supplied checkpoint functions
     to be executed at the end of each phase, for example to
@@ -645,7 +828,8 @@ class CheckpointSaveFunction(CheckpointFunction):
     and continue the training.
     """
 
-    def __init__(self, filename, stop_training=0, binary=1, protocol=2):
+    def __init__(self, filename, stop_training=0, binary=1, protocol=2,
+                 archive=False):
         """CheckpointSaveFunction constructor.
 
         'filename'      -- the name of the pickle dump file.
@@ -658,17 +842,115 @@ def __init__(self, filename, stop_training=0, binary=1, protocol=2):
                            the file is opened in binary mode.
         'protocol'      -- is the 'protocol' argument for the pickle dump
                            (see Pickle documentation for details)
+        'archive'       -- if True the node is saved in the MDP archive
+                           format (see 'mdp.save') instead of pickled;
+                           'binary' and 'protocol' are then ignored
         """
         self.filename = filename
         self.proto = protocol
         self.stop_training = stop_training
+        self.archive = archive
         if binary or protocol > 0:
             self.mode = 'wb'
         else:
             self.mode = 'w'
 
     def __call__(self, node):
-        with open(self.filename, self.mode) as fid:
-            if self.stop_training:
-                node.stop_training()
-            _cPickle.dump(node, fid, self.proto)
+        if self.stop_training and node.is_training():
+            node.stop_training()
+        self._save(node)
+
+    def _save(self, node):
+        # the file is replaced atomically, so that it always holds a
+        # complete checkpoint
+        if self.archive:
+            mdp.save(node, self.filename)
+        else:
+            with _atomic_open(self.filename, self.mode) as fid:
+                _cPickle.dump(node, fid, self.proto)
+
+
+class AsyncCheckpointSaveFunction(CheckpointSaveFunction):
+    """Checkpoint function which saves the node in a background thread.
+
+    At the checkpoint only a copy of the node is made, which is much faster
+    than writing it to disk, and the training of the flow continues while
+    the copy is saved by a background thread. At most 'max_pending' copies
+    wait to be saved; when the next checkpoint is reached the training
+    waits until the thread has saved one of them.
+
+    As with CheckpointSaveFunction the file is replaced atomically, so
+    after a crash it holds the last complete checkpoint, from which the
+    training can be resumed (the finished nodes of a flow are skipped by
+    'train'). Call 'wait' to make sure that all the checkpoints are
+    written, e.g. before the end of the program.
+    """
+
+    def __init__(self, filename, stop_training=0, binary=1, protocol=2,
+                 archive=False, max_pending=1):
+        """AsyncCheckpointSaveFunction constructor.
+
+        'max_pending' -- the maximum number of node copies which wait to
+                         be saved
+        The other arguments are as for CheckpointSaveFunction.
+        """
+        super(AsyncCheckpointSaveFunction, self).__init__(
+            filename, stop_training=stop_training, binary=binary,
+            protocol=protocol, archive=archive)
+        if max_pending < 1:
+            err = "max_pending must be at least 1, got %d." % max_pending
+            raise mdp.MDPException(err)
+        self.max_pending = max_pending
+        self._queue = _queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._error = None
+
+    def __call__(self, node):
+        self._raise_error()
+        if self.stop_training and node.is_training():
+            node.stop_training()
+        snapshot = node.copy()
+        if self._thread is None:
+            self._thread = _threading.Thread(target=self._save_thread)
+            self._thread.daemon = True
+            self._thread.start()
+        # blocks if max_pending copies are waiting
+        self._queue.put(snapshot)
+
+    def _save_thread(self):
+        while True:
+            node = self._queue.get()
+            try:
+                if node is None:
+                    return
+                # after an error the later checkpoints are dropped
+                if self._error is None:
+                    self._save(node)
+            except Exception as exception:
+                self._error = exception
+            finally:
+                self._queue.task_done()
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            err = ("Saving the checkpoint %s failed: %s" %
+                   (self.filename, str(error)))
+            raise mdp.MDPException(err)
+
+    def wait(self):
+        """Wait until all the checkpoints are saved.
+
+        Raise an MDPException if saving a checkpoint failed.
+        """
+        self._queue.join()
+        self._raise_error()
+
+    def close(self):
+        """Wait for the pending checkpoints and stop the background
+        thread."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        self._raise_error()
@@ -1,43 +1,67 @@
 # -*- coding:utf-8 -*-
+"""
+The node modules are imported on the first access of one of their nodes,
+e.g. ``mdp.nodes.PCANode``, so that ``import mdp`` does not pay for
+the nodes (and their external dependencies, like ``scipy.signal`` or
+sklearn) which are not used. The sklearn wrappers are generated on the
+first access of a ``*ScikitsLearnNode`` attribute. ``dir(mdp.nodes)``
+and ``mdp.nodes.__all__`` import all the available nodes.
+"""
 __docformat__ = "restructuredtext en"
 
-from .pca_nodes import WhiteningNode, PCANode
-from .sfa_nodes import SFANode, SFA2Node
-from .ica_nodes import ICANode, CuBICANode, FastICANode, TDSEPNode
-from .neural_gas_nodes import GrowingNeuralGasNode, NeuralGasNode
-from .expansion_nodes import (QuadraticExpansionNode, PolynomialExpansionNode,
-                             RBFExpansionNode, GrowingNeuralGasExpansionNode,
-                             GeneralExpansionNode)
-from .fda_nodes import FDANode
-from .em_nodes import FANode
-from .misc_nodes import (IdentityNode, HitParadeNode, TimeFramesNode,
-                        TimeDelayNode, TimeDelaySlidingWindowNode,
-                        EtaComputerNode, NoiseNode, NormalNoiseNode,
-                        CutoffNode, HistogramNode, AdaptiveCutoffNode)
-from .isfa_nodes import ISFANode
-from .rbm_nodes import RBMNode, RBMWithLabelsNode
-from .regression_nodes import LinearRegressionNode
-from .classifier_nodes import (SignumClassifier, PerceptronClassifier,
-                              SimpleMarkovClassifier,
-                              DiscreteHopfieldClassifier,
-                              KMeansClassifier, GaussianClassifier,
-                              NearestMeanClassifier, KNNClassifier)
-from .jade import JADENode
-from .nipals import NIPALSNode
-from .lle_nodes import LLENode, HLLENode
-from .xsfa_nodes import XSFANode, NormalizeNode
-
-# import internals for use in test_suites
-from .misc_nodes import OneDimensionalHitParade as _OneDimensionalHitParade
-from .expansion_nodes import expanded_dim as _expanded_dim
-
-from .mca_nodes_online import MCANode
-from .pca_nodes_online import CCIPCANode, CCIPCAWhiteningNode
-from .sfa_nodes_online import IncSFANode
-from .stats_nodes_online import OnlineCenteringNode, OnlineTimeDiffNode
-
-__all__ = ['PCANode', 'WhiteningNode', 'NIPALSNode', 'FastICANode',
-           'CuBICANode', 'TDSEPNode', 'JADENode', 'SFANode', 'SFA2Node',
+from importlib import import_module
+
+from mdp.utils._lazy_module import LazyModule, install_lazy_module
+
+# node modules and the names they export
+_NODE_MODULES = [
+    ('pca_nodes', ['WhiteningNode', 'PCANode', 'RandomizedPCANode']),
+    ('sfa_nodes', ['SFANode', 'SFA2Node']),
+    ('ica_nodes', ['ICANode', 'CuBICANode', 'FastICANode', 'TDSEPNode']),
+    ('neural_gas_nodes', ['GrowingNeuralGasNode', 'NeuralGasNode']),
+    ('expansion_nodes', ['QuadraticExpansionNode', 'PolynomialExpansionNode',
+                         'RBFExpansionNode', 'GrowingNeuralGasExpansionNode',
+                         'GeneralExpansionNode']),
+    ('fda_nodes', ['FDANode']),
+    ('em_nodes', ['FANode']),
+    ('misc_nodes', ['IdentityNode', 'AffineNode', 'HitParadeNode',
+                    'TimeFramesNode', 'TimeDelayNode',
+                    'TimeDelaySlidingWindowNode',
+                    'EtaComputerNode', 'NoiseNode', 'NormalNoiseNode',
+                    'CutoffNode', 'HistogramNode', 'AdaptiveCutoffNode']),
+    ('isfa_nodes', ['ISFANode']),
+    ('rbm_nodes', ['RBMNode', 'RBMWithLabelsNode']),
+    ('regression_nodes', ['LinearRegressionNode']),
+    ('classifier_nodes', ['SignumClassifier', 'PerceptronClassifier',
+                          'SimpleMarkovClassifier',
+                          'DiscreteHopfieldClassifier',
+                          'KMeansClassifier', 'GaussianClassifier',
+                          'NearestMeanClassifier', 'KNNClassifier']),
+    ('jade', ['JADENode']),
+    ('nipals', ['NIPALSNode']),
+    ('lle_nodes', ['LLENode', 'HLLENode']),
+    ('xsfa_nodes', ['XSFANode', 'NormalizeNode']),
+    ('mca_nodes_online', ['MCANode']),
+    ('pca_nodes_online', ['CCIPCANode', 'CCIPCAWhiteningNode']),
+    ('sfa_nodes_online', ['IncSFANode']),
+    ('stats_nodes_online', ['OnlineCenteringNode', 'OnlineTimeDiffNode']),
+    ]
+
+# nodes with external dependencies,
+# (module, names, name of the mdp.config attribute of the dependency)
+_OPTIONAL_NODE_MODULES = [
+    ('shogun_svm_classifier', ['ShogunSVMClassifier'], 'has_shogun'),
+    ('libsvm_classifier', ['LibSVMClassifier'], 'has_libsvm'),
+    ]
+
+# internals for use in test_suites, name -> (module, name in module)
+_INTERNALS = {
+    '_OneDimensionalHitParade': ('misc_nodes', 'OneDimensionalHitParade'),
+    '_expanded_dim': ('expansion_nodes', 'expanded_dim'),
+    }
+
+__all__ = ['PCANode', 'WhiteningNode', 'RandomizedPCANode', 'NIPALSNode',
+           'FastICANode', 'CuBICANode', 'TDSEPNode', 'JADENode', 'SFANode', 'SFA2Node',
            'ISFANode', 'XSFANode', 'FDANode', 'FANode', 'RBMNode',
            'RBMWithLabelsNode', 'GrowingNeuralGasNode', 'LLENode', 'HLLENode',
            'LinearRegressionNode', 'QuadraticExpansionNode',
@@ -50,63 +74,137 @@
            'EtaComputerNode', 'HitParadeNode', 'NoiseNode', 'NormalNoiseNode',
            'TimeFramesNode', 'TimeDelayNode', 'TimeDelaySlidingWindowNode',
            'CutoffNode', 'AdaptiveCutoffNode', 'HistogramNode',
-           'IdentityNode', '_OneDimensionalHitParade',
+           'IdentityNode', 'AffineNode', '_OneDimensionalHitParade',
            'OnlineCenteringNode', 'OnlineTimeDiffNode', 'CCIPCANode', 'CCIPCAWhiteningNode', 'MCANode',
            'IncSFANode',]
 
-# nodes with external dependencies
-from mdp import config, numx_description, MDPException
+from mdp import numx_description
 
 if numx_description == 'scipy':
-    from .convolution_nodes import Convolution2DNode
+    _NODE_MODULES.append(('convolution_nodes', ['Convolution2DNode']))
     __all__ += ['Convolution2DNode']
 
-if config.has_shogun:
-    from .shogun_svm_classifier import ShogunSVMClassifier
-    __all__ += ['ShogunSVMClassifier']
+# the private modules, which are removed from the namespace
+_OLD_MODULES = ('pca_nodes',
+                'sfa_nodes',
+                'ica_nodes',
+                'neural_gas_nodes',
+                'expansion_nodes',
+                'fda_nodes',
+                'em_nodes',
+                'misc_nodes',
+                'isfa_nodes',
+                'rbm_nodes',
+                'regression_nodes',
+                'classifier_nodes',
+                'jade',
+                'nipals',
+                'lle_nodes',
+                'xsfa_nodes',
+                'convolution_nodes',
+                'shogun_svm_classifier',
+                'svm_classifiers',
+                'libsvm_classifier',
+                'regression_nodes',
+                'classifier_nodes',
+                'utils',
+                'scikits_nodes',
+                'numx_description',
+                'config',
+                'stats_nodes_online',
+                'pca_nodes_online',
+                'mca_nodes_online',
+                'sfa_nodes_online',
+                )
+
+# name -> (module, name in module), for all the nodes which are available
+# without checking for an external dependency
+_EXPORTS = dict(_INTERNALS)
+for _modname, _names in _NODE_MODULES:
+    for _name in _names:
+        _EXPORTS[_name] = (_modname, _name)
+del _modname, _names, _name
+
+# names of the sklearn wrappers, None before they are generated
+_scikits_names = None
+
 
-if config.has_libsvm:
-    from .libsvm_classifier import LibSVMClassifier
-    __all__ += ['LibSVMClassifier']
+def _optional_exports():
+    """Return the name -> (module, name in module) dict of the nodes whose
+    external dependency is available."""
+    from mdp import config
+    exports = {}
+    for modname, names, dependency in _OPTIONAL_NODE_MODULES:
+        if getattr(config, dependency):
+            for name in names:
+                exports[name] = (modname, name)
+    return exports
 
-if config.has_sklearn:
+def _scikits_exports():
+    """Generate the sklearn wrappers (if sklearn is available) and return
+    the name -> wrapper dict."""
+    global _scikits_names
+    from mdp import config
+    if not config.has_sklearn:
+        _scikits_names = []
+        return {}
     from . import scikits_nodes
-    for name in scikits_nodes.DICT_:
-        if name.endswith('Node'):
-            globals()[name] = scikits_nodes.DICT_[name]
-            __all__.append(name)
-        del name
-
-from mdp import utils
-utils.fixup_namespace(__name__, __all__ + ['ICANode'],
-                      ('pca_nodes',
-                       'sfa_nodes',
-                       'ica_nodes',
-                       'neural_gas_nodes',
-                       'expansion_nodes',
-                       'fda_nodes',
-                       'em_nodes',
-                       'misc_nodes',
-                       'isfa_nodes',
-                       'rbm_nodes',
-                       'regression_nodes',
-                       'classifier_nodes',
-                       'jade',
-                       'nipals',
-                       'lle_nodes',
-                       'xsfa_nodes',
-                       'convolution_nodes',
-                       'shogun_svm_classifier',
-                       'svm_classifiers',
-                       'libsvm_classifier',
-                       'regression_nodes',
-                       'classifier_nodes',
-                       'utils',
-                       'scikits_nodes',
-                       'numx_description',
-                       'config',
-                       'stats_nodes_online',
-                       'pca_nodes_online',
-                       'mca_nodes_online',
-                       'sfa_nodes_online',
-                       ))
+    exports = dict((name, node) for name, node in scikits_nodes.DICT_.items()
+                   if name.endswith('Node'))
+    _scikits_names = sorted(exports)
+    return exports
+
+
+class _NodesModule(LazyModule):
+    """Module type of ``mdp.nodes``, which imports the node modules on
+    the first access of one of their names."""
+
+    def __getattr__(self, name):
+        if name.startswith('__') and name != '__all__':
+            raise AttributeError(name)
+        if name == '__all__':
+            names = list(__all__) + sorted(_optional_exports())
+            if _scikits_names is None:
+                self._export(_scikits_exports())
+            names += _scikits_names
+            self.__dict__['__all__'] = names
+            return names
+        if name in _EXPORTS:
+            self._import_module(_EXPORTS[name][0])
+        elif name.endswith('ScikitsLearnNode'):
+            if _scikits_names is None:
+                self._export(_scikits_exports())
+        else:
+            optional = _optional_exports()
+            if name in optional:
+                self._import_module(optional[name][0])
+        try:
+            return self.__dict__[name]
+        except KeyError:
+            raise AttributeError("'module' object has no attribute '%s'" %
+                                 name)
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | set(self.__all__) |
+                      set(_EXPORTS))
+
+    def _import_module(self, modname):
+        """Import the node module modname and export its names."""
+        module = import_module(self.__name__ + '.' + modname)
+        exports = {}
+        for name, (export_modname, attr) in _EXPORTS.items():
+            if export_modname == modname:
+                exports[name] = getattr(module, attr)
+        for optional_modname, names, _ in _OPTIONAL_NODE_MODULES:
+            if optional_modname == modname:
+                for name in names:
+                    exports[name] = getattr(module, name)
+        self._export(exports)
+
+    def _export(self, exports):
+        self.__dict__.update(exports)
+        from mdp import utils
+        utils.fixup_namespace(self.__name__, list(exports), _OLD_MODULES)
+
+
+install_lazy_module(__name__, _NodesModule, copy_namespace=False)
@@ -29,7 +29,12 @@ def _label(self, x):
 
 
 class PerceptronClassifier(ClassifierNode):
-    """A simple perceptron with input_dim input nodes."""
+    """A simple perceptron with input_dim input nodes.
+
+    The weights are updated after each misclassified sample, as in the
+    online perceptron rule. The samples are classified in blocks, so that
+    the data is only processed sample by sample near misclassifications.
+    """
     
     def __init__(self, execute_method=None,
                  input_dim=None, output_dim=None, dtype=None):
@@ -70,19 +75,27 @@ def _train(self, x, labels):
         if not len(self.weights):
             self.weights = numx.ones(self.input_dim)
 
-        for xi, labeli in mdp.utils.izip_stretched(x, labels):
-            new_weights = self.weights
-            new_offset = self.offset_weight
-
-            rate = self.learning_rate * (labeli - self._label(xi))
-            for j in range(self.input_dim):
-                new_weights[j] = self.weights[j] + rate * xi[j]
-
+        labels = _stretch_labels(labels, x.shape[0])
+        n = x.shape[0]
+        block_size = 1
+        i = 0
+        while i < n:
+            # classify a block with the current weights, the weights only
+            # change at the first misclassified sample
+            stop = min(i + block_size, n)
+            errors = labels[i:stop] - self._label(x[i:stop])
+            wrong = errors.nonzero()[0]
+            if not len(wrong):
+                i = stop
+                block_size *= 2
+                continue
+            k = i + wrong[0]
+            rate = self.learning_rate * errors[wrong[0]]
+            self.weights += rate * x[k]
             # the offset corresponds to a node with input 1 all the time
-            new_offset = self.offset_weight + rate * 1
-
-            self.weights = new_weights
-            self.offset_weight = new_offset
+            self.offset_weight = self.offset_weight + rate * 1
+            i = k + 1
+            block_size = 1
 
     def _label(self, x):
         """Returns an array with class labels from the perceptron.
@@ -90,10 +103,25 @@ def _label(self, x):
         return numx.sign(numx.dot(x, self.weights) + self.offset_weight)
 
 
+def _stretch_labels(labels, n):
+    """Return the labels as an array of length n, a single label is
+    repeated for all the data points."""
+    if isinstance(labels, (list, tuple, numx.ndarray)):
+        return numx.asarray(labels)
+    result = numx.empty(n, dtype=numx.asarray(labels).dtype)
+    result.fill(labels)
+    return result
+
+
 class SimpleMarkovClassifier(ClassifierNode):
     """A simple version of a Markov classifier.
     It can be trained on a vector of tuples the label being the next element
     in the testing data.
+
+    Each distinct feature (row of the data) and label is assigned an
+    integer id, the number of occurrences of the features, the labels and
+    of each (feature, label) connection are stored in count tables
+    indexed by these ids.
     """
     def __init__(self, execute_method=None,
                  input_dim=None, output_dim=None, dtype=None):
@@ -104,9 +132,17 @@ def __init__(self, execute_method=None,
                                                 dtype=dtype)
         self.ntotal_connections = 0
 
-        self.features = {}
-        self.labels = {}
-        self.connections = {}
+        # features and labels in the order of their ids
+        self._feature_list = []
+        self._label_list = []
+        # dictionaries mapping features and labels to their ids
+        self._feature_ids = {}
+        self._label_ids = {}
+        # count tables, they can be larger than the number of ids
+        self._feature_counts = numx.zeros(0, dtype='int64')
+        self._label_counts = numx.zeros(0, dtype='int64')
+        # (feature id, label id) connection counts
+        self._connection_counts = numx.zeros((0, 0), dtype='int64')
         
     def _get_supported_dtypes(self):
         """Return the list of dtypes supported by this node."""
@@ -134,71 +170,216 @@ def _train(self, x, labels):
               the same class.
         """
         # if labels is a number, all x's belong to the same class
-        for xi, labeli in mdp.utils.izip_stretched(x, labels):
-            self._learn(xi, labeli)
+        labels = _stretch_labels(labels, x.shape[0])
+        features, feature_idx = _unique_rows(x)
+        labels, label_idx = _unique_labels(labels)
+        n_labels = len(labels)
+        connections = numx.bincount(feature_idx * n_labels + label_idx,
+                                    minlength=len(features) * n_labels)
+        self._add_counts(features, labels,
+                         numx.bincount(feature_idx, minlength=len(features)),
+                         numx.bincount(label_idx, minlength=n_labels),
+                         connections.reshape((len(features), n_labels)))
+        self.ntotal_connections += x.shape[0]
+
+    def _get_ids(self, keys, ids, key_list):
+        """Return the array of ids of keys, adding the unknown ones."""
+        result = numx.empty(len(keys), dtype='int64')
+        for i, key in enumerate(keys):
+            if key not in ids:
+                ids[key] = len(key_list)
+                key_list.append(key)
+            result[i] = ids[key]
+        return result
+
+    def _add_counts(self, features, labels, feature_counts, label_counts,
+                    connection_counts):
+        """Add the counts for the given features and labels to the tables.
+
+        connection_counts -- array with one row per feature and one column
+                             per label
+        """
+        feature_idx = self._get_ids(features, self._feature_ids,
+                                    self._feature_list)
+        label_idx = self._get_ids(labels, self._label_ids, self._label_list)
+        n_features = len(self._feature_list)
+        n_labels = len(self._label_list)
+        if n_features > len(self._feature_counts):
+            self._feature_counts = _grow(self._feature_counts, (n_features,))
+        if n_labels > len(self._label_counts):
+            self._label_counts = _grow(self._label_counts, (n_labels,))
+        shape = self._connection_counts.shape
+        if n_features > shape[0] or n_labels > shape[1]:
+            self._connection_counts = _grow(self._connection_counts,
+                                            (n_features, n_labels))
+        # the ids are unique, so the fancy indexing updates are safe
+        self._feature_counts[feature_idx] += feature_counts
+        self._label_counts[label_idx] += label_counts
+        self._connection_counts[numx.ix_(feature_idx, label_idx)] += \
+            connection_counts
+
+    def __setstate__(self, state):
+        """Set the pickled state of the node.
+
+        Nodes pickled by older MDP versions stored the features, labels
+        and connections as dictionaries, the count tables are rebuilt from
+        them.
+        """
+        features = state.pop('features', None)
+        labels = state.pop('labels', None)
+        connections = state.pop('connections', None)
+        self.__dict__.update(state)
+        if '_feature_list' in state:
+            return
+        self._feature_list = []
+        self._label_list = []
+        self._feature_ids = {}
+        self._label_ids = {}
+        self._feature_counts = numx.zeros(0, dtype='int64')
+        self._label_counts = numx.zeros(0, dtype='int64')
+        self._connection_counts = numx.zeros((0, 0), dtype='int64')
+        features = features or {}
+        labels = labels or {}
+        feature_list = list(features)
+        label_list = list(labels)
+        feature_ids = dict((feature, i)
+                           for i, feature in enumerate(feature_list))
+        label_ids = dict((label, j) for j, label in enumerate(label_list))
+        connection_counts = numx.zeros((len(feature_list), len(label_list)),
+                                       dtype='int64')
+        for (feature, label), count in (connections or {}).items():
+            connection_counts[feature_ids[feature], label_ids[label]] = count
+        self._add_counts(feature_list, label_list,
+                         numx.array([features[f] for f in feature_list],
+                                    dtype='int64'),
+                         numx.array([labels[l] for l in label_list],
+                                    dtype='int64'),
+                         connection_counts)
 
-    def _learn(self, feature, label):
-        feature = tuple(feature)
-        self.ntotal_connections += 1
+    @property
+    def features(self):
+        """Dictionary with the number of occurrences of each feature."""
+        return dict((feature, int(count)) for feature, count in
+                    zip(self._feature_list, self._feature_counts))
 
-        if label in self.labels:
-            self.labels[label] += 1
-        else:
-            self.labels[label] = 1
+    @property
+    def labels(self):
+        """Dictionary with the number of occurrences of each label."""
+        return dict((label, int(count)) for label, count in
+                    zip(self._label_list, self._label_counts))
 
-        if feature in self.features:
-            self.features[feature] += 1
-        else:
-            self.features[feature] = 1
+    @property
+    def connections(self):
+        """Dictionary with the number of occurrences of each observed
+        (feature, label) pair."""
+        n_labels = len(self._label_list)
+        counts = self._connection_counts[:len(self._feature_list), :n_labels]
+        return dict(((self._feature_list[i], self._label_list[j]),
+                     int(counts[i, j]))
+                    for i, j in zip(*counts.nonzero()))
 
-        connection = (feature, label)
-        if connection in self.connections:
-            self.connections[connection] += 1
-        else:
-            self.connections[connection] = 1
+    @property
+    def labels_(self):
+        return list(self._label_list)
 
     def _prob(self, features):
-        return [self._prob_one(feature) for feature in features]
-
-    def _prob_one(self, feature):
-        feature = tuple(feature)
-        probabilities = {}
-
-        try:
-            n_feature_connections = self.features[feature]
-        except KeyError:
-            n_feature_connections = 0
-            # if n_feature_connections == 0, we get a division by zero
-            # we could throw here, but maybe it's best to simply return
-            # an empty dict object
-            return {}
-
-        for label in self.labels:
-            conn = (feature, label)
-            try:
-                n_conn = self.connections[conn]
-            except KeyError:
-                n_conn = 0
-
-            try:
-                n_label_connections = self.labels[label]
-            except KeyError:
-                n_label_connections = 0
-
-            p_feature_given_label = 1.0 * n_conn / n_label_connections
-            p_label = 1.0 * n_label_connections / self.ntotal_connections
-            p_feature = 1.0 * n_feature_connections / self.ntotal_connections
-            prob = 1.0 * p_feature_given_label * p_label / p_feature
-            probabilities[label] = prob
-        return probabilities
+        labels = self.labels_
+        # features that were never seen have no probabilities at all
+        return [dict(list(zip(labels, p))) if p.any() else {}
+                for p in self._prob_array(features)]
+
+    def _rank_prob_array(self, prob, threshold):
+        ranking = super(SimpleMarkovClassifier, self)._rank_prob_array(
+                                                            prob, threshold)
+        # features that were never seen are not ranked, like in prob
+        ranking[~prob.any(axis=1)] = -1
+        return ranking
+
+    def _prob_array(self, features):
+        """Return the probabilities of the labels given each feature.
+
+        The columns are ordered as in ``self.labels_``, the rows of features
+        that were never seen during training are zero.
+        """
+        n_labels = len(self._label_list)
+        prob = numx.zeros((len(features), n_labels))
+        keys, inverse = _unique_rows(features)
+        ids = numx.array([self._feature_ids.get(key, -1) for key in keys],
+                         dtype='int64')[inverse]
+        seen = ids >= 0
+        ids = ids[seen]
+        # p(feature|label) * p(label) / p(feature)
+        prob[seen] = (self._connection_counts[ids, :n_labels] /
+                      self._feature_counts[ids][:, numx.newaxis].astype('d'))
+        return prob
+
+
+def _unique_rows(x):
+    """Return the list of distinct rows of x (as tuples) and the index
+    into it of each row."""
+    x = numx.ascontiguousarray(x)
+    if x.shape[0] == 0:
+        return [], numx.zeros(0, dtype='int64')
+    rows = x.reshape((x.shape[0], -1))
+    # view each row as a single scalar to find the distinct ones
+    void_rows = rows.view(numx.dtype((numx.void,
+                                      rows.dtype.itemsize * rows.shape[1])))
+    _, first, inverse = numx.unique(void_rows.ravel(), return_index=True,
+                                    return_inverse=True)
+    # rows with different bytes can still be equal (e.g. 0. and -0.)
+    keys, idx = _index_keys([tuple(rows[i]) for i in first])
+    return keys, idx[inverse]
+
+def _unique_labels(labels):
+    """Return the list of distinct labels and the index into it of each
+    label."""
+    if labels.dtype.kind == 'O':
+        return _index_keys(labels)
+    unique, idx = numx.unique(labels, return_inverse=True)
+    return list(unique), idx
+
+def _index_keys(keys):
+    """Return the list of distinct keys (in order of appearance) and the
+    index into it of each key."""
+    unique = []
+    ids = {}
+    idx = numx.empty(len(keys), dtype='int64')
+    for i, key in enumerate(keys):
+        if key not in ids:
+            ids[key] = len(unique)
+            unique.append(key)
+        idx[i] = ids[key]
+    return unique, idx
+
+def _grow(counts, shape):
+    """Return a zero-padded copy of counts with at least the given shape,
+    the size is doubled to amortize repeated growing."""
+    new_shape = tuple(max(new, 2*old) if new > old else old
+                      for new, old in zip(shape, counts.shape))
+    new_counts = numx.zeros(new_shape, dtype=counts.dtype)
+    new_counts[tuple(slice(0, n) for n in counts.shape)] = counts
+    return new_counts
 
 
 class DiscreteHopfieldClassifier(ClassifierNode):
-    """Node for simulating a simple discrete Hopfield model"""
+    """Node for simulating a simple discrete Hopfield model
+
+    All patterns of a chunk are stored with a single matrix product and
+    recalled together. With asynchronous updates (the default) the units
+    are updated one at a time, in random order if ``self._shuffled_update``
+    is True (the same order is used for all patterns of a chunk in each
+    sweep). With synchronous updates all units are updated at once, a
+    pattern which oscillates between two states is returned in the last
+    one.
+    """
     # TODO: It is unclear if this belongs to classifiers or is a general node
     # because label space is a subset of feature space
-    def __init__(self, execute_method=None,
+    def __init__(self, execute_method=None, synchronous=False,
                  input_dim=None, output_dim=None, dtype='b'):
+        """
+        synchronous -- if True, update all the units at the same time
+                       during recall, instead of one at a time
+        """
         super(DiscreteHopfieldClassifier, self).__init__(
                                             execute_method=execute_method,
                                             input_dim=input_dim,
@@ -207,6 +388,12 @@ def __init__(self, execute_method=None,
         self._weight_matrix = 0 # assigning zero to ease addition
         self._num_patterns = 0
         self._shuffled_update = True
+        self.synchronous = synchronous
+
+    def __setstate__(self, state):
+        # nodes pickled by older MDP versions only had asynchronous updates
+        state.setdefault('synchronous', False)
+        self.__dict__.update(state)
 
     def _get_supported_dtypes(self):
         return ['b']
@@ -217,14 +404,10 @@ def _train(self, x):
         x -- a matrix having different variables on different columns
             and observations on rows.
         """
-        for pattern in x:
-            self._train_one(pattern)
-
-    def _train_one(self, pattern):
-        pattern = mdp.utils.bool_to_sign(pattern)
-        weights = numx.outer(pattern, pattern)
+        patterns = mdp.utils.bool_to_sign(x)
+        weights = mdp.utils.mult(patterns.T, patterns)
         self._weight_matrix += old_div(weights, float(self.input_dim))
-        self._num_patterns += 1
+        self._num_patterns += x.shape[0]
 
     @property
     def memory_size(self):
@@ -240,39 +423,75 @@ def load_parameter(self):
 
     def _stop_training(self):
         # remove self-feedback
-        # we could use numx.fill_diagonal, but thats numpy 1.4 only
-        for i in range(self.input_dim):
-            self._weight_matrix[i][i] = 0
+        numx.fill_diagonal(self._weight_matrix, 0)
 
     def _label(self, x, threshold = 0):
         """Retrieves patterns from the associative memory.
         """
         threshold = numx.zeros(self.input_dim) + threshold
-        return numx.array([self._label_one(pattern, threshold) for pattern in x])
+        patterns = mdp.utils.bool_to_sign(x)
+        if self.synchronous:
+            self._recall_synchronous(patterns, threshold)
+        else:
+            self._recall_asynchronous(patterns, threshold)
+        return mdp.utils.sign_to_bool(patterns)
 
-    def _label_one(self, pattern, threshold):
-        pattern = mdp.utils.bool_to_sign(pattern)
+    def _recall_asynchronous(self, patterns, threshold):
+        """Update the patterns in-place until they converge.
 
-        has_converged = False
-        while not has_converged:
-            has_converged = True
+        With shuffled updates each pattern is recalled on its own, so that
+        every pattern draws a new unit order in each sweep (as in the
+        pattern by pattern recall) and the results are reproducible with a
+        fixed seed. Otherwise all the patterns are updated together.
+        """
+        if self._shuffled_update:
+            for i in range(patterns.shape[0]):
+                self._recall_asynchronous_patterns(patterns[i:i+1],
+                                                   threshold)
+        else:
+            self._recall_asynchronous_patterns(patterns, threshold)
+
+    def _recall_asynchronous_patterns(self, patterns, threshold):
+        """Update the patterns in-place with a shared unit order in each
+        sweep until they converge."""
+        # indices of the patterns that have not converged yet
+        active = numx.arange(patterns.shape[0])
+        while len(active):
+            current = patterns[active]
+            changed = numx.zeros(len(active), dtype=bool)
             iter_order = list(range(len(self._weight_matrix)))
             if self._shuffled_update:
                 numx_rand.shuffle(iter_order)
             for row in iter_order:
-                w_row = self._weight_matrix[row]
-
-                thresh_row = threshold[row]
-                new_pattern_row = numx.sign(numx.dot(w_row, pattern) - thresh_row)
-
-                if new_pattern_row == 0:
-                    # Following McKay, Neural Networks, we do nothing
-                    # when the new pattern is zero
-                    pass
-                elif pattern[row] != new_pattern_row:
-                    has_converged = False
-                    pattern[row] = new_pattern_row
-        return mdp.utils.sign_to_bool(pattern)
+                new_row = numx.sign(mdp.utils.mult(current,
+                                                   self._weight_matrix[row])
+                                    - threshold[row])
+                # Following McKay, Neural Networks, we do nothing
+                # when the new pattern is zero
+                update = (new_row != 0) & (new_row != current[:, row])
+                current[update, row] = new_row[update]
+                changed |= update
+            patterns[active] = current
+            active = active[changed]
+
+    def _recall_synchronous(self, patterns, threshold):
+        """Update the patterns in-place until they converge or oscillate
+        between two states."""
+        active = numx.arange(patterns.shape[0])
+        previous = None
+        while len(active):
+            current = patterns[active]
+            new = numx.sign(mdp.utils.mult(current, self._weight_matrix.T)
+                            - threshold)
+            # do nothing for units with zero input
+            new = numx.where(new == 0, current, new)
+            patterns[active] = new
+            running = (new != current).any(axis=1)
+            if previous is not None:
+                # stop the patterns in a cycle of length two
+                running &= (new != previous).any(axis=1)
+            active = active[running]
+            previous = current[running]
 
 # TODO: Make it more efficient
 
@@ -353,6 +572,11 @@ class GaussianClassifier(ClassifierNode):
 
     Given a set of labelled data, the node fits a gaussian distribution
     to each class.
+
+    The densities are evaluated in the log-domain using the Cholesky
+    factors of the covariance matrices, so that the posterior
+    probabilities do not underflow in high dimensions. The densities of
+    all classes are computed together with a single matrix product.
     """
     
     def __init__(self, execute_method=False,
@@ -362,12 +586,13 @@ def __init__(self, execute_method=False,
                                                  output_dim=output_dim,
                                                  dtype=dtype)
         self._cov_objs = {}  # only stored during training
-        # this list contains the square root of the determinant of the
-        # corresponding covariance matrix
-        self._sqrt_def_covs = []
-        # we are going to store the inverse of the covariance matrices
-        # since only those are useful to compute the probabilities
-        self.inv_covs = []
+        # inverse Cholesky factors L^-1 of all covariance matrices, stacked
+        # to a (n_labels*input_dim, input_dim) matrix
+        self._whitening = None
+        # the means transformed with the inverse Cholesky factors
+        self._whitened_means = None
+        # log of the class prior times the normalization constant
+        self._log_norms = None
         self.means = []
         self.p = []  # number of observations
         self.labels = None
@@ -376,6 +601,47 @@ def __init__(self, execute_method=False,
     def is_invertible():
         return False
 
+    @property
+    def inv_covs(self):
+        """List with the inverse of the covariance matrices (computed on
+        demand from the Cholesky factors)."""
+        if self._whitening is None:
+            return []
+        dim = self.input_dim
+        return [utils.mult(w.T, w)
+                for w in self._whitening.reshape((-1, dim, dim))]
+
+    def __setstate__(self, state):
+        """Set the pickled state of the node.
+
+        Nodes pickled by older MDP versions stored the inverse covariance
+        matrices and the square roots of their determinants, the whitening
+        matrices and normalization constants are rebuilt from them.
+        """
+        inv_covs = state.pop('inv_covs', None)
+        state.pop('_sqrt_def_covs', None)
+        self.__dict__.update(state)
+        if '_whitening' in state:
+            return
+        self._whitening = None
+        self._whitened_means = None
+        self._log_norms = None
+        if not inv_covs:
+            return
+        whitening = []
+        log_dets = []
+        for inv_cov in inv_covs:
+            # inv_cov = R R^T, so R^T is an inverse factor of the covariance
+            chol = utils.cholesky(inv_cov)
+            whitening.append(chol.T)
+            log_dets.append(-numx.log(chol.diagonal()).sum())
+        self._whitening = numx.concatenate(whitening)
+        self._whitened_means = numx.concatenate(
+            [utils.mult(w, mn) for w, mn in zip(whitening, self.means)])
+        self._log_norms = (numx.log(self.p) - numx.array(log_dets) -
+                           0.5*self.input_dim*numx.log(2.*numx.pi)
+                           ).astype(self.dtype)
+
     def _check_train_args(self, x, labels):
         if isinstance(labels, (list, tuple, numx.ndarray)) and (
             len(labels) != x.shape[0]):
@@ -400,86 +666,97 @@ def _train(self, x, labels):
         """
         # if labels is a number, all x's belong to the same class
         if isinstance(labels, (list, tuple, numx.ndarray)):
+            # sort the data by label once, each class is then a contiguous
+            # block of rows
             labels_ = numx.asarray(labels)
-            # get all classes from cl
-            for lbl in set(labels_):
-                x_lbl = numx.compress(labels_==lbl, x, axis=0)
-                self._update_covs(x_lbl, lbl)
+            order = labels_.argsort(kind="mergesort")
+            lbls, starts = numx.unique(labels_[order], return_index=True)
+            x = x[order]
+            ends = list(starts[1:]) + [len(order)]
+            for lbl, start, end in zip(lbls, starts, ends):
+                self._update_covs(x[start:end], lbl)
         else:
             self._update_covs(x, labels)
 
     def _stop_training(self):
         self.labels = list(self._cov_objs.keys())
         self.labels.sort()
+        dim = self.input_dim
         nitems = 0
+        whitening = []
+        log_dets = []
         for lbl in self.labels:
             cov, mean, p = self._cov_objs[lbl].fix()
             nitems += p
-            self._sqrt_def_covs.append(numx.sqrt(numx_linalg.det(cov)))
-            if self._sqrt_def_covs[-1] == 0.0:
+            try:
+                chol = utils.cholesky(cov)
+            except numx_linalg.LinAlgError:
                 err = ("The covariance matrix is singular for at least "
                        "one class.")
                 raise mdp.NodeException(err)
+            whitening.append(utils.solve_triangular(
+                chol, numx.eye(dim, dtype=self.dtype), lower=True))
+            # half the log of the determinant of the covariance matrix
+            log_dets.append(numx.log(chol.diagonal()).sum())
             self.means.append(mean)
             self.p.append(p)
-            self.inv_covs.append(utils.inv(cov))
 
         for i in range(len(self.p)):
             self.p[i] /= float(nitems)
 
+        self._whitening = numx.concatenate(whitening)
+        self._whitened_means = numx.concatenate(
+            [utils.mult(w, mn) for w, mn in zip(whitening, self.means)])
+        self._log_norms = (numx.log(self.p) - numx.array(log_dets) -
+                           0.5*dim*numx.log(2.*numx.pi)).astype(self.dtype)
         del self._cov_objs
 
-    def _gaussian_prob(self, x, lbl_idx):
-        """Return the probability of the data points x with respect to a
-        gaussian.
+    def _log_joint(self, x):
+        """Return the log of prior times density for each class, i.e. an
+        array with shape (x.shape[0], len(self.labels))."""
+        n_labels = len(self.labels)
+        z = utils.mult(x, self._whitening.T)
+        z -= self._whitened_means
+        z = z.reshape((x.shape[0], n_labels, self.input_dim))
+        return self._log_norms - 0.5*(z*z).sum(axis=2)
+
+    def _log_posterior(self, x):
+        log_joint = self._log_joint(x)
+        # normalize with the log-sum-exp trick
+        log_max = log_joint.max(axis=1)[:, numx.newaxis]
+        log_joint -= log_max
+        log_joint -= numx.log(numx.exp(log_joint).sum(axis=1))[:, numx.newaxis]
+        return log_joint
 
-        Input arguments:
-        x -- Input data
-        S -- Covariance matrix
-        mn -- Mean
-        """
-        x = self._refcast(x)
+    @property
+    def labels_(self):
+        return self.labels
 
-        dim = self.input_dim
-        sqrt_detS = self._sqrt_def_covs[lbl_idx]
-        invS = self.inv_covs[lbl_idx]
-        # subtract the mean
-        x_mn = x - self.means[lbl_idx][numx.newaxis, :]
-        # exponent
-        exponent = -0.5 * (utils.mult(x_mn, invS)*x_mn).sum(axis=1)
-        # constant
-        constant = old_div((2.*numx.pi)**(old_div(-dim,2.)), sqrt_detS)
-        # probability
-        return constant * numx.exp(exponent)
+    def log_prob(self, x):
+        """Return the log of the posterior probability of each class given
+        the input.
 
-    def class_probabilities(self, x):
-        """Return the posterior probability of each class given the input."""
+        The result is an array with one row per data point, the columns
+        are ordered as in ``self.labels``.
+        """
         self._pre_execution_checks(x)
+        return self._log_posterior(self._refcast(x))
 
-        # compute the probability for each class
-        tmp_prob = numx.zeros((x.shape[0], len(self.labels)),
-                              dtype=self.dtype)
-        for i in range(len(self.labels)):
-            tmp_prob[:, i] = self._gaussian_prob(x, i)
-            tmp_prob[:, i] *= self.p[i]
-
-        # normalize to probability 1
-        # (not necessary, but sometimes useful)
-        tmp_tot = tmp_prob.sum(axis=1)
-        tmp_tot = tmp_tot[:, numx.newaxis]
-        return old_div(tmp_prob, tmp_tot)
+    def class_probabilities(self, x):
+        """Return the posterior probability of each class given the input."""
+        return self.prob_array(x)
 
-    def _prob(self, x):
-        """Return the posterior probability of each class given the input in a dict."""
+    def _prob_array(self, x):
+        """Return the posterior probability of each class given the input.
 
-        class_prob = self.class_probabilities(x)
-        return [dict(list(zip(self.labels, prob))) for prob in class_prob]
+        The columns are ordered as in ``self.labels``.
+        """
+        return numx.exp(self._log_posterior(x))
 
     def _label(self, x):
         """Classify the input data using Maximum A-Posteriori."""
 
-        class_prob = self.class_probabilities(x)
-        winner = class_prob.argmax(axis=-1)
+        winner = self._log_joint(x).argmax(axis=-1)
         return [self.labels[winner[i]] for i in range(len(winner))]
     
 # TODO: Maybe extract some common elements form this class and
@@ -541,15 +818,23 @@ def _stop_training(self):
             ordered_means.append(self.label_means[label])
         self.ordered_means = numx.vstack(ordered_means)
             
+    @property
+    def labels_(self):
+        return self.ordered_labels
+
+    def _square_distances(self, x):
+        """Return the square distances between x and the class means."""
+        square_distances = (x*x).sum(1)[:, numx.newaxis] \
+                      + (self.ordered_means*self.ordered_means).sum(1)
+        square_distances -= 2 * numx.dot(x, self.ordered_means.T)
+        return square_distances
+
     def _label(self, x):
         """Classify the data based on minimal distance to mean."""
-        n_labels = len(self.ordered_labels)
-        differences = x[:,:,numx.newaxis].repeat(n_labels, 2). \
-                        swapaxes(1,2) - self.ordered_means
-        square_distances = (differences**2).sum(2)
-        label_indices = square_distances.argmin(1)
+        label_indices = self._square_distances(x).argmin(1)
         labels = [self.ordered_labels[i] for i in label_indices]
         return labels
+
     
     
 class KNNClassifier(ClassifierNode):
@@ -616,13 +901,34 @@ def _stop_training(self):
                                            dtype="int32") * i
                                  for i in range(len(self.ordered_labels))])
 
+    @property
+    def labels_(self):
+        return self.ordered_labels
+
     def _label(self, x):
         """Label the data by comparison with the reference points."""
+        win_inds = self._prob_array(x).argmax(1)
+        labels = [self.ordered_labels[i] for i in win_inds]
+        return labels
+
+    def _prob_array(self, x):
+        """Return the fraction of the k nearest reference points having
+        each label.
+
+        The columns are ordered as in ``self.ordered_labels``.
+        """
         square_distances = (x*x).sum(1)[:, numx.newaxis] \
                       + (self.samples*self.samples).sum(1)
         square_distances -= 2 * numx.dot(x, self.samples.T)
-        min_inds = square_distances.argsort()
-        win_inds = [numx.bincount(self.sample_label_indices[indices[0:self.k]]).
-                    argmax(0) for indices in min_inds]
-        labels = [self.ordered_labels[i] for i in win_inds]
-        return labels
+        k = min(self.k, self.n_samples)
+        if k < self.n_samples:
+            min_inds = square_distances.argpartition(k-1, axis=1)[:, :k]
+        else:
+            min_inds = square_distances.argsort(axis=1)
+        n_labels = len(self.ordered_labels)
+        # count the labels of the neighbours with a single bincount
+        label_inds = (self.sample_label_indices[min_inds] +
+                      n_labels * numx.arange(len(x))[:, numx.newaxis])
+        counts = numx.bincount(label_inds.ravel(),
+                               minlength=n_labels*len(x))
+        return counts.reshape((len(x), n_labels)) / float(k)
@@ -84,8 +84,7 @@ def _stop_training(self):
         if not self.output_dim:
             self.output_dim = d
         k = self.output_dim
-        # indices of the diagonal elements of a dxd or kxk matrix
-        idx_diag_d = [i*(d+1) for i in range(d)]
+        # indices of the diagonal elements of a kxk matrix
         idx_diag_k = [i*(k+1) for i in range(k)]
         # constant term in front of the log-likelihood
         const = -d/2. * numx.log(2.*numx.pi)
@@ -105,7 +104,8 @@ def _stop_training(self):
         if d<=300:
             scale = det(cov_mtx)**(old_div(1.,d))
         else:
-            scale = numx.product(sigma)**(old_div(1.,d))
+            # geometric mean in the log-domain, the product overflows
+            scale = numx.exp(numx.log(sigma).mean())
         if scale <= 0.:
             err = ("The covariance matrix of the data is singular. "
                    "Redundant dimensions need to be removed.")
@@ -114,36 +114,46 @@ def _stop_training(self):
         A = normal(0., sqrt(old_div(scale,k)), size=(d, k)).astype(typ)
 
         ##### EM-cycle
+        # B = (A A^T + Sigma)^-1 is never formed explicitly. With the matrix
+        # inversion lemma
+        #   B = Sigma^-1 - Sigma^-1 A M^-1 A^T Sigma^-1
+        # where M = I + A^T Sigma^-1 A is only kxk, and with the matrix
+        # determinant lemma
+        #   det(A A^T + Sigma) = det(M) det(Sigma)
+        # so that no dxd matrix has to be inverted.
         lhood_curve = []
         base_lhood = None
         old_lhood = -numx.inf
         for t in range(self.max_cycles):
-            ## compute B = (A A^T + Sigma)^-1
-            B = mult(A, A.T)
-            # B += diag(sigma), avoid computing diag(sigma) which is dxd
-            B.ravel().put(idx_diag_d, B.ravel().take(idx_diag_d)+sigma)
-            # this quantity is used later for the log-likelihood
+            ## compute A^T B = M^-1 A^T Sigma^-1
+            inv_sigma = 1./sigma
+            trA_inv_sigma = A.T * inv_sigma
+            M = mult(trA_inv_sigma, A)
+            M.ravel().put(idx_diag_k, M.ravel().take(idx_diag_k)+1.)
+            inv_M = inv(M)
+            trA_B = mult(inv_M, trA_inv_sigma)
+            # log(det(A A^T + Sigma)), used later for the log-likelihood
             # abs is there to avoid numerical errors when det < 0
-            log_det_B = numx.log(abs(det(B)))
-            # end the computation of B
-            B = inv(B)
+            log_det_B = numx.log(abs(det(M))) + numx.log(sigma).sum()
 
             ## other useful quantities
-            trA_B = mult(A.T, B)
             trA_B_cov_mtx = mult(trA_B, cov_mtx)
 
             ##### E-step
             ## E_yyT = E(y_n y_n^T | x_n)
-            E_yyT = - mult(trA_B, A) + mult(trA_B_cov_mtx, trA_B.T)
-            # E_yyT += numx.eye(k)
-            E_yyT.ravel().put(idx_diag_k, E_yyT.ravel().take(idx_diag_k)+1.)
+            ## since A^T B A = I - M^-1 this is M^-1 + A^T B C B A
+            E_yyT = inv_M + mult(trA_B_cov_mtx, trA_B.T)
+
+            ##### log-likelihood
+            # trace(B C) = trace(Sigma^-1 C) - trace(M^-1 A^T Sigma^-1 C
+            #                                         Sigma^-1 A)
+            trace_B_cov = ((inv_sigma*cov_diag).sum() -
+                           (trA_B_cov_mtx*trA_inv_sigma).sum())
 
             ##### M-step
             A = mult(trA_B_cov_mtx.T, inv(E_yyT))
-            sigma = cov_diag - (mult(A, trA_B_cov_mtx)).diagonal()
+            sigma = cov_diag - (A*trA_B_cov_mtx.T).sum(axis=1)
 
-            ##### log-likelihood
-            trace_B_cov = (B*cov_mtx.T).sum()
             # this is actually likelihood/tlen.
             lhood = const - 0.5*log_det_B - 0.5*trace_B_cov
             if verbose:
@@ -170,11 +180,11 @@ def _stop_training(self):
         self.sigma = sigma
 
         ## MAP matrix
-        # compute B = (A A^T + Sigma)^-1
-        B = mult(A, A.T).copy()
-        B.ravel().put(idx_diag_d, B.ravel().take(idx_diag_d)+sigma)
-        B = inv(B)
-        self.E_y_mtx = mult(B.T, A)
+        # B A = Sigma^-1 A M^-1, computed with the inversion lemma as above
+        inv_sigma_A = A / sigma[:, numx.newaxis]
+        M = mult(A.T, inv_sigma_A)
+        M.ravel().put(idx_diag_k, M.ravel().take(idx_diag_k)+1.)
+        self.E_y_mtx = mult(inv_sigma_A, inv(M))
 
         self.lhood = lhood_curve
 
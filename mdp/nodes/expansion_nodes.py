@@ -64,12 +64,24 @@ def expanded_dim(self, dim):
         return expanded_dim(self._degree, dim)
 
     def _execute(self, x):
+        # preallocate memory
+        dexp = numx.zeros((self.output_dim, x.shape[0]), dtype=self.dtype)
+        return self._expand(x, dexp).T
+
+    def _execute_into(self, x, out):
+        if out.flags.f_contiguous:
+            self._expand(x, out.T)
+        else:
+            # writing the monomials into the columns of out is slow
+            out[:] = self._execute(x)
+        return out
+
+    def _expand(self, x, dexp):
+        """Write the monomials of x into the rows of dexp."""
         degree = self._degree
         dim = self.input_dim
         n = x.shape[1]
 
-        # preallocate memory
-        dexp = numx.zeros((self.output_dim, x.shape[0]), dtype=self.dtype)
         # copy monomials of degree 1
         dexp[0:n, :] = x.T
 
@@ -91,7 +103,7 @@ def _execute(self, x):
                 next_lens[j+1] = len_
                 k = k+len_
 
-        return dexp.T
+        return dexp
 
 class QuadraticExpansionNode(PolynomialExpansionNode):
     """Perform expansion in the space formed by all linear and quadratic
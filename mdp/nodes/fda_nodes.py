@@ -86,9 +86,11 @@ def _update_means(self, x, label):
         label -- The label for that class.
         """
         if label not in self.means:
-            self.means[label] = numx.zeros((1, self.input_dim), dtype=self.dtype)
+            self.means[label] = numx.zeros(
+                (1, self.input_dim),
+                dtype=mdp.utils.accumulator_dtype(self.dtype))
             self.tlens[label] = 0
-        self.means[label] += x.sum(axis=0)
+        self.means[label] += x.sum(axis=0, dtype=self.means[label].dtype)
         self.tlens[label] += x.shape[0]
 
     # Training step 2: compute the overall and within-class covariance
@@ -97,8 +99,9 @@ def _update_means(self, x, label):
     def _train_fda(self, x, labels):
         """Gather data for the overall and within-class covariance"""
         if self._S_W is None:
-            self._S_W = numx.zeros((self.input_dim, self.input_dim),
-                                   dtype=self.dtype)
+            self._S_W = numx.zeros(
+                (self.input_dim, self.input_dim),
+                dtype=mdp.utils.accumulator_dtype(self.dtype))
         # update the covariance matrix of all classes
         self._allcov.update(x)
         # if labels is a number, all x's belong to the same class
@@ -126,6 +129,10 @@ def _stop_fda(self):
         else:
             rng = (1, self.output_dim)
         self.v = mdp.utils.symeig(S_W, S_T, range=rng, overwrite = 1)[1]
+        # the eigenvalue problem may have been solved with a larger
+        # precision (see mdp.precision)
+        self.v = self._refcast(self.v)
+        self.avg = self._refcast(self.avg)
 
     def _update_SW(self, x, label):
         """Update the covariance matrix of the class means.
@@ -133,7 +140,7 @@ def _update_SW(self, x, label):
         x -- Data points from a single class.
         label -- The label for that class.
         """
-        x = x - self.means[label]
+        x = x - self._refcast(self.means[label])
         self._S_W += mdp.utils.mult(x.T, x)
     
     # Overwrite the standard methods
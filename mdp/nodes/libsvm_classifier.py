@@ -128,11 +128,14 @@ def predict_probability(self, x):
         else:
             return self._prob([x])
 
-    def _prob(self, x):
+    @property
+    def labels_(self):
+        return self.model.get_labels()
+
+    def _prob_array(self, x):
         y = [0] * len(x)
         p_labs, p_acc, p_vals = libsvmutil.svm_predict(y, x.tolist(), self.model, "-b 1")
-        labels = self.model.get_labels()
-        return [dict(list(zip(labels, ps))) for ps in p_vals]
+        return numx.array(p_vals)
 
     def _train(self, x, labels):
         super(LibSVMClassifier, self)._train(x, labels)
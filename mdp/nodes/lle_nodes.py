@@ -4,8 +4,9 @@
 from past.utils import old_div
 __docformat__ = "restructuredtext en"
 
+import mdp
 from mdp import numx, numx_linalg, Cumulator, TrainingException, MDPWarning
-from mdp.utils import mult, nongeneral_svd, svd, sqrtm, symeig
+from mdp.utils import mult, nongeneral_svd, svd, sqrtm
 import warnings as _warnings
 
 # some useful functions
@@ -202,7 +203,8 @@ def _stop_training(self):
             WW = mult(W, W.T)
             # regularizes the eigenvalues, does not change the eigenvectors:
             WW[W_diag_idx, W_diag_idx] += 0.1
-            sig, U = symeig(WW, range=(2, self.output_dim+1), overwrite=True)
+            sig, U = mdp.utils.symeig(WW, range=(2, self.output_dim+1),
+                                      overwrite=True)
 
         self.training_projection = U
 
@@ -527,7 +529,8 @@ def _stop_training(self):
             # regularizes the eigenvalues, does not change the eigenvectors:
             W_diag_idx = numx.arange(N)
             WW[W_diag_idx, W_diag_idx] += 0.01
-            sig, U = symeig(WW, range=(2, self.output_dim+1), overwrite=True)
+            sig, U = mdp.utils.symeig(WW, range=(2, self.output_dim+1),
+                                      overwrite=True)
             Y = U*numx.sqrt(N)
             del WW
         del W
@@ -14,6 +14,8 @@
 import pickle as pickle
 import pickle as real_pickle
 
+from numpy.lib.stride_tricks import as_strided
+
 class IdentityNode(PreserveDimNode):
     """Execute returns the input data and the node is not trainable.
 
@@ -31,10 +33,112 @@ def _get_supported_dtypes(self):
     def is_trainable():
         return False
 
+
+class AffineNode(Node):
+    """Apply the affine map ``y = x * matrix + bias``.
+
+    The node is not trainable. It is used by ``Flow.compile`` to replace
+    consecutive linear nodes with a single one (see ``mdp.fusion``).
+
+    **Internal variables of interest**
+
+      ``self.matrix``
+          The ``(input_dim, output_dim)`` matrix of the map.
+
+      ``self.bias``
+          The bias vector of length ``output_dim`` (or None).
+    """
+
+    def __init__(self, matrix, bias=None, input_dim=None, output_dim=None,
+                 dtype=None):
+        """
+        matrix -- matrix with shape (input_dim, output_dim)
+        bias -- vector of length output_dim, or None for a linear map
+        """
+        matrix = numx.asarray(matrix)
+        if input_dim is None:
+            input_dim = matrix.shape[0]
+        if output_dim is None:
+            output_dim = matrix.shape[1]
+        if matrix.shape != (input_dim, output_dim):
+            err = ("matrix has shape %s, expected %s" %
+                   (str(matrix.shape), str((input_dim, output_dim))))
+            raise NodeException(err)
+        if bias is not None:
+            bias = numx.asarray(bias).ravel()
+            if bias.shape[0] != output_dim:
+                err = ("bias has length %d, expected %d" %
+                       (bias.shape[0], output_dim))
+                raise NodeException(err)
+        super(AffineNode, self).__init__(input_dim=input_dim,
+                                         output_dim=output_dim, dtype=dtype)
+        self.matrix = matrix
+        self.bias = bias
+
+    @staticmethod
+    def is_trainable():
+        return False
+
+    @staticmethod
+    def is_invertible():
+        return False
+
+    def _execute(self, x):
+        y = utils.mult(x, self.matrix.astype(self.dtype, copy=False))
+        if self.bias is not None:
+            y += self.bias.astype(self.dtype, copy=False)
+        return y
+
+    def _execute_into(self, x, out):
+        matrix = self.matrix.astype(self.dtype, copy=False)
+        if out.flags.c_contiguous and out.dtype == x.dtype:
+            numx.dot(x, matrix, out=out)
+        else:
+            out[:] = utils.mult(x, matrix)
+        if self.bias is not None:
+            out += self.bias.astype(self.dtype, copy=False)
+        return out
+
+def _hit_parade_threshold(x, k, largest):
+    """Return the k-th largest (or smallest) value along the first axis.
+
+    For a 2d array x the thresholds of all columns are computed at once.
+    Return None if there are no more than k samples.
+    """
+    rows = x.shape[0]
+    if k >= rows:
+        return None
+    if largest:
+        return numx.partition(x, rows-k, axis=0)[rows-k]
+    else:
+        return numx.partition(x, k-1, axis=0)[k-1]
+
+def _hit_parade_positions(rows, cand, thr, is_open):
+    """Yield the sample positions that a hit-parade update has to visit.
+
+    As long as is_open(thr) is True a sample outside of the candidates
+    cand could still enter the hit-parade, so all positions are visited.
+    Afterwards the remaining candidates are sufficient.
+    """
+    pos = 0
+    if thr is not None:
+        while pos < rows and is_open(thr):
+            yield pos
+            pos += 1
+    for i in cand[cand.searchsorted(pos):]:
+        yield i
+
 class OneDimensionalHitParade(object):
     """
     Class to produce hit-parades (i.e., a list of the largest
     and smallest values) out of a one-dimensional time-series.
+
+    The samples of each chunk are not visited one by one: the
+    ``n_candidates`` most extreme values of the chunk are pre-selected
+    with a partial sort and the minimum gap constraint is only applied
+    to them. All other samples are visited only as long as they could
+    still enter the hit-parade, so the result is the same as for a
+    sequential scan over all samples.
     """
     
     def __init__(self, n, d, real_dtype="d", integer_dtype="l"):
@@ -65,24 +169,50 @@ def __init__(self, n, d, real_dtype="d", integer_dtype="l"):
         self.lM = 0
         self.lm = 0
 
+    @property
+    def n_candidates(self):
+        """Number of samples per chunk pre-selected for maxima and minima."""
+        return 2 * self.n * (self.d + 1)
+
     def update(self, inp):
         """
         Input arguments:
         inp -- tuple (time-series, time-indices)
         """
         (x, ix) = inp
-        rows = len(x)
+        k = self.n_candidates
+        self._update_maxima(x, ix, _hit_parade_threshold(x, k, True))
+        self._update_minima(x, ix, _hit_parade_threshold(x, k, False))
+
+    def _update_maxima(self, x, ix, thr):
+        """Update the maxima with the time-series x.
+
+        thr -- Only samples larger or equal than thr are guaranteed to be
+            visited once the smallest stored maximum reaches thr
+            (None to visit all samples).
+
+        Return the positions of the samples that were larger than the
+        smallest maximum when they were visited. The other samples are
+        not larger than the smallest maximum after any preceding data
+        either, so feeding only these samples after other data gives the
+        same maxima as feeding the whole time-series.
+        """
         d = self.d
         M = self.M
-        m = self.m
         iM = self.iM
-        im = self.im
         lM = self.lM
-        lm = self.lm
-        for i in range(rows):
+        kept = []
+        # samples not larger than the current smallest maximum can never
+        # enter the hit-parade, since the smallest maximum can only grow
+        cand = x > M.min()
+        if thr is not None:
+            cand &= x >= thr
+        is_open = lambda value: value > M.min()
+        for i in _hit_parade_positions(len(x), cand.nonzero()[0],
+                                       thr, is_open):
             k1 = M.argmin()
-            k2 = m.argmax()
             if x[i] > M[k1]:
+                kept.append(i)
                 if ix[i]-iM[lM] <= d and x[i] > M[lM]:
                     M[lM] = x[i]
                     iM[lM] = ix[i]
@@ -90,7 +220,33 @@ def update(self, inp):
                     M[k1] = x[i]
                     iM[k1] = ix[i]
                     lM = k1
+        self.lM = lM
+        return numx.array(kept, dtype='int64')
+
+    def _update_minima(self, x, ix, thr):
+        """Update the minima with the time-series x.
+
+        thr -- Only samples smaller or equal than thr are guaranteed to be
+            visited once the largest stored minimum reaches thr
+            (None to visit all samples).
+
+        Return the positions of the samples that were smaller than the
+        largest minimum when they were visited (see _update_maxima).
+        """
+        d = self.d
+        m = self.m
+        im = self.im
+        lm = self.lm
+        kept = []
+        cand = x < m.max()
+        if thr is not None:
+            cand &= x <= thr
+        is_open = lambda value: value < m.max()
+        for i in _hit_parade_positions(len(x), cand.nonzero()[0],
+                                       thr, is_open):
+            k2 = m.argmax()
             if x[i] < m[k2]:
+                kept.append(i)
                 if ix[i]-im[lm] <= d and x[i] < m[lm]:
                     m[lm] = x[i]
                     im[lm] = ix[i]
@@ -98,12 +254,8 @@ def update(self, inp):
                     m[k2] = x[i]
                     im[k2] = ix[i]
                     lm = k2
-        self.M = M
-        self.m = m
-        self.iM = iM
-        self.im = im
-        self.lM = lM
         self.lm = lm
+        return numx.array(kept, dtype='int64')
 
     def get_maxima(self):
         """
@@ -160,6 +312,12 @@ def _get_supported_dtypes(self):
                 mdp.utils.get_dtypes('AllInteger'))
 
     def _train(self, x):
+        self._update_hits(x)
+
+    def _update_hits(self, x):
+        """Update the hit-parades with x and return the positions of the
+        samples kept by the updates of the maxima and minima of each column
+        (see OneDimensionalHitParade._update_maxima)."""
         hit = self.hit
         old_tlen = self.tlen
         if hit is None:
@@ -168,10 +326,21 @@ def _train(self, x):
                    for c in range(self.input_dim)]
         tlen = old_tlen + x.shape[0]
         indices = numx.arange(old_tlen, tlen)
+        # pre-select the candidates of all columns at once
+        k = hit[0].n_candidates
+        thr_M = _hit_parade_threshold(x, k, True)
+        thr_m = _hit_parade_threshold(x, k, False)
+        kept = []
         for c in range(self.input_dim):
-            hit[c].update((x[:, c], indices))
+            kept.append((hit[c]._update_maxima(
+                             x[:, c], indices,
+                             None if thr_M is None else thr_M[c]),
+                         hit[c]._update_minima(
+                             x[:, c], indices,
+                             None if thr_m is None else thr_m[c])))
         self.hit = hit
         self.tlen = tlen
+        return kept
 
     def get_maxima(self):
         """
@@ -227,20 +396,37 @@ class TimeFramesNode(Node):
     It is not always possible to invert this transformation (the
     transformation is not surjective. However, the ``pseudo_inverse``
     method does the correct thing when it is indeed possible.
+
+    With ``streaming=True`` the last ``(time_frames-1)*gap`` input rows are
+    kept between calls to ``execute``, so that executing the data chunk by
+    chunk produces the same frames as executing it in one batch. Call
+    ``reset`` to start a new stream.
+
+    With ``strided=True`` and ``gap=1`` the output is a read-only view on
+    the (contiguous) input data, so no frames are copied. Changing the
+    input data afterwards also changes the output. Pass ``copy=True`` to
+    ``execute`` to get a writable copy instead.
     """
 
     def __init__(self, time_frames, gap=1,
-                 input_dim=None, dtype=None):
+                 input_dim=None, dtype=None, strided=False, streaming=False):
         """
         Input arguments:
         time_frames -- Number of delayed copies
         gap -- Time delay between the copies
+        strided -- If True, return a read-only view on the input data
+            whenever possible (i.e. for gap=1).
+        streaming -- If True, carry the end of each chunk over to the
+            next call of execute.
         """
         self.time_frames = time_frames
         super(TimeFramesNode, self).__init__(input_dim=input_dim,
                                              output_dim=None,
                                              dtype=dtype)
         self.gap = gap
+        self.strided = strided
+        self.streaming = streaming
+        self._tail = None
 
     def _get_supported_dtypes(self):
         """Return the list of dtypes supported by this node."""
@@ -264,9 +450,29 @@ def _set_output_dim(self, n):
         msg = 'Output dim can not be explicitly set!'
         raise NodeException(msg)
 
-    def _execute(self, x):
+    def reset(self):
+        """Forget the data of previous chunks (only used for streaming)."""
+        self._tail = None
+
+    def _execute(self, x, copy=False):
+        """Return the time frames of x.
+
+        copy -- If True, always return a writable array, even if the node
+            was created with strided=True.
+        """
+        delay = (self.time_frames-1)*self.gap
+        if self.streaming and delay > 0:
+            if self._tail is not None:
+                x = numx.concatenate((self._tail, x))
+            self._tail = x[-delay:].copy()
+        tf = max(x.shape[0] - delay, 0)
+        if (self.strided and not copy and self.gap == 1 and
+            x.flags.c_contiguous):
+            y = as_strided(x, shape=(tf, self.output_dim),
+                           strides=x.strides)
+            y.flags.writeable = False
+            return y
         gap = self.gap
-        tf = x.shape[0] - (self.time_frames-1)*gap
         rows = self.input_dim
         cols = self.output_dim
         y = numx.zeros((tf, cols), dtype=self.dtype)
@@ -368,12 +574,16 @@ class TimeDelaySlidingWindowNode(TimeDelayNode):
     ``TimeDelaySlidingWindowNode`` is an alternative to ``TimeDelayNode``
     which should be used for online learning/execution. Whereas the
     ``TimeDelayNode`` works in a batch manner, for online application
-    a sliding window is necessary which yields only one row per call.
+    a sliding window is necessary which carries the past input over to the
+    next call. The input can be a single row or a chunk of several rows.
 
     Applied to the same data the collection of all returned rows of the
     ``TimeDelaySlidingWindowNode`` is equivalent to the result of the
     ``TimeDelayNode``.
 
+    The sliding window is a circular buffer of the last
+    ``(time_frames-1)*gap`` input rows, so no data is shifted in memory.
+
     Original code contributed by Sebastian Hoefer.
     Dec 31, 2010
     """
@@ -389,45 +599,47 @@ def __init__(self, time_frames, gap=1, input_dim=None, dtype=None):
         super(TimeDelaySlidingWindowNode, self).__init__(time_frames, gap,
                                                          input_dim, dtype)
         self.sliding_wnd = None
+        # position of the oldest row in the circular buffer
         self.cur_idx = 0
-        self.slide = False
 
     def _init_sliding_window(self):
-        rows = self.gap+1
-        cols = self.input_dim*self.time_frames
+        rows = (self.time_frames-1)*self.gap
+        cols = self.input_dim
         self.sliding_wnd = numx.zeros((rows, cols), dtype=self.dtype)
+        self.cur_idx = 0
 
     def _execute(self, x):
-        assert x.shape[0] == 1
-
         if self.sliding_wnd is None:
             self._init_sliding_window()
 
         gap = self.gap
-        rows = self.sliding_wnd.shape[0]
-        cols = self.output_dim
+        wnd = self.sliding_wnd
+        wnd_rows = wnd.shape[0]
+        rows = x.shape[0]
         n = self.input_dim
 
-        new_row = numx.zeros(cols, dtype=self.dtype)
-        new_row[:n] = x
-
-        # Slide
-        if self.slide:
-            self.sliding_wnd[:-1, :] = self.sliding_wnd[1:, :]
-
-        # Delay
-        if self.cur_idx-gap >= 0:
-            new_row[n:] = self.sliding_wnd[self.cur_idx-gap, :-n]
-
-        # Add new row to matrix
-        self.sliding_wnd[self.cur_idx, :] = new_row
-
-        if self.cur_idx < rows-1:
-            self.cur_idx = self.cur_idx+1 
-        else:
-            self.slide = True
-
-        return new_row[numx.newaxis,:]
+        y = numx.empty((rows, self.output_dim), dtype=self.dtype)
+        y[:, :n] = x
+        for frame in range(1, self.time_frames):
+            delay = gap*frame
+            cols = slice(frame*n, (frame+1)*n)
+            # delayed rows from the current chunk
+            if delay < rows:
+                y[delay:, cols] = x[:rows-delay]
+            # delayed rows from the previous chunks
+            n_old = min(delay, rows)
+            idx = (self.cur_idx + wnd_rows - delay +
+                   numx.arange(n_old)) % wnd_rows
+            y[:n_old, cols] = wnd[idx]
+
+        # store the most recent rows
+        if wnd_rows:
+            n_new = min(rows, wnd_rows)
+            idx = (self.cur_idx + rows - n_new +
+                   numx.arange(n_new)) % wnd_rows
+            wnd[idx] = x[rows-n_new:]
+            self.cur_idx = (self.cur_idx + rows) % wnd_rows
+        return y
 
 class EtaComputerNode(Node):
     """Compute the eta values of the normalized training data.
@@ -7,7 +7,7 @@
 import mdp
 from mdp import numx
 from mdp.utils import (mult, nongeneral_svd, CovarianceMatrix,
-                       symeig, SymeigException)
+                       SymeigException, get_symeig_solver)
 import warnings as _warnings
 
 class PCANode(mdp.Node):
@@ -38,7 +38,7 @@ class PCANode(mdp.Node):
 
     def __init__(self, input_dim=None, output_dim=None, dtype=None,
                  svd=False, reduce=False, var_rel=1E-12, var_abs=1E-15,
-                 var_part=None):
+                 var_part=None, solver='auto'):
         """The number of principal components to be kept can be specified as
         'output_dim' directly (e.g. 'output_dim=10' means 10 components
         are kept) or by the fraction of variance to be explained
@@ -59,16 +59,25 @@ def __init__(self, input_dim=None, output_dim=None, dtype=None,
                   Note: when the 'reduce' switch is enabled, the actual number
                   of principal components (self.output_dim) may be different
                   from that set when creating the instance.
+
+        solver -- eigenproblem solver used when output_dim is given as a
+                  number of components: 'dense' for the full symmetric
+                  eigensolver, 'arpack' or 'lobpcg' for iterative solvers
+                  that only compute the requested components, 'auto'
+                  (default) uses ARPACK when few components of a large
+                  covariance matrix are requested (see
+                  mdp.utils.symeig_auto). Ignored if svd is True.
         """
         # this must occur *before* calling super!
         self.desired_variance = None
         super(PCANode, self).__init__(input_dim, output_dim, dtype)
         self.svd = svd
+        self.solver = solver
         # set routine for eigenproblem
         if svd:
             self._symeig = nongeneral_svd
         else:
-            self._symeig = symeig
+            self._symeig = get_symeig_solver(solver)
         self.var_abs = var_abs
         self.var_rel = var_rel
         self.var_part = var_part
@@ -155,7 +164,7 @@ def _stop_training(self, debug=False):
         # this is a bit counterintuitive, as it reshapes the average vector to
         # be a matrix. in this way, however, we spare the reshape
         # operation every time that 'execute' is called.
-        self.avg = avg.reshape(1, avg.shape[0])
+        self.avg = self._refcast(avg.reshape(1, avg.shape[0]))
 
         # range for the eigenvalues
         rng = self._adjust_output_dim()
@@ -196,6 +205,14 @@ def _stop_training(self, debug=False):
         if not debug:
             del self.cov_mtx
 
+        self._store_components(d, v, vartot)
+
+    def _store_components(self, d, v, vartot):
+        """Select and store the principal components.
+
+        d, v -- eigenvalues (in ascending order) and eigenvectors
+        vartot -- total variance of the input
+        """
         # sort by descending order
         d = numx.take(d, list(range(d.shape[0]-1, -1, -1)))
         v = v[:, ::-1]
@@ -239,8 +256,9 @@ def _stop_training(self, debug=False):
 
         # store the eigenvalues
         self.d = d
-        # store the eigenvectors
-        self.v = v
+        # store the eigenvectors (the eigenvalue problem may have been
+        # solved with a larger precision, see mdp.precision)
+        self.v = self._refcast(v)
         # store the total variance
         self.total_variance = vartot
 
@@ -282,6 +300,151 @@ def _inverse(self, y, n=None):
         return mult(y, v) + self.avg
 
 
+class RandomizedPCANode(PCANode):
+    """Filter the input data through its first principal components, which
+    are approximated with a randomized algorithm.
+
+    A random subspace slightly larger than the number of components
+    (``output_dim + n_oversamples``) is multiplied ``n_iter`` times with
+    the covariance matrix (power iterations), the principal components
+    are then computed in the resulting subspace. This is much faster
+    than a full eigendecomposition when ``output_dim`` is small compared
+    to the input dimension. ``output_dim`` can not be given as a fraction
+    of the variance, if it is not set all components are kept.
+
+    By default the covariance matrix is accumulated during training as
+    in the PCANode. If ``streaming`` is True, the covariance matrix is
+    never formed: the node has ``n_iter + 1`` training phases, each
+    of them needs one pass over the data and only stores an
+    ``input_dim x (output_dim + n_oversamples)`` matrix.
+
+    **Internal variables of interest**
+
+      ``self.avg``
+          Mean of the input data (available after training).
+
+      ``self.v``
+          Transposed of the projection matrix (available after training).
+
+      ``self.d``
+          Variance corresponding to the PCA components.
+
+    Reference: Halko, N., Martinsson, P.-G. and Tropp, J. A. (2011).
+    Finding structure with randomness: Probabilistic algorithms for
+    constructing approximate matrix decompositions. SIAM Review,
+    53(2):217-288.
+    """
+
+    def __init__(self, input_dim=None, output_dim=None, dtype=None,
+                 n_oversamples=10, n_iter=2, streaming=False, reduce=False,
+                 var_rel=1E-12, var_abs=1E-15, var_part=None):
+        """
+        Keyword Arguments:
+
+        n_oversamples -- number of additional random directions that
+                         are used to improve the accuracy
+        n_iter -- number of power iterations
+        streaming -- if True, do not accumulate the covariance matrix,
+                     but perform one training phase for each
+                     multiplication with it
+
+        For the other arguments see PCANode.
+        """
+        super(RandomizedPCANode, self).__init__(input_dim, output_dim, dtype,
+                                                reduce=reduce,
+                                                var_rel=var_rel,
+                                                var_abs=var_abs,
+                                                var_part=var_part)
+        if self.desired_variance is not None:
+            err = "output_dim must be the number of components"
+            raise mdp.NodeException(err)
+        self.n_oversamples = n_oversamples
+        self.n_iter = n_iter
+        self.streaming = streaming
+        # orthonormal basis of the current subspace
+        self._q = None
+        # variables for the streaming mode
+        self._xq = None
+        self._x_sum = None
+        self._sq_sum = None
+        self._tlen = 0
+
+    def _get_train_seq(self):
+        if self.streaming:
+            return [(self._train_pass, self._stop_pass)] * (self.n_iter + 1)
+        return [(self._train, self._stop_training)]
+
+    def _random_basis(self):
+        if self.output_dim is None:
+            self.output_dim = self.input_dim
+        dim = min(self.output_dim + self.n_oversamples, self.input_dim)
+        omega = mdp.numx_rand.randn(self.input_dim, dim)
+        return self._orthonormalize(self._refcast(omega))
+
+    @staticmethod
+    def _orthonormalize(y):
+        u = mdp.utils.svd(y)[0]
+        return u[:, :y.shape[1]]
+
+    def _train_pass(self, x):
+        if self._q is None:
+            self._q = self._random_basis()
+        acc_dtype = mdp.utils.accumulator_dtype(self.dtype)
+        if self._xq is None:
+            self._xq = numx.zeros(self._q.shape, dtype=acc_dtype)
+        self._xq += mult(x.T, mult(x, self._q))
+        if self.get_current_train_phase() == 0:
+            if self._x_sum is None:
+                self._x_sum = numx.zeros(self.input_dim, dtype=acc_dtype)
+                self._sq_sum = numx.zeros(self.input_dim, dtype=acc_dtype)
+            self._x_sum += x.sum(axis=0, dtype=acc_dtype)
+            self._sq_sum += (x*x).sum(axis=0, dtype=acc_dtype)
+            self._tlen += x.shape[0]
+
+    def _stop_pass(self, debug=False):
+        # debug argument is ignored but needed by the base class
+        tlen = self._tlen
+        avg = self._x_sum / tlen
+        # product of the (unbiased) covariance matrix with the basis
+        y = (self._xq - tlen * numx.outer(avg, mult(avg, self._q))) / (tlen-1)
+        self._xq = None
+        if self.get_current_train_phase() < self.n_iter:
+            self._q = self._refcast(self._orthonormalize(y))
+            return
+        self.avg = self._refcast(avg.reshape(1, avg.shape[0]))
+        self.tlen = tlen
+        vartot = (self._sq_sum - tlen * avg*avg).sum() / (tlen-1)
+        self._rayleigh_ritz(self._q, y, vartot)
+        self._q = self._x_sum = self._sq_sum = None
+
+    def _stop_training(self, debug=False):
+        cov_mtx, avg, self.tlen = self._cov_mtx.fix()
+        del self._cov_mtx
+        self.avg = self._refcast(avg.reshape(1, avg.shape[0]))
+        if self._q is None:
+            self._q = self._random_basis()
+        q = self._q
+        y = mult(cov_mtx, q)
+        for i in range(self.n_iter):
+            q = self._orthonormalize(y)
+            y = mult(cov_mtx, q)
+        self._rayleigh_ritz(q, y, numx.diag(cov_mtx).sum())
+        self._q = None
+        if debug:
+            self.cov_mtx = cov_mtx
+
+    def _rayleigh_ritz(self, q, y, vartot):
+        """Compute the principal components in the subspace q, where y is
+        the product of the covariance matrix with q."""
+        b = mult(q.T, y)
+        try:
+            d, u = mdp.utils.symeig(0.5 * (b + b.T))
+        except SymeigException as exception:
+            raise mdp.NodeException(str(exception))
+        k = self.output_dim
+        self._store_components(d[-k:], mult(q, u[:, -k:]), vartot)
+
+
 class WhiteningNode(PCANode):
     """*Whiten* the input data by filtering it through the most
     significatives of its principal components. All output
@@ -310,7 +473,7 @@ def _stop_training(self, debug=False):
 
         ##### whiten the filters
         # self.v is now the _whitening_ matrix
-        self.v = old_div(self.v, numx.sqrt(self.d))
+        self.v = self._refcast(old_div(self.v, numx.sqrt(self.d)))
 
     def get_eigenvectors(self):
         """Return the eigenvectors of the covariance matrix."""
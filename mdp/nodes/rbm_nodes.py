@@ -21,6 +21,13 @@ def rrep(x, n):
     shp = x.shape + (1,)
     return x.reshape(shp).repeat(n, axis=-1)
 
+def _sigmoid(a):
+    """Return the logistic function of `a`, computed in-place."""
+    numx.negative(a, a)
+    numx.exp(a, a)
+    a += 1.
+    return numx.reciprocal(a, a)
+
 
 class RBMNode(mdp.Node):
     """Restricted Boltzmann Machine node. An RBM is an undirected
@@ -39,6 +46,11 @@ class RBMNode(mdp.Node):
     Hinton, G. E. (2002). Training products of experts by minimizing
     contrastive divergence. Neural Computation, 14(8):1711-1800
 
+    Optionally the data is split in mini-batches and the model term is
+    computed with Persistent Contrastive Divergence, as described in
+    Tieleman, T. (2008). Training restricted Boltzmann machines using
+    approximations to the likelihood gradient. Proc. 25th ICML, 1064-1071
+
     **Internal variables of interest**
 
       ``self.w``
@@ -64,6 +76,8 @@ def __init__(self, hidden_dim, visible_dim = None, dtype = None):
         """
         super(RBMNode, self).__init__(visible_dim, hidden_dim, dtype)
         self._initialized = False
+        # hidden state of the persistent Gibbs chains
+        self._chains = None
 
     def _init_weights(self):
         # weights and biases are initialized to small random values to
@@ -83,18 +97,19 @@ def _init_weights(self):
 
     def _sample_h(self, v):
         # returns P(h=1|v,W,b) and a sample from it
-        probs = old_div(1.,(1. + exp(-self.bh - mult(v, self.w))))
+        probs = _sigmoid(mult(v, self.w) + self.bh)
         h = (probs > random(probs.shape)).astype(self.dtype)
         return probs, h
 
     def _sample_v(self, h):
         # returns  P(v=1|h,W,b) and a sample from it
-        probs = old_div(1.,(1. + exp(-self.bv - mult(h, self.w.T))))
+        probs = _sigmoid(mult(h, self.w.T) + self.bv)
         v = (probs > random(probs.shape)).astype(self.dtype)
         return probs, v
 
     def _train(self, v, n_updates=1, epsilon=0.1, decay=0., momentum=0.,
-               update_with_ph=True, verbose=False):
+               update_with_ph=True, verbose=False, batch_size=None,
+               persistent=False):
         """Update the internal structures according to the input data `v`.
         The training is performed using Contrastive Divergence (CD).
 
@@ -115,9 +130,40 @@ def _train(self, v, n_updates=1, epsilon=0.1, decay=0., momentum=0.,
             probability of the hidden unit activations instead of a
             sample from it. This is in order to speed up sequential
             learning of RBMs. Set this to False to use the samples instead.
+          batch_size
+            number of observations used for each update. The data
+            is split in mini-batches of this size, which are used
+            one after the other. By default the whole data chunk
+            is used for a single update.
+          persistent
+            If True, the model term is computed with Persistent
+            Contrastive Divergence (PCD): the Gibbs chains are not
+            restarted at the data, but continue from their state at
+            the previous update (also across calls to ``train``).
+            The number of chains is the size of the first mini-batch.
+            Default value: False
         """
         if not self._initialized:
             self._init_weights()
+        if batch_size is None:
+            batch_size = v.shape[0]
+
+        train_err = 0.
+        for start in range(0, v.shape[0], batch_size):
+            train_err += self._update(v[start:start+batch_size], n_updates,
+                                      epsilon, decay, momentum,
+                                      update_with_ph, persistent)
+        self._train_err = train_err
+
+        if verbose:
+            print('training error', old_div(self._train_err,v.shape[0]))
+            ph, h = self._sample_h(v)
+            print('energy', self._energy(v, ph).sum())
+
+    def _update(self, v, n_updates, epsilon, decay, momentum,
+                update_with_ph, persistent):
+        # perform a single update on the mini-batch `v` and return the
+        # squared reconstruction error
 
         # useful quantities
         n = v.shape[0]
@@ -129,40 +175,46 @@ def _train(self, v, n_updates=1, epsilon=0.1, decay=0., momentum=0.,
         # first update of the hidden units for the data term
         ph_data, h_data = self._sample_h(v)
         # n updates of both v and h for the model term
-        h_model = h_data.copy()
+        if persistent and self._chains is not None:
+            h_model = self._chains
+        else:
+            h_model = h_data
         for i in range(n_updates):
             pv_model, v_model = self._sample_v(h_model)
             ph_model, h_model = self._sample_h(v_model)
+        # the chains may have a different number of samples than the data
+        n_model = v_model.shape[0]
 
         # update w
-        data_term = mult(v.T, ph_data)
-        model_term = mult(v_model.T, ph_model)
-        dw = momentum*dw + epsilon*(old_div((data_term - model_term),n) - decay*w)
+        data_term = old_div(mult(v.T, ph_data), n)
+        model_term = old_div(mult(v_model.T, ph_model), n_model)
+        dw = momentum*dw + epsilon*(data_term - model_term - decay*w)
         w += dw
 
         # update bv
-        data_term = v.sum(axis=0)
-        model_term = v_model.sum(axis=0)
-        dbv = momentum*dbv + epsilon*(old_div((data_term - model_term),n))
+        data_term = old_div(v.sum(axis=0), n)
+        model_term = old_div(v_model.sum(axis=0), n_model)
+        dbv = momentum*dbv + epsilon*(data_term - model_term)
         bv += dbv
 
         # update bh
         if update_with_ph:
-            data_term = ph_data.sum(axis=0)
-            model_term = ph_model.sum(axis=0)
+            data_term = old_div(ph_data.sum(axis=0), n)
+            model_term = old_div(ph_model.sum(axis=0), n_model)
         else:
-            data_term = h_data.sum(axis=0)
-            model_term = h_model.sum(axis=0)
-        dbh = momentum*dbh + epsilon*(old_div((data_term - model_term),n))
+            data_term = old_div(h_data.sum(axis=0), n)
+            model_term = old_div(h_model.sum(axis=0), n_model)
+        dbh = momentum*dbh + epsilon*(data_term - model_term)
         bh += dbh
 
         self._delta = (dw, dbv, dbh)
-        self._train_err = float(((v-v_model)**2.).sum())
 
-        if verbose:
-            print('training error', old_div(self._train_err,v.shape[0]))
-            ph, h = self._sample_h(v)
-            print('energy', self._energy(v, ph).sum())
+        if persistent:
+            self._chains = h_model
+            # the chains are not related to the data, use a one-step
+            # reconstruction for the error
+            pv_model, v_model = self._sample_v(h_data)
+        return float(((v-v_model)**2.).sum())
 
     def _stop_training(self):
         #del self._delta
@@ -286,20 +338,23 @@ def _sample_v(self, h, sample_l=False, concatenate=True):
         av, al = a[:, :vdim], a[:, vdim:]
 
         # ## visible units: logistic activation
-        probs_v = old_div(1.,(1. + exp(-av)))
-        v = (probs_v > random(probs_v.shape)).astype('d')
+        probs_v = _sigmoid(av)
+        v = (probs_v > random(probs_v.shape)).astype(self.dtype)
 
         # ## label units: softmax activation
         # subtract maximum to regularize exponent
-        exponent = al - rrep(al.max(axis=1), ldim)
-        probs_l = exp(exponent)
-        probs_l /= rrep(probs_l.sum(axis=1), ldim)
+        probs_l = exp(al - al.max(axis=1)[:, numx.newaxis])
+        probs_l /= probs_l.sum(axis=1)[:, numx.newaxis]
 
         if sample_l:
-            # ?? todo: I'm sure this can be optimized
-            l = numx.zeros((h.shape[0], ldim))
-            for t in range(h.shape[0]):
-                l[t, :] = mdp.numx_rand.multinomial(1, probs_l[t, :])
+            # sample the active labels by inverting the cumulative
+            # distributions with one uniform random number per row
+            n = h.shape[0]
+            cum_l = probs_l.cumsum(axis=1)
+            u = random((n, 1)) * cum_l[:, -1:]
+            idx = numx.minimum((cum_l < u).sum(axis=1), ldim-1)
+            l = numx.zeros(probs_l.shape, dtype=probs_l.dtype)
+            l[numx.arange(n), idx] = 1.
         else:
             l = probs_l.copy()
 
@@ -368,7 +423,7 @@ def is_invertible():
         return False
 
     def train(self, v, l, n_updates=1, epsilon=0.1, decay=0., momentum=0.,
-              verbose=False):
+              verbose=False, batch_size=None, persistent=False):
         """Update the internal structures according to the visible data `v`
         and the labels `l`.
         The training is performed using Contrastive Divergence (CD).
@@ -388,6 +443,12 @@ def train(self, v, l, n_updates=1, epsilon=0.1, decay=0., momentum=0.,
             weight decay term. Default value: 0.
           momentum
             momentum term. Default value: 0.
+          batch_size
+            number of observations used for each update. By default
+            the whole data chunk is used for a single update.
+          persistent
+            If True, use Persistent Contrastive Divergence (see
+            ``RBMNode.train``). Default value: False
         """
 
         if not self.is_training():
@@ -403,4 +464,6 @@ def train(self, v, l, n_updates=1, epsilon=0.1, decay=0., momentum=0.,
                                               epsilon=epsilon,
                                               decay=decay,
                                               momentum=momentum,
-                                              verbose=verbose)
+                                              verbose=verbose,
+                                              batch_size=batch_size,
+                                              persistent=persistent)
@@ -26,7 +26,7 @@ class LinearRegressionNode(Node):
           The coefficients of the linear regression
     """
 
-    def __init__(self, with_bias=True, use_pinv=False,
+    def __init__(self, with_bias=True, use_pinv=False, solver=None, ridge=0.,
                  input_dim=None, output_dim=None, dtype=None):
         """
         :Arguments:
@@ -44,25 +44,52 @@ def __init__(self, with_bias=True, use_pinv=False,
             If true, uses the pseudo-inverse function to compute
             the linear regression coefficients, which is more robust
             in some cases
+
+          solver
+            Method used to compute the coefficients at the end of the
+            training, can be overridden in ``stop_training``:
+
+            - 'inv': invert X^T X (default if ``use_pinv`` is false)
+            - 'pinv': use the pseudo-inverse of X^T X (default if
+              ``use_pinv`` is true)
+            - 'cholesky': solve with the Cholesky factor of X^T X
+            - 'ridge': ridge regression with regularization ``ridge``.
+              The constant term is not regularized. The eigenvalue
+              decomposition is kept, so that the coefficients for other
+              regularization values are cheap (see ``set_ridge``).
+
+          ridge
+            Regularization parameter for the 'ridge' solver
         """
         super(LinearRegressionNode, self).__init__(input_dim, output_dim, dtype)
 
         self.with_bias = with_bias
         self.use_pinv = use_pinv
+        self.solver = solver
+        self.ridge = ridge
 
         # for the linear regression estimator we need two terms
         # the first one is X^T X
         self._xTx = None
         # the second one is X^T Y
         self._xTy = None
+        # the constant term is handled with the sums of x and y instead
+        # of adding a column of ones to x
+        self._x_sum = None
+        self._y_sum = None
 
         # keep track of how many data points have been sent
         self._tlen = 0
 
+        # eigenvalue decomposition used by the 'ridge' solver
+        self._ridge_eig = None
+
         # final regression coefficients
         # if with_bias=True, beta includes the bias term in the first column
         self.beta = None
 
+    _solvers = ('inv', 'pinv', 'cholesky', 'ridge')
+
     @staticmethod
     def is_invertible():
         return False
@@ -88,48 +115,134 @@ def _train(self, x, y):
         """
         # initialize internal vars if necessary
         if self._xTx is None:
-            if self.with_bias:
-                x_size = self._input_dim + 1
-            else:
-                x_size = self._input_dim
+            x_size = self._input_dim
             self._xTx = numx.zeros((x_size, x_size), self._dtype)
             self._xTy = numx.zeros((x_size, self._output_dim), self._dtype)
-
-        if self.with_bias:
-            x = self._add_constant(x)
+            self._x_sum = numx.zeros((x_size,), self._dtype)
+            self._y_sum = numx.zeros((self._output_dim,), self._dtype)
 
         # update internal variables
         self._xTx += mult(x.T, x)
         self._xTy += mult(x.T, y)
+        self._x_sum += x.sum(axis=0)
+        self._y_sum += y.sum(axis=0)
         self._tlen += x.shape[0]
 
-    def _stop_training(self):
+    def _moments(self):
+        """Return X^T X and X^T Y, including the constant term if with_bias.
+
+        With the constant term the matrices are extended with the sums
+        of x and y, as if a column of ones was prepended to x.
+        """
+        if not self.with_bias:
+            return self._xTx, self._xTy
+        x_size = self._input_dim + 1
+        xTx = numx.empty((x_size, x_size), self._dtype)
+        xTx[0, 0] = self._tlen
+        xTx[0, 1:] = xTx[1:, 0] = self._x_sum
+        xTx[1:, 1:] = self._xTx
+        xTy = numx.concatenate((self._y_sum[numx.newaxis, :], self._xTy))
+        return xTx, xTy
+
+    def _stop_training(self, solver=None, ridge=None):
+        """
+        **Additional input arguments**
+
+        solver
+          Overrides the ``solver`` given in the constructor.
+
+        ridge
+          Overrides the ``ridge`` parameter given in the constructor.
+        """
+        if solver is None:
+            solver = self.solver
+        if solver is None:
+            solver = 'pinv' if self.use_pinv else 'inv'
+        if solver not in self._solvers:
+            err = ("Unknown solver '%s', use one of %s." %
+                   (solver, str(self._solvers)))
+            raise NodeException(err)
+        if ridge is not None:
+            self.ridge = ridge
         try:
-            if self.use_pinv:
-                invfun = utils.pinv
+            if solver == 'ridge':
+                self._init_ridge()
+                self.beta = self._ridge_beta(self.ridge)
             else:
-                invfun = utils.inv
-            inv_xTx = invfun(self._xTx)
+                xTx, xTy = self._moments()
+                if solver == 'cholesky':
+                    chol = utils.cholesky(xTx)
+                    self.beta = utils.solve(chol.T, utils.solve(chol, xTy))
+                else:
+                    if solver == 'pinv':
+                        invfun = utils.pinv
+                    else:
+                        invfun = utils.inv
+                    self.beta = mult(invfun(xTx), xTy)
         except numx_linalg.LinAlgError as exception:
             errstr = (str(exception) +
                       "\n Input data may be redundant (i.e., some of the " +
                       "variables may be linearly dependent).")
             raise NodeException(errstr)
 
-        self.beta = mult(inv_xTx, self._xTy)
-
         # remove junk
         del self._xTx
         del self._xTy
+        del self._x_sum
+        del self._y_sum
 
-    def _execute(self, x):
+    def _init_ridge(self):
+        """Compute the eigenvalue decomposition for ridge regression.
+
+        With the constant term the data is centered, so that the constant
+        term is not regularized.
+        """
         if self.with_bias:
-            x = self._add_constant(x)
-        return mult(x, self.beta)
+            x_mean = self._x_sum / self._tlen
+            y_mean = self._y_sum / self._tlen
+            xTx = self._xTx - self._tlen * numx.outer(x_mean, x_mean)
+            xTy = self._xTy - self._tlen * numx.outer(x_mean, y_mean)
+        else:
+            x_mean = y_mean = None
+            xTx, xTy = self._xTx, self._xTy
+        eigvals, eigvecs = numx_linalg.eigh(xTx)
+        self._ridge_eig = (eigvals, eigvecs, mult(eigvecs.T, xTy),
+                           x_mean, y_mean)
+
+    def _ridge_beta(self, ridge):
+        eigvals, eigvecs, eigvecs_xTy, x_mean, y_mean = self._ridge_eig
+        shifted = eigvals + ridge
+        # without a positive regularization X^T X must not be singular
+        tol = len(eigvals) * numx.finfo(eigvals.dtype).eps * abs(eigvals).max()
+        if ridge <= 0 and shifted.min() <= tol:
+            errstr = ("The matrix X^T X is singular and ridge is not "
+                      "positive.\n Input data may be redundant (i.e., some "
+                      "of the variables may be linearly dependent).")
+            raise NodeException(errstr)
+        inv_eigvals = 1. / shifted
+        beta = mult(eigvecs, inv_eigvals[:, numx.newaxis] * eigvecs_xTy)
+        if self.with_bias:
+            bias = y_mean - mult(x_mean, beta)
+            beta = numx.concatenate((bias[numx.newaxis, :], beta))
+        return utils.refcast(beta, self.dtype)
 
-    def _add_constant(self, x):
-        """Add a constant term to the vector 'x'.
-        x -> [1 x]
+    def ridge_betas(self, ridges):
+        """Return the list of coefficients for several regularization
+        values, reusing the eigenvalue decomposition of the 'ridge' solver.
         """
-        return numx.concatenate((numx.ones((x.shape[0], 1),
-                                           dtype=self.dtype), x), axis=1)
+        self._if_training_stop_training()
+        if self._ridge_eig is None:
+            err = "The coefficients were not computed with the 'ridge' solver."
+            raise NodeException(err)
+        return [self._ridge_beta(ridge) for ridge in ridges]
+
+    def set_ridge(self, ridge):
+        """Set the coefficients to the ridge regression solution for a new
+        regularization value (only for the 'ridge' solver)."""
+        self.beta = self.ridge_betas([ridge])[0]
+        self.ridge = ridge
+
+    def _execute(self, x):
+        if self.with_bias:
+            return mult(x, self.beta[1:]) + self.beta[0]
+        return mult(x, self.beta)
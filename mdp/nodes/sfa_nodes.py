@@ -5,7 +5,7 @@
 import mdp
 from mdp import numx, Node, NodeException, TrainingException
 from mdp.utils import (mult, pinv, CovarianceMatrix, QuadraticForm,
-                       symeig, SymeigException)
+                       SymeigException, get_symeig_solver)
 
 class SFANode(Node):
     """Extract the slowly varying components from the input data.
@@ -71,13 +71,17 @@ class SFANode(Node):
     """
 
     def __init__(self, input_dim=None, output_dim=None, dtype=None,
-                 include_last_sample=True):
+                 include_last_sample=True, solver='auto'):
         """
         For the ``include_last_sample`` switch have a look at the
         SFANode class docstring.
+
+        ``solver`` selects the solver for the generalized eigenproblem:
+        'dense', 'arpack', 'lobpcg' or 'auto' (default), see the PCANode.
          """
         super(SFANode, self).__init__(input_dim, output_dim, dtype)
         self._include_last_sample = include_last_sample
+        self.solver = solver
 
         # init two covariance matrices
         # one for the input data
@@ -86,7 +90,7 @@ def __init__(self, input_dim=None, output_dim=None, dtype=None,
         self._dcov_mtx = CovarianceMatrix(dtype)
 
         # set routine for eigenproblem
-        self._symeig = symeig
+        self._symeig = get_symeig_solver(solver)
 
         # SFA eigenvalues and eigenvectors, will be set after training
         self.d = None
@@ -169,6 +173,11 @@ def _stop_training(self, debug=False):
 
         # store bias
         self._bias = mult(self.avg, self.sf)
+        # the eigenvalue problem may have been solved with a larger
+        # precision (see mdp.precision)
+        self.sf = self._refcast(self.sf)
+        self.avg = self._refcast(self.avg)
+        self._bias = self._refcast(self._bias)
 
     def _execute(self, x, n=None):
         """Compute the output of the slowest functions.
@@ -2,8 +2,15 @@
 from __future__ import division
 from builtins import range
 from past.utils import old_div
+from builtins import object
 __docformat__ = "restructuredtext en"
 
+import hashlib
+import os
+import shutil
+import tempfile
+from numpy.lib.format import open_memmap
+
 import mdp
 
 class XSFANode(mdp.Node):
@@ -43,6 +50,15 @@ class XSFANode(mdp.Node):
     of the internal flow state for each training phase and execution step
     will be opened in a web brower and presented as a slideshow.
 
+    During training the output of the already trained part of the
+    internal flow is cached for each data chunk, so that in each training
+    phase only the newest source extractor module has to be executed. This
+    requires that the chunks are presented in the same order in all
+    training phases (as done by ``Flow.train``), chunks which differ from
+    the cached ones are detected and recomputed. The size of the cache is
+    limited by ``cache_size``; it can be kept in memory-mapped files
+    to reduce memory usage.
+
     References:
     Sprekeler, H., Zito, T., and Wiskott, L. (2009).
     An Extension of Slow Feature Analysis for Nonlinear Blind Source Separation.
@@ -50,7 +66,8 @@ class XSFANode(mdp.Node):
     http://cogprints.org/7056/1/SprekelerZitoWiskott-Cogprints-2010.pdf
     """
     def __init__(self, basic_exp=None, intern_exp=None, svd=False, verbose=False,
-                 input_dim=None, output_dim=None, dtype=None):
+                 input_dim=None, output_dim=None, dtype=None,
+                 cache_size=2**28, cache_mmap=False):
         """
         :Keywords:
            basic_exp
@@ -83,6 +100,20 @@ def __init__(self, basic_exp=None, intern_exp=None, svd=False, verbose=False,
            verbose
              show some progress during training.
 
+             Default: False
+
+           cache_size
+             maximum size in bytes of the cached outputs of the trained
+             part of the internal flow. Chunks which do not fit
+             are recomputed in each training phase. Use 0 to disable
+             the cache.
+
+             Default: ``2**28`` (256 MB)
+
+           cache_mmap
+             keep the cached outputs in memory-mapped files in a
+             temporary directory instead of in memory.
+
              Default: False
         """
 
@@ -112,6 +143,12 @@ def __init__(self, basic_exp=None, intern_exp=None, svd=False, verbose=False,
         self._flow = None
         self.verbose = verbose
         self.svd = svd
+        self.cache_size = cache_size
+        self.cache_mmap = cache_mmap
+        # outputs of the trained part of the internal flow
+        self._cache = None
+        # index of the next chunk in the current training phase
+        self._chunk_index = 0
         super(XSFANode, self).__init__(input_dim=input_dim,
                                        output_dim=output_dim, dtype=dtype)
 
@@ -189,13 +226,38 @@ def is_invertible():
 
     def _train(self, x):
         # train the last source extractor module in the flow
-        self._flow[-1].train(self._flow[:-1](x))
+        self._flow[-1].train(self._trained_output(x))
+
+    def _trained_output(self, x):
+        """Return the output of the trained part of the internal flow
+        (all but the last module), using the cached outputs."""
+        n_trained = len(self._flow) - 1
+        index = self._chunk_index
+        self._chunk_index += 1
+        if self.cache_size <= 0:
+            return self._flow[:n_trained](x)
+        if self._cache is None:
+            self._cache = _OutputCache(self.cache_size, self.cache_mmap)
+        # number of nodes already applied to the cached output
+        n_applied, y = self._cache.get(index, x)
+        if n_applied == 0:
+            y = x
+        if n_applied < n_trained:
+            # only execute the modules trained since the chunk was cached
+            y = self._flow[n_applied:n_trained](y)
+            self._cache.set(index, x, n_trained, y)
+        return y
 
     def _stop_training(self):
         # stop the current training phase
         self._flow[-1].stop_training()
+        self._chunk_index = 0
         # update the current training phase
         cur_tr_ph = self.get_current_train_phase() + 1
+        if cur_tr_ph == sum(self._training_phases) and self._cache is not None:
+            # training is finished
+            self._cache.clear()
+            self._cache = None
         # if we finished to train the current source extractor module
         # and we still have to extract some sources
         # append a new source extractor module
@@ -252,7 +314,7 @@ def _get_source_extractor(self, dim, nsources):
                                     N2ContLayer)
 
         # expanded sources projection
-        proj = ProjectionNode(S, L-1)
+        proj = ProjectionNode(S, L-1, dtype=self.dtype)
         # use another identity node to copy the sources
         # we could in principle reuse the idn_new1 but using a new
         # node will make debugging much easier
@@ -268,17 +330,81 @@ def _get_source_extractor(self, dim, nsources):
         return mdp.hinet.FlowNode(N1 + src_rem)
 
 
+class _OutputCache(object):
+    """Cache of the outputs of the trained part of the XSFANode internal
+    flow, one entry for each training chunk.
+
+    Each entry stores the number of nodes that have been applied to the
+    chunk, so that it can be updated by applying only the remaining ones.
+    """
+
+    def __init__(self, max_bytes, mmap=False):
+        self.max_bytes = max_bytes
+        self.mmap = mmap
+        self.nbytes = 0
+        # list of (key, n_applied, output)
+        self._entries = []
+        self._dir = None
+
+    @staticmethod
+    def _key(x):
+        # content hash of the whole chunk
+        digest = hashlib.sha1(str((x.dtype.str, x.shape)).encode('ascii'))
+        digest.update(mdp.numx.ascontiguousarray(x).data)
+        return digest.hexdigest()
+
+    def get(self, index, x):
+        """Return (n_applied, output) for chunk number index, or (0, None)
+        if it is not cached."""
+        if (index < len(self._entries) and self._entries[index] is not None
+            and self._entries[index][0] == self._key(x)):
+            return self._entries[index][1:]
+        return 0, None
+
+    def set(self, index, x, n_applied, y):
+        """Cache the output y of the first n_applied nodes for chunk
+        number index, if it fits into the cache."""
+        self._remove(index)
+        if self.nbytes + y.nbytes > self.max_bytes:
+            return
+        if self.mmap:
+            if self._dir is None:
+                self._dir = tempfile.mkdtemp(prefix='mdp_xsfa_')
+            filename = os.path.join(self._dir, '%d.npy' % index)
+            stored = open_memmap(filename, mode='w+', dtype=y.dtype,
+                                 shape=y.shape)
+            stored[:] = y
+            y = stored
+        while len(self._entries) <= index:
+            self._entries.append(None)
+        self._entries[index] = (self._key(x), n_applied, y)
+        self.nbytes += y.nbytes
+
+    def _remove(self, index):
+        if index < len(self._entries) and self._entries[index] is not None:
+            self.nbytes -= self._entries[index][2].nbytes
+            self._entries[index] = None
+
+    def clear(self):
+        """Remove all entries (and the memory-mapped files)."""
+        self._entries = []
+        self.nbytes = 0
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+
+
 class ProjectionNode(mdp.Node):
     """Get expanded sources and input signals, and return
     the sources and the input signals projected into the space
     orthogonal to the expanded sources and their products."""
-    def __init__(self, S, L):
+    def __init__(self, S, L, dtype=None):
         #!! IMPORTANT!!
         # this node *must* return the sources together with the
         # projected input signals
         self.proj_mtx = None
         self.L = L
-        super(ProjectionNode, self).__init__(output_dim=S+1+L)
+        super(ProjectionNode, self).__init__(output_dim=S+1+L, dtype=dtype)
         self._cov_mtx = mdp.utils.CrossCovarianceMatrix(self.dtype)
 
     def _train(self, x):
@@ -25,19 +25,24 @@
     SqrTestCallable, SleepSqrTestCallable, TaskCallableWrapper, Scheduler,
     cpu_count, MDPVersionCallable
 )
-from .process_schedule import ProcessScheduler
+from .process_schedule import ProcessScheduler, ForkServerScheduler
 from .thread_schedule import ThreadScheduler
 from .parallelnodes import (
     ParallelExtensionNode, NotForkableParallelException, JoinParallelException,
-    ParallelPCANode, ParallelSFANode, ParallelFDANode, ParallelHistogramNode
+    TrainState, ParallelPCANode, ParallelSFANode, ParallelFDANode, ParallelHistogramNode,
+    ParallelHitParadeNode, ParallelLinearRegressionNode, ParallelCumulator,
+    ParallelISFANode, ParallelEtaComputerNode, ParallelNormalizeNode,
+    ParallelProjectionNode, ParallelXSFANode, ParallelRBMNode,
+    ParallelRandomizedPCANode
 )
 from .parallelclassifiers import (
     ParallelGaussianClassifier, ParallelNearestMeanClassifier,
-    ParallelKNNClassifier
+    ParallelKNNClassifier, ParallelSimpleMarkovClassifier,
+    ParallelDiscreteHopfieldClassifier, ParallelClassifierCumulator
 )
 from .parallelflows import (
     _purge_flownode, FlowTaskCallable, FlowTrainCallable, FlowExecuteCallable,
-    TrainResultContainer, ExecuteResultContainer,
+    TrainStateReduceCallable, TrainResultContainer, ExecuteResultContainer,
     ParallelFlowException, NoTaskException,
     ParallelFlow, ParallelCheckpointFlow
 )
@@ -48,27 +53,43 @@
 from mdp import config
 from mdp.utils import fixup_namespace
 
-if config.has_parallel_python:
-    from . import pp_support
-
 # Note: the modules with the actual extension node classes are still available
 
 __all__ = [
     "ResultContainer", "ListResultContainer",
     "OrderedResultContainer", "TaskCallable", "SqrTestCallable",
     "SleepSqrTestCallable", "TaskCallableWrapper", "Scheduler",
-    "ProcessScheduler", "ThreadScheduler",
+    "ProcessScheduler", "ForkServerScheduler", "ThreadScheduler",
     "ParallelExtensionNode", "JoinParallelException",
-    "NotForkableParallelException",
+    "NotForkableParallelException", "TrainState",
     "ParallelSFANode", "ParallelSFANode", "ParallelFDANode",
-    "ParallelHistogramNode",
+    "ParallelHistogramNode", "ParallelHitParadeNode",
+    "ParallelLinearRegressionNode", "ParallelCumulator", "ParallelISFANode",
+    "ParallelEtaComputerNode", "ParallelNormalizeNode",
+    "ParallelProjectionNode", "ParallelXSFANode", "ParallelRBMNode",
+    "ParallelRandomizedPCANode",
     "FlowTaskCallable", "FlowTrainCallable", "FlowExecuteCallable",
-    "ExecuteResultContainer", "TrainResultContainer", "ParallelFlowException",
+    "TrainStateReduceCallable", "ExecuteResultContainer",
+    "TrainResultContainer", "ParallelFlowException",
     "NoTaskException",
     "ParallelFlow", "ParallelCheckpointFlow",
     "ParallelFlowNode", "ParallelLayer", "ParallelCloneLayer"]
 
-import sys as _sys
+from importlib import import_module as _import_module
+from mdp.utils._lazy_module import LazyModule as _LazyModule
+from mdp.utils._lazy_module import install_lazy_module as _install_lazy_module
+
+class _ParallelModule(_LazyModule):
+    """Module type of ``mdp.parallel``, which imports ``pp_support`` on the
+    first access, because probing for parallel python starts a server."""
+
+    def __getattr__(self, name):
+        if name == 'pp_support' and config.has_parallel_python:
+            return _import_module(self.__name__ + '.pp_support')
+        raise AttributeError("'module' object has no attribute '%s'" % name)
+
+_install_lazy_module(__name__, _ParallelModule)
+
 fixup_namespace(__name__, __all__,
                 ('scheduling',
                  'process_schedule',
@@ -5,6 +5,7 @@
 import mdp
 from mdp import numx
 from mdp.parallel import ParallelExtensionNode
+from mdp.parallel.parallelnodes import _fork_cumulator, _join_cumulator
 
 
 class ParallelGaussianClassifier(ParallelExtensionNode,
@@ -55,3 +56,41 @@ def _join(self, forked_node):
                 self._label_samples[key] = forked_node._label_samples[key]
 
 
+class ParallelSimpleMarkovClassifier(ParallelExtensionNode,
+                                     mdp.nodes.SimpleMarkovClassifier):
+
+    def _fork(self):
+        return self._default_fork()
+
+    def _join(self, forked_node):
+        n_features = len(forked_node._feature_list)
+        n_labels = len(forked_node._label_list)
+        self._add_counts(forked_node._feature_list, forked_node._label_list,
+                         forked_node._feature_counts[:n_features],
+                         forked_node._label_counts[:n_labels],
+                         forked_node._connection_counts[:n_features,
+                                                        :n_labels])
+        self.ntotal_connections += forked_node.ntotal_connections
+
+
+class ParallelDiscreteHopfieldClassifier(ParallelExtensionNode,
+                                         mdp.nodes.DiscreteHopfieldClassifier):
+
+    def _fork(self):
+        return self._default_fork()
+
+    def _join(self, forked_node):
+        # the weight matrix starts as 0, so this also works for empty nodes
+        self._weight_matrix = self._weight_matrix + forked_node._weight_matrix
+        self._num_patterns += forked_node._num_patterns
+
+
+class ParallelClassifierCumulator(ParallelExtensionNode,
+                                  mdp.ClassifierCumulator):
+    """Parallel version of the ClassifierCumulator (e.g. for SVM nodes)."""
+
+    def _fork(self):
+        return _fork_cumulator(self)
+
+    def _join(self, forked_node):
+        _join_cumulator(self, forked_node)
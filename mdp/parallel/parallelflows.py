@@ -13,7 +13,7 @@
 import mdp
 from mdp import numx as n
 
-from .parallelnodes import NotForkableParallelException
+from .parallelnodes import NotForkableParallelException, TrainState
 from .scheduling import (
     TaskCallable, ResultContainer, OrderedResultContainer, Scheduler
 )
@@ -72,16 +72,20 @@ class FlowTrainCallable(FlowTaskCallable):
     You can also derive from this class to define your own callable class.
     """
 
-    def __init__(self, flownode, purge_nodes=True):
+    def __init__(self, flownode, purge_nodes=True, train_state=True):
         """Store everything for the training.
 
         keyword arguments:
         flownode -- FlowNode containing the flow to be trained.
         purge_nodes -- If True nodes not needed for the join will be replaced
             with dummy nodes to reduce the footprint.
+        train_state -- If True only the TrainState of the trained flownode
+            is returned (if the nodes support this), which contains just the
+            statistics needed for the join.
         """
         self._flownode = flownode
         self._purge_nodes = purge_nodes
+        self._train_state = train_state
         super(FlowTrainCallable, self).__init__()
 
     def __call__(self, data):
@@ -96,36 +100,151 @@ def __call__(self, data):
             self._flownode.train(*data)
         # note the local training in ParallelFlow relies on the flownode
         # being preserved, so derived classes should preserve it as well
+        if self._train_state:
+            state = self._flownode.get_train_state()
+            if state is not None:
+                return state
         if self._purge_nodes:
             _purge_flownode(self._flownode)
         return self._flownode
 
     def fork(self):
         return self.__class__(self._flownode.fork(),
-                              purge_nodes=self._purge_nodes)
+                              purge_nodes=self._purge_nodes,
+                              train_state=self._train_state)
+
+
+class TrainStateReduceCallable(FlowTaskCallable):
+    """Joins a batch of TrainStates of consecutive training tasks.
+
+    This makes it possible to join the TrainStates as a tree reduction on the
+    scheduler, instead of joining all of them on the master.
+    """
+
+    def __call__(self, data):
+        """Return the joined TrainState of the batch.
+
+        data -- Tuple (first, last, states) as returned by the
+            pop_state_batches method of TrainResultContainer, where the
+            states belong to the tasks first to last in the task order.
+        The result is the tuple (first, last, joined_state).
+        """
+        first, last, states = data
+        state = states[0]
+        for forked_state in states[1:]:
+            state.join(forked_state)
+        return (first, last, state)
 
 
 class TrainResultContainer(ResultContainer):
     """Container for parallel nodes.
 
-    Expects flownodes as results and joins them to save memory.
+    Expects flownodes (or their TrainState) as results and joins them to save
+    memory. The results are joined in the order of the tasks, the results of
+    consecutive tasks are joined as soon as they are available (the order
+    matters e.g. for the HitParadeNode).
+    If reduce_size is set then the TrainStates are not joined here, instead
+    they are handed out in batches (see pop_state_batches) to be joined by
+    TrainStateReduceCallable tasks on the scheduler. The results of these
+    tasks are added to the container again.
     A list containing one flownode is returned, so this container can replace
     the standard list container without any changes elsewhere.
     """
 
-    def __init__(self):
+    def __init__(self, reduce_size=4):
+        """Initialize the container.
+
+        reduce_size -- Maximum number of TrainStates that are joined by a
+            single reduce task. If it is None then the TrainStates are joined
+            in this container, like the flownodes.
+        """
         super(TrainResultContainer, self).__init__()
-        self._flownode = None
+        self.reduce_size = reduce_size
+        # joined results of consecutive tasks,
+        # first task index -> [last task index, joined result]
+        self._runs = {}
+        # last task index -> first task index of the runs
+        self._run_starts = {}
+        # TrainStates waiting for a reduce task,
+        # first task index -> [last task index, state]
+        self._states = {}
 
     def add_result(self, result, task_index):
-        if not self._flownode:
-            self._flownode = result
+        if result is None or task_index is None:
+            # the task failed
+            return
+        if isinstance(result, tuple):
+            # result of a TrainStateReduceCallable
+            first, last, result = result
+        else:
+            first = last = task_index
+        if self.reduce_size and isinstance(result, TrainState):
+            self._states[first] = [last, result]
+        else:
+            self._add_run(first, last, result)
+
+    def _add_run(self, first, last, result):
+        """Join the result of the tasks first to last with the adjacent
+        runs."""
+        start = self._run_starts.pop(first - 1, None)
+        if start is None:
+            start = first
+            run = self._runs[start] = [last, result]
         else:
-            self._flownode.join(result)
+            run = self._runs[start]
+            run[1].join(result)
+            run[0] = last
+        next_run = self._runs.pop(last + 1, None)
+        if next_run is not None:
+            del self._run_starts[next_run[0]]
+            run[1].join(next_run[1])
+            run[0] = next_run[0]
+        self._run_starts[run[0]] = start
+
+    def pop_state_batches(self, final=False):
+        """Remove and return batches of TrainStates of consecutive tasks.
+
+        Each batch is a tuple (first, last, states), which can be joined by
+        a TrainStateReduceCallable. Only batches with reduce_size states are
+        returned, unless final is True (i.e. no more results are expected),
+        in which case all the remaining states of consecutive tasks are
+        returned in batches of at least two states.
+        """
+        if not self.reduce_size:
+            return []
+        # split the states into chains of consecutive tasks
+        chains = []
+        for first in sorted(self._states):
+            if chains and chains[-1][-1][1][0] == first - 1:
+                chains[-1].append((first, self._states[first]))
+            else:
+                chains.append([(first, self._states[first])])
+        batches = []
+        for chain in chains:
+            for i in range(0, len(chain), self.reduce_size):
+                batch = chain[i:i+self.reduce_size]
+                if (len(batch) < self.reduce_size and
+                    not (final and len(batch) > 1)):
+                    continue
+                for first, _ in batch:
+                    del self._states[first]
+                batches.append((batch[0][0], batch[-1][1][0],
+                                [state for _, (_, state) in batch]))
+        return batches
 
     def get_results(self):
-        flownode = self._flownode
-        self._flownode = None
+        for first in sorted(self._states):
+            self._add_run(first, *self._states[first])
+        flownode = None
+        for first in sorted(self._runs):
+            result = self._runs[first][1]
+            if flownode is None:
+                flownode = result
+            else:
+                flownode.join(result)
+        self._runs = {}
+        self._run_starts = {}
+        self._states = {}
         return [flownode,]
     
 
@@ -297,6 +416,8 @@ def train(self, data_iterables, scheduler=None,
             the result container in the scheduler will be overwritten with an
             instance of NodeResultContainer (unless it is already an instance
             of NodeResultContainer). This improves the memory efficiency.
+            With a TrainResultContainer the TrainStates returned by the
+            tasks are joined by reduce tasks on the scheduler.
         """
         # Warning: If this method is updated you also have to update train
         #          in ParallelCheckpointFlow.
@@ -351,6 +472,7 @@ def train(self, data_iterables, scheduler=None,
                     while self.task_available:
                         task = self.get_task()
                         scheduler.add_task(*task)
+                    self._reduce_train_states(scheduler)
                     results = scheduler.get_results()
                     if results == []:
                         err = ("Could not get any training tasks or results "
@@ -381,6 +503,39 @@ def train(self, data_iterables, scheduler=None,
                 if (schedulers is not None) and (scheduler is not None):
                     scheduler.shutdown()
 
+    def _reduce_train_states(self, scheduler):
+        """Join the TrainStates of the training tasks on the scheduler.
+
+        Batches of TrainStates from the TrainResultContainer are joined by
+        reduce tasks as soon as they are available, until no more states of
+        consecutive tasks are left. This must only be called after all the
+        training tasks of the current phase were submitted, since these
+        tasks reuse the last task callable of the scheduler.
+        """
+        container = scheduler.result_container
+        if not (isinstance(container, TrainResultContainer) and
+                container.reduce_size):
+            return
+        reduce_callable = TrainStateReduceCallable()
+        while True:
+            # the scheduler lock is notified whenever a task is finished
+            scheduler._lock.acquire()
+            try:
+                while True:
+                    final = not scheduler.n_open_tasks
+                    batches = container.pop_state_batches(final=final)
+                    if batches or final:
+                        break
+                    scheduler._lock.wait(1)
+            finally:
+                scheduler._lock.release()
+            if not batches:
+                return
+            for batch in batches:
+                scheduler.add_task(batch, reduce_callable)
+                # the following tasks reuse the cached callable
+                reduce_callable = None
+
     def setup_parallel_training(self, data_iterables,
                                 train_callable_class=FlowTrainCallable):
         """Prepare the flow for handing out tasks to do the training.
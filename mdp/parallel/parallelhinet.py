@@ -39,6 +39,38 @@ def _join(self, forked_node):
                 self._flow[i_node].join(node)
             elif node.use_execute_fork():
                 self._flow[i_node].join(node)
+
+    def _get_train_state(self):
+        """Return the train states of the nodes that require a join.
+
+        None is returned if one of these nodes does not provide a train state.
+        """
+        states = []
+        found_train_node = False  # set to True at the first training node
+        for node in self._flow:
+            if not found_train_node and node.is_training():
+                found_train_node = True
+            elif not node.use_execute_fork():
+                states.append(None)
+                continue
+            state = node.get_train_state()
+            if state is None:
+                return None
+            states.append(state)
+        return states
+
+    @staticmethod
+    def _join_train_stats(stats, forked_stats):
+        for state, forked_state in zip(stats, forked_stats):
+            if state is not None:
+                state.join(forked_state)
+        return stats
+
+    def _join_train_state(self, stats):
+        """Join the train states into the corresponding nodes."""
+        for node, state in zip(self._flow, stats):
+            if state is not None:
+                node.join(state)
     
     def use_execute_fork(self):
         return any(node.use_execute_fork() for node in self._flow)
@@ -11,10 +11,12 @@
 # http://projects.scipy.org/scipy/numpy/ticket/551
 # To circumvent this, you can use a copy() of all unpickled arrays.
 
+import copy
 import inspect
 
 import mdp
 from mdp import numx
+from mdp.nodes.xsfa_nodes import ProjectionNode
 
 
 class NotForkableParallelException(mdp.NodeException):
@@ -31,6 +33,43 @@ class JoinParallelException(mdp.NodeException):
     pass
 
 
+class TrainState(object):
+    """Mergeable training statistics of a forked node.
+
+    A TrainState is returned by the get_train_state method of a forked node
+    and only contains the accumulated statistics (e.g. the covariance sums
+    and the number of samples) instead of the whole node. It can be joined
+    into the parent node just like the forked node itself, and it can be
+    joined with other states of the same node class.
+    """
+
+    def __init__(self, node, stats):
+        """Store the statistics and the dimensions of the node.
+
+        node -- The node for which this state was created.
+        stats -- The statistics returned by node._get_train_state.
+        """
+        self.node_class = node.__class__
+        self.dtype = node.dtype
+        self.input_dim = node.input_dim
+        self.output_dim = node.output_dim
+        self._train_phase_started = node._train_phase_started
+        self.stats = stats
+
+    def join(self, state):
+        """Absorb the statistics of another state into this state."""
+        if self.dtype is None:
+            self.dtype = state.dtype
+        if self.input_dim is None:
+            self.input_dim = state.input_dim
+        if self.output_dim is None:
+            self.output_dim = state.output_dim
+        if state._train_phase_started:
+            self._train_phase_started = True
+        self.stats = self.node_class._join_train_stats(self.stats,
+                                                       state.stats)
+
+
 class ParallelExtensionNode(mdp.ExtensionNode, mdp.Node):
     """Base class for parallel trainable MDP nodes.
 
@@ -62,6 +101,9 @@ def fork(self):
     def join(self, forked_node):
         """Absorb the trained node from a fork into this parent node.
 
+        Instead of the forked node its TrainState (see get_train_state) can be
+        given as well.
+
         This is a template method, the actual joining should be implemented in
         _join.
         """
@@ -75,7 +117,26 @@ def join(self, forked_node):
             self.output_dim = forked_node.output_dim
         if forked_node._train_phase_started and not self._train_phase_started:
             self._train_phase_started = True
-        self._join(forked_node)
+        if isinstance(forked_node, TrainState):
+            self._join_train_state(forked_node.stats)
+        else:
+            self._join(forked_node)
+
+    def get_train_state(self):
+        """Return the TrainState with the statistics of this forked node.
+
+        The TrainState can be joined instead of the forked node, which avoids
+        transferring the configuration and the arrays that do not change
+        during training. None is returned if the node does not support this,
+        then the forked node itself has to be joined.
+
+        This is a template method, the actual statistics should be provided
+        by _get_train_state.
+        """
+        stats = self._get_train_state()
+        if stats is None:
+            return None
+        return TrainState(self, stats)
 
     ## overwrite these methods ##
 
@@ -91,10 +152,49 @@ def _fork(self):
                                            str(self.__class__))
 
     def _join(self, forked_node):
-        """Hook method for joining, to be overridden."""
-        raise JoinParallelException("join is not implemented " +
+        """Hook method for joining with default implementation.
+
+        The default implementation joins the statistics of the forked node,
+        so it only has to be overridden if _get_train_state is not
+        implemented.
+        """
+        stats = forked_node._get_train_state()
+        if stats is None:
+            raise JoinParallelException("join is not implemented " +
+                                        "by this node (%s)" %
+                                        str(self.__class__))
+        self._join_train_state(stats)
+
+    def _get_train_state(self):
+        """Hook method returning the training statistics of this node.
+
+        The statistics should only contain the accumulators collected during
+        training, which are merged by _join_train_stats and stored by
+        _set_train_state. The default output is None, which signals that
+        the node does not support this.
+        """
+        return None
+
+    def _set_train_state(self, stats):
+        """Hook method to store the statistics in this node."""
+        raise JoinParallelException("train state is not implemented " +
                                     "by this node (%s)" %
                                     str(self.__class__))
+
+    @staticmethod
+    def _join_train_stats(stats, forked_stats):
+        """Hook method to merge two statistics, to be overridden.
+
+        The merged statistics are returned, the arrays in stats may be
+        modified in-place.
+        """
+        raise JoinParallelException("train state is not implemented " +
+                                    "by this node")
+
+    def _join_train_state(self, stats):
+        """Join the statistics of a forked node into this node."""
+        self._set_train_state(self._join_train_stats(self._get_train_state(),
+                                                     stats))
     
     @staticmethod
     def use_execute_fork():
@@ -165,26 +265,155 @@ def _join_covariance(cov, forked_cov):
         cov -- Instance of CovarianceMatrix, to which the forked_cov instance
             is aded in-place.
         """
+        forked_cov._set_shift(cov._shift)
         cov._cov_mtx += forked_cov._cov_mtx
         cov._avg += forked_cov._avg
         cov._tlen += forked_cov._tlen
-        
+
+    @staticmethod
+    def _join_delay_covariance(cov, forked_cov):
+        """Helper method to join two DelayCovarianceMatrix instances.
+
+        cov -- Instance of DelayCovarianceMatrix, to which the forked_cov
+            instance is aded in-place.
+        """
+        forked_cov._set_shift(cov._shift)
+        cov._cov_mtx += forked_cov._cov_mtx
+        cov._avg += forked_cov._avg
+        cov._avg_dt += forked_cov._avg_dt
+        cov._tlen += forked_cov._tlen
+
+    @staticmethod
+    def _join_cross_covariance(cov, forked_cov):
+        """Helper method to join two CrossCovarianceMatrix instances.
+
+        cov -- Instance of CrossCovarianceMatrix, to which the forked_cov
+            instance is aded in-place.
+        """
+        forked_cov._set_shift(cov._shift, cov._shifty)
+        cov._cov_mtx += forked_cov._cov_mtx
+        cov._avgx += forked_cov._avgx
+        cov._avgy += forked_cov._avgy
+        cov._tlen += forked_cov._tlen
+
+    @staticmethod
+    def _join_covariance_stats(covs, forked_covs, join_covariance):
+        """Helper method to merge tuples of covariance matrix instances.
+
+        covs -- Tuple of covariance matrix instances, which are returned
+            if they are not empty. Otherwise forked_covs is returned.
+        join_covariance -- One of the methods above for joining the
+            covariance matrix instances.
+        """
+        if forked_covs[0]._cov_mtx is None:
+            return covs
+        if covs[0]._cov_mtx is None:
+            return forked_covs
+        for cov, forked_cov in zip(covs, forked_covs):
+            join_covariance(cov, forked_cov)
+        return covs
+
 
 ## MDP parallel node implementations ##
 
+class ParallelCumulator(ParallelExtensionNode, mdp.Cumulator):
+    """Parallel version of the Cumulator.
+
+    The data collected by the forked nodes is appended to the data of this
+    node, so nodes derived from Cumulator (e.g. ICANode, LLENode or
+    NIPALSNode) can be trained in parallel without further changes.
+    """
+
+    def _fork(self):
+        return _fork_cumulator(self)
+
+    def _join(self, forked_node):
+        _join_cumulator(self, forked_node)
+
+
+def _fork_cumulator(node):
+    """Return a copy of the cumulator node without the collected data."""
+    # copy the node attributes without the data, which can be large
+    forked_node = copy.copy(node)
+    for field in node._cumulator_fields:
+        setattr(forked_node, field, [])
+    forked_node.tlen = 0
+    return forked_node.copy()
+
+
+def _join_cumulator(node, forked_node):
+    """Append the data collected by the forked cumulator node."""
+    for field in node._cumulator_fields:
+        getattr(node, field).extend(getattr(forked_node, field))
+    node.tlen += forked_node.tlen
+
+
 class ParallelPCANode(ParallelExtensionNode, mdp.nodes.PCANode):
     """Parallel version of MDP PCA node."""
 
     def _fork(self):
         return self._default_fork()
 
-    def _join(self, forked_node):
+    def _get_train_state(self):
+        return (self._cov_mtx,)
+
+    def _set_train_state(self, stats):
+        self._cov_mtx, = stats
+
+    @staticmethod
+    def _join_train_stats(stats, forked_stats):
         """Combine the covariance matrices."""
-        if self._cov_mtx._cov_mtx is None:
-            self.set_dtype(self._cov_mtx._dtype)
-            self._cov_mtx = forked_node._cov_mtx
+        return ParallelExtensionNode._join_covariance_stats(
+            stats, forked_stats, ParallelExtensionNode._join_covariance)
+
+
+class ParallelRandomizedPCANode(ParallelExtensionNode,
+                                mdp.nodes.RandomizedPCANode):
+    """Parallel version of the RandomizedPCANode.
+
+    In the streaming mode all forked nodes use the random basis of this
+    node, so the input dimension must be known before the first fork.
+    """
+
+    def _fork(self):
+        if not self.streaming:
+            return self._default_fork()
+        if self._q is None:
+            if self.input_dim is None:
+                err = ("the random basis can not be forked before the "
+                       "input dimension is known")
+                raise NotForkableParallelException(err)
+            self._q = self._random_basis()
+        forked_node = self.copy()
+        # reset the variables that might contain data from this train phase
+        forked_node._xq = None
+        if self.get_current_train_phase() == 0:
+            forked_node._x_sum = forked_node._sq_sum = None
+            forked_node._tlen = 0
+        return forked_node
+
+    def _join(self, forked_node):
+        if not self.streaming:
+            if self._cov_mtx._cov_mtx is None:
+                self.set_dtype(forked_node._cov_mtx._dtype)
+                self._cov_mtx = forked_node._cov_mtx
+            else:
+                self._join_covariance(self._cov_mtx, forked_node._cov_mtx)
+            return
+        if forked_node._xq is None:
+            return
+        if self._xq is None:
+            self._xq = forked_node._xq
         else:
-            self._join_covariance(self._cov_mtx, forked_node._cov_mtx)
+            self._xq += forked_node._xq
+        if self.get_current_train_phase() == 0:
+            if self._x_sum is None:
+                self._x_sum = forked_node._x_sum
+                self._sq_sum = forked_node._sq_sum
+            else:
+                self._x_sum += forked_node._x_sum
+                self._sq_sum += forked_node._sq_sum
+            self._tlen += forked_node._tlen
 
 
 class ParallelSFANode(ParallelExtensionNode, mdp.nodes.SFANode):
@@ -193,15 +422,17 @@ class ParallelSFANode(ParallelExtensionNode, mdp.nodes.SFANode):
     def _fork(self):
         return self._default_fork()
 
-    def _join(self, forked_node):
+    def _get_train_state(self):
+        return (self._cov_mtx, self._dcov_mtx)
+
+    def _set_train_state(self, stats):
+        self._cov_mtx, self._dcov_mtx = stats
+
+    @staticmethod
+    def _join_train_stats(stats, forked_stats):
         """Combine the covariance matrices."""
-        if self._cov_mtx._cov_mtx is None:
-            self.set_dtype(forked_node._cov_mtx._dtype)
-            self._cov_mtx = forked_node._cov_mtx
-            self._dcov_mtx = forked_node._dcov_mtx
-        else:
-            self._join_covariance(self._cov_mtx, forked_node._cov_mtx)
-            self._join_covariance(self._dcov_mtx, forked_node._dcov_mtx)
+        return ParallelExtensionNode._join_covariance_stats(
+            stats, forked_stats, ParallelExtensionNode._join_covariance)
 
 
 class ParallelFDANode(ParallelExtensionNode, mdp.nodes.FDANode):
@@ -251,3 +482,284 @@ def _join(self, forked_node):
                                             forked_node.data_hist])
         elif forked_node.data_hist is not None:
             self.data_hist = forked_node.data_hist
+
+
+class ParallelHitParadeNode(ParallelExtensionNode, mdp.nodes.HitParadeNode):
+    """Parallel version of the HitParadeNode.
+
+    The data of a forked node is treated as if it was appended to the
+    data seen so far, so the forks have to be joined in the order of their
+    data (the TrainResultContainer of the ParallelFlow joins the results in
+    the order of the tasks). A forked node keeps the samples that were
+    larger than its smallest maximum (or smaller than its largest minimum)
+    when they were visited. Only these samples can change the hits after
+    the preceding data, they are fed to the hit-parades when joining, so
+    the result is the same as for the serial training.
+    """
+
+    def _fork(self):
+        forked_node = self._default_fork()
+        # for each column the lists of the kept values and time indices
+        # of the maxima and minima
+        forked_node._kept = []
+        return forked_node
+
+    def _train(self, x):
+        old_tlen = self.tlen
+        kept = self._update_hits(x)
+        if getattr(self, "_kept", None) is not None:
+            for c, (pos_M, pos_m) in enumerate(kept):
+                self._add_kept(c, x[pos_M, c], pos_M + old_tlen,
+                               x[pos_m, c], pos_m + old_tlen)
+
+    def _add_kept(self, c, values_M, indices_M, values_m, indices_m):
+        if len(self._kept) <= c:
+            self._kept.append(([], [], [], []))
+        for kept, array in zip(self._kept[c],
+                               (values_M, indices_M, values_m, indices_m)):
+            kept.append(array)
+
+    def _join(self, forked_node):
+        if forked_node.hit is None:
+            return
+        keep = getattr(self, "_kept", None) is not None
+        if self.hit is None:
+            self.hit = forked_node.hit
+            self.tlen = forked_node.tlen
+            if keep:
+                self._kept = forked_node._kept
+            return
+        offset = self.tlen
+        for c, (hit, forked_kept) in enumerate(zip(self.hit,
+                                                   forked_node._kept)):
+            values_M, indices_M, values_m, indices_m = [
+                numx.concatenate(kept) for kept in forked_kept]
+            indices_M += offset
+            indices_m += offset
+            pos_M = hit._update_maxima(values_M, indices_M, None)
+            pos_m = hit._update_minima(values_m, indices_m, None)
+            if keep:
+                self._add_kept(c, values_M[pos_M], indices_M[pos_M],
+                               values_m[pos_m], indices_m[pos_m])
+        self.tlen += forked_node.tlen
+
+
+class ParallelLinearRegressionNode(ParallelExtensionNode,
+                                   mdp.nodes.LinearRegressionNode):
+    """Parallel version of the LinearRegressionNode."""
+
+    def _fork(self):
+        return self._default_fork()
+
+    def _get_train_state(self):
+        return (self._xTx, self._xTy, self._x_sum, self._y_sum, self._tlen)
+
+    def _set_train_state(self, stats):
+        self._xTx, self._xTy, self._x_sum, self._y_sum, self._tlen = stats
+
+    @staticmethod
+    def _join_train_stats(stats, forked_stats):
+        if forked_stats[0] is None:
+            return stats
+        if stats[0] is None:
+            return forked_stats
+        for acc, forked_acc in zip(stats[:4], forked_stats[:4]):
+            acc += forked_acc
+        return stats[:4] + (stats[4] + forked_stats[4],)
+
+
+class ParallelISFANode(ParallelExtensionNode, mdp.nodes.ISFANode):
+    """Parallel version of the ISFANode (and of the derived TDSEPNode)."""
+
+    def _fork(self):
+        forked_node = self.copy()
+        # reset the statistics that have been collected so far
+        forked_node.covs = [mdp.utils.DelayCovarianceMatrix(dt,
+                                                            dtype=self.dtype)
+                            for dt in self.lags]
+        if not self.whitened:
+            forked_node.white = self.white.fork()
+        return forked_node
+
+    def _join(self, forked_node):
+        """Combine the time-delayed covariance matrices."""
+        if not self.whitened:
+            self.white.join(forked_node.white)
+        for i, forked_cov in enumerate(forked_node.covs):
+            if forked_cov._cov_mtx is None:
+                continue
+            if self.covs[i]._cov_mtx is None:
+                self.covs[i] = forked_cov
+            else:
+                self._join_delay_covariance(self.covs[i], forked_cov)
+
+
+class ParallelEtaComputerNode(ParallelExtensionNode,
+                              mdp.nodes.EtaComputerNode):
+    """Parallel version of the EtaComputerNode."""
+
+    def _fork(self):
+        return self._default_fork()
+
+    def _get_train_state(self):
+        if not self._initialized:
+            return ()
+        return (self._mean, self._var, self._diff2, self._tlen)
+
+    def _set_train_state(self, stats):
+        if stats:
+            self._mean, self._var, self._diff2, self._tlen = stats
+            self._initialized = 1
+
+    @staticmethod
+    def _join_train_stats(stats, forked_stats):
+        if not forked_stats:
+            return stats
+        if not stats:
+            return forked_stats
+        for acc, forked_acc in zip(stats[:3], forked_stats[:3]):
+            acc += forked_acc
+        return stats[:3] + (stats[3] + forked_stats[3],)
+
+
+class ParallelNormalizeNode(ParallelExtensionNode, mdp.nodes.NormalizeNode):
+    """Parallel version of the NormalizeNode."""
+
+    def _fork(self):
+        return self._default_fork()
+
+    def _get_train_state(self):
+        return (self._cov_mtx,)
+
+    def _set_train_state(self, stats):
+        self._cov_mtx, = stats
+
+    @staticmethod
+    def _join_train_stats(stats, forked_stats):
+        """Combine the covariance matrices."""
+        return ParallelExtensionNode._join_covariance_stats(
+            stats, forked_stats, ParallelExtensionNode._join_covariance)
+
+
+class ParallelProjectionNode(ParallelExtensionNode, ProjectionNode):
+    """Parallel version of the ProjectionNode used inside the XSFANode."""
+
+    def _fork(self):
+        return self.__class__(self.output_dim - 1 - self.L, self.L,
+                              dtype=self.dtype)
+
+    def _get_train_state(self):
+        return (self._cov_mtx,)
+
+    def _set_train_state(self, stats):
+        self._cov_mtx, = stats
+
+    @staticmethod
+    def _join_train_stats(stats, forked_stats):
+        """Combine the cross-covariance matrices."""
+        return ParallelExtensionNode._join_covariance_stats(
+            stats, forked_stats, ParallelExtensionNode._join_cross_covariance)
+
+
+class ParallelXSFANode(ParallelExtensionNode, mdp.nodes.XSFANode):
+    """Parallel version of the XSFANode.
+
+    Only the module of the internal flow that is currently trained is
+    forked, the modules that have already been trained are shared with the
+    forked node. Since the internal flow is only created once the input
+    dimension is known, the first training phase can only be forked if
+    input_dim was given. The forked nodes do not cache the outputs of the
+    trained modules.
+    """
+
+    def _fork(self):
+        if self._flow is None:
+            if self.input_dim is None:
+                err = ("the internal flow can not be forked before the "
+                       "input dimension is known")
+                raise NotForkableParallelException(err)
+            self._initialize_internal_flow()
+        forked_node = copy.copy(self)
+        forked_node._flow = self._flow[:-1] + self._flow[-1].fork()
+        # the forked node only sees part of the data, so it does not cache
+        forked_node._cache = None
+        forked_node.cache_size = 0
+        return forked_node
+
+    def _join(self, forked_node):
+        self._flow[-1].join(forked_node._flow[-1])
+
+
+class ParallelRBMNode(ParallelExtensionNode, mdp.nodes.RBMNode):
+    """Parallel version of the RBMNode (and of the RBMWithLabelsNode).
+
+    The forked nodes start from the current parameters of this node. When
+    they are joined the parameters are set to the parameters at the time of
+    the fork plus the average of the parameter updates of the joined forks.
+    The train state of a fork holds the sum of its updates and their number,
+    so the forks (or their TrainStates) can also be joined with each other
+    before they are joined into this node. A fork made after a join starts
+    a new averaging round. The momentum terms are not joined, while the
+    persistent chains are taken from the last joined fork.
+    """
+
+    def _fork(self):
+        if not self._initialized:
+            if self.input_dim is None:
+                err = ("the weights can not be forked before the "
+                       "input dimension is known")
+                raise NotForkableParallelException(err)
+            self._init_weights()
+        # start a new averaging round
+        self._join_params = self._params_copy()
+        self._join_updates = None
+        self._n_joined = 0
+        forked_node = self.copy()
+        forked_node._fork_params = self._join_params
+        forked_node._join_params = None
+        return forked_node
+
+    def _params_copy(self):
+        return (self.w.copy(), self.bv.copy(), self.bh.copy())
+
+    def _get_train_state(self):
+        if getattr(self, "_n_joined", 0):
+            return (self._join_updates, self._n_joined, self._chains)
+        if (getattr(self, "_join_params", None) is None and
+            getattr(self, "_fork_params", None) is not None):
+            # a trained fork, which has not joined other forks
+            updates = [param - fork_param for param, fork_param in
+                       zip((self.w, self.bv, self.bh), self._fork_params)]
+            return (updates, 1, self._chains)
+        return (None, 0, self._chains)
+
+    def _set_train_state(self, stats):
+        updates, n_updates, chains = stats
+        if n_updates:
+            if getattr(self, "_join_params", None) is None:
+                if getattr(self, "_fork_params", None) is not None:
+                    # a fork which joins other forks
+                    self._join_params = self._fork_params
+                else:
+                    self._join_params = self._params_copy()
+            self._join_updates = updates
+            self._n_joined = n_updates
+            for param, join_param, update_sum in zip(
+                    (self.w, self.bv, self.bh), self._join_params, updates):
+                param[...] = join_param + update_sum / n_updates
+        if chains is not None:
+            self._chains = chains
+
+    @staticmethod
+    def _join_train_stats(stats, forked_stats):
+        """Add the updates of the forks and their numbers."""
+        updates, n_updates, chains = stats
+        forked_updates, forked_n_updates, forked_chains = forked_stats
+        if forked_chains is None:
+            forked_chains = chains
+        if not n_updates:
+            return (forked_updates, forked_n_updates, forked_chains)
+        if forked_n_updates:
+            for update_sum, update in zip(updates, forked_updates):
+                update_sum += update
+        return (updates, n_updates + forked_n_updates, forked_chains)
@@ -59,7 +59,8 @@ def _monkeypatch_pp(container_dir):
         # pp 1.6.0 compatibility
         pp._Worker.command = pp._Worker.command.replace(ppworker, ppworker3)
 
-if hasattr(mdp.config, 'pp_monkeypatch_dirname'):
+if (mdp.config.has_parallel_python and
+    hasattr(mdp.config, 'pp_monkeypatch_dirname')):
     _monkeypatch_pp(mdp.config.pp_monkeypatch_dirname)
 
 class PPScheduler(scheduling.Scheduler):
@@ -7,9 +7,6 @@
 from builtins import str
 from builtins import range
 
-# TODO: use a queue instead of sleep?
-#    http://docs.python.org/library/queue.html
-
 # TODO: use shared memory for data numpy arrays, but this also requires the
 #    use of multiprocessing since the ctype objects can't be pickled
 
@@ -18,19 +15,22 @@
 #    we would have to add support for this to the callable,
 #    might get too complicated
 
-# TODO: leverage process forks on unix systems,
-#    might be very efficient due to copy-on-write, see
-#    http://gael-varoquaux.info/blog/?p=119
-#    http://www.ibm.com/developerworks/aix/library/au-multiprocessing/
-
 import sys
 import os
+import collections
+import hashlib
+import io
 import pickle as pickle
 import threading
 import subprocess
+import signal
+import socket
+import shutil
+import tempfile
 import time
 import traceback
 import warnings
+from importlib import import_module
 
 if __name__ == "__main__":
     # try to make sure that mdp can be imported by adding it to sys.path
@@ -44,9 +44,102 @@
     warnings.filterwarnings("ignore", ".*")
 
 import mdp
+from mdp import numx
 from mdp.parallel import Scheduler, cpu_count
 
 SLEEP_TIME = 0.1  # time spend sleeping when waiting for a free process
+FORK_TIMEOUT = 60  # seconds to wait for a forked worker to connect
+# arrays in the task callable with at least this size are identified by
+# their content hash and sent only once to each process
+BROADCAST_MIN_BYTES = 2**16
+# number of recent task callables whose arrays are kept in each process
+CALLABLE_STORE_VERSIONS = 2
+
+
+def _pack_result(result):
+    """Attach the profile recorded in this process to the task result.
+
+    The profiling package is only imported if it was already loaded, which
+    is the case if the task activated the profile extension.
+    """
+    if 'mdp.profiling' not in sys.modules:
+        return result
+    from mdp.profiling.profile_extension import _pack_worker_result
+    return _pack_worker_result(result)
+
+
+def _unpack_result(result):
+    """Merge the profile attached to the result and return the task result.
+
+    A result with a profile can only be unpickled after the profiling
+    package has been imported.
+    """
+    if 'mdp.profiling' not in sys.modules:
+        return result
+    from mdp.profiling.profile_extension import _unpack_worker_result
+    return _unpack_worker_result(result)
+
+
+def _array_hash(array):
+    """Return the content hash of the array."""
+    digest = hashlib.sha1(str((array.dtype.descr, array.shape))
+                          .encode('ascii'))
+    digest.update(numx.ascontiguousarray(array).data)
+    return digest.hexdigest()
+
+
+class _CallablePickler(pickle.Pickler):
+    """Pickler which replaces the large arrays by their content hash.
+
+    The replaced arrays are collected in the arrays dict.
+    """
+
+    def __init__(self, file_):
+        pickle.Pickler.__init__(self, file_, -1)
+        self.arrays = {}
+        self._hashes = {}
+
+    def persistent_id(self, obj):
+        if (type(obj) is not numx.ndarray or obj.dtype.hasobject or
+            obj.nbytes < BROADCAST_MIN_BYTES):
+            return None
+        key = self._hashes.get(id(obj))
+        if key is None:
+            key = self._hashes[id(obj)] = _array_hash(obj)
+            self.arrays[key] = obj
+        return key
+
+
+class _CallableStore(object):
+    """Store of the large arrays of the recent task callables in a process.
+
+    The arrays are kept for the last CALLABLE_STORE_VERSIONS callables, the
+    scheduler keeps track of them to only send the missing arrays.
+    """
+
+    def __init__(self):
+        self._arrays = {}
+        self._versions = collections.deque(maxlen=CALLABLE_STORE_VERSIONS)
+
+    def load(self, pickled, hashes, arrays):
+        """Unpickle a callable pickled by `_CallablePickler`.
+
+        pickled -- The pickled callable.
+        hashes -- The hashes of all the arrays in the callable.
+        arrays -- Dict with the arrays which are not in the store yet.
+        """
+        for key, array in arrays.items():
+            # the arrays are shared by the callables using them
+            array.setflags(write=False)
+            self._arrays[key] = array
+        self._versions.append(set(hashes))
+        used = set().union(*self._versions)
+        for key in list(self._arrays):
+            if key not in used:
+                del self._arrays[key]
+        unpickler = pickle.Unpickler(io.BytesIO(pickled))
+        unpickler.persistent_load = self._arrays.__getitem__
+        return unpickler.load()
 
 
 class ProcessScheduler(Scheduler):
@@ -55,10 +148,19 @@ class ProcessScheduler(Scheduler):
     The subprocess module is used to start the requested number of processes.
     The execution of each task is internally managed by dedicated thread.
 
+    When the task callables are cached, each callable is pickled only once
+    and its large arrays are sent only once to each process, so that the
+    arrays of the nodes which do not change (e.g. the already trained nodes
+    of a flow) are not sent again with the next callable. In the processes
+    these arrays are read-only.
+
     This scheduler should work on all platforms (at least on Linux,
-    Windows XP and Vista).
+    Windows XP and Vista). A failed process is replaced by a new one.
     """
 
+    # number of times that a task is retried when the process fails
+    max_retries = 0
+
     def __init__(self, result_container=None, verbose=False, n_processes=1,
                  source_paths=None, python_executable=None,
                  cache_callable=True):
@@ -106,19 +208,59 @@ def __init__(self, result_container=None, verbose=False, n_processes=1,
         if source_paths is None:
             source_paths = sys.path
         process_args += source_paths
+        self._process_args = process_args
+        # the pickled version of the last sent callable
+        self._payload = None
+        self._payload_lock = threading.Lock()
+        self._start_processes()
+        if self.verbose:
+            print ("scheduler initialized with %d processes" %
+                   self._n_processes)
+
+    def _start_processes(self):
+        """Start the worker processes."""
         # list of processes not in use, start the processes now
-        self._free_processes = [subprocess.Popen(args=process_args,
-                                                 stdout=subprocess.PIPE,
-                                                 stdin=subprocess.PIPE)
+        self._free_processes = [self._new_process()
                                 for _ in range(self._n_processes)]
+
+    def _start_process(self):
+        """Start and return a new worker process."""
+        return subprocess.Popen(args=self._process_args,
+                                stdout=subprocess.PIPE,
+                                stdin=subprocess.PIPE)
+
+    def _new_process(self):
+        """Start a new worker process and tag it with its state."""
+        process = self._start_process()
         # tag each process with its cached callable task_index,
         # this is compared with _last_callable_index to check if the cached
         # task_callable is still up to date
-        for process in self._free_processes:
-            process._callable_index = -1
-        if self.verbose:
-            print ("scheduler initialized with %d processes" %
-                   self._n_processes)
+        process._callable_index = -1
+        process._n_tasks = 0
+        # hashes of the arrays of the recent callables sent to the process
+        process._array_versions = collections.deque(
+                                        maxlen=CALLABLE_STORE_VERSIONS)
+        return process
+
+    def _stop_process(self, process, kill=False):
+        """Stop a worker process, kill it if it failed."""
+        if kill:
+            try:
+                process.kill()
+            except OSError:
+                # the process has already exited
+                pass
+        else:
+            pickle.dump("EXIT", process.stdin)
+            process.stdin.flush()
+        process.wait()
+
+    def _release_process(self, process):
+        """Put the process back into the list of free processes."""
+        self._lock.acquire()
+        self._free_processes.append(process)
+        self._lock.notify_all()
+        self._lock.release()
 
     def _shutdown(self):
         """Shut down the slave processes.
@@ -126,12 +268,14 @@ def _shutdown(self):
         If a process is still running a task then an exception is raised.
         """
         self._lock.acquire()
-        if len(self._free_processes) < self._n_processes:
-            raise Exception("some slave process is still working")
-        for process in self._free_processes:
-            pickle.dump("EXIT", process.stdin)
-            process.stdin.flush()
-        self._lock.release()
+        try:
+            if len(self._free_processes) < self._n_processes:
+                raise Exception("some slave process is still working")
+            for process in self._free_processes:
+                self._stop_process(process)
+            self._free_processes = []
+        finally:
+            self._lock.release()
         if self.verbose:
             print("scheduler shutdown")
 
@@ -144,10 +288,8 @@ def _process_task(self, data, task_callable, task_index):
         task_started = False
         while not task_started:
             if not len(self._free_processes):
-                # release lock for other threads and wait
-                self._lock.release()
-                time.sleep(SLEEP_TIME)
-                self._lock.acquire()
+                # wait until a process is released
+                self._lock.wait(SLEEP_TIME)
             else:
                 try:
                     process = self._free_processes.pop()
@@ -167,36 +309,230 @@ def _task_thread(self, process, data, task_callable, task_index):
         """Thread function which cares for a single task.
 
         The task is pushed to the process via stdin, then we wait for the
-        result on stdout, pass the result to the result container, free
-        the process and exit.
+        result on stdout, free the process, pass the result to the result
+        container and exit.
+
+        If the process fails it is replaced by a new process. The task is
+        then retried up to max_retries times, after that its result is
+        stored as None (with the task index None).
         """
-        try:
-            if self._cache_callable:
-                # check if the cached callable is up to date
-                if process._callable_index < self._last_callable_index:
-                    process._callable_index = self._last_callable_index
-                else:
-                    task_callable = None
-            # push the task to the process
-            pickle.dump((data, task_callable, task_index),
-                        process.stdin, protocol=-1)
-            process.stdin.flush()
-            # wait for result to arrive
-            result = pickle.load(process.stdout)
-        except:
-            traceback.print_exc()
-            self._free_processes.append(process)
-            sys.exit("failed to execute task %d in process:" % task_index)
-        # store the result and clean up
+        n_failures = 0
+        while True:
+            try:
+                result = self._run_task(process, data, task_callable,
+                                        task_index)
+                break
+            except Exception:
+                traceback.print_exc()
+                n_failures += 1
+                self._stop_process(process, kill=True)
+                process = self._new_process()
+                if n_failures > self.max_retries:
+                    print("failed to execute task %d in process" %
+                          task_index)
+                    self._release_process(process)
+                    self._store_result(None, None)
+                    return
+        self._release_process(process)
         self._store_result(result, task_index)
-        self._free_processes.append(process)
 
+    def _callable_delta(self, process, task_callable):
+        """Return the pickled callable with the arrays which are missing in
+        the process."""
+        with self._payload_lock:
+            if (self._payload is None or
+                self._payload[0] is not task_callable or
+                self._payload[1] != process._callable_index):
+                pickled = io.BytesIO()
+                pickler = _CallablePickler(pickled)
+                pickler.dump(task_callable)
+                self._payload = (task_callable, process._callable_index,
+                                 pickled.getvalue(), pickler.arrays)
+            pickled, arrays = self._payload[2:]
+        known = set().union(*process._array_versions)
+        process._array_versions.append(set(arrays))
+        missing = dict((key, array) for key, array in arrays.items()
+                       if key not in known)
+        return pickled, list(arrays), missing
 
-def _process_run(cache_callable=True):
-    """Run this function in a worker process to receive and run tasks.
+    def _run_task(self, process, data, task_callable, task_index):
+        """Run the task in the process and return the result."""
+        if self._cache_callable:
+            # check if the cached callable is up to date
+            if process._callable_index < self._last_callable_index:
+                process._callable_index = self._last_callable_index
+                task_callable = self._callable_delta(process, task_callable)
+            else:
+                task_callable = None
+        # push the task to the process
+        pickle.dump((data, task_callable, task_index),
+                    process.stdin, protocol=-1)
+        process.stdin.flush()
+        # wait for result to arrive
+        result = pickle.load(process.stdout)
+        process._n_tasks += 1
+        # merge the profile of the process (if it was profiled)
+        return _unpack_result(result)
+
+
+class _ForkedProcess(object):
+    """Worker process forked by the fork server.
+
+    It is connected to the scheduler by a socket, which provides the stdin
+    and stdout file objects used by ProcessScheduler.
+    """
 
-    It waits for tasks on stdin, and sends the results back via stdout.
+    def __init__(self, pid, connection):
+        self.pid = pid
+        self._connection = connection
+        self.stdin = connection.makefile('wb')
+        self.stdout = connection.makefile('rb')
+
+    def kill(self):
+        try:
+            os.kill(self.pid, signal.SIGKILL)
+        except OSError:
+            # the process has already exited
+            pass
+
+    def close(self):
+        for file_ in (self.stdin, self.stdout):
+            try:
+                file_.close()
+            except (IOError, OSError, socket.error):
+                pass
+        self._connection.close()
+
+
+def _process_memory(pid):
+    """Return the resident memory of the process in bytes, or None if it is
+    not available (only supported on Linux)."""
+    try:
+        with open('/proc/%d/statm' % pid) as statm:
+            pages = int(statm.read().split()[1])
+    except (IOError, OSError, IndexError, ValueError):
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE')
+
+
+class ForkServerScheduler(ProcessScheduler):
+    """Process scheduler with a pool of workers forked from a fork server.
+
+    A single server process is started, which imports mdp and the
+    preload_modules once. The worker processes are forked from the server,
+    so they start without the cost of a new interpreter and of the imports.
+    A failed worker is replaced by a new fork and its task is retried,
+    and workers can be recycled after a number of tasks or when their
+    memory exceeds a limit, e.g. to contain memory leaks.
+
+    This scheduler requires os.fork and Unix sockets, so it is not
+    available on Windows.
     """
+
+    def __init__(self, result_container=None, verbose=False, n_processes=1,
+                 source_paths=None, python_executable=None,
+                 cache_callable=True, preload_modules=None,
+                 max_tasks_per_process=None, max_memory=None,
+                 max_retries=1):
+        """Initialize the scheduler, start the server and fork the workers.
+
+        preload_modules -- List of names of the modules which are imported
+            by the server, e.g. the modules defining the task callables.
+        max_tasks_per_process -- Number of tasks after which a worker is
+            replaced by a new fork (default is None, for no limit).
+        max_memory -- Resident memory in bytes above which a worker is
+            replaced after finishing a task (default is None, for no limit).
+            This is only supported on Linux.
+        max_retries -- Number of times that a task is retried when its
+            worker fails (default is 1).
+
+        The other arguments are as for ProcessScheduler.
+        """
+        if not hasattr(os, 'fork') or not hasattr(socket, 'AF_UNIX'):
+            err = ("ForkServerScheduler requires os.fork and Unix sockets, "
+                   "use ProcessScheduler instead.")
+            raise mdp.MDPException(err)
+        self._preload_modules = list(preload_modules or [])
+        self.max_tasks_per_process = max_tasks_per_process
+        self.max_memory = max_memory
+        self.max_retries = max_retries
+        super(ForkServerScheduler, self).__init__(
+            result_container=result_container, verbose=verbose,
+            n_processes=n_processes, source_paths=source_paths,
+            python_executable=python_executable,
+            cache_callable=cache_callable)
+
+    def _start_processes(self):
+        """Start the fork server and fork the worker processes."""
+        # process_args is [python, -u, module_file, cache flag, paths...]
+        self._socket_dir = tempfile.mkdtemp(prefix='mdp-forkserver-')
+        address = os.path.join(self._socket_dir, 'socket')
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._listener.bind(address)
+        self._listener.listen(self._n_processes)
+        self._listener.settimeout(FORK_TIMEOUT)
+        server_args = (self._process_args[:3] + ['forkserver'] +
+                       self._process_args[3:4] +
+                       [address, ','.join(self._preload_modules)] +
+                       self._process_args[4:])
+        self._server = subprocess.Popen(args=server_args,
+                                        stdout=subprocess.PIPE,
+                                        stdin=subprocess.PIPE)
+        self._fork_lock = threading.Lock()
+        super(ForkServerScheduler, self)._start_processes()
+
+    def _start_process(self):
+        """Fork a new worker process from the server and return it."""
+        with self._fork_lock:
+            pickle.dump("FORK", self._server.stdin, protocol=-1)
+            self._server.stdin.flush()
+            try:
+                pid = pickle.load(self._server.stdout)
+            except EOFError:
+                err = "The fork server of the scheduler has exited."
+                raise mdp.MDPException(err)
+            connection = self._listener.accept()[0]
+            connection.settimeout(None)
+        return _ForkedProcess(pid, connection)
+
+    def _stop_process(self, process, kill=False):
+        """Stop a worker process, kill it if it failed."""
+        if kill:
+            process.kill()
+        else:
+            try:
+                pickle.dump("EXIT", process.stdin)
+                process.stdin.flush()
+            except (IOError, OSError, socket.error):
+                pass
+        process.close()
+
+    def _release_process(self, process):
+        """Recycle the process if it reached a limit, then put it back into
+        the list of free processes."""
+        if ((self.max_tasks_per_process is not None and
+             process._n_tasks >= self.max_tasks_per_process) or
+            (self.max_memory is not None and
+             (_process_memory(process.pid) or 0) > self.max_memory)):
+            self._stop_process(process)
+            process = self._new_process()
+        super(ForkServerScheduler, self)._release_process(process)
+
+    def _shutdown(self):
+        """Shut down the workers and the fork server."""
+        try:
+            super(ForkServerScheduler, self)._shutdown()
+        finally:
+            pickle.dump("EXIT", self._server.stdin, protocol=-1)
+            self._server.stdin.flush()
+            self._server.wait()
+            self._listener.close()
+            shutil.rmtree(self._socket_dir, ignore_errors=True)
+
+
+def _std_pipes():
+    """Return the binary stdin and stdout for the pickled objects and
+    redirect sys.stdout to stderr."""
     # use sys.stdout only for pickled objects, everything else goes to stderr
     # NOTE: .buffer is the binary mode interface for stdin and out in py3k
     try:
@@ -207,10 +543,54 @@ def _process_run(cache_callable=True):
         pickle_in = sys.stdin.buffer
     except AttributeError:
         pickle_in = sys.stdin
-
     sys.stdout = sys.stderr
+    return pickle_in, pickle_out
+
+
+def _fork_server_run(address, preload_modules=(), cache_callable=True):
+    """Run this function in the fork server process.
+
+    For each request on stdin a worker is forked, which connects to the
+    scheduler at the socket address and runs `_process_run`. The pid of the
+    worker is sent back via stdout.
+    """
+    for module_name in preload_modules:
+        import_module(module_name)
+    pickle_in, pickle_out = _std_pipes()
+    # the exited workers are reaped automatically
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    while True:
+        request = pickle.load(pickle_in)
+        if request == "EXIT":
+            break
+        pid = os.fork()
+        if pid == 0:
+            try:
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                connection = socket.socket(socket.AF_UNIX,
+                                           socket.SOCK_STREAM)
+                connection.connect(address)
+                _process_run(cache_callable=cache_callable,
+                             pickle_in=connection.makefile('rb'),
+                             pickle_out=connection.makefile('wb'))
+            finally:
+                # never return to the server loop in the worker
+                os._exit(0)
+        pickle.dump(pid, pickle_out, protocol=-1)
+        pickle_out.flush()
+
+
+def _process_run(cache_callable=True, pickle_in=None, pickle_out=None):
+    """Run this function in a worker process to receive and run tasks.
+
+    It waits for tasks on stdin, and sends the results back via stdout
+    (or via the given pickle_in and pickle_out file objects).
+    """
+    if pickle_in is None:
+        pickle_in, pickle_out = _std_pipes()
     exit_loop = False
     last_callable = None  # cached callable
+    store = _CallableStore()  # arrays of the cached callables
     while not exit_loop:
         task = None
         try:
@@ -228,13 +608,15 @@ def _process_run(cache_callable=True):
                     task_callable = last_callable.fork()
                 elif cache_callable:
                     # store callable in cache
-                    last_callable = task_callable
+                    last_callable = store.load(*task_callable)
+                    task_callable = last_callable
                     task_callable.setup_environment()
                     task_callable = task_callable.fork()
                 else:
                     task_callable.setup_environment()
                 result = task_callable(data)
                 del task_callable  # free memory
+                result = _pack_result(result)
                 pickle.dump(result, pickle_out, protocol=-1)
                 pickle_out.flush()
         except Exception as exception:
@@ -249,13 +631,25 @@ def _process_run(cache_callable=True):
             sys.exit()
 
 if __name__ == "__main__":
+    # the fork server gets the 'forkserver' argument, followed by the
+    # cache_callable flag, the socket address and the preload modules
+    fork_server = sys.argv[1] == "forkserver"
+    args = sys.argv[2:] if fork_server else sys.argv[1:]
     # first argument is cache_callable flag
-    cache_callable = sys.argv[1] == "True"
+    cache_callable = args[0] == "True"
+    if fork_server:
+        address = args[1]
+        preload_modules = [name for name in args[2].split(',') if name]
+        args = args[2:]
 
-    if len(sys.argv) > 2:
+    if len(args) > 1:
         # remaining arguments are code paths,
         # put them in front so that they take precedence over PYTHONPATH
-        new_paths = [sys_arg for sys_arg in sys.argv[2:]
+        new_paths = [sys_arg for sys_arg in args[1:]
                      if sys_arg not in sys.path]
         sys.path = new_paths + sys.path
-    _process_run(cache_callable=cache_callable)
+    if fork_server:
+        _fork_server_run(address, preload_modules,
+                         cache_callable=cache_callable)
+    else:
+        _process_run(cache_callable=cache_callable)
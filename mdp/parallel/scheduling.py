@@ -213,7 +213,9 @@ def __init__(self, result_container=None, verbose=False):
         self._n_open_tasks = 0  # number of tasks that are currently running
         # count the number of submitted tasks, also used for the task index
         self._task_counter = 0
-        self._lock = threading.Lock()
+        # the condition is used as the lock of the scheduler, it is
+        # notified when a task is finished
+        self._lock = threading.Condition()
         self._last_callable = None  # last callable is stored
         # task index of the _last_callable, can be *.5 if updated between tasks
         self._last_callable_index = -1.0
@@ -297,6 +299,7 @@ def _store_result(self, result, task_index):
             else:
                 print("    task failed")
         self._n_open_tasks -= 1
+        self._lock.notify_all()
         self._lock.release()
 
     def get_results(self):
@@ -304,15 +307,14 @@ def get_results(self):
 
         This method blocks if there are open tasks.
         """
-        while True:
-            self._lock.acquire()
-            if self._n_open_tasks == 0:
-                results = self.result_container.get_results()
-                self._lock.release()
-                return results
-            else:
-                self._lock.release()
-                time.sleep(1)
+        self._lock.acquire()
+        try:
+            while self._n_open_tasks:
+                # a timeout keeps the wait interruptible
+                self._lock.wait(1)
+            return self.result_container.get_results()
+        finally:
+            self._lock.release()
 
     def shutdown(self):
         """Controlled shutdown of the scheduler.
@@ -0,0 +1,13 @@
+from .profile_extension import (ProfileExtensionNode, Profile,
+                                activate_profiling, deactivate_profiling,
+                                profile, get_profile, reset_profile,
+                                register_flop_estimate, estimate_flops,
+                                __doc__, __docformat__)
+
+from mdp.utils import fixup_namespace
+
+__all__ = ['ProfileExtensionNode', 'Profile', 'activate_profiling',
+           'deactivate_profiling', 'profile', 'get_profile', 'reset_profile',
+           'register_flop_estimate', 'estimate_flops']
+
+fixup_namespace(__name__, __all__, ('profile_extension', 'fixup_namespace',))
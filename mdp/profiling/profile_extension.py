@@ -0,0 +1,465 @@
+"""MDP extension to profile the nodes.
+
+When the ``'profile'`` extension is active, every call of ``train``,
+``stop_training``, ``execute`` and ``inverse`` of a node is recorded:
+the number of calls, the wall and CPU time, the bytes of the input and
+output arrays, the peak of the traced memory (optional, see below) and an
+estimate of the floating point operations for the known linear nodes
+(see `register_flop_estimate`).
+
+The calls are aggregated by their call path, i.e. by the classes and
+methods of the nested calls, like ``FlowNode.train/PCANode.execute`` for
+the execution of a PCANode inside a FlowNode during the training of the
+FlowNode. Each record holds the inclusive time of the calls and their
+*self* time, excluding the nested node calls. Since the path only consists
+of class names, the calls of instances of the same class at the same place
+(e.g. two PCANodes in a flow) are aggregated as well. This also makes the
+records of the node copies which are trained or executed by a scheduler
+merge into the records of the original nodes: the profiles recorded in the
+processes of a `ProcessScheduler` are returned with the task results and
+merged into the profile of the main process, and the threads of a
+`ThreadScheduler` record into the same profile.
+
+The memory is traced with the ``tracemalloc`` module, which requires
+Python 3.9 or later, and only when it is requested with
+``activate_profiling(memory=True)``, since the tracing slows down the
+allocations considerably. The memory values are None otherwise.
+
+Nodes which overwrite the public methods themselves (e.g. ``OnlineNode``
+or ``RBMWithLabelsNode``) are not profiled in these methods.
+
+Example::
+
+    with mdp.profiling.profile() as prof:
+        flow.train(x)
+        y = flow(x)
+    print(prof.table())
+    prof.save_chrome_trace('flow_trace.json')
+"""
+from __future__ import division
+from builtins import object
+__docformat__ = "restructuredtext en"
+
+import json
+import os
+import threading
+import time
+import warnings
+
+try:
+    import tracemalloc
+    if not hasattr(tracemalloc, 'reset_peak'):
+        # Python < 3.9 cannot trace the peak of nested calls
+        tracemalloc = None
+except ImportError:
+    tracemalloc = None
+
+import mdp
+from mdp import numx
+from ..extension import ExtensionNode, activate_extension, deactivate_extension
+from ..signal_node import Node, _method_function
+
+# process time in Python 3, time.clock is the process time on Unix in Python 2
+_cpu_time = getattr(time, 'process_time', None) or time.clock
+
+# -- global attributes for this extension
+
+# the profile recorded by the extension (see get_profile)
+_profile = None
+_lock = threading.Lock()
+# stacks of the active calls, one per thread
+_local = threading.local()
+# record the single calls for the Chrome trace
+_record_events = True
+# trace the memory with tracemalloc
+_trace_memory = False
+# True if the tracing was started by activate_profiling
+_started_tracemalloc = False
+
+# registered classes and their flop estimate functions
+_FLOP_ESTIMATES = {}
+
+_RECORD_FIELDS = ('calls', 'wall', 'self_wall', 'cpu', 'bytes_in',
+                  'bytes_out', 'peak_memory', 'flops')
+
+
+class Profile(object):
+    """Profile of the node calls, aggregated by call path.
+
+    `records` maps the call paths, i.e. tuples of ``'Class.method'``
+    strings starting with the outermost call, to dicts with the fields
+    ``calls``, ``wall``, ``self_wall``, ``cpu`` (in seconds), ``bytes_in``,
+    ``bytes_out``, ``peak_memory`` (in bytes) and ``flops``. The last two
+    are None if they are unknown. `events` holds the single calls as tuples
+    ``(path, start, duration, pid, thread id)``.
+    """
+
+    def __init__(self):
+        self.records = {}
+        self.events = []
+
+    def __len__(self):
+        return len(self.records)
+
+    def add_call(self, path, wall, self_wall, cpu, bytes_in, bytes_out,
+                 peak_memory, flops):
+        """Add a single call to the records."""
+        record = self.records.get(path)
+        if record is None:
+            record = self.records[path] = {'calls': 0, 'wall': 0.,
+                                           'self_wall': 0., 'cpu': 0.,
+                                           'bytes_in': 0, 'bytes_out': 0,
+                                           'peak_memory': None,
+                                           'flops': None}
+        self._add_record(record, {'calls': 1, 'wall': wall,
+                                  'self_wall': self_wall, 'cpu': cpu,
+                                  'bytes_in': bytes_in,
+                                  'bytes_out': bytes_out,
+                                  'peak_memory': peak_memory,
+                                  'flops': flops})
+
+    @staticmethod
+    def _add_record(record, other):
+        for field in ('calls', 'wall', 'self_wall', 'cpu', 'bytes_in',
+                      'bytes_out'):
+            record[field] += other[field]
+        if other['peak_memory'] is not None:
+            record['peak_memory'] = max(record['peak_memory'] or 0,
+                                        other['peak_memory'])
+        if other['flops'] is not None:
+            record['flops'] = (record['flops'] or 0) + other['flops']
+
+    def merge(self, other):
+        """Add the records and events of another profile."""
+        for path, other_record in other.records.items():
+            record = self.records.get(path)
+            if record is None:
+                self.records[path] = dict(other_record)
+            else:
+                self._add_record(record, other_record)
+        self.events.extend(other.events)
+
+    def as_list(self):
+        """Return the records as a list of dicts, sorted by path.
+
+        The path is given as a string, with the calls separated by '/'.
+        """
+        result = []
+        for path in sorted(self.records):
+            record = dict(self.records[path])
+            record['path'] = '/'.join(path)
+            result.append(record)
+        return result
+
+    def table(self):
+        """Return the records as a table string, with the nested calls
+        indented below the outer calls."""
+        header = ('%-40s %7s %9s %9s %9s %9s %9s %9s %8s' %
+                  ('call', 'calls', 'wall [s]', 'self [s]', 'cpu [s]',
+                   'in [MB]', 'out [MB]', 'peak [MB]', 'GFLOP/s'))
+        lines = [header, '-' * len(header)]
+        for path in sorted(self.records):
+            record = self.records[path]
+            name = '  ' * (len(path) - 1) + path[-1]
+            if record['peak_memory'] is None:
+                peak = '-'
+            else:
+                peak = '%.2f' % (record['peak_memory'] / 2.**20)
+            if record['flops'] is None or record['self_wall'] <= 0:
+                gflops = '-'
+            else:
+                gflops = '%.2f' % (record['flops'] /
+                                   record['self_wall'] / 1e9)
+            lines.append('%-40s %7d %9.4f %9.4f %9.4f %9.2f %9.2f %9s %8s' %
+                         (name, record['calls'], record['wall'],
+                          record['self_wall'], record['cpu'],
+                          record['bytes_in'] / 2.**20,
+                          record['bytes_out'] / 2.**20, peak, gflops))
+        return '\n'.join(lines)
+
+    def save_json(self, filename):
+        """Save the records (see `as_list`) in a JSON file."""
+        with open(filename, 'w') as json_file:
+            json.dump({'records': self.as_list()}, json_file, indent=1)
+
+    def save_chrome_trace(self, filename):
+        """Save the single calls in the Chrome trace event format.
+
+        The file can be viewed with ``chrome://tracing`` or Perfetto. The
+        calls in the processes of a scheduler appear with their process id.
+        """
+        events = []
+        for path, start, duration, pid, tid in self.events:
+            name, method = path[-1].rsplit('.', 1)
+            events.append({'name': path[-1], 'cat': method, 'ph': 'X',
+                           'ts': start * 1e6, 'dur': duration * 1e6,
+                           'pid': pid, 'tid': tid,
+                           'args': {'path': '/'.join(path)}})
+        with open(filename, 'w') as json_file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'},
+                      json_file)
+
+
+_profile = Profile()
+
+
+def get_profile():
+    """Return the `Profile` recorded by the 'profile' extension."""
+    return _profile
+
+def reset_profile():
+    """Discard the recorded profile and return the new, empty one."""
+    global _profile
+    with _lock:
+        _profile = Profile()
+    return _profile
+
+
+## flop estimates ##
+
+def register_flop_estimate(node_class):
+    """Decorator to register the flop estimate function of node_class.
+
+    The function takes the node, the name of the called method (e.g.
+    'execute') and the input array (None for 'stop_training'), and returns
+    the estimated number of floating point operations of the call, or None
+    if it is unknown. The function is only used for instances whose private
+    method (e.g. ``_execute``) is the one of the registered class.
+    """
+    def register(func):
+        _FLOP_ESTIMATES[node_class] = func
+        return func
+    return register
+
+def estimate_flops(node, method, x):
+    """Return the estimated number of floating point operations of a call,
+    or None if it is unknown."""
+    for klass in type(node).__mro__:
+        if klass in _FLOP_ESTIMATES:
+            private = '_' + method
+            if (_method_function(type(node), private) is not
+                _method_function(klass, private)):
+                return None
+            return _FLOP_ESTIMATES[klass](node, method, x)
+    return None
+
+def _linear_execute_flops(node, method, x):
+    # one multiplication and addition for each input and output dimension
+    if method == 'execute':
+        return 2 * len(x) * node.input_dim * node.output_dim
+    return None
+
+@register_flop_estimate(mdp.nodes.PCANode)
+def _pca_flops(node, method, x):
+    if method == 'train':
+        # update of the covariance matrix
+        return 2 * len(x) * node.input_dim**2
+    return _linear_execute_flops(node, method, x)
+
+@register_flop_estimate(mdp.nodes.SFANode)
+def _sfa_flops(node, method, x):
+    if method == 'train':
+        # covariance matrices of the data and of its derivative
+        return 4 * len(x) * node.input_dim**2
+    return _linear_execute_flops(node, method, x)
+
+@register_flop_estimate(mdp.nodes.LinearRegressionNode)
+def _linear_regression_flops(node, method, x):
+    if method == 'train':
+        dim = node.input_dim + int(node.with_bias)
+        return 2 * len(x) * dim * (dim + node.output_dim)
+    return _linear_execute_flops(node, method, x)
+
+register_flop_estimate(mdp.nodes.FDANode)(_linear_execute_flops)
+register_flop_estimate(mdp.nodes.AffineNode)(_linear_execute_flops)
+
+
+## the extension ##
+
+class _Frame(object):
+    """Active call on the stack of a thread."""
+
+    __slots__ = ('path', 'child_wall', 'memory_start', 'outer_peak',
+                 'child_peak')
+
+    def __init__(self, path):
+        self.path = path
+        self.child_wall = 0.
+        self.memory_start = None
+
+def _stack():
+    try:
+        return _local.stack
+    except AttributeError:
+        _local.stack = []
+        return _local.stack
+
+def _nbytes(values):
+    nbytes = 0
+    for value in values:
+        if isinstance(value, numx.ndarray):
+            nbytes += value.nbytes
+        elif isinstance(value, tuple):
+            nbytes += _nbytes(value)
+    return nbytes
+
+def _profile_call(node, method, func, args, kwargs):
+    """Call func(*args, **kwargs) for node.method and record the call."""
+    stack = _stack()
+    parent = stack[-1] if stack else None
+    label = '%s.%s' % (type(node).__name__, method)
+    frame = _Frame(parent.path + (label,) if parent else (label,))
+    if _trace_memory and tracemalloc is not None and tracemalloc.is_tracing():
+        frame.memory_start, frame.outer_peak = tracemalloc.get_traced_memory()
+        frame.child_peak = 0
+        tracemalloc.reset_peak()
+    stack.append(frame)
+    start_cpu = _cpu_time()
+    start = time.time()
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        wall = time.time() - start
+        cpu = _cpu_time() - start_cpu
+        stack.pop()
+    peak_memory = None
+    if frame.memory_start is not None:
+        peak = max(tracemalloc.get_traced_memory()[1], frame.child_peak)
+        peak_memory = peak - frame.memory_start
+        if parent is not None and parent.memory_start is not None:
+            # the nested call has reset the peak of the outer call
+            parent.child_peak = max(parent.child_peak, frame.outer_peak,
+                                    peak)
+    if parent is not None:
+        parent.child_wall += wall
+    x = args[0] if args else None
+    flops = estimate_flops(node, method, x)
+    bytes_in = _nbytes(args) + _nbytes(kwargs.values())
+    bytes_out = _nbytes((result,))
+    with _lock:
+        _profile.add_call(frame.path, wall, wall - frame.child_wall, cpu,
+                          bytes_in, bytes_out, peak_memory, flops)
+        if _record_events:
+            _profile.events.append((frame.path, start, wall, os.getpid(),
+                                    threading.current_thread().ident))
+    return result
+
+
+class ProfileExtensionNode(ExtensionNode, Node):
+    """MDP extension to record the calls of the nodes.
+
+    The records are available with `get_profile`, see the
+    ``mdp.profiling`` module for the details.
+    """
+
+    extension_name = 'profile'
+
+    def train(self, x, *args, **kwargs):
+        return _profile_call(self, 'train', self._non_extension_train,
+                             (x,) + args, kwargs)
+
+    def stop_training(self, *args, **kwargs):
+        return _profile_call(self, 'stop_training',
+                             self._non_extension_stop_training, args, kwargs)
+
+    def execute(self, x, *args, **kwargs):
+        return _profile_call(self, 'execute', self._non_extension_execute,
+                             (x,) + args, kwargs)
+
+    def inverse(self, y, *args, **kwargs):
+        return _profile_call(self, 'inverse', self._non_extension_inverse,
+                             (y,) + args, kwargs)
+
+
+## the scheduler processes ##
+
+class _WorkerResult(object):
+    """Task result of a scheduler process together with its profile."""
+
+    def __init__(self, result, profile):
+        self.result = result
+        self.profile = profile
+
+def _pack_worker_result(result):
+    """Attach the profile recorded in this process to the task result and
+    reset the profile (used in the processes of a scheduler)."""
+    global _profile
+    with _lock:
+        if not _profile.records:
+            return result
+        profile = _profile
+        _profile = Profile()
+    return _WorkerResult(result, profile)
+
+def _unpack_worker_result(result):
+    """Merge the profile of a packed result and return the task result."""
+    if not isinstance(result, _WorkerResult):
+        return result
+    with _lock:
+        _profile.merge(result.profile)
+    return result.result
+
+
+# ------- helper functions and context manager
+
+def activate_profiling(memory=False, events=True, reset=True):
+    """Activate the profile extension.
+
+    :Parameters:
+     memory
+      Trace the peak memory of the calls with tracemalloc (requires
+      Python 3.9 or later). Default value: False
+     events
+      Record the single calls for `Profile.save_chrome_trace`.
+      Default value: True
+     reset
+      Discard the previously recorded profile. Default value: True
+    """
+    global _record_events, _trace_memory, _started_tracemalloc
+    _record_events = events
+    _trace_memory = memory
+    if memory:
+        if tracemalloc is None:
+            warnings.warn("Tracing the memory requires Python 3.9 or "
+                          "later.", mdp.MDPWarning)
+        elif not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracemalloc = True
+    if reset:
+        reset_profile()
+    activate_extension('profile')
+
+def deactivate_profiling():
+    """De-activate the profile extension, the profile is kept."""
+    global _record_events, _trace_memory, _started_tracemalloc
+    deactivate_extension('profile')
+    if _started_tracemalloc:
+        tracemalloc.stop()
+        _started_tracemalloc = False
+    _record_events = True
+    _trace_memory = False
+
+class profile(object):
+    """Context manager for the 'profile' extension.
+
+    The profile is returned by the 'with' statement:
+
+    >>> with mdp.profiling.profile() as prof:                # doctest: +SKIP
+    ...     flow.train(x)
+    >>> print(prof.table())                                  # doctest: +SKIP
+
+    The arguments are the ones of `activate_profiling`.
+    """
+
+    def __init__(self, memory=False, events=True, reset=True):
+        self.memory = memory
+        self.events = events
+        self.reset = reset
+
+    def __enter__(self):
+        activate_profiling(memory=self.memory, events=self.events,
+                           reset=self.reset)
+        return get_profile()
+
+    def __exit__(self, type, value, traceback):
+        deactivate_profiling()
@@ -47,6 +47,19 @@ class IsNotInvertibleException(NodeException):
     pass
 
 
+def _method_function(klass, name):
+    """Return the function of the method name of klass.
+
+    The docstring wrappers of NodeMetaclass are removed, so that e.g.
+    ``_method_function(SFANode, 'execute')`` is ``Node.execute``.
+    """
+    method = getattr(klass, name)
+    while hasattr(method, '_undecorated_'):
+        method = method._undecorated_
+    # unbound methods in Python 2
+    return getattr(method, '__func__', method)
+
+
 class NodeMetaclass(type):
     """A metaclass which copies docstrings from private to public methods.
 
@@ -61,7 +74,7 @@ class NodeMetaclass(type):
 
     # methods that can overwrite docs:
     DOC_METHODS = ['_train', '_stop_training', '_execute', '_inverse',
-                   '_label', '_prob']
+                   '_label', '_prob', '_prob_array']
 
     def __new__(cls, classname, bases, members):
         new_cls = super(NodeMetaclass, cls).__new__(cls, classname,
@@ -471,7 +484,10 @@ def _check_input(self, x):
 
         # set the dtype if necessary
         if self.dtype is None:
-            self.dtype = x.dtype
+            dtype = mdp.utils.storage_dtype(x.dtype)
+            if dtype not in self.get_supported_dtypes():
+                dtype = x.dtype
+            self.dtype = dtype
 
         # check the input dimension
         if not x.shape[1] == self.input_dim:
@@ -555,6 +571,25 @@ def _refcast(self, x):
         """Helper function to cast arrays to the internal dtype."""
         return mdp.utils.refcast(x, self.dtype)
 
+    def _can_execute_into(self):
+        """Return True if the node can write its output into a
+        preallocated array.
+
+        Subclasses can implement ``_execute_into(x, out)``, which must be
+        equivalent to ``out[:] = self._execute(x)`` (and return out). It is
+        only used if it is defined in the class that defines ``_execute``
+        or in a subclass of it, so that it is not inherited by subclasses
+        which change the execution.
+        """
+        into_class = execute_class = None
+        for klass in type(self).__mro__:
+            if into_class is None and '_execute_into' in vars(klass):
+                into_class = klass
+            if execute_class is None and '_execute' in vars(klass):
+                execute_class = klass
+        return into_class is not None and issubclass(into_class,
+                                                     execute_class)
+
     ### Methods to be implemented by the user
 
     # this are the methods the user has to overwrite
@@ -710,7 +745,8 @@ def save(self, filename, protocol=-1):
         If `filename` is None, return a string.
 
         Note: the pickled `Node` is not guaranteed to be forwards or
-        backwards compatible."""
+        backwards compatible. Use `mdp.save` to store the node in the
+        versioned MDP archive format, which can be memory-mapped."""
         if filename is None:
             return _cPickle.dumps(self, protocol)
         else:
@@ -719,6 +755,21 @@ def save(self, filename, protocol=-1):
             with open(filename, mode) as flh:
                 _cPickle.dump(self, flh, protocol)
 
+    @classmethod
+    def load(cls, filename, mmap=False):
+        """Load a node saved with `save` or `mdp.save` from `filename`.
+
+        :param mmap: If True, the arrays of an MDP archive are mapped
+            read-only from the file instead of being read into memory
+            (see `mdp.load`).
+        """
+        node = mdp.load(filename, mmap=mmap)
+        if not isinstance(node, cls):
+            err = ("The file %s contains a %s, not a %s." %
+                   (filename, type(node).__name__, cls.__name__))
+            raise NodeException(err)
+        return node
+
 
 class PreserveDimNode(Node):
     """Abstract base class with ``output_dim == input_dim``.
@@ -151,6 +151,19 @@ def spinner():
     sys.stderr.write(next(_spinner))
     sys.stderr.flush()
 
+def run_python(code, env=None):
+    """Run code in a new interpreter, which imports the tested mdp, and
+    return its output."""
+    import os, subprocess
+    full_env = dict(os.environ)
+    if env is not None:
+        full_env.update(env)
+    package_dir = os.path.dirname(os.path.dirname(mdp.__file__))
+    full_env['PYTHONPATH'] = os.pathsep.join([package_dir] + sys.path[1:])
+    output = subprocess.check_output([sys.executable, '-c', code],
+                                     env=full_env)
+    return output.decode('ascii').strip()
+
 class skip_on_condition(object):
     """Skip a test if the eval(condition_str, namespace) returns True.
 
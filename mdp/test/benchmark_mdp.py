@@ -1,4 +1,7 @@
 """These are some benchmark functions for MDP.
+
+The benchmark suite with JSON results and the comparison of runs is in
+the mdp.test.benchmarks package.
 """
 from __future__ import print_function
 from builtins import str
@@ -83,6 +86,66 @@ def polynomial_expansion_benchmark(dim, len, degree, times):
     for i in range(times):
         pnode(a)
 
+# flow execution overhead benchmark
+
+def flow_plan_benchmark(len, planned, times):
+    """    This benchmark executes a small trained flow 'times' times on
+    random data of shape (len, 8), either with Flow.execute or with a
+    FlowPlan ('planned'), to measure the per-call overhead.
+    Arguments: (len, planned, times)."""
+    numx_rand.seed(3925441)
+    flow = mdp.Flow([mdp.nodes.PCANode(),
+                     mdp.hinet.Switchboard(8, list(range(8))),
+                     mdp.hinet.Layer([
+                         mdp.nodes.PolynomialExpansionNode(2, input_dim=4),
+                         mdp.nodes.PolynomialExpansionNode(2, input_dim=4)]),
+                     mdp.nodes.SFANode(output_dim=5)])
+    flow.train(numx_rand.random((1000, 8)))
+    flow = flow.compile()
+    a = numx_rand.random((len, 8))
+    if planned:
+        flow = flow.plan(a.shape)
+    for i in range(times):
+        flow(a)
+
+# import time benchmark
+
+def import_mdp_benchmark(all_nodes, times):
+    """    This benchmark imports mdp 'times' times in a new interpreter,
+    optionally followed by the import of all the nodes ('all_nodes').
+    Arguments: (all_nodes, times)."""
+    import os
+    import subprocess
+    import sys
+    code = "import mdp; dir(mdp.nodes)" if all_nodes else "import mdp"
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [os.path.dirname(os.path.dirname(mdp.__file__))] + sys.path[1:])
+    for i in range(times):
+        subprocess.check_call([sys.executable, '-c', code], env=env)
+
+# eigensolver benchmark
+
+def _random_posdef(dim):
+    # diagonally dominant, so that generating it is cheap compared to
+    # the eigendecomposition
+    x = numx_rand.random((dim, dim))
+    return x + x.T + 2*dim*numx.eye(dim)
+
+def symeig_lapack_benchmark(dim, driver, nvals, dtype):
+    """    This benchmark solves a random eigenproblem of dimension dim
+    for the nvals smallest eigenvalues and eigenvectors with the LAPACK
+    driver (standard problem for evr and evd, generalized otherwise),
+    in precision dtype.
+    Arguments: (dim, driver, nvals, dtype)."""
+    a = _random_posdef(dim)
+    if driver in mdp.utils._symeig.STANDARD_DRIVERS:
+        b = None
+    else:
+        b = _random_posdef(dim)
+    mdp.utils.symeig_lapack(a, b, range=(1, nvals), driver=driver,
+                            dtype=dtype)
+
 # ISFA benchmark
 
 def _tobias_mix(src):
@@ -199,6 +262,15 @@ def run_benchmarks(bench_funcs, time_digits=15):
 ####### /benchmark function
 
 POLY_EXP_ARGS = [(2**i, 100, j, 200) for j in range(2,5) for i in range(2,4)]
+FLOW_PLAN_ARGS = [(n, planned, 1000) for n in (1, 10, 100, 1000)
+                  for planned in (False, True)]
+IMPORT_ARGS = [(all_nodes, 5) for all_nodes in (False, True)]
+
+SYMEIG_ARGS = [(dim, driver, nvals, dtype)
+               for dim in (100, 500, 1000)
+               for driver in ('evr', 'evd', 'gvx', 'gvd')
+               for nvals in (dim//10, dim)
+               for dtype in ('d', 'f')]
 
 #if mdp.numx_description in ['symeig', 'scipy', 'numpy']:
 #    MUL_MTX_DIMS = [[2**i] for i in xrange(4,11)]
@@ -213,6 +285,9 @@ def run_benchmarks(bench_funcs, time_digits=15):
 #else:
 #    BENCH_FUNCS = [(polynomial_expansion_benchmark, POLY_EXP_ARGS)]
 BENCH_FUNCS = [(polynomial_expansion_benchmark, POLY_EXP_ARGS),
+               (flow_plan_benchmark, FLOW_PLAN_ARGS),
+               (import_mdp_benchmark, IMPORT_ARGS),
+               (symeig_lapack_benchmark, SYMEIG_ARGS),
                (isfa_spiral_benchmark, [[]]),
                (sfa_benchmark, [[]])]
 
@@ -0,0 +1,273 @@
+"""
+Benchmark suite for the hot paths of MDP.
+
+The benchmarks are registered with the `benchmark` decorator in the
+``bench_*`` modules of this package. A benchmark is a generator function:
+the code before the ``yield`` sets up the data (and is not timed), the
+yielded callable is the timed part, and the code after the ``yield`` (in a
+``finally`` clause) cleans up::
+
+    @benchmark('nodes', small=[dict(n=1000)], medium=[dict(n=10000)])
+    def pca(n):
+        x = numx_rand.random((n, 10))
+        def run():
+            mdp.nodes.PCANode().train(x)
+        yield run
+
+Each size ('small', 'medium', 'large') has a list of parameter sets, every
+parameter set is a separate case. A case is run `warmup` times before it
+is timed `repeat` times. The results can be saved as a JSON file together
+with the machine metadata, and two result files can be compared to find
+the regressions. From the command line::
+
+    python -m mdp.test.benchmarks run -o before.json
+    python -m mdp.test.benchmarks run -o after.json
+    python -m mdp.test.benchmarks compare before.json after.json
+
+The ``compare`` command exits with status 1 if a case is slower by more
+than the threshold (10% by default).
+
+The old benchmark functions are still available in
+``mdp.test.benchmark_mdp``.
+"""
+from __future__ import print_function
+from __future__ import division
+from builtins import range
+from builtins import object
+
+import fnmatch
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import timeit
+
+import numpy
+
+import mdp
+
+SIZES = ('small', 'medium', 'large')
+
+# function used to measure time
+TIMEFUNC = timeit.default_timer
+
+# statistics of the times stored in the results
+STATS = ('min', 'median', 'mean', 'std')
+
+# registered benchmarks, in the order of registration
+_BENCHMARKS = []
+
+
+class SkipBenchmark(Exception):
+    """Raised in the setup of a benchmark which cannot run, e.g. because
+    of a missing dependency."""
+    pass
+
+
+class Benchmark(object):
+    """A registered benchmark function and its parameters."""
+
+    def __init__(self, group, func, params):
+        self.group = group
+        self.func = func
+        self.params = params
+        self.name = '%s.%s' % (group, func.__name__)
+        self.__doc__ = func.__doc__
+
+    def cases(self, size):
+        """Return the list of parameter dicts for size."""
+        return self.params.get(size, [])
+
+
+def benchmark(group, **params):
+    """Decorator to register a benchmark generator function.
+
+    group -- Name of the group of the benchmark, e.g. 'nodes'.
+    params -- For each size, the list of parameter dicts with which the
+        function is called.
+    """
+    for size in params:
+        if size not in SIZES:
+            err = "Unknown benchmark size '%s'." % size
+            raise mdp.MDPException(err)
+    def register(func):
+        _BENCHMARKS.append(Benchmark(group, func, params))
+        return func
+    return register
+
+
+def get_benchmarks(pattern=None):
+    """Return the registered benchmarks, optionally only the ones whose
+    name matches the shell-style pattern (e.g. 'nodes.*')."""
+    # import the modules which register the benchmarks
+    from . import bench_nodes, bench_hinet, bench_extensions, bench_parallel
+    if pattern is None:
+        return list(_BENCHMARKS)
+    return [bench for bench in _BENCHMARKS
+            if fnmatch.fnmatch(bench.name, pattern)]
+
+
+def case_key(name, params):
+    """Return the string identifying a benchmark case."""
+    args = ', '.join('%s=%r' % (key, params[key]) for key in sorted(params))
+    return '%s(%s)' % (name, args)
+
+
+def _stats(times):
+    ordered = sorted(times)
+    n = len(ordered)
+    if n % 2:
+        median = ordered[n // 2]
+    else:
+        median = (ordered[n // 2 - 1] + ordered[n // 2]) / 2.
+    mean = sum(ordered) / n
+    std = (sum((t - mean)**2 for t in ordered) / n)**0.5
+    return {'min': ordered[0], 'median': median, 'mean': mean, 'std': std}
+
+
+def run_case(bench, params, repeat=5, warmup=1, seed=0):
+    """Run a single benchmark case and return its result dict.
+
+    The result holds the 'name', 'params' and 'key' of the case and either
+    the measured 'times' (in seconds) with their statistics or the reason
+    why the case was 'skipped'.
+    """
+    result = {'name': bench.name, 'params': params,
+              'key': case_key(bench.name, params)}
+    mdp.numx_rand.seed(seed)
+    cases = bench.func(**params)
+    try:
+        try:
+            run = next(cases)
+        except SkipBenchmark as exception:
+            result['skipped'] = str(exception)
+            return result
+        for _ in range(warmup):
+            run()
+        times = []
+        for _ in range(repeat):
+            start = TIMEFUNC()
+            run()
+            times.append(TIMEFUNC() - start)
+    finally:
+        cases.close()
+    result['times'] = times
+    result.update(_stats(times))
+    return result
+
+
+def machine_info():
+    """Return a dict with the metadata of the machine and the software."""
+    info = {'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'hostname': platform.node(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'cpu_count': mdp.parallel.cpu_count(),
+            'python': '%s %s' % (platform.python_implementation(),
+                                 platform.python_version()),
+            'mdp': mdp.__version__,
+            'numx': '%s %s' % (mdp.numx_description,
+                               mdp.numx_version.version),
+            'numpy': numpy.__version__}
+    try:
+        revision = subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(mdp.__file__), stderr=subprocess.STDOUT)
+        info['revision'] = revision.decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        info['revision'] = None
+    return info
+
+
+def run_benchmarks(pattern=None, size='medium', repeat=5, warmup=1, seed=0,
+                   verbose=True):
+    """Run the benchmarks and return the results dict.
+
+    pattern -- Shell-style pattern to select the benchmarks by name.
+    size -- One of 'small', 'medium' and 'large'.
+    repeat -- Number of timed runs of each case.
+    warmup -- Number of untimed runs of each case before the timed runs.
+    seed -- Random seed, which is set before the setup of each case.
+    verbose -- Print the results of the cases while running.
+    """
+    if size not in SIZES:
+        err = ("Unknown benchmark size '%s', use one of %s." %
+               (size, str(SIZES)))
+        raise mdp.MDPException(err)
+    results = []
+    for bench in get_benchmarks(pattern):
+        for params in bench.cases(size):
+            result = run_case(bench, params, repeat=repeat, warmup=warmup,
+                              seed=seed)
+            if verbose:
+                print(_format_result(result))
+                sys.stdout.flush()
+            results.append(result)
+    return {'metadata': machine_info(),
+            'settings': {'pattern': pattern, 'size': size, 'repeat': repeat,
+                         'warmup': warmup, 'seed': seed},
+            'results': results}
+
+
+def _format_result(result):
+    if 'skipped' in result:
+        return '%-72s skipped: %s' % (result['key'], result['skipped'])
+    return ('%-72s %10.4f s (median %.4f s, std %.4f s)' %
+            (result['key'], result['min'], result['median'], result['std']))
+
+
+def save_results(results, filename):
+    """Save the results of `run_benchmarks` in a JSON file."""
+    with open(filename, 'w') as json_file:
+        json.dump(results, json_file, indent=1, sort_keys=True)
+
+
+def load_results(filename):
+    """Load the results saved with `save_results`."""
+    with open(filename) as json_file:
+        return json.load(json_file)
+
+
+def compare_results(old, new, threshold=0.1, stat='median'):
+    """Compare two results of `run_benchmarks`.
+
+    Return a list of tuples ``(key, old time, new time, ratio, status)``
+    for the cases which were timed in both runs, the status is
+    'regression' if the new time is larger than the old one by more than
+    the relative threshold, 'improvement' if it is smaller by the same
+    factor and 'ok' otherwise.
+    """
+    if stat not in STATS:
+        err = "Unknown statistic '%s', use one of %s." % (stat, str(STATS))
+        raise mdp.MDPException(err)
+    old_times = dict((result['key'], result[stat])
+                     for result in old['results'] if stat in result)
+    comparison = []
+    for result in new['results']:
+        key = result['key']
+        if key not in old_times or stat not in result:
+            continue
+        old_time, new_time = old_times[key], result[stat]
+        ratio = new_time / old_time if old_time > 0 else float('inf')
+        if ratio > 1. + threshold:
+            status = 'regression'
+        elif ratio < 1. / (1. + threshold):
+            status = 'improvement'
+        else:
+            status = 'ok'
+        comparison.append((key, old_time, new_time, ratio, status))
+    return comparison
+
+
+def format_comparison(comparison):
+    """Return the result of `compare_results` as a table string."""
+    lines = ['%-72s %10s %10s %7s' % ('case', 'old [s]', 'new [s]', 'ratio')]
+    for key, old_time, new_time, ratio, status in comparison:
+        line = '%-72s %10.4f %10.4f %7.2f' % (key, old_time, new_time, ratio)
+        if status != 'ok':
+            line += '  ' + status.upper()
+        lines.append(line)
+    return '\n'.join(lines)
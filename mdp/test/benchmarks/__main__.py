@@ -0,0 +1,67 @@
+"""Command line interface of the benchmark suite, see mdp.test.benchmarks.
+
+    python -m mdp.test.benchmarks list [pattern]
+    python -m mdp.test.benchmarks run [-s SIZE] [-r REPEAT] [-w WARMUP]
+                                      [-o FILE] [pattern]
+    python -m mdp.test.benchmarks compare [-t THRESHOLD] OLD NEW
+"""
+from __future__ import print_function
+
+import argparse
+import sys
+
+from mdp.test.benchmarks import (SIZES, STATS, get_benchmarks,
+                                 run_benchmarks, save_results, load_results,
+                                 compare_results, format_comparison)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog='python -m mdp.test.benchmarks',
+                                     description='MDP benchmark suite.')
+    commands = parser.add_subparsers(dest='command')
+    list_parser = commands.add_parser('list', help='list the benchmarks')
+    list_parser.add_argument('pattern', nargs='?', default=None,
+                             help="shell-style pattern, e.g. 'nodes.*'")
+    run_parser = commands.add_parser('run', help='run the benchmarks')
+    run_parser.add_argument('pattern', nargs='?', default=None,
+                            help="shell-style pattern, e.g. 'nodes.*'")
+    run_parser.add_argument('-s', '--size', choices=SIZES, default='medium')
+    run_parser.add_argument('-r', '--repeat', type=int, default=5,
+                            help='number of timed runs of each case')
+    run_parser.add_argument('-w', '--warmup', type=int, default=1,
+                            help='number of untimed runs of each case')
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('-o', '--output',
+                            help='save the results in this JSON file')
+    compare_parser = commands.add_parser(
+        'compare', help='compare two result files, the exit status is 1 '
+                        'if there are regressions')
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('-t', '--threshold', type=float, default=0.1,
+                                help='relative slowdown which is flagged '
+                                     '(default 0.1)')
+    compare_parser.add_argument('--stat', choices=STATS, default='median')
+    args = parser.parse_args(args)
+
+    if args.command == 'list':
+        for bench in get_benchmarks(args.pattern):
+            print('%-30s %s' % (bench.name, ' '.join(bench.__doc__.split())))
+    elif args.command == 'run':
+        results = run_benchmarks(args.pattern, size=args.size,
+                                 repeat=args.repeat, warmup=args.warmup,
+                                 seed=args.seed)
+        if args.output:
+            save_results(results, args.output)
+    elif args.command == 'compare':
+        comparison = compare_results(load_results(args.old),
+                                     load_results(args.new),
+                                     threshold=args.threshold,
+                                     stat=args.stat)
+        print(format_comparison(comparison))
+        if any(status == 'regression' for _, _, _, _, status in comparison):
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
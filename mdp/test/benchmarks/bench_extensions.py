@@ -0,0 +1,58 @@
+"""Benchmarks of the node extensions."""
+from builtins import range
+
+import mdp
+from mdp import numx_rand
+
+from . import benchmark, SkipBenchmark
+
+
+@benchmark('extensions',
+           small=[dict(n=1000, dim=10, hit=hit) for hit in (False, True)],
+           medium=[dict(n=10000, dim=50, hit=hit) for hit in (False, True)],
+           large=[dict(n=100000, dim=100, hit=hit) for hit in (False, True)])
+def caching(n, dim, hit):
+    """Execute a PCANode with the caching extension, either with a cache
+    hit or with a cache miss (the data is changed before each call)."""
+    if not mdp.config.has_joblib:
+        raise SkipBenchmark("joblib is not available")
+    x = numx_rand.random((n, dim))
+    node = mdp.nodes.PCANode()
+    node.train(x)
+    node.stop_training()
+    cachedir = mdp.utils.TemporaryDirectory(prefix='mdp-bench-cache.')
+    mdp.caching.activate_caching(cachedir=cachedir.name)
+    try:
+        node.execute(x)
+        def run():
+            if not hit:
+                x[0, 0] += 1.
+            node.execute(x)
+        yield run
+    finally:
+        mdp.caching.deactivate_caching()
+        del cachedir
+
+@benchmark('extensions',
+           small=[dict(n=10, n_calls=100, profile=profile)
+                  for profile in (False, True)],
+           medium=[dict(n=100, n_calls=1000, profile=profile)
+                   for profile in (False, True)],
+           large=[dict(n=100, n_calls=10000, profile=profile)
+                  for profile in (False, True)])
+def profiling(n, n_calls, profile):
+    """Execute a small trained flow n_calls times, with or without the
+    profile extension, to measure its overhead."""
+    x = numx_rand.random((n, 5))
+    flow = mdp.Flow([mdp.nodes.PCANode(), mdp.nodes.SFANode()])
+    flow.train(numx_rand.random((1000, 5)))
+    if profile:
+        mdp.profiling.activate_profiling(events=False)
+    try:
+        def run():
+            for _ in range(n_calls):
+                flow.execute(x)
+        yield run
+    finally:
+        if profile:
+            mdp.profiling.deactivate_profiling()
@@ -0,0 +1,40 @@
+"""Benchmarks of the hinet nodes."""
+from builtins import range
+
+import mdp
+from mdp import numx_rand
+
+from . import benchmark
+
+
+@benchmark('hinet',
+           small=[dict(n=2000, n_nodes=4, node_dim=5)],
+           medium=[dict(n=20000, n_nodes=16, node_dim=10)],
+           large=[dict(n=100000, n_nodes=64, node_dim=10)])
+def layer(n, n_nodes, node_dim):
+    """Train and execute a Layer of n_nodes SFANodes."""
+    x = numx_rand.random((n, n_nodes * node_dim))
+    def run():
+        nodes = [mdp.nodes.SFANode(input_dim=node_dim, output_dim=2)
+                 for _ in range(n_nodes)]
+        node = mdp.hinet.Layer(nodes)
+        node.train(x)
+        node.stop_training()
+        node.execute(x)
+    yield run
+
+@benchmark('hinet',
+           small=[dict(n=2000, n_nodes=4, node_dim=5)],
+           medium=[dict(n=20000, n_nodes=16, node_dim=10)],
+           large=[dict(n=100000, n_nodes=64, node_dim=10)])
+def clone_layer(n, n_nodes, node_dim):
+    """Train and execute a CloneLayer with n_nodes copies of a SFANode."""
+    x = numx_rand.random((n, n_nodes * node_dim))
+    def run():
+        node = mdp.hinet.CloneLayer(
+            mdp.nodes.SFANode(input_dim=node_dim, output_dim=2),
+            n_nodes=n_nodes)
+        node.train(x)
+        node.stop_training()
+        node.execute(x)
+    yield run
@@ -0,0 +1,119 @@
+"""Benchmarks of the covariance matrices and of the nodes."""
+from builtins import range
+
+import mdp
+from mdp import numx, numx_rand
+from mdp.utils import mult
+
+from . import benchmark
+
+
+def _mixed_sources(n, dim):
+    """Return a random linear mixture of n samples of dim slow sine waves
+    and Laplacian noise."""
+    t = numx.linspace(0, 10 * numx.pi, n)[:, None]
+    freqs = numx.arange(1, dim + 1)[None, :]
+    src = numx.sin(t * freqs) + 0.5 * numx_rand.laplace(size=(n, dim))
+    return mult(src, numx_rand.random((dim, dim)))
+
+
+@benchmark('nodes',
+           small=[dict(n=10000, dim=10, precision='double')],
+           medium=[dict(n=100000, dim=50, precision=precision)
+                   for precision in ('double', 'mixed')],
+           large=[dict(n=500000, dim=100, precision=precision)
+                  for precision in ('double', 'mixed')])
+def covariance(n, dim, precision):
+    """Update a CovarianceMatrix with 10 chunks of data and fix it."""
+    chunks = [chunk for chunk in _mixed_sources(n, dim).reshape(10, -1, dim)]
+    def run():
+        with mdp.precision(precision):
+            cov = mdp.utils.CovarianceMatrix()
+            for chunk in chunks:
+                cov.update(chunk)
+            cov.fix()
+    yield run
+
+
+def _train_execute(node_factory, x):
+    def run():
+        node = node_factory()
+        node.train(x)
+        node.stop_training()
+        node.execute(x)
+    return run
+
+@benchmark('nodes',
+           small=[dict(n=5000, dim=10)],
+           medium=[dict(n=50000, dim=50)],
+           large=[dict(n=200000, dim=200)])
+def pca(n, dim):
+    """Train and execute a PCANode, keeping half of the components."""
+    x = _mixed_sources(n, dim)
+    yield _train_execute(lambda: mdp.nodes.PCANode(output_dim=dim // 2), x)
+
+@benchmark('nodes',
+           small=[dict(n=5000, dim=10)],
+           medium=[dict(n=50000, dim=50)],
+           large=[dict(n=200000, dim=200)])
+def sfa(n, dim):
+    """Train and execute a SFANode, keeping half of the components."""
+    x = _mixed_sources(n, dim)
+    yield _train_execute(lambda: mdp.nodes.SFANode(output_dim=dim // 2), x)
+
+@benchmark('nodes',
+           small=[dict(n=2000, dim=5)],
+           medium=[dict(n=20000, dim=10)],
+           large=[dict(n=100000, dim=20)])
+def sfa2(n, dim):
+    """Train and execute a SFA2Node on data with dim dimensions."""
+    x = _mixed_sources(n, dim)
+    yield _train_execute(lambda: mdp.nodes.SFA2Node(output_dim=dim), x)
+
+_ICA_NODES = ('FastICANode', 'CuBICANode', 'TDSEPNode')
+
+@benchmark('nodes',
+           small=[dict(node='FastICANode', n=2000, dim=3)],
+           medium=[dict(node=node, n=20000, dim=5) for node in _ICA_NODES],
+           large=[dict(node=node, n=100000, dim=10) for node in _ICA_NODES])
+def ica(node, n, dim):
+    """Train and execute an ICA node (FastICANode, CuBICANode or
+    TDSEPNode) on a mixture of dim sources."""
+    x = _mixed_sources(n, dim)
+    node_class = getattr(mdp.nodes, node)
+    yield _train_execute(lambda: node_class(verbose=False), x)
+
+def _labeled_data(n, dim, n_classes):
+    labels = numx_rand.randint(n_classes, size=n)
+    centers = 3 * numx_rand.random((n_classes, dim))
+    x = centers[labels] + numx_rand.normal(size=(n, dim))
+    return x, labels
+
+@benchmark('nodes',
+           small=[dict(n=1000, dim=5, n_classes=3, k=5)],
+           medium=[dict(n=5000, dim=20, n_classes=10, k=5)],
+           large=[dict(n=20000, dim=50, n_classes=10, k=10)])
+def knn(n, dim, n_classes, k):
+    """Train a KNNClassifier with n samples and classify n/10 samples."""
+    x, labels = _labeled_data(n, dim, n_classes)
+    test_x = x[:n // 10]
+    def run():
+        node = mdp.nodes.KNNClassifier(k=k)
+        node.train(x, labels)
+        node.stop_training()
+        node.label(test_x)
+    yield run
+
+@benchmark('nodes',
+           small=[dict(n=5000, dim=5, n_classes=3)],
+           medium=[dict(n=50000, dim=20, n_classes=10)],
+           large=[dict(n=200000, dim=50, n_classes=20)])
+def gaussian(n, dim, n_classes):
+    """Train a GaussianClassifier and classify the training data."""
+    x, labels = _labeled_data(n, dim, n_classes)
+    def run():
+        node = mdp.nodes.GaussianClassifier()
+        node.train(x, labels)
+        node.stop_training()
+        node.label(x)
+    yield run
@@ -0,0 +1,71 @@
+"""Benchmarks of the schedulers."""
+from builtins import range
+
+import mdp
+from mdp import numx, numx_rand
+from mdp import parallel
+
+from . import benchmark
+
+
+def _scheduler(kind, n_workers):
+    if kind == 'thread':
+        return parallel.ThreadScheduler(n_threads=n_workers)
+    if kind == 'forkserver':
+        return parallel.ForkServerScheduler(n_processes=n_workers)
+    return parallel.ProcessScheduler(n_processes=n_workers)
+
+_CASES = [(scheduler, task) for task in ('sqr', 'train')
+          for scheduler in ('thread', 'process', 'forkserver')]
+
+@benchmark('parallel',
+           small=[dict(scheduler=scheduler, task=task, n_tasks=8, n=100)
+                  for scheduler, task in _CASES],
+           medium=[dict(scheduler=scheduler, task=task, n_tasks=32, n=10000)
+                   for scheduler, task in _CASES],
+           large=[dict(scheduler=scheduler, task=task, n_tasks=128, n=50000)
+                  for scheduler, task in _CASES])
+def scheduler(scheduler, task, n_tasks, n):
+    """Process n_tasks tasks with two workers of a ThreadScheduler, a
+    ProcessScheduler or a ForkServerScheduler. The 'sqr' tasks square n
+    numbers, to measure the overhead per task, the 'train' tasks train a
+    ParallelFlow with a PCANode on chunks of (n, 20) samples. The start of
+    the workers is not timed."""
+    sched = _scheduler(scheduler, 2)
+    try:
+        if task == 'sqr':
+            data = numx.arange(n, dtype='d')
+            callable_ = parallel.SqrTestCallable()
+            def run():
+                for _ in range(n_tasks):
+                    sched.add_task(data, callable_)
+                sched.get_results()
+        else:
+            chunks = [numx_rand.random((n, 20)) for _ in range(n_tasks)]
+            def run():
+                flow = parallel.ParallelFlow([mdp.nodes.PCANode()])
+                flow.train([chunks], scheduler=sched)
+        yield run
+    finally:
+        sched.shutdown()
+
+@benchmark('parallel',
+           small=[dict(scheduler=scheduler, n_workers=2)
+                  for scheduler in ('process', 'forkserver')],
+           medium=[dict(scheduler=scheduler, n_workers=4)
+                   for scheduler in ('process', 'forkserver')],
+           large=[dict(scheduler=scheduler, n_workers=8)
+                  for scheduler in ('process', 'forkserver')])
+def startup(scheduler, n_workers):
+    """Start a ProcessScheduler or a ForkServerScheduler with n_workers
+    workers, run one task in each worker and shut the scheduler down."""
+    callable_ = parallel.SqrTestCallable()
+    def run():
+        sched = _scheduler(scheduler, n_workers)
+        try:
+            for i in range(n_workers):
+                sched.add_task(i, callable_)
+            sched.get_results()
+        finally:
+            sched.shutdown()
+    yield run
@@ -77,3 +77,51 @@ def test_FANode_singular_cov():
     # the matrix x is singular
     py.test.raises(mdp.NodeException, "fanode.stop_training()")
 
+
+def _dense_fa_em(cov_mtx, A, sigma, max_cycles, tol):
+    # reference EM-cycles, inverting the full dxd matrix B
+    d = cov_mtx.shape[0]
+    cov_diag = cov_mtx.diagonal()
+    base_lhood = None
+    old_lhood = -numx.inf
+    lhood_curve = []
+    for t in range(max_cycles):
+        B = mult(A, A.T) + numx.diag(sigma)
+        log_det_B = numx.log(abs(numx_linalg.det(B)))
+        B = utils.inv(B)
+        trA_B = mult(A.T, B)
+        trA_B_cov_mtx = mult(trA_B, cov_mtx)
+        E_yyT = (numx.eye(A.shape[1]) - mult(trA_B, A) +
+                 mult(trA_B_cov_mtx, trA_B.T))
+        A = mult(trA_B_cov_mtx.T, utils.inv(E_yyT))
+        sigma = cov_diag - (mult(A, trA_B_cov_mtx)).diagonal()
+        lhood = (-d/2. * numx.log(2.*numx.pi) - 0.5*log_det_B -
+                 0.5*(B*cov_mtx.T).sum())
+        if base_lhood is None:
+            base_lhood = lhood
+        elif (lhood-base_lhood)<(1.+tol)*(old_lhood-base_lhood):
+            break
+        old_lhood = lhood
+        lhood_curve.append(lhood)
+    B = utils.inv(mult(A, A.T) + numx.diag(sigma))
+    return A, sigma, mult(B.T, A), lhood_curve
+
+def test_FANode_dense_equivalence():
+    d, k, N = 30, 3, 2000
+    x = mult(numx_rand.normal(size=(N, k)), numx_rand.normal(size=(k, d)))
+    x += numx_rand.normal(size=(N, d)) * uniform((d,))
+    fa = mdp.nodes.FANode(output_dim=k, max_cycles=20, dtype='d')
+    fa.train(x)
+    cov_mtx = numx.cov(x, rowvar=0, bias=1)
+    state = numx_rand.get_state()
+    fa.stop_training()
+    # draw the same initial loading factors
+    numx_rand.set_state(state)
+    scale = numx_linalg.det(cov_mtx)**(1./d)
+    A = numx_rand.normal(0., numx.sqrt(scale/k), size=(d, k))
+    A, sigma, E_y_mtx, lhood = _dense_fa_em(cov_mtx, A, cov_mtx.diagonal(),
+                                            20, fa.tol)
+    assert_array_almost_equal(fa.A, A, 8)
+    assert_array_almost_equal(fa.sigma, sigma, 8)
+    assert_array_almost_equal(fa.E_y_mtx, E_y_mtx, 8)
+    assert_array_almost_equal(fa.lhood, lhood, 8)
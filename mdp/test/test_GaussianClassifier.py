@@ -1,5 +1,6 @@
 from builtins import range
 from ._tools import *
+import pickle
 
 def testGaussianClassifier_train():
     nclasses = 10
@@ -75,3 +76,60 @@ def distr(size): return normal(0, 1., size=(size)) * std_
     classification = node.label(x)
 
     assert_array_equal(classes, classification)
+
+def testGaussianClassifier_log_prob():
+    dim = 3
+    x = normal(0., 1., size=(300, dim))
+    labels = numx_rand.randint(0, 3, size=300)
+    x += labels[:, numx.newaxis]
+    node = mdp.nodes.GaussianClassifier()
+    node.train(x[:150], labels[:150])
+    node.train(x[150:], labels[150:])
+    node.stop_training()
+    # compare with the explicit densities
+    dens = numx.zeros((len(x), len(node.labels)))
+    for i, lbl in enumerate(node.labels):
+        x_lbl = x[labels == lbl]
+        cov = numx.cov(x_lbl, rowvar=0)
+        x_mn = x - x_lbl.mean(axis=0)
+        exponent = -0.5 * (mult(x_mn, utils.inv(cov)) * x_mn).sum(axis=1)
+        dens[:, i] = (node.p[i] * numx.exp(exponent) /
+                      numx.sqrt(numx_linalg.det(2*numx.pi*cov)))
+    probs = dens / dens.sum(axis=1)[:, numx.newaxis]
+    assert_array_almost_equal(node.class_probabilities(x), probs, 6)
+    assert_array_almost_equal(node.log_prob(x), numx.log(probs), 6)
+
+def testGaussianClassifier_high_dim():
+    # the densities underflow in high dimensions, the posterior must not
+    dim = 500
+    node = mdp.nodes.GaussianClassifier()
+    for lbl in range(3):
+        node.train(normal(lbl, 1., size=(2000, dim)), lbl)
+    x = normal(1., 1., size=(20, dim)) * 10
+    probs = node.class_probabilities(x)
+    assert numx.all(numx.isfinite(probs))
+    assert_array_almost_equal(probs.sum(axis=1), numx.ones(len(x)))
+    assert_array_equal(node.label(x),
+                       numx.take(node.labels, probs.argmax(axis=1)))
+
+def testGaussianClassifier_old_pickle():
+    x = normal(0., 1., size=(300, 3))
+    labels = numx_rand.randint(0, 3, size=300)
+    x += labels[:, numx.newaxis]
+    node = mdp.nodes.GaussianClassifier()
+    node.train(x, labels)
+    node.stop_training()
+    # replace the attributes with the ones stored by older MDP versions
+    old = mdp.nodes.GaussianClassifier()
+    old.__dict__.update(node.__dict__)
+    old.__dict__['inv_covs'] = node.inv_covs
+    old.__dict__['_sqrt_def_covs'] = [
+        numx.sqrt(numx_linalg.det(utils.inv(inv_cov)))
+        for inv_cov in node.inv_covs]
+    for name in ('_whitening', '_whitened_means', '_log_norms'):
+        del old.__dict__[name]
+    old = pickle.loads(pickle.dumps(old))
+    assert old.label(x) == node.label(x)
+    assert_array_almost_equal(old.class_probabilities(x),
+                              node.class_probabilities(x), 10)
+    assert_array_almost_equal(old.log_prob(x), node.log_prob(x), 10)
@@ -53,3 +53,47 @@ def testOneDimensionalHitParade():
     assert_array_equal(ind_maxima,[110,103,0,10,50])
     assert_array_equal(minima,[-3.1,-3,-1.5,-1.4,-1.3])
     assert_array_equal(ind_minima,[123,130,1,11,51])
+
+def _reference_hit_parade(x, n, d):
+    # sequential scan over all samples, as the hit-parade is defined
+    M = numx.array([numx.finfo('d').min]*n)
+    iM = numx.zeros((n,), dtype='l')
+    m = numx.array([numx.finfo('d').max]*n)
+    im = numx.zeros((n,), dtype='l')
+    lM = lm = 0
+    for i in range(len(x)):
+        k1 = M.argmin()
+        k2 = m.argmax()
+        if x[i] > M[k1]:
+            if i-iM[lM] <= d and x[i] > M[lM]:
+                M[lM], iM[lM] = x[i], i
+            elif i-iM[lM] > d:
+                M[k1], iM[k1] = x[i], i
+                lM = k1
+        if x[i] < m[k2]:
+            if i-im[lm] <= d and x[i] < m[lm]:
+                m[lm], im[lm] = x[i], i
+            elif i-im[lm] > d:
+                m[k2], im[k2] = x[i], i
+                lm = k2
+    sort = M.argsort()[::-1]
+    M, iM = M[sort], iM[sort]
+    sort = m.argsort()
+    return M, iM, m[sort], im[sort]
+
+def testHitParadeNode_sequential_equivalence():
+    for n, d, chunksize in [(1, 1, 50), (3, 1, 100), (5, 4, 37),
+                            (4, 20, 200), (2, 0, 1000)]:
+        # a random walk has many hits in close vicinity
+        signal = numx.cumsum(normal(0, 1, (1000, 3)), axis=0)
+        hit = mdp.nodes.HitParadeNode(n, d)
+        for i in range(0, len(signal), chunksize):
+            hit.train(signal[i:i+chunksize])
+        maxima, max_ind = hit.get_maxima()
+        minima, min_ind = hit.get_minima()
+        for c in range(signal.shape[1]):
+            M, iM, m, im = _reference_hit_parade(signal[:, c], n, d)
+            assert_array_equal(maxima[:, c], M)
+            assert_array_equal(max_ind[:, c], iM)
+            assert_array_equal(minima[:, c], m)
+            assert_array_equal(min_ind[:, c], im)
@@ -70,3 +70,54 @@ def test_LinearRegressionNode_raises_on_wrong_output_size():
     y = mult(x, beta)
     y = y[:10,:]
     py.test.raises(mdp.TrainingException, train_LRNode, [x], [y], False)
+
+def test_LinearRegressionNode_solvers():
+    beta = numx_rand.uniform(-10., 10., size=(INDIM+1, OUTDIM))
+    x = numx_rand.uniform(-20., 20., size=(TLEN, INDIM))
+    y = mult(x, beta[1:,:]) + beta[0,:] + numx_rand.normal(size=(TLEN, OUTDIM))
+    ref = train_LRNode([x], [y], True).beta
+    for solver in ['inv', 'pinv', 'cholesky', 'ridge']:
+        for with_bias in [True, False]:
+            lrnode = mdp.nodes.LinearRegressionNode(with_bias)
+            lrnode.train(x[:TLEN//2], y[:TLEN//2])
+            lrnode.train(x[TLEN//2:], y[TLEN//2:])
+            lrnode.stop_training(solver=solver)
+            if with_bias:
+                assert_array_almost_equal(lrnode.beta, ref, 8)
+            else:
+                assert_array_almost_equal(
+                    lrnode.beta, mult(utils.pinv(mult(x.T, x)),
+                                      mult(x.T, y)), 8)
+    lrnode = mdp.nodes.LinearRegressionNode(solver='qr')
+    lrnode.train(x, y)
+    py.test.raises(mdp.NodeException, lrnode.stop_training)
+
+def test_LinearRegressionNode_ridge():
+    x = numx_rand.uniform(-20., 20., size=(TLEN, INDIM))
+    y = numx_rand.normal(size=(TLEN, OUTDIM))
+    lrnode = mdp.nodes.LinearRegressionNode(solver='ridge', ridge=100.)
+    lrnode.train(x, y)
+    lrnode.stop_training()
+    # compare with the explicit solution on centered data
+    xc, yc = x - x.mean(axis=0), y - y.mean(axis=0)
+    for ridge in [100., 1., 1e5]:
+        beta = mult(utils.inv(mult(xc.T, xc) + ridge*numx.eye(INDIM)),
+                    mult(xc.T, yc))
+        bias = y.mean(axis=0) - mult(x.mean(axis=0), beta)
+        lrnode.set_ridge(ridge)
+        assert_array_almost_equal(lrnode.beta[1:], beta, 10)
+        assert_array_almost_equal(lrnode.beta[0], bias, 10)
+        assert_array_almost_equal(lrnode(x), mult(x, beta) + bias, 10)
+    betas = lrnode.ridge_betas([1., 1e5])
+    assert_array_almost_equal(betas[1][1:], beta, 10)
+
+def test_LinearRegressionNode_ridge_singular():
+    x = numx_rand.uniform(-20., 20., size=(TLEN, INDIM))
+    x[:, -1] = 2.*x[:, 0]
+    y = numx_rand.normal(size=(TLEN, OUTDIM))
+    lrnode = mdp.nodes.LinearRegressionNode(solver='ridge')
+    lrnode.train(x, y)
+    py.test.raises(mdp.NodeException, lrnode.stop_training)
+    # a positive regularization makes the problem well-posed
+    lrnode.stop_training(ridge=1.)
+    assert numx.all(numx.isfinite(lrnode.beta))
@@ -233,4 +233,61 @@ def test_PCANode_no_eigenvalues_left():
     pca = mdp.nodes.PCANode(svd=True, reduce=True)
     pca.train(mat)
     py.test.raises(mdp.NodeException, 'pca.stop_training()')
-    
+
+def _gapped_data(n=2000, dim=60):
+    # the variances decay fast, so the first components are well separated
+    x = numx_rand.randn(n, dim) * 0.7**numx.arange(dim)
+    return mult(x, utils.random_rot(dim))
+
+def testPCANode_solvers():
+    x = _gapped_data()
+    nodes = []
+    for solver in ('dense', 'arpack', 'lobpcg', 'auto'):
+        pca = mdp.nodes.PCANode(output_dim=4, solver=solver)
+        pca.train(x)
+        pca.stop_training()
+        nodes.append(pca)
+    for pca in nodes[1:]:
+        assert_array_almost_equal(pca.d, nodes[0].d, 6)
+        assert_array_almost_equal(abs(pca.v), abs(nodes[0].v), 4)
+        assert_almost_equal(pca.explained_variance,
+                            nodes[0].explained_variance, 6)
+    py.test.raises(mdp.MDPException, mdp.nodes.PCANode, solver='foo')
+
+def testWhiteningNode_solvers():
+    x = _gapped_data()
+    for solver in ('arpack', 'lobpcg'):
+        node = mdp.nodes.WhiteningNode(output_dim=3, solver=solver)
+        node.train(x)
+        y = node(x)
+        assert_array_almost_equal(numx.cov(y, rowvar=0), numx.eye(3), 4)
+
+def testRandomizedPCANode():
+    x = _gapped_data()
+    pca = mdp.nodes.PCANode(output_dim=4)
+    pca.train(x)
+    pca.stop_training()
+    for streaming in (False, True):
+        rpca = mdp.nodes.RandomizedPCANode(output_dim=4, n_iter=3,
+                                           streaming=streaming)
+        assert rpca.get_remaining_train_phase() == (4 if streaming else 1)
+        while rpca.is_training():
+            for i in range(0, 2000, 500):
+                rpca.train(x[i:i+500])
+            rpca.stop_training()
+        assert_array_almost_equal(rpca.d, pca.d, 6)
+        assert_array_almost_equal(abs(rpca.v), abs(pca.v), 4)
+        assert_array_almost_equal(rpca.avg, pca.avg, 10)
+        assert_almost_equal(rpca.total_variance, pca.total_variance, 8)
+        assert_array_almost_equal(abs(rpca(x)), abs(pca(x)), 4)
+
+def testRandomizedPCANode_output_dim():
+    py.test.raises(mdp.NodeException, mdp.nodes.RandomizedPCANode,
+                   output_dim=0.9)
+    # keep all components by default
+    x = uniform((10, 3))
+    rpca = mdp.nodes.RandomizedPCANode()
+    rpca.train(x)
+    rpca.stop_training()
+    assert rpca.output_dim == 3
+    assert_array_almost_equal(rpca.inverse(rpca(x)), x)
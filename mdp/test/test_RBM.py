@@ -178,6 +178,41 @@ def test_RBM_learning():
 
     assert old_div(bm._train_err, N) < 0.1
 
+def test_RBM_persistent_learning():
+    # same problem as in test_RBM_learning, trained with mini-batches
+    # and persistent chains
+    I, J = 4, 2
+
+    bm = mdp.nodes.RBMNode(J, I)
+    bm.w = mdp.utils.random_rot(max(I,J), dtype='d')[:I, :J]
+
+    N = int(1e4)
+    v = numx.zeros((N,I))
+    r = numx_rand.random(N)
+    v[r>0.666, :] = [0,1,0,1]
+    v[(r>0.333) & (r<=0.666), :] = [1,0,1,0]
+
+    for k in range(100):
+        bm.train(v, epsilon=0.1, momentum=0.5, batch_size=100,
+                 persistent=True)
+        if old_div(bm._train_err,N)<0.1: break
+
+    assert bm._chains.shape == (100, J)
+    assert old_div(bm._train_err, N) < 0.1
+
+def test_RBM_float32():
+    I, J = 6, 3
+    bm = mdp.nodes.RBMNode(J, I, dtype='f')
+    v = numx_rand.randint(0, 2, (50, I))
+    bm.train(v, batch_size=10, persistent=True)
+    bm.stop_training()
+    for param in (bm.w, bm.bv, bm.bh) + bm._delta:
+        assert param.dtype == numx.dtype('f')
+    assert bm.execute(v).dtype == numx.dtype('f')
+    probs, h = bm.sample_v(bm.execute(v))
+    assert probs.dtype == numx.dtype('f')
+    assert h.dtype == numx.dtype('f')
+
 def _generate_data(bm, I, N):
     data = []
     h = numx.ones(I, dtype='d')
@@ -308,3 +343,16 @@ def test_RBMWithLabelsNode():
     nzeros = idxzeros.sum()
     point5 = numx.zeros((nzeros, L)) + 0.5
     assert_array_almost_equal(pl[idxzeros], point5, 2)
+
+def test_RBMWithLabelsNode_sample_labels():
+    I, J, L = 2, 3, 3
+    bm = mdp.nodes.RBMWithLabelsNode(J, L, I)
+    bm.train(numx.zeros((1, I)), numx.zeros((1, L)))
+    bm.w *= 0.
+    bm.bv[I:] = numx.log([0.2, 0.3, 0.5])
+    N = 20000
+    pv, pl, v, l = bm.sample_v(numx.zeros((N, J)))
+    assert_array_almost_equal(pl, numx.zeros((N, L)) + [0.2, 0.3, 0.5], 10)
+    # exactly one label is active in each sample
+    assert_array_equal(l.sum(axis=1), numx.ones(N))
+    assert_array_almost_equal(l.mean(axis=0), [0.2, 0.3, 0.5], 1)
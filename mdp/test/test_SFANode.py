@@ -148,3 +148,15 @@ def testSFANode_derivative_bug2D_eigen():
                                         overwrite=False)
     assert_array_almost_equal(eigvalues, sfa.d, decimal)
     assert_array_almost_equal(eigvectors, sfa.sf, decimal)
+
+def testSFANode_solvers():
+    x = numx_rand.randn(2000, 30).cumsum(axis=0)
+    nodes = []
+    for solver in ('dense', 'arpack', 'lobpcg'):
+        sfa = mdp.nodes.SFANode(output_dim=3, solver=solver)
+        sfa.train(x)
+        sfa.stop_training()
+        nodes.append(sfa)
+    for sfa in nodes[1:]:
+        assert_array_almost_equal(sfa.d / nodes[0].d, numx.ones(3), 3)
+        assert_array_almost_equal(abs(sfa(x)), abs(nodes[0](x)), 2)
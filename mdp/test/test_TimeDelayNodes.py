@@ -78,3 +78,13 @@ def test_TimeDelayNodes():
 
     assert_array_equal(real_res, slider_res)
 
+
+def test_TimeDelaySlidingWindowNode_chunks():
+    x = numx_rand.random((100, 3))
+    for time_frames, gap in [(1, 1), (3, 2), (4, 5), (2, 30)]:
+        real_res = TimeDelayNode(time_frames, gap).execute(x)
+        slider = TimeDelaySlidingWindowNode(time_frames, gap)
+        slider_res = [slider.execute(x[i:j])
+                      for i, j in [(0, 1), (1, 7), (7, 40), (40, 41),
+                                   (41, 100)]]
+        assert_array_equal(real_res, numx.concatenate(slider_res))
@@ -25,3 +25,29 @@ def test_TimeFramesNode():
 
 def test_TimeFramesNodeBugInputDim():
     mdp.nodes.TimeFramesNode(time_frames=10, gap=1, input_dim=1)
+
+def test_TimeFramesNode_strided():
+    inp = numx.arange(60.).reshape(20, 3)
+    for gap in [1, 3]:
+        tf = mdp.nodes.TimeFramesNode(4, gap)
+        stf = mdp.nodes.TimeFramesNode(4, gap, strided=True)
+        out = stf.execute(inp)
+        assert_array_equal(out, tf.execute(inp))
+        assert out.flags.writeable == (gap != 1)
+        out = stf.execute(inp, copy=True)
+        assert out.flags.writeable
+        assert_array_equal(out, tf.execute(inp))
+
+def test_TimeFramesNode_streaming():
+    inp = uniform((50, 2))
+    for strided in [False, True]:
+        for gap in [1, 2]:
+            batch = mdp.nodes.TimeFramesNode(3, gap).execute(inp)
+            tf = mdp.nodes.TimeFramesNode(3, gap, strided=strided,
+                                          streaming=True)
+            # chunks shorter than the time frames produce no output
+            out = [tf.execute(inp[i:j])
+                   for i, j in [(0, 1), (1, 2), (2, 20), (20, 50)]]
+            assert_array_equal(numx.concatenate(out), batch)
+            tf.reset()
+            assert_array_equal(tf.execute(inp), batch)
@@ -0,0 +1,180 @@
+"""Test the MDP archive format."""
+import collections
+import json
+import os
+import pickle
+import stat
+import struct
+import tempfile
+
+from ._tools import *
+from mdp.utils import _archive
+
+
+def _filename(name='archive.mdp'):
+    tempdir = tempfile.mkdtemp(dir=py.test.mdp_tempdirname)
+    return os.path.join(tempdir, name)
+
+class _ItemList(list):
+    pass
+
+class _ItemSet(set):
+    pass
+
+def _trained_flow(x):
+    flow = mdp.Flow([mdp.nodes.PCANode(output_dim=3),
+                     mdp.nodes.SFA2Node(output_dim=2)])
+    flow.train(x)
+    return flow
+
+def test_archive_flow():
+    x = numx_rand.random((200, 5))
+    flow = _trained_flow(x)
+    filename = _filename()
+    mdp.save(flow, filename)
+    assert _archive.is_archive(filename)
+    for mmap in (False, True, 'c'):
+        loaded = mdp.Flow.load(filename, mmap=mmap)
+        assert type(loaded) is mdp.Flow
+        assert_array_almost_equal(loaded(x), flow(x))
+        assert loaded[1].get_remaining_train_phase() == 0
+
+def test_archive_mmap():
+    x = numx_rand.random((200, 5))
+    filename = _filename()
+    mdp.save(_trained_flow(x), filename)
+    loaded = mdp.load(filename, mmap=True)
+    avg = loaded[0].avg
+    assert not avg.flags.writeable
+    # the arrays are views of the mapped file
+    assert avg.base is not None
+    py.test.raises(ValueError, avg.__setitem__, 0, 1.)
+    # copy-on-write arrays can be modified without changing the file
+    loaded = mdp.load(filename, mmap='c')
+    loaded[0].avg[...] = 0
+    assert mdp.load(filename)[0].avg.any()
+    py.test.raises(mdp.MDPException, mdp.load, filename, mmap='w')
+
+def test_archive_layout():
+    node = mdp.nodes.PCANode(output_dim=2)
+    node.train(numx_rand.random((100, 4)))
+    node.stop_training()
+    filename = _filename()
+    mdp.save(node, filename)
+    with open(filename, 'rb') as archive:
+        assert archive.read(len(_archive.MAGIC)) == _archive.MAGIC
+        header_length = struct.unpack('<Q', archive.read(8))[0]
+        header = json.loads(archive.read(header_length).decode('ascii'))
+    assert header['format_version'] == _archive.ARCHIVE_VERSION
+    assert header['mdp_version'] == mdp.__version__
+    assert header['root']['__object__'] == 'mdp.nodes:PCANode'
+    data_start = _archive._align(16 + header_length)
+    for entry in header['arrays']:
+        assert (data_start + entry['offset']) % 64 == 0
+
+def test_archive_shared_nodes():
+    x = numx_rand.random((100, 4))
+    layer = mdp.hinet.CloneLayer(mdp.nodes.SFANode(input_dim=2,
+                                                   output_dim=1),
+                                 n_nodes=2)
+    layer.train(x)
+    layer.stop_training()
+    filename = _filename()
+    mdp.save(layer, filename)
+    loaded = mdp.hinet.CloneLayer.load(filename, mmap=True)
+    assert loaded.nodes[0] is loaded.nodes[1]
+    assert_array_almost_equal(loaded(x), layer(x))
+
+def test_archive_values():
+    fortran = numx.asfortranarray(numx_rand.random((3, 4)))
+    array = numx_rand.random((4, 6))
+    obj = {'none': None, 'bool': True, 1: 2.5, (1, 'a'): [u'\xe9', b'\xff'],
+           'set': set([1, 2]), 'complex': 1 + 2j,
+           'dtype': numx.dtype('int32'),
+           'structured': numx.zeros(2, dtype=[('a', 'i4'), ('b', 'f8')]),
+           'scalar': numx.float32(1.5), 'empty': numx.zeros((0, 3)),
+           'fortran': fortran, 'strided': array[:, ::2],
+           'same': [array, array], 'function': mdp.utils.mult}
+    filename = _filename()
+    mdp.save(obj, filename)
+    for mmap in (False, True):
+        loaded = mdp.load(filename, mmap=mmap)
+        assert loaded['none'] is None and loaded['bool'] is True
+        assert loaded[1] == 2.5
+        assert loaded[(1, 'a')] == [u'\xe9', b'\xff']
+        assert loaded['set'] == set([1, 2])
+        assert loaded['complex'] == 1 + 2j
+        assert loaded['dtype'] == numx.dtype('int32')
+        assert loaded['structured'].dtype == obj['structured'].dtype
+        assert loaded['scalar'] == 1.5
+        assert loaded['scalar'].dtype == numx.float32
+        assert loaded['empty'].shape == (0, 3)
+        assert loaded['fortran'].flags.f_contiguous
+        assert_array_equal(loaded['fortran'], fortran)
+        assert_array_equal(loaded['strided'], array[:, ::2])
+        assert loaded['same'][0] is loaded['same'][1]
+        assert loaded['function'] is mdp.utils.mult
+
+def test_archive_container_subclasses():
+    items = _ItemList([1, numx.arange(3)])
+    items.name = 'items'
+    obj = {'ordered': mdp.utils.OrderedDict([('b', 1), ('a', items)]),
+           'counter': collections.Counter('abracadabra'),
+           'set': _ItemSet([1, 2]), 'items': items}
+    filename = _filename()
+    mdp.save(obj, filename)
+    loaded = mdp.load(filename)
+    ordered = loaded['ordered']
+    assert type(ordered) is mdp.utils.OrderedDict
+    assert list(ordered.keys()) == ['b', 'a']
+    assert ordered['a'] is loaded['items']
+    assert type(loaded['items']) is _ItemList
+    assert loaded['items'].name == 'items'
+    assert loaded['items'][0] == 1
+    assert_array_equal(loaded['items'][1], numx.arange(3))
+    assert type(loaded['counter']) is collections.Counter
+    assert loaded['counter'] == obj['counter']
+    assert type(loaded['set']) is _ItemSet
+    assert loaded['set'] == set([1, 2])
+
+def test_archive_version():
+    filename = _filename()
+    mdp.save(mdp.nodes.IdentityNode(), filename)
+    with open(filename, 'rb') as archive:
+        content = archive.read()
+    newer = b'"format_version": %d' % (_archive.ARCHIVE_VERSION + 1)
+    current = b'"format_version": %d' % _archive.ARCHIVE_VERSION
+    with open(filename, 'wb') as archive:
+        archive.write(content.replace(current, newer))
+    py.test.raises(mdp.MDPException, mdp.load, filename)
+
+def test_archive_file_mode():
+    filename = _filename()
+    mdp.save(mdp.nodes.IdentityNode(), filename)
+    umask = os.umask(0o022)
+    os.umask(umask)
+    assert stat.S_IMODE(os.stat(filename).st_mode) == 0o666 & ~umask
+    # the permissions of an existing file are kept
+    os.chmod(filename, 0o640)
+    mdp.save(mdp.nodes.IdentityNode(), filename)
+    assert stat.S_IMODE(os.stat(filename).st_mode) == 0o640
+
+def test_archive_pickle():
+    x = numx_rand.random((200, 5))
+    flow = _trained_flow(x)
+    filename = _filename('flow.pic')
+    flow.save(filename)
+    assert not _archive.is_archive(filename)
+    loaded = mdp.Flow.load(filename, mmap=True)
+    assert_array_almost_equal(loaded(x), flow(x))
+    py.test.raises(mdp.NodeException, mdp.Node.load, filename)
+
+def test_checkpoint_archive():
+    x = numx_rand.random((100, 4))
+    filename = _filename()
+    flow = mdp.CheckpointFlow([mdp.nodes.PCANode(output_dim=2)])
+    flow.train(x, checkpoints=mdp.CheckpointSaveFunction(filename,
+                                                         stop_training=1,
+                                                         archive=True))
+    node = mdp.nodes.PCANode.load(filename)
+    assert_array_almost_equal(node(x), flow(x))
@@ -0,0 +1,74 @@
+"""Test the benchmark suite (with the smallest sizes)."""
+import os
+import tempfile
+
+from ._tools import *
+from mdp.test import benchmarks
+from mdp.test.benchmarks.__main__ import main
+
+
+def test_benchmark_names():
+    names = [bench.name for bench in benchmarks.get_benchmarks()]
+    assert len(names) == len(set(names))
+    for bench in benchmarks.get_benchmarks():
+        assert bench.cases('small')
+        assert bench.__doc__
+    assert ([bench.name for bench in benchmarks.get_benchmarks('hinet.*')] ==
+            ['hinet.layer', 'hinet.clone_layer'])
+
+def test_run_benchmarks():
+    results = benchmarks.run_benchmarks('nodes.*', size='small', repeat=2,
+                                        warmup=0, verbose=False)
+    assert results['settings']['size'] == 'small'
+    assert results['metadata']['mdp'] == mdp.__version__
+    assert len(results['results']) == len(
+        benchmarks.get_benchmarks('nodes.*'))
+    for result in results['results']:
+        assert len(result['times']) == 2
+        assert result['min'] <= result['median'] <= max(result['times'])
+
+def test_skip_and_teardown():
+    calls = []
+    def counted(n):
+        if n < 0:
+            raise benchmarks.SkipBenchmark('negative')
+        try:
+            yield lambda: calls.append('run')
+        finally:
+            calls.append('teardown')
+    bench = benchmarks.Benchmark('test', counted, {})
+    result = benchmarks.run_case(bench, {'n': 1}, repeat=3, warmup=1)
+    assert calls == ['run'] * 4 + ['teardown']
+    assert result['key'] == 'test.counted(n=1)'
+    result = benchmarks.run_case(bench, {'n': -1})
+    assert result['skipped'] == 'negative'
+    assert 'times' not in result
+
+def _results(times):
+    return {'results': [{'key': key, 'min': time, 'median': time}
+                        for key, time in times.items()]}
+
+def test_compare_results():
+    old = _results({'a': 1., 'b': 1., 'c': 1., 'old': 1.})
+    new = _results({'a': 1.05, 'b': 1.5, 'c': 0.5, 'new': 1.})
+    comparison = benchmarks.compare_results(old, new, threshold=0.1)
+    status = dict((key, status) for key, _, _, _, status in comparison)
+    assert status == {'a': 'ok', 'b': 'regression', 'c': 'improvement'}
+    assert 'REGRESSION' in benchmarks.format_comparison(comparison)
+    comparison = benchmarks.compare_results(old, new, threshold=0.6)
+    assert 'regression' not in [item[-1] for item in comparison]
+
+def test_command_line():
+    tempdir = tempfile.mkdtemp(dir=py.test.mdp_tempdirname)
+    filenames = [os.path.join(tempdir, name)
+                 for name in ('old.json', 'new.json')]
+    for filename in filenames:
+        assert main(['run', '-s', 'small', '-r', '1', '-w', '0',
+                     '-o', filename, 'hinet.layer']) == 0
+    results = benchmarks.load_results(filenames[0])
+    assert results['results'][0]['name'] == 'hinet.layer'
+    # the threshold is large enough for the timing noise
+    assert main(['compare', '-t', '100'] + filenames) == 0
+    benchmarks.save_results(_results({results['results'][0]['key']: 0.}),
+                            filenames[0])
+    assert main(['compare'] + filenames) == 1
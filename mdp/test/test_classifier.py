@@ -6,6 +6,7 @@
 from builtins import zip
 from builtins import range
 from past.utils import old_div
+import pickle
 from ._tools import *
 
 from mdp import ClassifierNode
@@ -36,6 +37,57 @@ def testClassifierNode_ranking():
         # check that the probabilities sum up to 100
         assert 0.999 < p[r[0]] + p[r[1]] < 1.001
 
+def testClassifierNode_prob_array():
+    x = numx_rand.random((200, 3))
+    labels = (x.sum(axis=1) > 1.5).astype('i') + 2 * (x[:, 0] > 0.5)
+    test_data = numx_rand.random((30, 3))
+    for node in [mdp.nodes.GaussianClassifier(),
+                 mdp.nodes.KNNClassifier(k=5)]:
+        node.train(x, labels)
+        node.stop_training()
+        prob = node.prob_array(test_data)
+        assert prob.shape == (30, len(node.labels_))
+        assert_array_almost_equal(prob.sum(axis=1), numx.ones(30))
+        # the dict and list interfaces are views on the arrays
+        for p_dict, p in zip(node.prob(test_data), prob):
+            assert_array_equal([p_dict[lbl] for lbl in node.labels_], p)
+        ranking = node.rank_array(test_data)
+        for r, r_arr, p in zip(node.rank(test_data), ranking, prob):
+            assert r == [node.labels_[i] for i in r_arr]
+            assert numx.all(numx.diff(p[r_arr]) <= 0)
+        assert_array_equal(node.label(test_data),
+                           numx.take(node.labels_, ranking[:, 0]))
+        ranking = node.rank_array(test_data, threshold=0.2)
+        assert numx.all((ranking == -1) == (numx.sort(prob)[:, ::-1] <= 0.2))
+        for r, p in zip(node.rank(test_data, threshold=0.2), prob):
+            assert len(r) == (p > 0.2).sum()
+    # the nearest mean classifier does not provide probabilities
+    node = mdp.nodes.NearestMeanClassifier()
+    node.train(x, labels)
+    node.stop_training()
+    py.test.raises(NotImplementedError, node.prob_array, test_data)
+
+class _ArrayClassifier(ClassifierNode):
+    labels_ = ['a', 'b', 'c']
+    @staticmethod
+    def is_trainable():
+        return False
+    def _prob_array(self, x):
+        return numx.array([[0.25, 0.5, 0.25]] * len(x))
+
+class _ReversedProbClassifier(_ArrayClassifier):
+    def _prob(self, x):
+        return [dict(reversed(list(zip(self.labels_, p))))
+                for p in self._prob_array(x)]
+
+def testClassifierNode_rank_ties():
+    x = numx.zeros((2, 3))
+    assert _ArrayClassifier().rank(x) == [['b', 'a', 'c']] * 2
+    # equal probabilities are ranked in the order of the prob dictionaries
+    assert _ReversedProbClassifier().rank(x) == [['b', 'c', 'a']] * 2
+    assert (_ReversedProbClassifier().rank(x, threshold=0.3) ==
+            [['b']] * 2)
+
 def testClassifier_execute_method():
     """Test that the execute result has the correct format when execute_method
     is used.
@@ -159,6 +211,141 @@ def testDiscreteHopfieldClassifier():
         # Hopfield nets are blind for inversion, need to check either case
         assert numx.all(retrieved == p) or numx.all(retrieved != p)
 
+def testPerceptronClassifier_online_rule():
+    x = numx_rand.normal(size=(300, 4))
+    labels = numx.sign(x[:, 0] - x[:, 1] + 0.5 * numx_rand.normal(size=300))
+    labels[labels == 0] = 1
+    node = PerceptronClassifier()
+    node.train(x, labels)
+    # sample by sample perceptron rule
+    weights = numx.ones(4)
+    offset = 0.
+    for xi, label in zip(x, labels):
+        rate = node.learning_rate * (label -
+                                     numx.sign(numx.dot(xi, weights) + offset))
+        weights = weights + rate * xi
+        offset += rate
+    assert_array_almost_equal(node.weights, weights, 10)
+    assert_almost_equal(node.offset_weight, offset, 10)
+
+def testSimpleMarkovClassifier_chunks():
+    x = numx_rand.randint(0, 4, (200, 2)).astype('d')
+    x[:10] = -0.
+    labels = ['a' if i % 3 else 'b' for i in range(200)]
+    node = SimpleMarkovClassifier()
+    node.train(x, labels)
+    chunked = SimpleMarkovClassifier()
+    for i in range(0, 200, 30):
+        chunked.train(x[i:i+30], labels[i:i+30])
+    assert node.features == chunked.features
+    assert node.labels == chunked.labels
+    assert node.connections == chunked.connections
+    assert node.ntotal_connections == chunked.ntotal_connections == 200
+    # -0. and 0. are the same feature
+    assert len(node.features) == 16
+    assert sum(node.connections.values()) == 200
+    assert node.prob(x) == chunked.prob(x)
+    # a single label for the whole chunk
+    node = SimpleMarkovClassifier()
+    node.train(x[:5], 'c')
+    assert node.labels == {'c': 5}
+    prob = node.prob(numx.array([[7., 7.], [0., 0.]]))
+    assert prob[0] == {}
+    assert_almost_equal(sum(prob[1].values()), 1.)
+
+def testSimpleMarkovClassifier_old_pickle():
+    x = numx_rand.randint(0, 4, (200, 2)).astype('d')
+    labels = ['a' if i % 3 else 'b' for i in range(200)]
+    node = SimpleMarkovClassifier()
+    node.train(x, labels)
+    # replace the count tables with the dictionaries stored by older MDP
+    # versions
+    state = dict((name, value) for name, value in node.__dict__.items()
+                 if not name.startswith('_feature') and
+                 not name.startswith('_label') and
+                 name != '_connection_counts')
+    state['features'] = node.features
+    state['labels'] = node.labels
+    state['connections'] = node.connections
+    old = SimpleMarkovClassifier.__new__(SimpleMarkovClassifier)
+    old.__setstate__(pickle.loads(pickle.dumps(state)))
+    assert old.features == node.features
+    assert old.labels == node.labels
+    assert old.connections == node.connections
+    # the training can be continued
+    old.train(x[:50], labels[:50])
+    node.train(x[:50], labels[:50])
+    assert old.connections == node.connections
+    assert old.prob(x) == node.prob(x)
+
+def testSimpleMarkovClassifier_rank():
+    x = numx_rand.randint(0, 3, (100, 2)).astype('d')
+    labels = numx_rand.randint(0, 4, 100)
+    node = SimpleMarkovClassifier()
+    node.train(x, labels)
+    test_x = numx.concatenate([x, [[7., 7.]]])
+    for threshold in (None, 0, 0.3):
+        ranking = node.rank(test_x, threshold=threshold)
+        assert ranking == node._rank_from_prob(test_x, threshold)
+        # features that were never seen are not ranked
+        assert ranking[-1] == []
+
+def testDiscreteHopfieldClassifier_batch():
+    patterns = numx_rand.randint(0, 2, (5, 100)).astype('b')
+    noisy = patterns.copy()
+    noisy[:, :5] = 1 - noisy[:, :5]
+    h = DiscreteHopfieldClassifier()
+    h._shuffled_update = False
+    h.train(patterns)
+    h.stop_training()
+    # all the patterns are recalled together as if one by one
+    single = numx.array([h.label(p[numx.newaxis])[0] for p in noisy])
+    assert numx.all(h.label(noisy) == single)
+    h.synchronous = True
+    assert numx.all(h.label(patterns) == patterns)
+
+def testDiscreteHopfieldClassifier_shuffled_seed():
+    patterns = numx_rand.randint(0, 2, (5, 60)).astype('b')
+    noisy = patterns.copy()
+    noisy[:, :10] = 1 - noisy[:, :10]
+    h = DiscreteHopfieldClassifier()
+    h.train(patterns)
+    h.stop_training()
+    # pattern by pattern recall with a new unit order in each sweep
+    numx_rand.seed(3)
+    weights = h._weight_matrix
+    single = []
+    for pattern in mdp.utils.bool_to_sign(noisy):
+        has_converged = False
+        while not has_converged:
+            has_converged = True
+            iter_order = list(range(len(weights)))
+            numx_rand.shuffle(iter_order)
+            for row in iter_order:
+                new_row = numx.sign(numx.dot(weights[row], pattern))
+                if new_row != 0 and pattern[row] != new_row:
+                    has_converged = False
+                    pattern[row] = new_row
+        single.append(mdp.utils.sign_to_bool(pattern))
+    numx_rand.seed(3)
+    assert numx.all(h.label(noisy) == numx.array(single))
+
+def testDiscreteHopfieldClassifier_synchronous_cycle():
+    h = DiscreteHopfieldClassifier(synchronous=True)
+    h.train(numx.array([[1, 0]], dtype='b'))
+    h.stop_training()
+    # with synchronous updates this pattern flips between two states
+    retrieved = h.label(numx.array([[1, 1]], dtype='b'))
+    assert retrieved.shape == (1, 2)
+
+def testDiscreteHopfieldClassifier_old_pickle():
+    h = DiscreteHopfieldClassifier()
+    h.train(numx_rand.randint(0, 2, (3, 20)).astype('b'))
+    h.stop_training()
+    del h.__dict__['synchronous']
+    h = pickle.loads(pickle.dumps(h))
+    assert not h.synchronous
+
 def testKMeansClassifier():
     num_centroids = 3
     k = KMeansClassifier(num_centroids)
@@ -1,11 +1,17 @@
 """Test the configuration object."""
 from builtins import object
+import os
+import sys
+import tempfile
 
 from mdp import config
+from ._tools import run_python
 
 class TestConfig(object):
     def teardown_method(self, method):
-        delattr(config, 'has_test_property')
+        config._deferred.pop('test_property', None)
+        if 'has_test_property' in config.__dict__:
+            delattr(config, 'has_test_property')
 
     def test_config_depfound(self):
         s = config.ExternalDepFound('test_property', 0.777)
@@ -38,3 +44,66 @@ def test_config_depfailed_string(self):
         info = config.info()
         assert 'test property' in info
         assert 'GOOGOO' in info
+
+    def test_config_deferred(self):
+        calls = []
+        def probe():
+            calls.append(None)
+            config.ExternalDepFound('test_property', '0.777')
+        config._defer('test_property', probe, False)
+        order = config._deferred['test_property'][2]
+        assert not calls
+        assert config.has_test_property
+        assert config.has_test_property.order == order
+        assert 'test_property' not in config._deferred
+        assert config.has_test_property
+        assert len(calls) == 1
+
+    def test_config_deferred_info(self):
+        def probe():
+            config.ExternalDepFailed('test_property', 'GOOGOO')
+        config._defer('test_property', probe, False)
+        info = config.info()
+        assert 'test property' in info
+        assert 'GOOGOO' in info
+
+    def test_config_probe_cache(self):
+        fd, filename = tempfile.mkstemp(prefix='mdp-config-cache.')
+        os.close(fd)
+        old_cache = os.environ.get('MDP_CONFIG_CACHE')
+        os.environ['MDP_CONFIG_CACHE'] = filename
+        calls = []
+        def probe():
+            calls.append(None)
+            config.ExternalDepFound('test_property', '0.777')
+        try:
+            config._defer('test_property', probe, True)
+            assert config.has_test_property
+            assert len(calls) == 1
+            # the result is taken from the cache in a new query
+            delattr(config, 'has_test_property')
+            config._defer('test_property', probe, True)
+            assert config.has_test_property.version == '0.777'
+            assert len(calls) == 1
+            # the cache is invalidated by a change of sys.path
+            delattr(config, 'has_test_property')
+            config._defer('test_property', probe, True)
+            sys.path.append(os.path.dirname(filename))
+            try:
+                assert config.has_test_property
+            finally:
+                sys.path.pop()
+            assert len(calls) == 2
+        finally:
+            if old_cache is None:
+                del os.environ['MDP_CONFIG_CACHE']
+            else:
+                os.environ['MDP_CONFIG_CACHE'] = old_cache
+            os.remove(filename)
+
+
+def test_import_defers_probes():
+    output = run_python("import mdp; "
+                        "print(' '.join(sorted(mdp.config._deferred)))")
+    assert output.split() == ['libsvm', 'parallel_python', 'shogun',
+                              'sklearn']
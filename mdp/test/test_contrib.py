@@ -230,3 +230,61 @@ def test_XSFANode():
     assert min(corrs) > 0.8, ('source/estimate minimal'
                               ' covariance: %g' % min(corrs))
 
+class _CountingExpansionNode(mdp.nodes.PolynomialExpansionNode):
+    n_executed = 0
+    def _execute(self, x):
+        _CountingExpansionNode.n_executed += 1
+        return super(_CountingExpansionNode, self)._execute(x)
+
+def test_XSFANode_cache():
+    x = numx_rand.random((500, 3))
+    chunks = [x[:250], x[250:]]
+    outputs = []
+    n_executed = []
+    for kwargs in (dict(cache_size=0), dict(), dict(cache_mmap=True)):
+        _CountingExpansionNode.n_executed = 0
+        node = mdp.nodes.XSFANode(basic_exp=(_CountingExpansionNode,
+                                             (2,), {}),
+                                  intern_exp=(mdp.nodes.PolynomialExpansionNode,
+                                              (3,), {}),
+                                  **kwargs)
+        mdp.Flow([node]).train([chunks])
+        n_executed.append(_CountingExpansionNode.n_executed)
+        assert node._cache is None
+        outputs.append(node(x))
+    n_phases = sum(node._training_phases)
+    assert n_executed[0] == 2 * n_phases
+    # with the cache the basic expansion is executed once per chunk
+    assert n_executed[1] == n_executed[2] == 2
+    assert_array_almost_equal(outputs[0], outputs[1], 10)
+    assert_array_almost_equal(outputs[0], outputs[2], 10)
+
+def test_XSFANode_cache_size():
+    x = numx_rand.random((100, 2))
+    node = mdp.nodes.XSFANode(input_dim=2)
+    node._initialize_internal_flow()
+    node.cache_size = node._flow[0].output_dim * 100 * 8
+    # only the first chunk fits into the cache
+    y1 = node._trained_output(x)
+    y2 = node._trained_output(x + 1)
+    assert node._cache.nbytes == y1.nbytes
+    node._chunk_index = 0
+    assert node._trained_output(x) is y1
+    # a different chunk at the same position is recomputed
+    y3 = node._trained_output(x - 1)
+    assert y3 is not y2
+    assert_array_almost_equal(y3, node._flow[0](x - 1))
+
+
+def test_XSFANode_cache_key():
+    x = numx_rand.random((100, 2))
+    node = mdp.nodes.XSFANode(input_dim=2)
+    node._initialize_internal_flow()
+    y1 = node._trained_output(x)
+    # a chunk that only differs in an interior row is not a cache hit
+    x2 = x.copy()
+    x2[50] += 1
+    node._chunk_index = 0
+    y2 = node._trained_output(x2)
+    assert y2 is not y1
+    assert_array_almost_equal(y2, node._flow[0](x2))
@@ -4,6 +4,7 @@
 from builtins import object
 
 import tempfile
+import warnings
 import pickle
 import pickle
 import os
@@ -281,6 +282,56 @@ def testCheckpointFunction():
     for i in range(len(flow)):
         assert flow[i].__class__==cfunc.classes[i], 'Wrong class collected'
 
+def testAsyncCheckpointSaveFunction():
+    x = uniform((100, 4))
+    tempdir = tempfile.mkdtemp(dir=py.test.mdp_tempdirname)
+    filenames = [os.path.join(tempdir, 'node%d.pic' % i) for i in range(2)]
+    cfuncs = [mdp.AsyncCheckpointSaveFunction(filenames[0], stop_training=1),
+              mdp.AsyncCheckpointSaveFunction(filenames[1], stop_training=1,
+                                              archive=True, max_pending=2)]
+    flow = mdp.CheckpointFlow([mdp.nodes.PCANode(output_dim=3),
+                               mdp.nodes.SFANode(output_dim=2)])
+    flow.train(x, cfuncs)
+    for cfunc in cfuncs:
+        cfunc.wait()
+    # the checkpoints are copies of the trained nodes
+    flow[0].avg[:] = 0
+    nodes = [mdp.Node.load(filename) for filename in filenames]
+    assert nodes[0].avg.any()
+    assert_array_almost_equal(nodes[1].sf, flow[1].sf)
+    for cfunc in cfuncs:
+        cfunc.close()
+    assert cfuncs[0]._thread is None
+
+def testAsyncCheckpointResume():
+    x = uniform((100, 4))
+    tempdir = tempfile.mkdtemp(dir=py.test.mdp_tempdirname)
+    filename = os.path.join(tempdir, 'pca.pic')
+    cfunc = mdp.AsyncCheckpointSaveFunction(filename, stop_training=1)
+    flow = mdp.CheckpointFlow([mdp.nodes.PCANode(output_dim=2),
+                               BogusExceptNode()])
+    py.test.raises(mdp.FlowException, flow.train, [[x], [x]], [cfunc, None])
+    cfunc.wait()
+    # resume the training from the last complete checkpoint
+    flow = mdp.CheckpointFlow([mdp.nodes.PCANode.load(filename),
+                               mdp.nodes.SFANode()])
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', mdp.MDPWarning)
+        flow.train([[x], [x]], [cfunc, None])
+    cfunc.close()
+    assert_array_almost_equal(mdp.Node.load(filename).v, flow[0].v)
+    assert not flow[1].is_training()
+
+def testAsyncCheckpointError():
+    filename = os.path.join(py.test.mdp_tempdirname, 'missing', 'node.pic')
+    cfunc = mdp.AsyncCheckpointSaveFunction(filename)
+    cfunc(mdp.nodes.IdentityNode())
+    py.test.raises(mdp.MDPException, cfunc.wait)
+    # the error is only raised once
+    cfunc.wait()
+    py.test.raises(mdp.MDPException, mdp.AsyncCheckpointSaveFunction,
+                   filename, max_pending=0)
+
 def testCrashRecovery():
     flow = mdp.Flow([BogusExceptNode()])
     flow.set_crash_recovery(1)
@@ -344,3 +395,76 @@ def testgenerator():
         raise Exception('Expected mdp.FlowException')
     except mdp.FlowException:
         pass
+
+def _get_plan_flow():
+    x = uniform((300, 6))
+    flow = mdp.Flow([
+        mdp.nodes.PCANode(),
+        mdp.hinet.Switchboard(6, [5, 4, 3, 2, 1, 0]),
+        mdp.hinet.Layer([mdp.nodes.PolynomialExpansionNode(2, input_dim=3),
+                         mdp.nodes.NormalizeNode(input_dim=3)]),
+        mdp.hinet.CloneLayer(mdp.nodes.AffineNode(uniform((4, 2)),
+                                                  uniform(2)),
+                             n_nodes=3),
+        mdp.nodes.PolynomialExpansionNode(2),
+        mdp.hinet.SameInputLayer([mdp.nodes.IdentityNode(input_dim=27),
+                                  mdp.nodes.SFANode(input_dim=27,
+                                                    output_dim=4)])])
+    flow.train(x)
+    return flow, x
+
+def testFlowPlan():
+    flow, x = _get_plan_flow()
+    plan = flow.plan((50, 6))
+    for i in range(3):
+        x = uniform((50, 6))
+        assert_array_almost_equal(plan(x), flow(x), 10)
+    # the same for the fused flow
+    flow = flow.compile()
+    plan = flow.plan((50, 6))
+    assert_array_almost_equal(plan(x), flow(x), 10)
+
+def testFlowPlan_buffers():
+    flow = mdp.Flow([mdp.nodes.AffineNode(numx.eye(3)),
+                     mdp.nodes.AffineNode(2*numx.eye(3)),
+                     mdp.nodes.AffineNode(3*numx.eye(3))])
+    plan = flow.plan((10, 3))
+    x = uniform((10, 3))
+    y = plan(x)
+    assert_array_almost_equal(y, 6*x)
+    # the output buffer is reused
+    assert plan(2*x) is y
+    assert_array_almost_equal(y, 12*x)
+    # consecutive nodes use the two buffers alternately
+    buffers = plan._buffers
+    assert numx.may_share_memory(buffers[0], buffers[2])
+    assert not numx.may_share_memory(buffers[0], buffers[1])
+
+def testFlowPlan_dtype():
+    flow = mdp.Flow([mdp.nodes.PolynomialExpansionNode(2, dtype='f'),
+                     mdp.nodes.AffineNode(numx.ones((5, 1)), dtype='d')])
+    plan = flow.plan((10, 2), dtype='f')
+    x = uniform((10, 2))
+    y = plan(x)
+    assert y.dtype == numx.dtype('d')
+    assert_array_almost_equal(y, flow(x.astype('f')), 5)
+
+def testFlowPlan_exceptions():
+    flow, x = _get_plan_flow()
+    plan = flow.plan((50, 6))
+    py.test.raises(mdp.FlowException, plan, x)
+    flow = mdp.Flow([mdp.nodes.PCANode()])
+    py.test.raises(mdp.FlowException, flow.plan, (50, 6))
+
+def testCanExecuteInto():
+    class _SquareAffineNode(mdp.nodes.AffineNode):
+        def _execute(self, x):
+            return super(_SquareAffineNode, self)._execute(x)**2
+    matrix = numx.eye(2)
+    assert mdp.nodes.AffineNode(matrix)._can_execute_into()
+    assert mdp.nodes.QuadraticExpansionNode()._can_execute_into()
+    assert not _SquareAffineNode(matrix)._can_execute_into()
+    assert not mdp.nodes.PCANode()._can_execute_into()
+    flow = mdp.Flow([_SquareAffineNode(matrix)])
+    x = uniform((5, 2))
+    assert_array_almost_equal(flow.plan(x.shape)(x), x**2)
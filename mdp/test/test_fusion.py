@@ -0,0 +1,152 @@
+from ._tools import *
+
+uniform = numx_rand.random
+
+
+def _train_flow(flow, x):
+    flow.train(x)
+    return flow
+
+def _node_classes(flow):
+    return [node.__class__ for node in flow]
+
+def test_compile_linear_chain():
+    x = uniform((500, 10))
+    flow = _train_flow(mdp.Flow([mdp.nodes.PCANode(output_dim=8),
+                                 mdp.nodes.WhiteningNode(),
+                                 mdp.nodes.SFANode(output_dim=5),
+                                 mdp.nodes.NormalizeNode()]), x)
+    compiled = flow.compile()
+    assert _node_classes(compiled) == [mdp.nodes.AffineNode]
+    assert compiled[0].input_dim == 10
+    assert compiled[0].output_dim == 5
+    assert_array_almost_equal(compiled(x), flow(x), decimal=10)
+    # the original flow is not modified
+    assert len(flow) == 4
+
+def test_compile_nonlinear_boundary():
+    x = uniform((500, 4))
+    expansion = mdp.nodes.PolynomialExpansionNode(2)
+    flow = _train_flow(mdp.Flow([mdp.nodes.PCANode(),
+                                 mdp.nodes.WhiteningNode(),
+                                 expansion,
+                                 mdp.nodes.SFANode(output_dim=3),
+                                 mdp.nodes.NormalizeNode()]), x)
+    compiled = flow.compile()
+    assert _node_classes(compiled) == [mdp.nodes.AffineNode,
+                                       mdp.nodes.PolynomialExpansionNode,
+                                       mdp.nodes.AffineNode]
+    # the nonlinear node is not copied
+    assert compiled[1] is expansion
+    assert_array_almost_equal(compiled(x), flow(x), decimal=8)
+
+def test_compile_keeps_bottleneck():
+    # fusing a reduction and an expansion would increase the cost
+    x = uniform((500, 20))
+    y = uniform((500, 20))
+    pca = mdp.nodes.PCANode(output_dim=2)
+    pca.train(x)
+    pca.stop_training()
+    regression = mdp.nodes.LinearRegressionNode()
+    regression.train(pca(x), y)
+    regression.stop_training()
+    flow = mdp.Flow([pca, regression])
+    compiled = flow.compile()
+    assert compiled[0] is pca
+    assert compiled[1] is regression
+
+def test_compile_linear_regression():
+    x = uniform((500, 6))
+    y = uniform((500, 3))
+    pca = mdp.nodes.PCANode()
+    pca.train(x)
+    pca.stop_training()
+    for with_bias in (True, False):
+        regression = mdp.nodes.LinearRegressionNode(with_bias=with_bias)
+        regression.train(pca(x), y)
+        regression.stop_training()
+        flow = mdp.Flow([pca, regression])
+        compiled = flow.compile()
+        assert _node_classes(compiled) == [mdp.nodes.AffineNode]
+        assert_array_almost_equal(compiled(x), flow(x), decimal=10)
+
+def test_compile_subclass_not_fused():
+    # SFA2Node is a subclass of SFANode with a nonlinear execution
+    x = uniform((500, 3))
+    flow = _train_flow(mdp.Flow([mdp.nodes.PCANode(),
+                                 mdp.nodes.SFA2Node(output_dim=4)]), x)
+    compiled = flow.compile()
+    assert compiled[1] is flow[1]
+    assert_array_almost_equal(compiled(x), flow(x), decimal=10)
+
+def test_compile_untrained_node():
+    x = uniform((500, 4))
+    pca = mdp.nodes.PCANode()
+    pca.train(x)
+    pca.stop_training()
+    sfa = mdp.nodes.SFANode()
+    flow = mdp.Flow([pca, mdp.nodes.IdentityNode(input_dim=4), sfa])
+    compiled = flow.compile()
+    assert _node_classes(compiled) == [mdp.nodes.AffineNode,
+                                       mdp.nodes.SFANode]
+    assert compiled[1] is sfa
+
+def test_compile_hinet():
+    x = uniform((500, 6))
+    switchboard = mdp.hinet.Switchboard(input_dim=6,
+                                        connections=[5, 4, 3, 2, 1, 0])
+    layer = mdp.hinet.Layer([mdp.nodes.PCANode(input_dim=3),
+                             mdp.nodes.SFANode(input_dim=3, output_dim=2)])
+    clone_layer = mdp.hinet.CloneLayer(mdp.nodes.NormalizeNode(input_dim=1),
+                                       n_nodes=5)
+    same_input = mdp.hinet.SameInputLayer(
+        [mdp.hinet.FlowNode(mdp.Flow([mdp.nodes.PCANode(input_dim=5),
+                                      mdp.nodes.WhiteningNode()])),
+         mdp.nodes.IdentityNode(input_dim=5)])
+    flow = _train_flow(mdp.Flow([switchboard, layer, clone_layer,
+                                 same_input]), x)
+    compiled = flow.compile()
+    assert _node_classes(compiled) == [mdp.nodes.AffineNode]
+    assert_array_almost_equal(compiled(x), flow(x), decimal=8)
+
+def test_compile_dtype():
+    x = uniform((500, 5))
+    flow = _train_flow(mdp.Flow([mdp.nodes.PCANode(dtype='f'),
+                                 mdp.nodes.NormalizeNode(dtype='f')]),
+                       x.astype('f'))
+    compiled = flow.compile()
+    assert compiled[0].dtype == numx.dtype('f')
+    assert compiled(x.astype('f')).dtype == numx.dtype('f')
+
+def test_register_affine_map():
+    class ScaleNode(mdp.Node):
+        def is_trainable(self):
+            return False
+        def _execute(self, x):
+            return 2 * x
+    @mdp.fusion.register_affine_map(ScaleNode)
+    def _scale_map(node):
+        return 2 * numx.eye(node.input_dim), None
+    try:
+        x = uniform((100, 3))
+        flow = mdp.Flow([ScaleNode(input_dim=3, output_dim=3),
+                         mdp.nodes.IdentityNode(input_dim=3),
+                         ScaleNode(input_dim=3, output_dim=3)])
+        compiled = flow.compile()
+        assert _node_classes(compiled) == [mdp.nodes.AffineNode]
+        assert_array_almost_equal(compiled(x), 4 * x)
+    finally:
+        del mdp.fusion._AFFINE_MAPS[ScaleNode]
+
+def test_AffineNode():
+    matrix = uniform((4, 2))
+    bias = uniform(2)
+    node = mdp.nodes.AffineNode(matrix, bias)
+    assert node.input_dim == 4
+    assert node.output_dim == 2
+    x = uniform((10, 4))
+    assert_array_almost_equal(node(x), mult(x, matrix) + bias)
+    py.test.raises(mdp.NodeException, mdp.nodes.AffineNode, matrix,
+                   uniform(3))
+    py.test.raises(mdp.NodeException, mdp.nodes.AffineNode, matrix,
+                   input_dim=3)
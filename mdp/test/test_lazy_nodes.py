@@ -0,0 +1,34 @@
+"""Test the lazy import of the node modules."""
+from ._tools import *
+
+# node modules which are not imported by 'import mdp'
+DEFERRED_MODULES = ['mdp.nodes.convolution_nodes', 'mdp.nodes.lle_nodes',
+                    'mdp.nodes.scikits_nodes',
+                    'mdp.nodes.shogun_svm_classifier',
+                    'mdp.nodes.libsvm_classifier', 'scipy.signal']
+
+def test_import_defers_node_modules():
+    output = run_python(
+        "import sys, mdp; "
+        "print(' '.join(name for name in %r if name in sys.modules))" %
+        DEFERRED_MODULES)
+    assert output == ''
+
+def test_lazy_node_access():
+    node_class = mdp.nodes.LLENode
+    assert node_class.__module__ == 'mdp.nodes'
+    assert 'LLENode' in mdp.nodes.__dict__
+    assert 'lle_nodes' not in dir(mdp.nodes)
+    assert mdp.nodes._expanded_dim(2, 3) == 9
+    assert not hasattr(mdp.nodes, 'NoSuchNode')
+    assert not hasattr(mdp.nodes, 'NoSuchScikitsLearnNode')
+
+def test_dir_and_all():
+    names = dir(mdp.nodes)
+    for name in mdp.nodes.__all__:
+        assert name in names
+        assert hasattr(mdp.nodes, name)
+    assert 'ICANode' in names
+    namespace = {}
+    exec('from mdp.nodes import *', namespace)
+    assert namespace['PCANode'] is mdp.nodes.PCANode
@@ -1,4 +1,5 @@
 from builtins import range
+import pickle
 from ._tools import *
 
 TESTYPES = [numx.dtype('d'), numx.dtype('f')]
@@ -190,3 +191,123 @@ def get_mult_covs(inp,nmat):
     mcov2.permute(idx)
     assert_array_almost_equal_diff(mcov.covs, mcov_rot.covs, decimal)
     assert_array_almost_equal_diff(mcov2.covs, mcov_per.covs, decimal)
+
+def testPrecisionPolicy():
+    assert utils.get_precision() == 'double'
+    assert utils.storage_dtype('d') == numx.dtype('d')
+    with mdp.precision('mixed'):
+        assert utils.get_precision() == 'mixed'
+        assert utils.storage_dtype('d') == numx.dtype('f')
+        assert utils.storage_dtype('D') == numx.dtype('F')
+        assert utils.storage_dtype('i') == numx.dtype('i')
+        assert utils.accumulator_dtype('f') == numx.dtype('d')
+        assert utils.accumulator_dtype('F') == numx.dtype('D')
+        assert utils.accumulator_dtype('d') == numx.dtype('d')
+    assert utils.get_precision() == 'double'
+    assert utils.accumulator_dtype('f') == numx.dtype('f')
+    py.test.raises(mdp.MDPException, mdp.precision, 'half')
+    # the policy is only changed inside the with block
+    mdp.precision('mixed')
+    assert utils.get_precision() == 'double'
+    mdp.set_precision('mixed')
+    try:
+        assert utils.get_precision() == 'mixed'
+    finally:
+        mdp.set_precision('double')
+    py.test.raises(mdp.MDPException, mdp.set_precision, 'half')
+
+def testCovarianceMatrix_old_pickle():
+    x = numx_rand.random((100, 4))
+    for cov_class, args in ((utils.CovarianceMatrix, ()),
+                            (utils.DelayCovarianceMatrix, (1,)),
+                            (utils.CrossCovarianceMatrix, ())):
+        data = ((x, x[:, :2]) if cov_class is utils.CrossCovarianceMatrix
+                else (x,))
+        ref_cov = cov_class(*args)
+        ref_cov.update(*data)
+        ref_cov.update(*data)
+        cov = cov_class(*args)
+        cov.update(*data)
+        # remove the attributes which were added with the precision policy
+        for name in ('_shift', '_shifty', '_acc_dtype'):
+            cov.__dict__.pop(name, None)
+        cov = pickle.loads(pickle.dumps(cov))
+        cov.update(*data)
+        for res, ref in zip(cov.fix(), ref_cov.fix()):
+            assert_array_almost_equal(res, ref, 10)
+
+def _centered_cov(x, y):
+    x = x - mean(x, axis=0)
+    y = y - mean(y, axis=0)
+    return mult(x.T, y) / (x.shape[0] - 1)
+
+def _large_mean_input(shape):
+    # data with a large mean compared to its variance, so that the
+    # products accumulated in single precision lose all accuracy
+    return 1000. + numx_rand.random(shape)
+
+def testCovarianceMatrixMixed():
+    inp = _large_mean_input((1000, 4))
+    des_cov = numx.cov(inp, rowvar=0)
+    des_moments = mult(inp.T, inp) / (inp.shape[0] - 1)
+    with mdp.precision('mixed'):
+        for center in (True, False):
+            cov = utils.CovarianceMatrix(dtype='f')
+            for chunk in numx.split(inp, 4):
+                cov.update(chunk)
+            act_cov, act_avg, act_tlen = cov.fix(center=center)
+            assert_type_equal(act_cov.dtype, numx.dtype('d'))
+            assert_array_almost_equal(act_avg, mean(inp, axis=0), 3)
+            if center:
+                assert_array_almost_equal(act_cov, des_cov, 4)
+            else:
+                assert_array_almost_equal(act_cov / des_moments,
+                                          numx.ones((4, 4)), 5)
+
+def testDelayCovarianceMatrixMixed():
+    dt = 5
+    inp = _large_mean_input((1000, 3))
+    tlen = inp.shape[0] - dt
+    des_cov = _centered_cov(inp[:tlen], inp[dt:])
+    with mdp.precision('mixed'):
+        cov = utils.DelayCovarianceMatrix(dt, dtype='f')
+        cov.update(inp)
+        act_cov, act_avg, act_avg_dt, act_tlen = cov.fix()
+    assert_array_almost_equal(act_avg, mean(inp[:tlen], axis=0), 3)
+    assert_array_almost_equal(act_avg_dt, mean(inp[dt:], axis=0), 3)
+    # the off-diagonal entries are close to zero
+    assert_array_almost_equal(act_cov, des_cov, 4)
+
+def testCrossCovarianceMatrixMixed():
+    inp1 = _large_mean_input((1000, 3))
+    inp2 = inp1[:, :2] + 0.1 * numx_rand.random((1000, 2))
+    des_cov = _centered_cov(inp1, inp2)
+    with mdp.precision('mixed'):
+        cov = utils.CrossCovarianceMatrix(dtype='f')
+        for chunk1, chunk2 in zip(numx.split(inp1, 4), numx.split(inp2, 4)):
+            cov.update(chunk1, chunk2)
+        act_cov, act_avg1, act_avg2, act_tlen = cov.fix()
+    assert_array_almost_equal(act_avg1, mean(inp1, axis=0), 3)
+    assert_array_almost_equal(act_avg2, mean(inp2, axis=0), 3)
+    assert_array_almost_equal(act_cov, des_cov, 4)
+
+def testPrecisionMixedNodes():
+    # the error of the mixed policy grows with the condition number of the
+    # covariance matrix, so the sources are mixed by a rotation
+    src = numx_rand.random((1000, 4))
+    src[:, 0] = numx.sin(numx.linspace(0, 10, 1000))
+    inp = mult(src, utils.random_rot(4)) + 5.
+    for node_class in (mdp.nodes.PCANode, mdp.nodes.WhiteningNode,
+                       mdp.nodes.SFANode):
+        node = node_class()
+        node.train(inp)
+        with mdp.precision('mixed'):
+            mixed_node = node_class()
+            mixed_node.train(inp)
+            mixed_node.stop_training()
+        assert_type_equal(mixed_node.dtype, numx.dtype('f'))
+        out, mixed_out = node(inp), mixed_node(inp)
+        # execution in single precision
+        assert_type_equal(mixed_out.dtype, numx.dtype('f'))
+        mixed_out *= numx.sign((out * mixed_out).sum(axis=0))
+        assert_array_almost_equal(mixed_out, out, 3)
@@ -334,6 +334,8 @@ def CCIPCANode_inp_arg_gen():
          execute_arg_gen=_rand_labels_array),
     dict(klass='LinearRegressionNode',
          sup_arg_gen=_rand_array_halfdim),
+    dict(klass='AffineNode',
+         init_args=[mdp.numx.ones((5, 2)), mdp.numx.zeros(2)]),
     dict(klass='Convolution2DNode',
          init_args=[mdp.numx.array([[[1.]]]), (5,1)]),
     dict(klass='JADENode',
@@ -413,10 +415,11 @@ def generate_nodes_list(nodes_dicts):
     # they do not have a common API that would allow
     # automatic testing
     # XXX
-    for node_name in mdp.nodes.__dict__:
-        node = mdp.nodes.__dict__[node_name]
+    for node_name in dir(mdp.nodes):
+        if not node_name.endswith('ScikitsLearnNode'):
+            continue
+        node = getattr(mdp.nodes, node_name)
         if (inspect.isclass(node)
-            and node_name.endswith('ScikitsLearnNode')
             and (node not in visited)
             and (node not in excluded)):
             if issubclass(node, ClassifierNode):
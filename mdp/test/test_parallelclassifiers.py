@@ -86,3 +86,50 @@ def test_ParallelKNNClassifier():
     assert_array_almost_equal(node.samples, pnode.samples,
                               precision)
     assert node.n_samples == pnode.n_samples
+
+def test_ParallelSimpleMarkovClassifier():
+    """Test ParallelSimpleMarkovClassifier."""
+    xs = [numx_rand.randint(0, 3, (10, 2)) for _ in range(6)]
+    labels = [numx_rand.randint(0, 2, 10) for _ in range(6)]
+    node = mdp.nodes.SimpleMarkovClassifier()
+    pnode = parallel.ParallelSimpleMarkovClassifier()
+    for x, label in zip(xs, labels):
+        node.train(x, label)
+        forked_node = pnode.fork()
+        forked_node.train(x, label)
+        pnode.join(forked_node)
+    assert node.labels == pnode.labels
+    assert node.features == pnode.features
+    assert node.connections == pnode.connections
+    assert node.ntotal_connections == pnode.ntotal_connections
+    x = numx.concatenate(xs)
+    assert node.prob(x) == pnode.prob(x)
+
+def test_ParallelDiscreteHopfieldClassifier():
+    """Test ParallelDiscreteHopfieldClassifier."""
+    patterns = numx_rand.randint(0, 2, (6, 20)).astype('b')
+    node = mdp.nodes.DiscreteHopfieldClassifier()
+    pnode = parallel.ParallelDiscreteHopfieldClassifier()
+    for i in range(0, 6, 2):
+        node.train(patterns[i:i+2])
+        forked_node = pnode.fork()
+        forked_node.train(patterns[i:i+2])
+        pnode.join(forked_node)
+    node.stop_training()
+    pnode.stop_training()
+    assert_array_almost_equal(node._weight_matrix, pnode._weight_matrix)
+    assert node.load_parameter == pnode.load_parameter
+
+def test_ParallelClassifierCumulator():
+    """Test ParallelClassifierCumulator."""
+    xs = [numx_rand.random((5, 3)) for _ in range(4)]
+    labels = [1, 2, 1, 3]
+    pnode = parallel.ParallelClassifierCumulator()
+    for x, label in zip(xs, labels):
+        forked_node = pnode.fork()
+        forked_node.train(x, numx.repeat(label, 5))
+        pnode.join(forked_node)
+    pnode.stop_training()
+    assert pnode.tlen == 20
+    assert_array_equal(pnode.data, numx.concatenate(xs))
+    assert_array_equal(pnode.labels, numx.repeat(labels, 5))
@@ -200,12 +200,92 @@ def test_train_purge_nodes():
     data = n.random.random((30,10))
     mdp.activate_extension("parallel")
     try:
-        clbl = mdp.parallel.FlowTrainCallable(flownode)
+        clbl = mdp.parallel.FlowTrainCallable(flownode, train_state=False)
         flownode = clbl(data)
     finally:
         mdp.deactivate_extension("parallel")
     assert flownode._flow[1].__class__.__name__ == "_DummyNode"
+
+def test_train_state():
+    """Test that FlowTrainCallable returns the statistics of the node."""
+    x = n.random.random((100, 10))
+    flow = mdp.Flow([mdp.nodes.PCANode(output_dim=3),
+                     mdp.nodes.SFANode(output_dim=2)])
+    flow[0].train(x)
+    flow[0].stop_training()
+    sfa_node = mdp.nodes.SFANode(output_dim=2)
+    flownode = mdp.hinet.FlowNode(mdp.Flow([flow[0], sfa_node]))
+    mdp.activate_extension("parallel")
+    try:
+        states = [mdp.parallel.FlowTrainCallable(flownode.fork())(chunk)
+                  for chunk in (x[:50], x[50:])]
+        assert isinstance(states[0], parallel.TrainState)
+        # the trained PCANode is not part of the state
+        assert states[0].stats[0] is None
+        states[0].join(states[1])
+        flownode.join(states[0])
+    finally:
+        mdp.deactivate_extension("parallel")
+    flownode.stop_training()
+    y = flow[0].execute(x)
+    for chunk in (y[:50], y[50:]):
+        flow[1].train(chunk)
+    flow[1].stop_training()
+    assert_array_almost_equal(abs(flownode.execute(x)),
+                              abs(flow[1].execute(y)))
     
+def test_train_state_reduce():
+    """Test that the TrainStates are joined by reduce tasks."""
+    x = n.random.random((200, 5))
+    chunks = [x[i:i+20] for i in range(0, 200, 20)]
+    sfa_node = mdp.nodes.SFANode(output_dim=2)
+    for chunk in chunks:
+        sfa_node.train(chunk)
+    sfa_node.stop_training()
+    for scheduler in (parallel.Scheduler(), parallel.ThreadScheduler()):
+        scheduler.result_container = parallel.TrainResultContainer(
+                                                                reduce_size=3)
+        flow = parallel.ParallelFlow([mdp.nodes.SFANode(output_dim=2)])
+        flow.train([chunks], scheduler=scheduler)
+        # 10 training tasks and the reduce tasks 3 + 1 + 1
+        assert scheduler.task_counter == 15
+        scheduler.shutdown()
+        assert_array_almost_equal(abs(flow.execute(x)),
+                                  abs(sfa_node.execute(x)))
+
+def test_train_state_batches():
+    """Test that only the states of consecutive tasks are batched."""
+    x = n.random.random((60, 3))
+    container = parallel.TrainResultContainer(reduce_size=2)
+    node = mdp.nodes.PCANode()
+    reduce_callable = parallel.TrainStateReduceCallable()
+    mdp.activate_extension("parallel")
+    try:
+        # task 4 failed
+        for task_index, i in ((1, 0), (3, 2), (2, 1), (5, 3), (7, 5), (6, 4)):
+            forked = node.fork()
+            forked.train(x[10*i:10*(i+1)])
+            container.add_result(forked.get_train_state(), task_index)
+        batches = container.pop_state_batches()
+        assert [batch[:2] for batch in batches] == [(1, 2), (5, 6)]
+        assert container.pop_state_batches(final=True) == []
+        for task_index, batch in zip((8, 9), batches):
+            container.add_result(reduce_callable(batch), task_index)
+        batches = container.pop_state_batches()
+        assert [batch[:2] for batch in batches] == [(1, 3), (5, 7)]
+        for task_index, batch in zip((10, 11), batches):
+            container.add_result(reduce_callable(batch), task_index)
+        assert container.pop_state_batches(final=True) == []
+        node.join(container.get_results()[0])
+    finally:
+        mdp.deactivate_extension("parallel")
+    node.stop_training()
+    ref_node = mdp.nodes.PCANode()
+    ref_node.train(x)
+    ref_node.stop_training()
+    assert_array_almost_equal(node.avg, ref_node.avg)
+    assert_array_almost_equal(abs(node.v), abs(ref_node.v))
+
 def test_execute_fork():
     """Test the forking of a node based on use_execute_fork."""
     
@@ -32,6 +32,65 @@ def test_PCANode():
     y2 = parallel_pca_node.execute(x_test)
     assert_array_almost_equal(abs(y1), abs(y2), precision)
 
+def test_PCANode_train_state():
+    """Test joining the train states of forked PCANodes"""
+    x = numx_rand.random([100, 10]) * numx.arange(1, 11)
+    pca_node = mdp.nodes.PCANode()
+    parallel_pca_node = parallel.ParallelPCANode()
+    states = []
+    for i in range(4):
+        chunk = x[i*25:(i+1)*25]
+        pca_node.train(chunk)
+        forked_node = parallel_pca_node.fork()
+        forked_node.train(chunk)
+        states.append(forked_node.get_train_state())
+    # an untrained fork does not change the joined statistics
+    states.append(parallel_pca_node.fork().get_train_state())
+    for state in states[1:]:
+        states[0].join(state)
+    parallel_pca_node.join(states[0])
+    assert_array_almost_equal(pca_node._cov_mtx._cov_mtx,
+                              parallel_pca_node._cov_mtx._cov_mtx, 6)
+    assert parallel_pca_node._cov_mtx._tlen == 100
+
+def test_PCANode_mixed_precision():
+    """Test joining the shifted covariance sums of the mixed precision"""
+    x = 1000. + numx_rand.random([100, 5]) * numx.arange(1, 6)
+    with mdp.precision('mixed'):
+        pca_node = mdp.nodes.PCANode()
+        parallel_pca_node = parallel.ParallelPCANode()
+        for i in range(4):
+            chunk = x[i*25:(i+1)*25]
+            pca_node.train(chunk)
+            forked_node = parallel_pca_node.fork()
+            forked_node.train(chunk)
+            parallel_pca_node.join(forked_node)
+        pca_node.stop_training()
+        parallel_pca_node.stop_training()
+    assert_array_almost_equal(pca_node.avg, parallel_pca_node.avg, 3)
+    assert_array_almost_equal(abs(pca_node.v), abs(parallel_pca_node.v), 4)
+
+def test_RandomizedPCANode():
+    """Test Parallel RandomizedPCANode in the streaming mode"""
+    x = numx_rand.random([400, 10]) * 0.5**numx.arange(10)
+    node = mdp.nodes.RandomizedPCANode(input_dim=10, output_dim=3,
+                                       streaming=True)
+    parallel_node = parallel.ParallelRandomizedPCANode(input_dim=10,
+                                                       output_dim=3,
+                                                       streaming=True)
+    parallel_node._q = node._q = node._random_basis()
+    chunks = [x[i:i+100] for i in range(0, 400, 100)]
+    while node.is_training():
+        for chunk in chunks:
+            node.train(chunk)
+            forked_node = parallel_node.fork()
+            forked_node.train(chunk)
+            parallel_node.join(forked_node)
+        node.stop_training()
+        parallel_node.stop_training()
+    assert_array_almost_equal(node.d, parallel_node.d, 10)
+    assert_array_almost_equal(node.v, parallel_node.v, 10)
+
 def test_SFANode():
     """Test Parallel SFANode"""
     precision = 6
@@ -124,6 +183,161 @@ def test_ParallelHistogramNode_fraction():
         node.join(forked_node)
     assert len(node.data_hist) < 1000
 
+def test_ParallelHitParadeNode():
+    """Test ParallelHitParadeNode with well separated hits."""
+    x = numx_rand.random((300, 2))
+    x[20, 0], x[160, 0], x[250, 1] = 5, 4, 3
+    x[21, 0], x[161, 0], x[251, 1] = -5, -4, -3
+    node = mdp.nodes.HitParadeNode(2, 5)
+    parallel_node = parallel.ParallelHitParadeNode(2, 5)
+    for i in range(0, 300, 100):
+        chunk = x[i:i+100]
+        node.train(chunk)
+        forked_node = parallel_node.fork()
+        forked_node.train(chunk)
+        parallel_node.join(forked_node)
+    assert parallel_node.tlen == 300
+    for hits, parallel_hits in zip(node.get_maxima() + node.get_minima(),
+                                   parallel_node.get_maxima() +
+                                   parallel_node.get_minima()):
+        assert_array_equal(hits, parallel_hits)
+
+def test_ParallelHitParadeNode_join_order():
+    """Test ParallelHitParadeNode against serial training with hits closer
+    than d across the chunk boundaries and results that arrive in a
+    different order than their tasks."""
+    x = (numx_rand.random((500, 2)) - 0.5).cumsum(axis=0)
+    x[99, 0], x[101, 0], x[203, 1] = 50, 49, -50
+    x[198, 1], x[302, 0], x[299, 0] = -49, 60, 59
+    node = mdp.nodes.HitParadeNode(4, 5)
+    node.train(x)
+    parallel_node = parallel.ParallelHitParadeNode(4, 5)
+    parallel_node.train(x[:100])
+    forked_nodes = []
+    for i in range(100, 500, 100):
+        forked_node = parallel_node.fork()
+        forked_node.train(x[i:i+100])
+        forked_nodes.append(forked_node)
+    container = parallel.TrainResultContainer()
+    for task_index in [3, 1, 4, 2]:
+        container.add_result(forked_nodes[task_index - 1], task_index)
+    parallel_node.join(container.get_results()[0])
+    assert parallel_node.tlen == 500
+    for hits, parallel_hits in zip(node.get_maxima() + node.get_minima(),
+                                   parallel_node.get_maxima() +
+                                   parallel_node.get_minima()):
+        assert_array_equal(hits, parallel_hits)
+
+def test_ParallelLinearRegressionNode():
+    x = numx_rand.random((200, 4))
+    y = mult(x, numx_rand.random((4, 2))) + numx_rand.random((200, 2))
+    node = mdp.nodes.LinearRegressionNode()
+    parallel_node = parallel.ParallelLinearRegressionNode()
+    for i in range(0, 200, 50):
+        node.train(x[i:i+50], y[i:i+50])
+        forked_node = parallel_node.fork()
+        forked_node.train(x[i:i+50], y[i:i+50])
+        parallel_node.join(forked_node)
+    node.stop_training()
+    parallel_node.stop_training()
+    assert_array_almost_equal(node.beta, parallel_node.beta, 10)
+
+def _fork_join_train(node, chunks, *args):
+    """Train all training phases of node by forking for each chunk."""
+    while node.is_training():
+        for chunk in chunks:
+            forked_node = node.fork()
+            forked_node.train(chunk, *args)
+            node.join(forked_node)
+        node.stop_training()
+
+def test_ParallelISFANode():
+    x = numx_rand.random((400, 3))
+    node = mdp.nodes.ISFANode(lags=3)
+    parallel_node = parallel.ParallelISFANode(lags=3)
+    # the internal WhiteningNode is forked as well
+    with mdp.extension("parallel"):
+        for i in range(0, 400, 100):
+            node.train(x[i:i+100])
+            forked_node = parallel_node.fork()
+            forked_node.train(x[i:i+100])
+            parallel_node.join(forked_node)
+    for cov, parallel_cov in zip(node.covs, parallel_node.covs):
+        assert cov._tlen == parallel_cov._tlen
+        assert_array_almost_equal(cov._cov_mtx, parallel_cov._cov_mtx, 10)
+        assert_array_almost_equal(cov._avg_dt, parallel_cov._avg_dt, 10)
+    assert_array_almost_equal(node.white._cov_mtx._cov_mtx,
+                              parallel_node.white._cov_mtx._cov_mtx, 10)
+
+def test_ParallelEtaComputerNode():
+    x = numx_rand.random((400, 3))
+    node = mdp.nodes.EtaComputerNode()
+    parallel_node = parallel.ParallelEtaComputerNode()
+    chunks = [x[i:i+100] for i in range(0, 400, 100)]
+    for chunk in chunks:
+        node.train(chunk)
+    _fork_join_train(parallel_node, chunks)
+    assert_array_almost_equal(node.get_eta(100), parallel_node.get_eta(100),
+                              10)
+
+def test_ParallelNormalizeNode():
+    x = numx_rand.random((400, 3)) * numx.arange(1, 4)
+    node = mdp.nodes.NormalizeNode()
+    parallel_node = parallel.ParallelNormalizeNode()
+    chunks = [x[i:i+100] for i in range(0, 400, 100)]
+    for chunk in chunks:
+        node.train(chunk)
+    _fork_join_train(parallel_node, chunks)
+    assert_array_almost_equal(node(x), parallel_node(x), 10)
+
+def test_ParallelRBMNode():
+    v = numx_rand.randint(0, 2, (200, 6)).astype('d')
+    parallel_node = parallel.ParallelRBMNode(3, 6)
+    forked_nodes = [parallel_node.fork() for _ in range(2)]
+    w, bv, bh = (forked_nodes[0].w.copy(), forked_nodes[0].bv.copy(),
+                 forked_nodes[0].bh.copy())
+    for forked_node, chunk in zip(forked_nodes, [v[:100], v[100:]]):
+        forked_node.train(chunk, batch_size=20)
+    for forked_node in forked_nodes:
+        parallel_node.join(forked_node)
+    # the updates of the forked nodes are averaged
+    for param, start, name in [(parallel_node.w, w, "w"),
+                               (parallel_node.bv, bv, "bv"),
+                               (parallel_node.bh, bh, "bh")]:
+        update = sum(getattr(forked_node, name) - start
+                     for forked_node in forked_nodes) / 2.
+        assert_array_almost_equal(param, start + update, 10)
+    # a new fork starts from the averaged parameters
+    assert_array_equal(parallel_node.fork().w, parallel_node.w)
+    parallel_node.stop_training()
+
+def test_ParallelRBMNode_flow():
+    """Test that the updates are averaged when the forks are first joined
+    with each other by the TrainResultContainer of a ParallelFlow."""
+    v = numx_rand.randint(0, 2, (400, 6)).astype('d')
+    chunks = [v[i:i+100] for i in range(0, 400, 100)]
+    node = mdp.nodes.RBMNode(3, 6)
+    node._init_weights()
+    start_node = node.copy()
+    rand_state = numx_rand.get_state()
+    flow = parallel.ParallelFlow([node])
+    flow.train([chunks], scheduler=parallel.Scheduler())
+    # the scheduler trains the forks one after the other, so the same
+    # random numbers are used when the chunks are trained one by one
+    numx_rand.set_state(rand_state)
+    names = ["w", "bv", "bh"]
+    update_sums = dict((name, 0.) for name in names)
+    for chunk in chunks:
+        chunk_node = start_node.copy()
+        chunk_node.train(chunk)
+        for name in names:
+            update_sums[name] += (getattr(chunk_node, name) -
+                                  getattr(start_node, name))
+    for name in names:
+        assert_array_almost_equal(getattr(node, name),
+                                  getattr(start_node, name) +
+                                  update_sums[name] / len(chunks), 10)
+
 
 class TestDerivedParallelMDPNodes(object):
     """Test derived nodes that use the parallel node classes."""
@@ -175,3 +389,80 @@ def test_SFA2Node(self):
         node.stop_training()
         node.execute(x_test)
 
+    def test_TDSEPNode(self):
+        """Test Parallel TDSEPNode"""
+        x = numx_rand.random((400, 3))
+        node = mdp.nodes.TDSEPNode(lags=2)
+        chunks = [x[i:i+100] for i in range(0, 400, 100)]
+        for chunk in chunks:
+            forked_node = node.fork()
+            forked_node.train(chunk)
+            node.join(forked_node)
+        assert sum(cov._tlen for cov in node.covs) == 2*400 - 4*(1+2)
+        node.stop_training()
+        node.execute(x)
+
+    def test_Cumulators(self):
+        """Test that forked Cumulator nodes collect the same data."""
+        x = numx_rand.random((400, 4))
+        chunks = [x[i:i+100] for i in range(0, 400, 100)]
+        for node_class, kwargs in [(mdp.nodes.CuBICANode, {}),
+                                   (mdp.nodes.FastICANode, {}),
+                                   (mdp.nodes.JADENode, {}),
+                                   (mdp.nodes.NIPALSNode, {}),
+                                   (mdp.nodes.LLENode, {'k': 8})]:
+            node = node_class(**kwargs)
+            forked_node = node.fork()
+            forked_node.train(chunks[0])
+            node.join(forked_node)
+            # the collected data must not be passed on to new forks
+            forked_node = node.fork()
+            assert forked_node.data == []
+            assert forked_node.tlen == 0
+            for chunk in chunks[1:]:
+                forked_node = node.fork()
+                forked_node.train(chunk)
+                node.join(forked_node)
+            assert node.tlen == 400
+            assert_array_equal(numx.concatenate(node.data), x)
+
+    def test_CuBICANode(self):
+        """Test Parallel CuBICANode against serial training"""
+        x = numx_rand.random((400, 3)) - 0.5
+        x = mult(x, mdp.utils.random_rot(3))
+        chunks = [x[i:i+100] for i in range(0, 400, 100)]
+        node = mdp.nodes.CuBICANode()
+        for chunk in chunks:
+            node.train(chunk)
+        node.stop_training()
+        parallel_node = mdp.nodes.CuBICANode()
+        _fork_join_train(parallel_node, chunks)
+        assert_array_almost_equal(node(x), parallel_node(x), 6)
+
+    def test_XSFANode(self):
+        """Test Parallel XSFANode against serial training"""
+        x = numx_rand.random((500, 2)) * 2 - 1
+        x[:, 0] = numx.sin(numx.arange(500) / 20.) + 0.1 * x[:, 0]
+        chunks = [x[:250], x[250:]]
+        node = mdp.nodes.XSFANode(input_dim=2)
+        while node.is_training():
+            for chunk in chunks:
+                node.train(chunk)
+            node.stop_training()
+        parallel_node = mdp.nodes.XSFANode(input_dim=2)
+        _fork_join_train(parallel_node, chunks)
+        assert_array_almost_equal(abs(node(x)), abs(parallel_node(x)), 5)
+
+    def test_XSFANode_no_input_dim(self):
+        """Test that the first fork needs the input dimension"""
+        node = mdp.nodes.XSFANode()
+        py.test.raises(parallel.NotForkableParallelException, node.fork)
+
+    def test_ProjectionNode_fork_dtype(self):
+        """Test that the forked ProjectionNode keeps the dtype"""
+        node = parallel.ParallelProjectionNode(1, 2, dtype='float32')
+        forked_node = node.fork()
+        assert forked_node.output_dim == node.output_dim
+        assert forked_node.L == 2
+        assert forked_node.dtype == numx.dtype('float32')
+        assert forked_node._cov_mtx._dtype == numx.dtype('float32')
@@ -1,7 +1,14 @@
 from builtins import range
+import io
+import os
+import sys
+import tempfile
+
 from ._tools import *
 
 import mdp.parallel as parallel
+from mdp.parallel.process_schedule import _process_memory
+process_schedule = sys.modules['mdp.parallel.process_schedule']
 n = numx
 
 def test_process_scheduler_shutdown():
@@ -96,3 +103,137 @@ def test_process_scheduler_mdp_version():
     # check that we get 2 identical dictionaries
     assert out[0] == out[1], 'Subprocesses did not run '\
         'the same MDP as the parent:\n%s\n--\n%s'%(out[0], out[1])
+
+
+class _PidCallable(parallel.TaskCallable):
+    """Return the pid of the worker process."""
+
+    def __call__(self, data):
+        return os.getpid()
+
+
+class _CrashCallable(parallel.TaskCallable):
+    """Kill the worker process unless the marker file exists, which is
+    created by the first call."""
+
+    def __call__(self, marker):
+        if marker is None or not os.path.exists(marker):
+            if marker is not None:
+                open(marker, 'w').close()
+            os._exit(1)
+        return os.getpid()
+
+
+def _fork_server_scheduler(**kwargs):
+    if not hasattr(os, 'fork'):
+        py.test.skip("ForkServerScheduler requires os.fork")
+    return parallel.ForkServerScheduler(verbose=False, source_paths=None,
+                                        **kwargs)
+
+def test_fork_server_scheduler():
+    """Test the fork server scheduler with real Nodes."""
+    x = mdp.numx_rand.random((4, 100, 10))
+    flow = mdp.parallel.ParallelFlow([mdp.nodes.PCANode(output_dim=5)])
+    with _fork_server_scheduler(n_processes=2) as scheduler:
+        flow.train([x], scheduler=scheduler)
+        y = flow.execute(list(x), scheduler=scheduler)
+    assert flow[0].tlen == 400
+    assert_array_almost_equal(y, flow.execute(n.concatenate(x)))
+
+def test_fork_server_restart():
+    """Test that a crashed worker is replaced and the task is retried."""
+    marker = os.path.join(tempfile.mkdtemp(dir=py.test.mdp_tempdirname),
+                          'crashed')
+    with _fork_server_scheduler(n_processes=1) as scheduler:
+        pid = scheduler._free_processes[0].pid
+        scheduler.add_task(marker, _CrashCallable())
+        results = scheduler.get_results()
+        assert results[0] != pid
+        assert os.path.exists(marker)
+        # a task failing in every worker gives a None result
+        scheduler.add_task(None, _CrashCallable())
+        assert scheduler.get_results() == (None,)
+        scheduler.add_task(2, parallel.SqrTestCallable())
+        assert scheduler.get_results() == (4,)
+
+def test_fork_server_recycle():
+    """Test that the workers are recycled after max_tasks_per_process."""
+    with _fork_server_scheduler(n_processes=1,
+                                max_tasks_per_process=2) as scheduler:
+        for i in range(6):
+            scheduler.add_task(i, _PidCallable())
+        pids = scheduler.get_results()
+    assert len(set(pids)) == 3
+
+def test_fork_server_memory_limit():
+    """Test that the workers are recycled above max_memory."""
+    if _process_memory(os.getpid()) is None:
+        py.test.skip("process memory is not available")
+    with _fork_server_scheduler(n_processes=1, max_memory=1) as scheduler:
+        for i in range(3):
+            scheduler.add_task(i, _PidCallable())
+        pids = scheduler.get_results()
+    assert len(set(pids)) == 3
+
+def test_process_scheduler_restart():
+    """Test that a crashed process is replaced by the ProcessScheduler."""
+    with parallel.ProcessScheduler(verbose=False, n_processes=1,
+                                   source_paths=None) as scheduler:
+        scheduler.add_task(None, _CrashCallable())
+        assert scheduler.get_results() == (None,)
+        scheduler.add_task(3, parallel.SqrTestCallable())
+        assert scheduler.get_results() == (9,)
+
+class _ArrayCallable(parallel.TaskCallable):
+    """Return the sum of the array plus the data."""
+
+    def __init__(self, array):
+        self.array = array
+
+    def __call__(self, data):
+        return self.array.sum() + data, self.array.flags.writeable
+
+
+def test_process_scheduler_delta():
+    """Test that the large arrays of a callable are sent only once."""
+    array = n.arange(2 * process_schedule.BROADCAST_MIN_BYTES // 8,
+                     dtype='d')
+    small = n.arange(10.)
+    with parallel.ProcessScheduler(verbose=False, n_processes=1,
+                                   source_paths=None) as scheduler:
+        process = scheduler._free_processes[0]
+        callable_ = _ArrayCallable(array)
+        scheduler._last_callable_index += 1
+        process._callable_index = -1
+        pickled, hashes, missing = scheduler._callable_delta(process,
+                                                             callable_)
+        assert len(hashes) == 1 and list(missing) == hashes
+        # the array is replaced by its hash in the pickled callable
+        assert len(pickled) < array.nbytes
+        # a new callable with the same array only needs the new arrays
+        pickled, hashes, missing = scheduler._callable_delta(
+            process, _ArrayCallable([array, small]))
+        assert len(hashes) == 1 and missing == {}
+        # nothing was sent to the process
+        process._array_versions.clear()
+        # the store in the process reconstructs the callables
+        for offset in range(3):
+            scheduler.add_task(offset, _ArrayCallable(array))
+        results = scheduler.get_results()
+    assert [result[0] for result in results] == [array.sum() + i
+                                                 for i in range(3)]
+    assert not any(result[1] for result in results)
+
+def test_callable_store():
+    """Test that the store keeps only the arrays of the recent callables."""
+    arrays = [n.ones(process_schedule.BROADCAST_MIN_BYTES // 8) * i
+              for i in range(3)]
+    store = process_schedule._CallableStore()
+    for i in range(3):
+        pickled = io.BytesIO()
+        pickler = process_schedule._CallablePickler(pickled)
+        pickler.dump(arrays[i])
+        loaded = store.load(pickled.getvalue(), list(pickler.arrays),
+                            pickler.arrays)
+        assert_array_equal(loaded, arrays[i])
+    assert len(store._arrays) == process_schedule.CALLABLE_STORE_VERSIONS
@@ -0,0 +1,176 @@
+"""Test the profile extension."""
+from builtins import range
+import json
+import os
+import sys
+import tempfile
+import warnings
+
+from ._tools import *
+from mdp import parallel
+
+
+def _flow():
+    return mdp.Flow([mdp.nodes.PCANode(output_dim=3),
+                     mdp.nodes.PolynomialExpansionNode(degree=2),
+                     mdp.nodes.SFANode(output_dim=2)])
+
+def _calls(records, label):
+    # number of calls of label at any nesting level
+    return sum(record['calls'] for path, record in records.items()
+               if path[-1] == label)
+
+def test_import_defers_profiling():
+    code = ("import sys, mdp; "
+            "print('mdp.profiling' in sys.modules); "
+            "print(mdp.profiling.__name__)")
+    output = run_python(code).split()
+    assert output[1] == 'mdp.profiling'
+    if sys.version_info >= (3, 7):
+        assert output[0] == 'False'
+
+def test_profile_extension():
+    x = numx_rand.random((100, 5))
+    flow = _flow()
+    with mdp.profiling.profile() as prof:
+        assert mdp.get_active_extensions() == ['profile']
+        flow.train(x)
+        y = flow(x)
+    assert mdp.get_active_extensions() == []
+    records = prof.records
+    pca_train = records[('PCANode.train',)]
+    assert pca_train['calls'] == 1
+    assert pca_train['bytes_in'] == x.nbytes
+    assert pca_train['bytes_out'] == 0
+    assert pca_train['flops'] == 2 * 100 * 5**2
+    # the data is executed by the PCANode for the training of the SFANode
+    # and once more by the flow
+    assert records[('PCANode.execute',)]['calls'] == 2
+    sfa_execute = records[('SFANode.execute',)]
+    assert sfa_execute['calls'] == 1
+    assert sfa_execute['bytes_out'] == y.nbytes
+    assert sfa_execute['flops'] == 2 * 100 * 9 * 2
+    assert records[('PolynomialExpansionNode.execute',)]['flops'] is None
+    assert ('SFANode.stop_training',) in records
+    for record in records.values():
+        assert record['wall'] >= record['self_wall'] >= 0
+        assert record['peak_memory'] is None
+    assert len(prof.events) == sum(record['calls']
+                                   for record in records.values())
+    # nothing is recorded after the deactivation
+    flow(x)
+    assert records[('SFANode.execute',)]['calls'] == 1
+
+def test_profile_nesting():
+    x = numx_rand.random((50, 4))
+    flownode = mdp.hinet.FlowNode(mdp.Flow([mdp.nodes.PCANode(input_dim=4),
+                                            mdp.nodes.SFANode()]))
+    layer = mdp.hinet.Layer([flownode, mdp.nodes.IdentityNode(input_dim=2)])
+    x = numx.concatenate([x, x[:, :2]], axis=1)
+    with mdp.profiling.profile() as prof:
+        # one training phase for each node of the FlowNode
+        for _ in range(2):
+            layer.train(x)
+            layer.stop_training()
+    records = prof.records
+    path = ('Layer.train', 'FlowNode.train', 'PCANode.execute')
+    assert records[path]['calls'] == 1
+    layer_train = records[('Layer.train',)]
+    nested = sum(record['wall'] for path, record in records.items()
+                 if path[:1] == ('Layer.train',) and len(path) == 2)
+    assert_almost_equal(layer_train['self_wall'],
+                        layer_train['wall'] - nested)
+    table = prof.table()
+    lines = table.split('\n')
+    assert len(lines) == len(records) + 2
+    assert '    PCANode.execute' in table
+
+def test_profile_export():
+    x = numx_rand.random((100, 5))
+    with mdp.profiling.profile() as prof:
+        _flow().train(x)
+    tempdir = tempfile.mkdtemp(dir=py.test.mdp_tempdirname)
+    json_name = os.path.join(tempdir, 'profile.json')
+    prof.save_json(json_name)
+    with open(json_name) as json_file:
+        records = json.load(json_file)['records']
+    assert len(records) == len(prof.records)
+    assert 'PCANode.train' in [record['path'] for record in records]
+    trace_name = os.path.join(tempdir, 'trace.json')
+    prof.save_chrome_trace(trace_name)
+    with open(trace_name) as json_file:
+        events = json.load(json_file)['traceEvents']
+    assert len(events) == len(prof.events)
+    event = events[0]
+    assert event['ph'] == 'X'
+    assert event['pid'] == os.getpid()
+    assert event['dur'] >= 0
+
+def test_profile_no_events():
+    with mdp.profiling.profile(events=False) as prof:
+        _flow().train(numx_rand.random((100, 5)))
+    assert len(prof.records) > 0
+    assert prof.events == []
+
+def test_profile_memory():
+    x = numx_rand.random((1000, 5))
+    node = mdp.nodes.PolynomialExpansionNode(degree=2)
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        with mdp.profiling.profile(memory=True) as prof:
+            y = node(x)
+    peak = prof.records[('PolynomialExpansionNode.execute',)]['peak_memory']
+    if sys.version_info >= (3, 9):
+        assert peak >= y.nbytes
+    else:
+        assert peak is None
+        assert issubclass(caught[0].category, mdp.MDPWarning)
+
+def test_profile_merge():
+    x = numx_rand.random((100, 5))
+    profiles = []
+    for _ in range(2):
+        with mdp.profiling.profile() as prof:
+            _flow().train(x)
+        profiles.append(prof)
+    merged = mdp.profiling.Profile()
+    for prof in profiles:
+        merged.merge(prof)
+    assert merged.records[('PCANode.train',)]['calls'] == 2
+    assert (merged.records[('PCANode.train',)]['flops'] ==
+            2 * profiles[0].records[('PCANode.train',)]['flops'])
+
+def test_profile_subclass_flops():
+    # SFA2Node changes the execution of SFANode
+    x = numx_rand.random((100, 3))
+    node = mdp.nodes.SFA2Node()
+    node.train(x)
+    node.stop_training()
+    assert mdp.profiling.estimate_flops(node, 'execute', x) is None
+    assert mdp.profiling.estimate_flops(mdp.nodes.SFANode(input_dim=3,
+                                                          output_dim=2),
+                                        'execute', x) == 2 * 100 * 3 * 2
+
+def test_profile_process_scheduler():
+    x = numx_rand.random((4, 100, 5))
+    flow = mdp.parallel.ParallelFlow(_flow())
+    with mdp.profiling.profile() as prof:
+        with parallel.ProcessScheduler(verbose=False,
+                                       n_processes=2) as scheduler:
+            flow.train([x, None, x], scheduler=scheduler)
+    records = prof.records
+    # the training of the node forks is recorded in the processes
+    assert _calls(records, 'PCANode.train') == 4
+    assert _calls(records, 'SFANode.train') == 4
+    pids = set(event[3] for event in prof.events)
+    assert os.getpid() in pids
+    assert len(pids) > 1
+
+def test_profile_thread_scheduler():
+    x = numx_rand.random((4, 100, 5))
+    flow = mdp.parallel.ParallelFlow(_flow())
+    with mdp.profiling.profile() as prof:
+        scheduler = parallel.ThreadScheduler(n_threads=2)
+        flow.train([x, None, x], scheduler=scheduler)
+        scheduler.shutdown()
+    assert _calls(prof.records, 'PCANode.train') == 4
@@ -4,5 +4,9 @@
     from imp import reload
 
 def test_reload():
+    import sys
     import mdp
     reload(mdp)
+    # the submodules still refer to the reloaded module
+    assert sys.modules['mdp'] is mdp
+    assert mdp.utils._symeig.mdp.MDPException is mdp.MDPException
@@ -39,6 +39,45 @@ def test_introspection():
     keys = ['_bias', 'avg', 'd', 'davg', 'sf']
     assert sorted(a_sfa.keys()) == keys, 'Wrong arrays in SFANode'
 
+def test_node_size_shared_buffers():
+    node = BogusNode()
+    base = numx_rand.random((100, 10))
+    node.a = base
+    node.b = base[::2]
+    node.c = [base.T, {'d': base[3]}]
+    node.e = numx.frombuffer(numx_rand.random(50).tobytes())
+    size = utils.get_node_size(node)
+    arrays = base.nbytes + node.e.nbytes
+    assert arrays < size < arrays + 2000
+    breakdown = utils.get_node_size_breakdown(node)
+    assert sum(breakdown.values()) == size
+    # the buffer is attributed to the first attribute, the views are free
+    assert breakdown['a'] == base.nbytes
+    assert 'b' not in breakdown
+    assert breakdown['e'] == node.e.nbytes
+    # cyclic references are visited once
+    node.c.append(node)
+    assert size <= utils.get_node_size(node) < size + 100
+
+def test_node_size_breakdown_flow():
+    x = numx_rand.random((100, 4))
+    flow = mdp.Flow([nodes.PCANode(), nodes.SFANode()])
+    flow.train(x)
+    size = utils.get_node_size(flow)
+    breakdown = utils.get_node_size_breakdown(flow, depth=2)
+    assert sum(breakdown.values()) == size
+    assert breakdown['flow[0]'] == utils.get_node_size(flow[0])
+    assert breakdown['flow[0]'] > flow[0].v.nbytes
+    # nodes sharing an array
+    matrix = numx_rand.random((4, 4))
+    layer = mdp.hinet.Layer([nodes.AffineNode(matrix) for _ in range(10)])
+    breakdown = utils.get_node_size_breakdown(layer, depth=3)
+    assert breakdown['nodes[0].matrix'] == matrix.nbytes
+    assert 'nodes[1].matrix' not in breakdown
+    nodes_size = sum(size for key, size in breakdown.items()
+                     if key.startswith('nodes'))
+    assert utils.get_node_size_breakdown(layer)['nodes'] == nodes_size
+
 def test_random_rot():
     dim = 20
     tlen = 10
@@ -105,6 +144,112 @@ def test_symeig_fake_LAPACK_bug():
     val, vec = utils._symeig._symeig_fake(y)
     assert_almost_equal(abs(numx_linalg.det(vec)), 1., 12)
 
+def _posdef(dim):
+    x = numx_rand.random((3*dim, dim))
+    return utils.mult(x.T, x)
+
+@py.test.mark.skipif('mdp.numx_description != "scipy"')
+def test_symeig_lapack_drivers():
+    a, b = _posdef(20), _posdef(20)
+    w0, z0 = utils._symeig.wrap_eigh(a)
+    for driver in utils._symeig.STANDARD_DRIVERS:
+        w, z = utils.symeig_lapack(a, range=(3, 8), driver=driver)
+        assert_array_almost_equal(w, w0[2:8], 10)
+        assert_array_almost_equal(abs(z), abs(z0[:, 2:8]), 8)
+    w0, z0 = utils._symeig.wrap_eigh(a, b)
+    for driver in utils._symeig.GENERALIZED_DRIVERS:
+        w, z = utils.symeig_lapack(a, b, range=(3, 8), driver=driver)
+        assert_array_almost_equal(w, w0[2:8], 10)
+        assert_array_almost_equal(abs(z), abs(z0[:, 2:8]), 8)
+    py.test.raises(mdp.MDPException, utils.symeig_lapack, a, driver='gvx')
+    py.test.raises(mdp.MDPException, utils.symeig_lapack, a, b,
+                   driver='evr')
+
+@py.test.mark.skipif('mdp.numx_description != "scipy"')
+def test_symeig_lapack_value_range():
+    a, b = _posdef(20), _posdef(20)
+    for bb in (None, b):
+        w0 = utils._symeig.wrap_eigh(a, bb, eigenvectors=False)
+        vl, vu = (w0[4] + w0[5]) / 2, (w0[11] + w0[12]) / 2
+        w, z = utils.symeig_lapack(a, bb, value_range=(vl, vu))
+        assert_array_almost_equal(w, w0[5:12], 10)
+        assert z.shape == (20, 7)
+    w, z = utils.symeig_lapack(a, value_range=(-2., -1.))
+    assert w.shape == (0,) and z.shape == (20, 0)
+    py.test.raises(mdp.MDPException, utils.symeig_lapack, a,
+                   range=(1, 2), value_range=(0., 1.))
+
+@py.test.mark.skipif('mdp.numx_description != "scipy"')
+def test_symeig_lapack_single_precision():
+    a = _posdef(20)
+    w0, z0 = utils._symeig.wrap_eigh(a)
+    w, z = utils.symeig_lapack(a, dtype='f')
+    assert w.dtype == z.dtype == numx.dtype('d')
+    assert_array_almost_equal(w / w0[-1], w0 / w0[-1], 5)
+
+@py.test.mark.skipif('mdp.numx_description != "scipy"')
+def test_symeig_lapack_cached_cholesky():
+    a1, a2, b = _posdef(20), _posdef(20), _posdef(20)
+    cache = utils._symeig._cholesky_cache
+    cache.clear()
+    for a in (a1, a2):
+        w0, z0 = utils._symeig.wrap_eigh(a, b, range=(1, 5))
+        w, z = utils.symeig_lapack(a, b, range=(1, 5), cache_cholesky=True)
+        assert_array_almost_equal(w, w0, 10)
+        assert_array_almost_equal(abs(z), abs(z0), 8)
+    factor = cache._l
+    utils.symeig_lapack(a1, b.copy(), cache_cholesky=True)
+    assert cache._l is factor
+    utils.symeig_lapack(a1, 2*b, cache_cholesky=True)
+    assert cache._l is not factor
+    cache.clear()
+
+@py.test.mark.skipif('mdp.numx_description != "scipy"')
+def test_set_eigensolver():
+    a = _posdef(20)
+    w0 = utils.symeig(a, eigenvectors=False)
+    try:
+        utils.set_eigensolver('lapack', driver='evd', dtype='f')
+        assert utils.get_eigensolver() == ('lapack',
+                                           {'driver': 'evd', 'dtype': 'f'})
+        w = mdp.utils.symeig(a, eigenvectors=False)
+        assert_array_almost_equal(w / w0[-1], w0 / w0[-1], 5)
+        # nodes use the selected solver
+        x = numx_rand.random((100, 20))
+        pca = mdp.nodes.PCANode(solver='dense')
+        pca.train(x)
+        pca.stop_training()
+        # iterative solvers fall back to the full solver
+        utils.set_eigensolver('arpack')
+        assert utils.get_symeig_solver('dense') is not utils.symeig_arpack
+        w = mdp.utils.symeig(a, eigenvectors=False)
+        assert_array_almost_equal(w / w0[-1], w0 / w0[-1], 5)
+        py.test.raises(mdp.MDPException, utils.set_eigensolver, 'lapack',
+                       driver='xyz')
+        py.test.raises(mdp.MDPException, utils.set_eigensolver, 'foo')
+    finally:
+        utils.set_eigensolver('dense')
+    assert utils.get_eigensolver() == ('dense', {})
+    assert_array_almost_equal(mdp.utils.symeig(a, eigenvectors=False), w0)
+
+def test_register_eigensolver():
+    calls = []
+    def solver(A, B=None, eigenvectors=True, turbo="on", range=None,
+               type=1, overwrite=False):
+        calls.append(A.shape)
+        return utils._symeig._symeig_fake(A, B, eigenvectors, turbo, range)
+    utils.register_eigensolver('test_solver', solver)
+    try:
+        py.test.raises(mdp.MDPException, utils.register_eigensolver,
+                       'test_solver', solver)
+        assert utils.get_symeig_solver('test_solver') is solver
+        utils.set_eigensolver('test_solver')
+        mdp.utils.symeig(_posdef(3))
+        assert calls == [(3, 3)]
+    finally:
+        utils.set_eigensolver('dense')
+        del utils._symeig._SOLVERS['test_solver']
+
 def test_QuadraticForm_extrema():
     # TODO: add some real test
     # check H with negligible linear term
@@ -48,6 +48,8 @@ def test_geneigenproblem(dtype, range, func):
 test_geneigenproblem.funcs = [utils._symeig._symeig_fake]
 if mdp.utils.symeig is utils._symeig.wrap_eigh:
     test_geneigenproblem.funcs.append(utils._symeig.wrap_eigh)
+if mdp.numx_description == 'scipy':
+    test_geneigenproblem.funcs.append(utils.symeig_lapack)
 
 test_eigenproblem.funcs = test_geneigenproblem.funcs + [utils.nongeneral_svd]
 
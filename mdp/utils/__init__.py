@@ -21,7 +21,8 @@
 except ImportError:
     from .temporarydir import TemporaryDirectory
 
-from .introspection import dig_node, get_node_size, get_node_size_str
+from .introspection import (dig_node, get_node_size, get_node_size_str,
+                            get_node_size_breakdown)
 from .quad_forms import QuadraticForm, QuadraticFormException
 from .covariance import (CovarianceMatrix, DelayCovarianceMatrix,
                         MultipleCovarianceMatrices,CrossCovarianceMatrix)
@@ -31,7 +32,12 @@
                        SectionHTMLSlideShow, SectionImageHTMLSlideShow,
                        image_slideshow, show_image_slideshow)
 
-from ._symeig import SymeigException
+from ._symeig import (SymeigException, symeig_arpack, symeig_lobpcg,
+                      symeig_auto, symeig_lapack, get_symeig_solver,
+                      register_eigensolver, set_eigensolver, get_eigensolver)
+
+from ._precision import (precision, set_precision, get_precision,
+                         storage_dtype, accumulator_dtype)
 
 import mdp as _mdp
 # matrix multiplication function
@@ -66,6 +72,28 @@ def matmult(a,b, alpha=1.0, beta=0.0, c=None, trans_a=0, trans_b=0):
 _solve = _mdp.numx_linalg.solve
 solve = lambda x, y: refcast(_solve(x, y), x.dtype)
 
+if _mdp.numx_description == 'scipy':
+    _cholesky = lambda x: _mdp.numx_linalg.cholesky(x, lower=True)
+else:
+    _cholesky = _mdp.numx_linalg.cholesky
+def cholesky(x):
+    """Return the lower triangular Cholesky factor L of x (x = L L^T).
+
+    numpy and scipy differ in the default triangle of the factor, this
+    wrapper always returns the lower one."""
+    return refcast(_cholesky(x), x.dtype)
+
+def solve_triangular(a, b, lower=True):
+    """Solve a x = b for x, where a is a (lower or upper) triangular matrix.
+
+    The triangular solver is provided by scipy, with numpy the general
+    solver is used."""
+    if _mdp.numx_description == 'scipy':
+        x = _mdp.numx_linalg.solve_triangular(a, b, lower=lower)
+    else:
+        x = _solve(a, b)
+    return refcast(x, a.dtype)
+
 def svd(x, compute_uv = True):
     """Wrap the numx SVD routine, so that it returns arrays of the correct
     dtype and a SymeigException in case of failures."""
@@ -83,10 +111,15 @@ def svd(x, compute_uv = True):
 __all__ = ['CovarianceMatrix', 'DelayCovarianceMatrix','CrossCovarianceMatrix',
            'MultipleCovarianceMatrices', 'QuadraticForm',
            'QuadraticFormException',
-           'comb', 'cov2', 'dig_node', 'get_dtypes', 'get_node_size',
+           'cholesky', 'comb', 'cov2', 'dig_node', 'get_dtypes', 'get_node_size',
+           'get_node_size_breakdown',
+           'get_eigensolver', 'get_symeig_solver', 'register_eigensolver',
+           'set_eigensolver', 'symeig_arpack', 'symeig_auto',
+           'symeig_lapack', 'symeig_lobpcg',
            'hermitian', 'inv', 'mult', 'mult_diag', 'nongeneral_svd',
            'norm2', 'permute', 'pinv', 'progressinfo',
-           'random_rot', 'refcast', 'rotate', 'scast', 'solve', 'sqrtm',
+           'random_rot', 'refcast', 'rotate', 'scast', 'solve',
+           'solve_triangular', 'sqrtm',
            'svd', 'symrand', 'timediff', 'matmult',
            'HTMLSlideShow', 'ImageHTMLSlideShow',
            'basic_css', 'slideshow_css', 'image_slideshow_css',
@@ -95,7 +128,9 @@ def svd(x, compute_uv = True):
            'lrep', 'rrep', 'irep',
            'orthogonal_permutations', 'izip_stretched',
            'weighted_choice', 'bool_to_sign', 'sign_to_bool',
-           'OrderedDict', 'TemporaryDirectory', 'gabor', 'fixup_namespace']
+           'OrderedDict', 'TemporaryDirectory', 'gabor', 'fixup_namespace',
+           'precision', 'set_precision', 'get_precision', 'storage_dtype',
+           'accumulator_dtype']
 
 def _without_prefix(name, prefix):
     if name.startswith(prefix):
@@ -0,0 +1,390 @@
+"""
+Array-native archive format for nodes and flows.
+
+`save` stores an object (usually a node or a flow) as JSON metadata, which
+describes the object structure, followed by the raw data of its arrays.
+Each array starts at a 64 byte aligned offset, so that `load` can map
+them from the file with ``mmap=True``: the arrays are then read lazily
+by the operating system, and the processes which load the same archive
+share the memory pages through the page cache instead of holding their
+own copies. The layout of the file is::
+
+    MAGIC (8 bytes) | header length (8 bytes, little endian) |
+    JSON header | padding | array data ...
+
+The header holds the ``format_version`` of the archive, the MDP version
+that wrote it, the table of the arrays (dtype, shape, order and offset
+relative to the start of the data) and the encoded object. Instances are
+encoded by class name and attributes (or the state returned by
+``__getstate__``), numpy arrays and scalars by reference to the array
+table. Objects which cannot be described this way (e.g. functions or
+random number generators) are embedded as pickles.
+"""
+from builtins import range
+from builtins import object
+import base64
+import contextlib
+import json
+import mmap as _mmap
+import os
+import pickle
+import stat
+import struct
+import sys
+import tempfile
+import types
+from importlib import import_module
+
+import mdp
+from mdp import numx
+
+MAGIC = b'MDPARCH\x00'
+# version of the archive format, increased for incompatible changes
+ARCHIVE_VERSION = 1
+
+_ALIGNMENT = 64
+_HEADER_START = len(MAGIC) + 8
+
+_NATIVE_STR = type('')
+_BYTES = type(b'')
+_UNICODE = type(u'')
+_INTEGER_TYPES = (int,) + ((types.LongType,) if hasattr(types, 'LongType')
+                           else ())
+# types which are not stored as objects with attributes
+_NON_OBJECT_TYPES = (type, types.ModuleType, types.FunctionType,
+                     types.BuiltinFunctionType, types.MethodType)
+if hasattr(types, 'ClassType'):
+    # old-style classes and their instances in Python 2
+    _NON_OBJECT_TYPES += (types.ClassType, types.InstanceType)
+# builtin types whose instances hold their value outside of __dict__, the
+# instances of their subclasses are pickled (the items of list and dict
+# subclasses are stored like by pickle instead)
+_VALUE_TYPES = _INTEGER_TYPES + (float, complex, _BYTES, _UNICODE, tuple,
+                                 set, frozenset, numx.ndarray, numx.generic)
+
+
+def _align(offset):
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+def _encode_dtype(dtype):
+    if dtype.fields is None:
+        return dtype.str
+    return dtype.descr
+
+def _decode_dtype(descr):
+    if isinstance(descr, list):
+        # the JSON lists of a structured dtype must be tuples
+        descr = [tuple(_decode_dtype(item) if isinstance(item, list)
+                       else _decode_str(item) for item in field)
+                 for field in descr]
+        return numx.dtype(descr)
+    return numx.dtype(_decode_str(descr))
+
+def _decode_str(value):
+    """Return the JSON string value as a native string if possible."""
+    if isinstance(value, _UNICODE) and _NATIVE_STR is not _UNICODE:
+        try:
+            return value.encode('ascii')
+        except UnicodeEncodeError:
+            pass
+    return value
+
+def _class_name(cls):
+    """Return the 'module:name' string of cls, or None if the class cannot
+    be imported by this name."""
+    name = getattr(cls, '__qualname__', cls.__name__)
+    obj = sys.modules.get(cls.__module__)
+    for part in name.split('.'):
+        obj = getattr(obj, part, None)
+    if obj is not cls:
+        return None
+    return '%s:%s' % (cls.__module__, name)
+
+def _import_class(class_name):
+    module_name, name = class_name.split(':')
+    obj = import_module(module_name)
+    for part in name.split('.'):
+        obj = getattr(obj, part)
+    return obj
+
+def _custom_getstate(cls):
+    getstate = getattr(cls, '__getstate__', None)
+    return (getstate is not None and
+            getstate is not getattr(object, '__getstate__', None))
+
+
+class _Encoder(object):
+    """Encode an object as JSON data and collect its arrays."""
+
+    def __init__(self):
+        self.arrays = []
+        self._array_index = {}
+        self._memo = {}
+        # keep the encoded objects alive, so that their ids stay unique
+        self._keep = []
+
+    def _add_array(self, array):
+        index = self._array_index.get(id(array))
+        if index is None:
+            self._keep.append(array)
+            index = self._array_index[id(array)] = len(self.arrays)
+            self.arrays.append(array)
+        return index
+
+    def encode(self, obj):
+        typ = type(obj)
+        if obj is None or typ is bool or typ is float:
+            return obj
+        if typ in _INTEGER_TYPES:
+            return obj
+        if typ is _NATIVE_STR and typ is not _BYTES:
+            return obj
+        if typ is _BYTES:
+            try:
+                # native strings in Python 2
+                obj.decode('ascii')
+                return obj
+            except UnicodeDecodeError:
+                return {'__bytes__':
+                        base64.b64encode(obj).decode('ascii')}
+        if typ is _UNICODE:
+            return {'__unicode__': obj}
+        if typ is list:
+            return [self.encode(item) for item in obj]
+        if typ is tuple:
+            return {'__tuple__': [self.encode(item) for item in obj]}
+        if typ is dict:
+            return {'__dict__': [[self.encode(key), self.encode(value)]
+                                 for key, value in obj.items()]}
+        if typ is set or typ is frozenset:
+            return {'__' + typ.__name__ + '__':
+                    [self.encode(item) for item in obj]}
+        if typ is complex:
+            return {'__complex__': [obj.real, obj.imag]}
+        if typ is numx.dtype:
+            return {'__dtype__': _encode_dtype(obj)}
+        if isinstance(obj, numx.generic) and not obj.dtype.hasobject:
+            return {'__scalar__': self._add_array(numx.asarray(obj))}
+        if ((typ is numx.ndarray or typ is numx.memmap) and
+            not obj.dtype.hasobject):
+            return {'__array__': self._add_array(obj)}
+        if id(obj) in self._memo:
+            return {'__ref__': self._memo[id(obj)]}
+        self._memo[id(obj)] = memo_id = len(self._memo)
+        self._keep.append(obj)
+        class_name = _class_name(typ)
+        if (class_name is not None and hasattr(obj, '__dict__') and
+            not isinstance(obj, _NON_OBJECT_TYPES + _VALUE_TYPES)):
+            encoded = {'__object__': class_name, '__id__': memo_id}
+            if isinstance(obj, list):
+                encoded['listitems'] = [self.encode(item) for item in obj]
+            elif isinstance(obj, dict):
+                encoded['dictitems'] = [[self.encode(key),
+                                         self.encode(value)]
+                                        for key, value in obj.items()]
+            if _custom_getstate(typ):
+                encoded['state'] = self.encode(obj.__getstate__())
+            else:
+                encoded['attrs'] = dict((name, self.encode(value))
+                                        for name, value
+                                        in obj.__dict__.items())
+            return encoded
+        pickled = pickle.dumps(obj, protocol=2)
+        return {'__pickle__': base64.b64encode(pickled).decode('ascii'),
+                '__id__': memo_id}
+
+
+class _Decoder(object):
+    """Decode the JSON data of an `_Encoder`."""
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self._memo = {}
+
+    def decode(self, data):
+        if isinstance(data, list):
+            return [self.decode(item) for item in data]
+        if isinstance(data, _UNICODE) or isinstance(data, _NATIVE_STR):
+            return _decode_str(data)
+        if not isinstance(data, dict):
+            return data
+        if '__array__' in data:
+            return self.arrays[data['__array__']]
+        if '__object__' in data:
+            cls = _import_class(data['__object__'])
+            obj = cls.__new__(cls)
+            self._memo[data['__id__']] = obj
+            # like pickle, the items are added before the state is set
+            if 'listitems' in data:
+                obj.extend(self.decode(data['listitems']))
+            for key, value in data.get('dictitems', ()):
+                obj[self.decode(key)] = self.decode(value)
+            if 'state' in data:
+                obj.__setstate__(self.decode(data['state']))
+            else:
+                obj.__dict__.update((_decode_str(name), self.decode(value))
+                                    for name, value in data['attrs'].items())
+            return obj
+        if '__ref__' in data:
+            return self._memo[data['__ref__']]
+        if '__tuple__' in data:
+            return tuple(self.decode(data['__tuple__']))
+        if '__dict__' in data:
+            return dict((self.decode(key), self.decode(value))
+                        for key, value in data['__dict__'])
+        if '__set__' in data:
+            return set(self.decode(data['__set__']))
+        if '__frozenset__' in data:
+            return frozenset(self.decode(data['__frozenset__']))
+        if '__complex__' in data:
+            return complex(*data['__complex__'])
+        if '__dtype__' in data:
+            return _decode_dtype(data['__dtype__'])
+        if '__scalar__' in data:
+            return self.arrays[data['__scalar__']][()]
+        if '__unicode__' in data:
+            return _UNICODE(data['__unicode__'])
+        if '__bytes__' in data:
+            return base64.b64decode(data['__bytes__'].encode('ascii'))
+        if '__pickle__' in data:
+            obj = pickle.loads(
+                base64.b64decode(data['__pickle__'].encode('ascii')))
+            self._memo[data['__id__']] = obj
+            return obj
+        err = "Unknown entry in the archive: %s" % str(sorted(data))
+        raise mdp.MDPException(err)
+
+
+def _file_mode(filename):
+    """Return the permissions for the file written to filename: those of
+    the existing file, or the default ones of open() for a new file."""
+    try:
+        return stat.S_IMODE(os.stat(filename).st_mode)
+    except OSError:
+        pass
+    # the umask can only be read by setting it
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+@contextlib.contextmanager
+def _atomic_open(filename, mode='wb'):
+    """Context manager returning a temporary file in the directory of
+    filename, which is synced to disk and renamed to filename when the
+    block exits without an error. So filename is never left partially
+    written, it holds either its previous content or the new one."""
+    dirname = os.path.dirname(os.path.abspath(filename))
+    fd, tmpname = tempfile.mkstemp(dir=dirname, prefix='.mdp-tmp-')
+    try:
+        with os.fdopen(fd, mode) as tmpfile:
+            yield tmpfile
+            tmpfile.flush()
+            os.fsync(tmpfile.fileno())
+        os.chmod(tmpname, _file_mode(filename))
+        if os.name == 'nt' and os.path.exists(filename):
+            os.remove(filename)
+        os.rename(tmpname, filename)
+    except:
+        os.remove(tmpname)
+        raise
+
+
+def save(obj, filename):
+    """Save obj (usually a node or a flow) in the MDP archive format.
+
+    The arrays are stored as raw data, so that the archive can be loaded
+    with ``mdp.load(filename, mmap=True)``. The file is written
+    atomically (see `_atomic_open`).
+    """
+    encoder = _Encoder()
+    root = encoder.encode(obj)
+    entries = []
+    arrays = []
+    offset = 0
+    for array in encoder.arrays:
+        fortran_order = (array.ndim > 1 and array.flags.f_contiguous and
+                         not array.flags.c_contiguous)
+        if fortran_order:
+            # the transpose is C contiguous and has the same memory layout
+            array = array.T
+        else:
+            array = numx.ascontiguousarray(array)
+        offset = _align(offset)
+        entries.append({'dtype': _encode_dtype(array.dtype),
+                        'shape': list(array.shape[::-1] if fortran_order
+                                      else array.shape),
+                        'fortran_order': bool(fortran_order),
+                        'offset': offset})
+        arrays.append(array)
+        offset += array.nbytes
+    header = json.dumps({'format_version': ARCHIVE_VERSION,
+                         'mdp_version': mdp.__version__,
+                         'arrays': entries,
+                         'root': root}).encode('ascii')
+    data_start = _align(_HEADER_START + len(header))
+    with _atomic_open(filename) as archive:
+        archive.write(MAGIC)
+        archive.write(struct.pack('<Q', len(header)))
+        archive.write(header)
+        position = _HEADER_START + len(header)
+        for entry, array in zip(entries, arrays):
+            start = data_start + entry['offset']
+            archive.write(b'\x00' * (start - position))
+            archive.write(array.tostring() if array.size else b'')
+            position = start + array.nbytes
+
+
+def is_archive(filename):
+    """Return True if filename is in the MDP archive format."""
+    with open(filename, 'rb') as archive:
+        return archive.read(len(MAGIC)) == MAGIC
+
+
+def load(filename, mmap=False):
+    """Load a node, a flow or any other object saved in filename.
+
+    The file can be an MDP archive (see `save`) or a pickle, as written by
+    ``Node.save`` and ``Flow.save``.
+
+    mmap -- If True or 'r', the arrays of an archive are read-only arrays
+        mapped from the file. They are only read from disk when they are
+        used, and the processes which load the same file share the memory.
+        With 'c' the arrays are copy-on-write, i.e. they can be modified
+        but the changes are not written to the file. This argument is
+        ignored for pickles.
+    """
+    if mmap not in (False, True, 'r', 'c'):
+        err = "mmap must be False, True, 'r' or 'c', got %s." % str(mmap)
+        raise mdp.MDPException(err)
+    with open(filename, 'rb') as archive:
+        if archive.read(len(MAGIC)) != MAGIC:
+            archive.seek(0)
+            return pickle.load(archive)
+        header_length = struct.unpack('<Q', archive.read(8))[0]
+        header = json.loads(archive.read(header_length).decode('ascii'))
+        if header['format_version'] > ARCHIVE_VERSION:
+            err = ("The archive has format version %d, but this MDP "
+                   "version only supports archives up to version %d." %
+                   (header['format_version'], ARCHIVE_VERSION))
+            raise mdp.MDPException(err)
+        data_start = _align(_HEADER_START + header_length)
+        buffer_ = None
+        if mmap and header['arrays']:
+            access = _mmap.ACCESS_COPY if mmap == 'c' else _mmap.ACCESS_READ
+            buffer_ = _mmap.mmap(archive.fileno(), 0, access=access)
+        arrays = []
+        for entry in header['arrays']:
+            dtype = _decode_dtype(entry['dtype'])
+            shape = tuple(entry['shape'])
+            count = int(numx.prod(shape))
+            order = 'F' if entry['fortran_order'] else 'C'
+            if count == 0:
+                array = numx.empty(shape, dtype=dtype, order=order)
+            elif buffer_ is not None:
+                array = numx.frombuffer(buffer_, dtype=dtype, count=count,
+                                        offset=data_start + entry['offset'])
+            else:
+                archive.seek(data_start + entry['offset'])
+                array = numx.fromfile(archive, dtype=dtype, count=count)
+            arrays.append(array.reshape(shape, order=order))
+    return _Decoder(arrays).decode(header['root'])
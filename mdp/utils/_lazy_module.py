@@ -0,0 +1,45 @@
+"""
+Module type for the MDP packages which import parts of their content on
+the first access, so that ``import mdp`` does not pay for them.
+"""
+import sys
+from types import ModuleType
+
+
+class LazyModule(ModuleType):
+    """Base class for the module types of the lazy MDP packages.
+
+    An instance replaces the package in ``sys.modules`` (see
+    `install_lazy_module`). Subclasses implement ``__getattr__``, which is
+    only called for the names which are not in the namespace yet.
+    """
+
+    def __getattribute__(self, name):
+        # like plain modules, the module has no __module__ attribute (a
+        # property would be shadowed by the __module__ of the subclasses)
+        if name == '__module__':
+            raise AttributeError(name)
+        return ModuleType.__getattribute__(self, name)
+
+
+def install_lazy_module(name, module_class, copy_namespace=True):
+    """Replace the module name in sys.modules by a module_class instance.
+
+    name -- Name of the module, usually ``__name__`` of the caller.
+    module_class -- Subclass of LazyModule.
+    copy_namespace -- If True the whole namespace of the module is copied,
+        otherwise only the special names (like ``__doc__``) without
+        ``__all__``, which can then be provided by ``__getattr__``.
+
+    The original module is stored in the ``_module`` attribute of
+    module_class, since its namespace holds the globals of the functions
+    defined in it.
+    """
+    module = sys.modules[name]
+    lazy_module = module_class(name)
+    for key, value in module.__dict__.items():
+        if copy_namespace or (key.startswith('__') and key != '__all__'):
+            lazy_module.__dict__[key] = value
+    module_class._module = module
+    sys.modules[name] = lazy_module
+    return lazy_module
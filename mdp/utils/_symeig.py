@@ -41,6 +41,19 @@ def _assert_eigenvalues_real_and_positive(w, dtype):
     #    err = "Got negative eigenvalues: %s" % str(w)
     #    raise SymeigException(err)
 
+def _sanitize_range(range, n):
+    """Return the 1-based eigenvalue index range clipped to [1, n]."""
+    lo, hi = range
+    if lo < 1:
+        lo = 1
+    if lo > n:
+        lo = n
+    if hi > n:
+        hi = n
+    if lo > hi:
+        lo, hi = hi, lo
+    return lo, hi
+
 def wrap_eigh(A, B = None, eigenvectors = True, turbo = "on", range = None,
               type = 1, overwrite = False):
     """Wrapper for scipy.linalg.eigh for scipy version > 0.7"""
@@ -56,16 +69,7 @@ def wrap_eigh(A, B = None, eigenvectors = True, turbo = "on", range = None,
         args['turbo'] = False
     args['type'] = type
     if range is not None:
-        n = A.shape[0]
-        lo, hi = range
-        if lo < 1:
-            lo = 1
-        if lo > n:
-            lo = n
-        if hi > n:
-            hi = n
-        if lo > hi:
-            lo, hi = hi, lo
+        lo, hi = _sanitize_range(range, A.shape[0])
         # in scipy.linalg.eigh the range starts from 0
         lo -= 1
         hi -= 1
@@ -143,18 +147,8 @@ def _symeig_fake(A, B = None, eigenvectors = True, turbo = "on", range = None,
     Z = Z.take(idx, axis=1)
 
     # sanitize range:
-    n = A.shape[0]
     if range is not None:
-        lo, hi = range
-        if lo < 1:
-            lo = 1
-        if lo > n:
-            lo = n
-        if hi > n:
-            hi = n
-        if lo > hi:
-            lo, hi = hi, lo
-
+        lo, hi = _sanitize_range(range, A.shape[0])
         Z = Z[:, lo-1:hi]
         w = w[lo-1:hi]
 
@@ -166,3 +160,479 @@ def _symeig_fake(A, B = None, eigenvectors = True, turbo = "on", range = None,
     else:
         return mdp.utils.refcast(w, dtype)
 
+
+
+# Iterative solvers for a few extreme eigenvalues.
+# They have the same interface as symeig, but only compute the eigenvalues
+# at one end of the spectrum. For all other requests (no range, range in
+# the middle of the spectrum, many eigenvalues) they fall back to symeig.
+
+# minimum ratio between the dimension and the number of eigenvalues
+# for which LOBPCG is used
+LOBPCG_MIN_RATIO = 5
+# maximum number of LOBPCG iterations
+LOBPCG_MAXITER = 500
+# smallest dimension for which the automatic selection uses ARPACK
+AUTO_MIN_DIM = 1000
+# largest fraction of eigenvalues for which the automatic selection
+# uses ARPACK
+AUTO_MAX_FRACTION = 0.1
+
+def _extreme_range(range, n):
+    """Return (k, largest) if range is at one end of the spectrum of
+    an n x n matrix, else None."""
+    if range is None:
+        return None
+    lo, hi = _sanitize_range(range, n)
+    if lo == 1 and hi < n:
+        return hi, False
+    if hi == n and lo > 1:
+        return n - lo + 1, True
+    return None
+
+def _as_standard_problem(A, B):
+    """Return a function computing L^-1 A L^-T x and the Cholesky factor
+    L of B, which reduce the generalized problem to a standard one.
+
+    If A is None the identity matrix is used."""
+    from scipy.linalg import solve_triangular
+    L = mdp.utils.cholesky(B)
+    def matvec(x):
+        y = solve_triangular(L, x, trans='T', lower=True)
+        if A is not None:
+            y = mdp.utils.mult(A, y)
+        return solve_triangular(L, y, lower=True)
+    return matvec, L
+
+def symeig_arpack(A, B=None, eigenvectors=True, turbo="on", range=None,
+                  type=1, overwrite=False):
+    """Solve the (generalized) eigenproblem for a few extreme eigenvalues
+    with the implicitly restarted Lanczos method (ARPACK).
+
+    The interface is the same as for symeig. The problem is reduced to a
+    standard one with a Cholesky factorization, so only O(n^2)
+    operations are needed per iteration. The smallest eigenvalues are
+    computed as the (faster converging) largest eigenvalues of the
+    inverse problem, which requires A to be positive definite.
+    Falls back to symeig if range does not select eigenvalues at one end
+    of the spectrum, if A is singular in that case, or if scipy is not
+    available.
+    """
+    n = A.shape[0]
+    extreme = _extreme_range(range, n)
+    if (extreme is None or type != 1 or
+        mdp.numx_description != 'scipy' or extreme[0] >= n - 1):
+        return _full_symeig()(A, B, eigenvectors=eigenvectors, turbo=turbo,
+                              range=range, type=type, overwrite=overwrite)
+    from scipy.sparse.linalg import eigsh, LinearOperator, ArpackError
+    k, largest = extreme
+    dtype = numx.dtype(_greatest_common_dtype([A, B]))
+    L = None
+    try:
+        if largest and B is None:
+            op = A
+        elif largest:
+            matvec, L = _as_standard_problem(A, B)
+            op = LinearOperator((n, n), matvec=matvec, dtype=dtype)
+        else:
+            # solve B x = (1/lambda) A x
+            try:
+                matvec, L = _as_standard_problem(B, A)
+            except numx_linalg.LinAlgError:
+                return _full_symeig()(A, B, eigenvectors=eigenvectors,
+                                      turbo=turbo, range=range, type=type,
+                                      overwrite=overwrite)
+            op = LinearOperator((n, n), matvec=matvec, dtype=dtype)
+        w, Z = eigsh(op, k=k, which='LA')
+    except (ArpackError, numx_linalg.LinAlgError) as exception:
+        raise SymeigException(str(exception))
+    if not largest:
+        # normalize the eigenvectors with respect to B instead of A
+        Z = Z / numx.sqrt(w)
+        w = 1. / w
+    return _finish_partial(w, Z, L, eigenvectors, dtype)
+
+def symeig_lobpcg(A, B=None, eigenvectors=True, turbo="on", range=None,
+                  type=1, overwrite=False):
+    """Solve the (generalized) eigenproblem for a few extreme eigenvalues
+    with the Locally Optimal Block Preconditioned Conjugate Gradient
+    method (LOBPCG).
+
+    The interface is the same as for symeig. The generalized problem is
+    solved directly, without factorizing B. Falls back to symeig if
+    range does not select eigenvalues at one end of the spectrum, if
+    more than ``n / LOBPCG_MIN_RATIO`` eigenvalues are requested, or if
+    scipy is not available.
+    """
+    n = A.shape[0]
+    extreme = _extreme_range(range, n)
+    if (extreme is None or type != 1 or mdp.numx_description != 'scipy' or
+        extreme[0] * LOBPCG_MIN_RATIO > n):
+        return _full_symeig()(A, B, eigenvectors=eigenvectors, turbo=turbo,
+                              range=range, type=type, overwrite=overwrite)
+    from scipy.sparse.linalg import lobpcg
+    k, largest = extreme
+    dtype = numx.dtype(_greatest_common_dtype([A, B]))
+    X = mdp.numx_rand.randn(n, k).astype(dtype)
+    tol = numx.finfo(dtype).eps ** 0.5 * n
+    try:
+        w, Z = lobpcg(A, X, B=B, tol=tol, maxiter=LOBPCG_MAXITER,
+                      largest=largest)
+    except numx_linalg.LinAlgError as exception:
+        raise SymeigException(str(exception))
+    return _finish_partial(w, Z, None, eigenvectors, dtype)
+
+def _finish_partial(w, Z, L, eigenvectors, dtype):
+    # sort in ascending order and return in the symeig conventions
+    idx = w.argsort()
+    w = mdp.utils.refcast(w.take(idx), dtype)
+    if not eigenvectors:
+        return w
+    Z = Z.take(idx, axis=1)
+    if L is not None:
+        # transform back to the eigenvectors of the generalized problem
+        from scipy.linalg import solve_triangular
+        Z = solve_triangular(L, Z, trans='T', lower=True)
+    return w, mdp.utils.refcast(Z, dtype)
+
+def symeig_auto(A, B=None, eigenvectors=True, turbo="on", range=None,
+                type=1, overwrite=False):
+    """Solve the (generalized) eigenproblem, choosing the solver from the
+    size of the problem.
+
+    ARPACK (see symeig_arpack) is used if the matrices have at least
+    ``AUTO_MIN_DIM`` rows and at most a fraction ``AUTO_MAX_FRACTION``
+    of the eigenvalues at one end of the spectrum is requested, symeig
+    is used otherwise.
+    """
+    n = A.shape[0]
+    extreme = _extreme_range(range, n)
+    if (n >= AUTO_MIN_DIM and extreme is not None and
+        extreme[0] <= AUTO_MAX_FRACTION * n):
+        solver = symeig_arpack
+    else:
+        solver = _full_symeig()
+    return solver(A, B, eigenvectors=eigenvectors, turbo=turbo, range=range,
+                  type=type, overwrite=overwrite)
+
+
+# Dense solver with explicit choice of the LAPACK driver.
+
+# standard problem drivers: relatively robust representations ('evr'),
+# divide and conquer ('evd'); generalized problem drivers: bisection and
+# inverse iteration ('gvx'), divide and conquer ('gvd'), QR ('gv')
+STANDARD_DRIVERS = ('evr', 'evd')
+GENERALIZED_DRIVERS = ('gvx', 'gvd', 'gv')
+# largest fraction of eigenvalues for which the automatic driver selection
+# uses 'gvx' for a generalized problem, 'gvd' is used for more
+GVX_MAX_FRACTION = 0.5
+# smallest dimension for which the automatic driver selection uses 'evd'
+# for the full spectrum of a standard problem, 'evr' is used otherwise
+EVD_MIN_DIM = 1000
+
+# Timings (ms) of the drivers on a single core with OpenBLAS, for random
+# positive definite matrices (benchmark_mdp.symeig_lapack_benchmark).
+# 'part' is for the n/10 smallest eigenvalues and eigenvectors, the other
+# columns for the full spectrum.
+#
+# | dtype |    n | evr part |  evr | evd part |  evd | gvx part |  gvx |  gvd |
+# |   d   |  100 |      1.8 |  2.0 |      2.4 |  1.8 |      1.6 |  4.6 |  2.9 |
+# |   d   |  500 |       44 |   74 |       94 |   88 |       75 |  288 |  140 |
+# |   d   | 1000 |      299 |  595 |      735 |  573 |      513 | 2605 | 1009 |
+# |   f   |  100 |      1.0 |  2.2 |      1.4 |  1.8 |      1.5 |  3.7 |  2.2 |
+# |   f   |  500 |       27 |   88 |       58 |   51 |       39 |  191 |   83 |
+# |   f   | 1000 |      180 |  479 |      344 |  402 |      315 | 1669 |  597 |
+
+def _select_driver(n, generalized, nvals):
+    """Return the LAPACK driver for a problem of dimension n, for which
+    nvals eigenvalues are requested."""
+    if generalized:
+        if nvals <= GVX_MAX_FRACTION * n:
+            return 'gvx'
+        return 'gvd'
+    if nvals == n and n >= EVD_MIN_DIM:
+        return 'evd'
+    return 'evr'
+
+class _CholeskyCache(object):
+    """Cache the Cholesky factor of the last matrix B of a generalized
+    eigenproblem, so that repeated problems with the same B (e.g. when
+    the same covariance matrix is used with different A) need only
+    O(n^2) operations to check and reuse it."""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._b = None
+        self._l = None
+
+    def factor(self, B):
+        """Return the lower Cholesky factor of B."""
+        cached = self._b
+        if (cached is None or cached.shape != B.shape or
+            cached.dtype != B.dtype or not numx.array_equal(cached, B)):
+            self._l = mdp.utils.cholesky(B)
+            self._b = B.copy()
+        return self._l
+
+_cholesky_cache = _CholeskyCache()
+
+def _count_below(A, B, sigma):
+    """Return the number of eigenvalues of the (generalized) problem
+    smaller than sigma, from the inertia of A - sigma B."""
+    from scipy.linalg import ldl
+    if B is None:
+        M = A - sigma * numx.eye(A.shape[0], dtype=A.dtype)
+    else:
+        M = A - sigma * B
+    d = ldl(M, lower=True, hermitian=True)[1]
+    n = d.shape[0]
+    count = 0
+    i = 0
+    # d is block diagonal with blocks of size 1 or 2
+    while i < n:
+        if i < n - 1 and d[i+1, i] != 0:
+            det = (d[i, i] * d[i+1, i+1]).real - abs(d[i+1, i])**2
+            if det < 0:
+                count += 1
+            elif (d[i, i] + d[i+1, i+1]).real < 0:
+                count += 2
+            i += 2
+        else:
+            if d[i, i].real < 0:
+                count += 1
+            i += 1
+    return count
+
+def _value_to_index_range(A, B, value_range):
+    """Convert a range (vl, vu) of eigenvalues to the symeig index range,
+    return None if there are no eigenvalues in the range."""
+    vl, vu = value_range
+    lo = _count_below(A, B, vl) + 1
+    hi = _count_below(A, B, vu)
+    if hi < lo:
+        return None
+    return lo, hi
+
+def _solve_driver(A, B, driver, lo, hi, eigenvectors, type, overwrite):
+    """Solve the eigenproblem for the eigenvalues lo to hi (1-based) with
+    the given LAPACK driver."""
+    n = A.shape[0]
+    subset = (lo, hi) != (1, n)
+    if driver == 'evd':
+        name = 'heevd' if numx.iscomplexobj(A) else 'syevd'
+        syevd, = numx_linalg.get_lapack_funcs((name,), (A,))
+        w, Z, info = syevd(A, compute_v=int(eigenvectors), lower=1,
+                           overwrite_a=int(overwrite))
+        if info != 0:
+            raise SymeigException("LAPACK %s failed (info=%d)" % (name, info))
+    else:
+        args = dict(a=A, b=B, eigvals_only=not eigenvectors,
+                    overwrite_a=overwrite, overwrite_b=overwrite, type=type)
+        if driver in ('evr', 'gvx'):
+            args['eigvals'] = (lo-1, hi-1)
+            subset = False
+        else:
+            args['turbo'] = (driver == 'gvd')
+        try:
+            result = numx_linalg.eigh(**args)
+        except numx_linalg.LinAlgError as exception:
+            raise SymeigException(str(exception))
+        if eigenvectors:
+            w, Z = result
+        else:
+            w, Z = result, None
+    if subset:
+        w = w[lo-1:hi]
+        if eigenvectors:
+            Z = Z[:, lo-1:hi]
+    return w, Z
+
+def symeig_lapack(A, B=None, eigenvectors=True, turbo="on", range=None,
+                  type=1, overwrite=False, driver=None, value_range=None,
+                  dtype=None, cache_cholesky=False):
+    """Solve the (generalized) eigenproblem with a chosen LAPACK driver.
+
+    The interface is the same as for symeig, with the additional
+    keyword arguments:
+
+      driver -- LAPACK driver, one of STANDARD_DRIVERS for standard
+                problems or GENERALIZED_DRIVERS for generalized ones.
+                If None, the driver is selected from the size of the
+                problem and the number of requested eigenvalues
+                (turbo is ignored in this case).
+      value_range -- the tuple (vl, vu): only the eigenvalues in the
+                     interval [vl, vu) are returned. Can not be given
+                     together with range.
+      dtype -- if given, the problem is solved in this precision
+               (e.g. 'f' to solve a double precision problem in single
+               precision, which is faster for large problems). The
+               results have the dtype of the input matrices.
+      cache_cholesky -- if True, the generalized problem (type 1 only) is
+                        reduced to a standard one with the Cholesky factor
+                        of B, which is cached and reused as long as B does
+                        not change.
+
+    Requires scipy.
+    """
+    if mdp.numx_description != 'scipy':
+        err = "symeig_lapack requires scipy"
+        raise mdp.MDPException(err)
+    n = A.shape[0]
+    out_dtype = numx.dtype(_greatest_common_dtype([A, B]))
+    if dtype is not None and numx.dtype(dtype) != out_dtype:
+        A = A.astype(dtype)
+        if B is not None:
+            B = B.astype(dtype)
+        # A and B are our own copies now
+        overwrite = True
+    if value_range is not None:
+        if range is not None:
+            err = "range and value_range can not be given together"
+            raise mdp.MDPException(err)
+        range = _value_to_index_range(A, B, value_range)
+        if range is None:
+            w = numx.zeros((0,), dtype=out_dtype)
+            if eigenvectors:
+                return w, numx.zeros((n, 0), dtype=out_dtype)
+            return w
+    if range is None:
+        lo, hi = 1, n
+    else:
+        lo, hi = _sanitize_range(range, n)
+    L = None
+    if B is not None and cache_cholesky and type == 1:
+        from scipy.linalg import solve_triangular
+        try:
+            L = _cholesky_cache.factor(B)
+        except numx_linalg.LinAlgError as exception:
+            raise SymeigException(str(exception))
+        # A = L^-1 A L^-H
+        A = solve_triangular(L, A, lower=True)
+        A = solve_triangular(L, A.conj().T, lower=True)
+        B = None
+        overwrite = True
+    if driver is None:
+        if range is None and B is not None and turbo != "on":
+            driver = 'gv'
+        else:
+            driver = _select_driver(n, B is not None, hi - lo + 1)
+    elif driver not in (GENERALIZED_DRIVERS if B is not None
+                        else STANDARD_DRIVERS):
+        err = ("Driver '%s' can not solve a %s eigenproblem" %
+               (driver, 'generalized' if B is not None else 'standard'))
+        raise mdp.MDPException(err)
+    w, Z = _solve_driver(A, B, driver, lo, hi, eigenvectors, type, overwrite)
+    w = mdp.utils.refcast(w, out_dtype)
+    if not eigenvectors:
+        return w
+    if L is not None:
+        from scipy.linalg import solve_triangular
+        Z = solve_triangular(L, Z, trans='C', lower=True)
+    return w, mdp.utils.refcast(Z, out_dtype)
+
+_SOLVERS = {'arpack': symeig_arpack,
+            'lobpcg': symeig_lobpcg,
+            'auto': symeig_auto,
+            'lapack': symeig_lapack}
+# solvers which only compute a few eigenvalues and fall back to the
+# full solver otherwise
+_PARTIAL_SOLVERS = ('arpack', 'lobpcg', 'auto')
+
+def get_symeig_solver(solver):
+    """Return the eigenproblem solver function for the name `solver`.
+
+    solver -- 'dense' (or None) for the solver of the full problem
+              (symeig, unless changed with set_eigensolver), 'lapack'
+              for the full solver with LAPACK driver selection,
+              'arpack' or 'lobpcg' for iterative solvers of a few extreme
+              eigenvalues, 'auto' to choose depending on the problem size,
+              or the name of a solver added with register_eigensolver.
+    """
+    if solver is None or solver == 'dense':
+        return _full_symeig()
+    try:
+        return _SOLVERS[solver]
+    except KeyError:
+        err = ("Unknown eigenproblem solver '%s', must be one of %s" %
+               (solver, str(['dense'] + sorted(_SOLVERS))))
+        raise mdp.MDPException(err)
+
+def register_eigensolver(name, solver):
+    """Register a new eigenproblem solver under the name `name`.
+
+    solver -- function with the same interface as symeig, it must be
+              able to solve the full problem
+    """
+    if name == 'dense' or name in _SOLVERS:
+        err = "An eigenproblem solver named '%s' already exists" % name
+        raise mdp.MDPException(err)
+    _SOLVERS[name] = solver
+
+# symeig selected by the configuration and solver of the full problem,
+# they are set on the first call of set_eigensolver
+_default_symeig = None
+_full_solver = None
+# name and options of the current solver
+_current_solver = ('dense', {})
+
+def _full_symeig():
+    """Return the solver used for the full eigenproblem."""
+    if _full_solver is not None:
+        return _full_solver
+    return mdp.utils.symeig
+
+def set_eigensolver(solver='dense', **options):
+    """Set the eigenproblem solver used by mdp.utils.symeig, and
+    therefore by all nodes.
+
+    solver -- name of the solver (see get_symeig_solver), 'dense'
+              restores the solver selected at import time
+    options -- keyword arguments that are passed to the solver in each
+               call, e.g. ``set_eigensolver('lapack', driver='evd',
+               dtype='f')`` (see symeig_lapack)
+
+    The iterative solvers fall back to the last selected solver of the
+    full problem.
+    """
+    global _default_symeig, _full_solver, _current_solver
+    if _default_symeig is None:
+        _default_symeig = mdp.utils.symeig
+    if solver == 'dense':
+        if options:
+            err = "The 'dense' solver does not accept options"
+            raise mdp.MDPException(err)
+        function = _default_symeig
+    else:
+        function = get_symeig_solver(solver)
+    if solver == 'lapack':
+        driver = options.get('driver')
+        if (driver is not None and
+            driver not in STANDARD_DRIVERS + GENERALIZED_DRIVERS):
+            err = ("Unknown LAPACK driver '%s', must be one of %s" %
+                   (driver, str(STANDARD_DRIVERS + GENERALIZED_DRIVERS)))
+            raise mdp.MDPException(err)
+    if options:
+        function = _with_options(function, options)
+    if solver not in _PARTIAL_SOLVERS:
+        _full_solver = function
+    elif _full_solver is None:
+        _full_solver = _default_symeig
+    mdp.utils.symeig = function
+    _current_solver = (solver, options)
+
+def get_eigensolver():
+    """Return the name and the options of the solver used by
+    mdp.utils.symeig (see set_eigensolver)."""
+    return _current_solver[0], dict(_current_solver[1])
+
+def _with_options(solver, options):
+    """Return solver with the keyword arguments options always set."""
+    def symeig(A, B=None, eigenvectors=True, turbo="on", range=None,
+               type=1, overwrite=False):
+        return solver(A, B, eigenvectors=eigenvectors, turbo=turbo,
+                      range=range, type=type, overwrite=overwrite,
+                      **options)
+    symeig.__doc__ = solver.__doc__
+    return symeig
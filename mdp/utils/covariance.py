@@ -18,6 +18,40 @@ def _check_roundoff(t, dtype):
               ' information.' % (t, dtype.name))
         warnings.warn(wr, mdp.MDPWarning)
 
+def _init_shift(x, dtype, acc_dtype):
+    """Return the shift that is subtracted from the data before the
+    products are accumulated, or None.
+
+    If the sums are accumulated with a larger precision than the one of the
+    data (see mdp.precision), the data is shifted by the average of the
+    first block. This avoids the cancellation errors of the products of
+    data with a large mean, which are computed with the data precision.
+    """
+    if acc_dtype == dtype:
+        return None
+    return mdp.utils.refcast(x.mean(axis=0, dtype=acc_dtype), dtype)
+
+def _shift_delta(old_shift, new_shift, dim, dtype):
+    """Return old_shift - new_shift (None means no shift)."""
+    delta = numx.zeros(dim, dtype)
+    if old_shift is not None:
+        delta += old_shift
+    if new_shift is not None:
+        delta -= new_shift
+    return delta
+
+def _set_state(obj, state, **defaults):
+    """Set the pickled state of a covariance matrix instance.
+
+    The attributes missing in the states pickled by older MDP versions are
+    set to the given defaults. These versions did not shift the data and
+    accumulated the sums in the dtype of the data.
+    """
+    for name, value in defaults.items():
+        state.setdefault(name, value)
+    state.setdefault('_acc_dtype', state.get('_dtype'))
+    obj.__dict__.update(state)
+
 class CovarianceMatrix(object):
     """This class stores an empirical covariance matrix that can be updated
     incrementally. A call to the 'fix' method returns the current state of
@@ -41,6 +75,8 @@ def __init__(self, dtype=None, bias=False):
         no upcast is possible.
         If bias is True, the covariance matrix is normalized by dividing
         by T instead of the usual T-1.
+        The sums are accumulated with the dtype given by
+        ``mdp.utils.accumulator_dtype`` (see ``mdp.precision``).
         """
         if dtype is None:
             self._dtype = None
@@ -53,9 +89,14 @@ def __init__(self, dtype=None, bias=False):
         self._avg = None
         # number of observation so far during the training phase
         self._tlen = 0
+        # shift of the data, see _init_shift
+        self._shift = None
 
         self.bias = bias
 
+    def __setstate__(self, state):
+        _set_state(self, state, _shift=None)
+
     def _init_internals(self, x):
         """Init the internal structures.
 
@@ -68,11 +109,23 @@ def _init_internals(self, x):
             self._dtype = x.dtype
         dim = x.shape[1]
         self._input_dim = dim
-        type_ = self._dtype
+        self._acc_dtype = mdp.utils.accumulator_dtype(self._dtype)
+        type_ = self._acc_dtype
         # init covariance matrix
         self._cov_mtx = numx.zeros((dim, dim), type_)
         # init average
         self._avg = numx.zeros(dim, type_)
+        self._shift = _init_shift(x, self._dtype, type_)
+
+    def _set_shift(self, shift):
+        """Change the shift of the data in the accumulated sums."""
+        delta = _shift_delta(self._shift, shift, self._input_dim,
+                             self._acc_dtype)
+        outer = numx.outer(self._avg, delta)
+        self._cov_mtx += outer + outer.T
+        self._cov_mtx += self._tlen * numx.outer(delta, delta)
+        self._avg += self._tlen * delta
+        self._shift = shift
 
     def update(self, x):
         """Update internal structures.
@@ -84,10 +137,12 @@ def update(self, x):
             self._init_internals(x)
         # cast input
         x = mdp.utils.refcast(x, self._dtype)
+        if self._shift is not None:
+            x = x - self._shift
         # update the covariance matrix, the average and the number of
         # observations (try to do everything inplace)
         self._cov_mtx += mdp.utils.mult(x.T, x)
-        self._avg += x.sum(axis=0)
+        self._avg += x.sum(axis=0, dtype=self._acc_dtype)
         self._tlen += x.shape[0]
 
     def fix(self, center=True):
@@ -97,8 +152,11 @@ def fix(self, center=True):
 
         If center is false, the returned matrix is the matrix of the second moments,
         i.e. the covariance matrix of the data without subtracting the mean."""
+        if not center and self._shift is not None:
+            # the second moments are not invariant to the shift
+            self._set_shift(None)
         # local variables
-        type_ = self._dtype
+        type_ = self._acc_dtype
         tlen = self._tlen
         _check_roundoff(tlen, type_)
         avg = self._avg
@@ -121,6 +179,8 @@ def fix(self, center=True):
 
         # fix the average
         avg /= tlen
+        if self._shift is not None:
+            avg += self._shift
 
         ##### clean up
         # covariance matrix, updated during the training phase
@@ -129,6 +189,7 @@ def fix(self, center=True):
         self._avg = None
         # number of observation so far during the training phase
         self._tlen = 0
+        self._shift = None
 
         return cov_mtx, avg, tlen
 
@@ -170,9 +231,14 @@ def __init__(self, dt, dtype=None, bias=False):
         self._avg = None
         self._avg_dt = None
         self._tlen = 0
+        # shift of the data, see _init_shift
+        self._shift = None
 
         self.bias = bias
 
+    def __setstate__(self, state):
+        _set_state(self, state, _shift=None)
+
     def _init_internals(self, x):
         """Inits some internals structures. The reason this is not done in
         the constructor is that we want to be able to derive the input
@@ -184,11 +250,25 @@ def _init_internals(self, x):
             self._dtype = x.dtype
         dim = x.shape[1]
         self._input_dim = dim
+        self._acc_dtype = mdp.utils.accumulator_dtype(self._dtype)
+        type_ = self._acc_dtype
         # init covariance matrix
-        self._cov_mtx = numx.zeros((dim, dim), self._dtype)
+        self._cov_mtx = numx.zeros((dim, dim), type_)
         # init averages
-        self._avg = numx.zeros(dim, self._dtype)
-        self._avg_dt = numx.zeros(dim, self._dtype)
+        self._avg = numx.zeros(dim, type_)
+        self._avg_dt = numx.zeros(dim, type_)
+        self._shift = _init_shift(x, self._dtype, type_)
+
+    def _set_shift(self, shift):
+        """Change the shift of the data in the accumulated sums."""
+        delta = _shift_delta(self._shift, shift, self._input_dim,
+                             self._acc_dtype)
+        self._cov_mtx += numx.outer(self._avg, delta)
+        self._cov_mtx += numx.outer(delta, self._avg_dt)
+        self._cov_mtx += self._tlen * numx.outer(delta, delta)
+        self._avg += self._tlen * delta
+        self._avg_dt += self._tlen * delta
+        self._shift = shift
 
     def update(self, x):
         """Update internal structures."""
@@ -197,6 +277,8 @@ def update(self, x):
 
         # cast input
         x = mdp.utils.refcast(x, self._dtype)
+        if self._shift is not None:
+            x = x - self._shift
 
         dt = self._dt
 
@@ -209,9 +291,10 @@ def update(self, x):
         # update the covariance matrix, the average and the number of
         # observations (try to do everything inplace)
         self._cov_mtx += mdp.utils.mult(x[:tlen-dt, :].T, x[dt:tlen, :])
-        totalsum = x.sum(axis=0)
-        self._avg += totalsum - x[tlen-dt:, :].sum(axis=0)
-        self._avg_dt += totalsum - x[:dt, :].sum(axis=0)
+        type_ = self._acc_dtype
+        totalsum = x.sum(axis=0, dtype=type_)
+        self._avg += totalsum - x[tlen-dt:, :].sum(axis=0, dtype=type_)
+        self._avg_dt += totalsum - x[:dt, :].sum(axis=0, dtype=type_)
         self._tlen += tlen-dt
 
     def fix(self, A=None):
@@ -228,7 +311,7 @@ def fix(self, A=None):
         """
 
         # local variables
-        type_ = self._dtype
+        type_ = self._acc_dtype
         tlen = self._tlen
         _check_roundoff(tlen, type_)
         avg = self._avg
@@ -252,12 +335,16 @@ def fix(self, A=None):
         # fix the average
         avg /= tlen
         avg_dt /= tlen
+        if self._shift is not None:
+            avg += self._shift
+            avg_dt += self._shift
 
         ##### clean up variables to spare on space
         self._cov_mtx = None
         self._avg = None
         self._avg_dt = None
         self._tlen = 0
+        self._shift = None
 
         return cov_mtx, avg, avg_dt, tlen
 
@@ -338,6 +425,9 @@ def copy(self):
 
 class CrossCovarianceMatrix(CovarianceMatrix):
 
+    def __setstate__(self, state):
+        _set_state(self, state, _shift=None, _shifty=None)
+
     def _init_internals(self, x, y):
         if self._dtype is None:
             self._dtype = x.dtype
@@ -347,10 +437,26 @@ def _init_internals(self, x, y):
                 raise mdp.MDPException(err)
         dim_x = x.shape[1]
         dim_y = y.shape[1]
-        type_ = self._dtype
+        self._acc_dtype = mdp.utils.accumulator_dtype(self._dtype)
+        type_ = self._acc_dtype
         self._cov_mtx = numx.zeros((dim_x, dim_y), type_)
         self._avgx = numx.zeros(dim_x, type_)
         self._avgy = numx.zeros(dim_y, type_)
+        self._shift = _init_shift(x, self._dtype, type_)
+        self._shifty = _init_shift(y, self._dtype, type_)
+
+    def _set_shift(self, shift, shifty):
+        """Change the shifts of x and y in the accumulated sums."""
+        type_ = self._acc_dtype
+        delta = _shift_delta(self._shift, shift, len(self._avgx), type_)
+        deltay = _shift_delta(self._shifty, shifty, len(self._avgy), type_)
+        self._cov_mtx += numx.outer(self._avgx, deltay)
+        self._cov_mtx += numx.outer(delta, self._avgy)
+        self._cov_mtx += self._tlen * numx.outer(delta, deltay)
+        self._avgx += self._tlen * delta
+        self._avgy += self._tlen * deltay
+        self._shift = shift
+        self._shifty = shifty
 
 
     def update(self, x, y):
@@ -366,14 +472,17 @@ def update(self, x, y):
         # cast input
         x = mdp.utils.refcast(x, self._dtype)
         y = mdp.utils.refcast(y, self._dtype)
+        if self._shift is not None:
+            x = x - self._shift
+            y = y - self._shifty
 
         self._cov_mtx += mdp.utils.mult(x.T, y)
-        self._avgx += x.sum(axis=0)
-        self._avgy += y.sum(axis=0)
+        self._avgx += x.sum(axis=0, dtype=self._acc_dtype)
+        self._avgy += y.sum(axis=0, dtype=self._acc_dtype)
         self._tlen += x.shape[0]
 
     def fix(self):
-        type_ = self._dtype
+        type_ = self._acc_dtype
         tlen = self._tlen
         _check_roundoff(tlen, type_)
         avgx = self._avgx
@@ -394,6 +503,9 @@ def fix(self):
         # fix the average
         avgx /= tlen
         avgy /= tlen
+        if self._shift is not None:
+            avgx += self._shift
+            avgy += self._shifty
 
         ##### clean up
         # covariance matrix, updated during the training phase
@@ -403,5 +515,6 @@ def fix(self):
         self._avgy = None
         # number of observation so far during the training phase
         self._tlen = 0
+        self._shift = self._shifty = None
 
         return cov_mtx, avgx, avgy, tlen
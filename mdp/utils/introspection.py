@@ -3,8 +3,8 @@
 from builtins import map
 from builtins import str
 from builtins import object
+import sys
 import types
-import pickle
 import mdp
 
 class _Walk(object):
@@ -18,7 +18,7 @@ class _Walk(object):
     def __init__(self):
         self.arrays = {}
         self.start = None
-        self.allobjs = {}
+        self.allobjs = set()
 
     def __call__(self, x, start = None):
         arrays = self.arrays
@@ -26,12 +26,12 @@ def __call__(self, x, start = None):
         for name in dir(x):
             # get the corresponding member
             obj = getattr(x, name)
-            if id(obj) in list(self.allobjs.keys()):
+            if id(obj) in self.allobjs:
                 # if we already examined the member, skip to the next
                 continue
             else:
-                # add the id of this object to the list of know members
-                self.allobjs[id(obj)] = None
+                # add the id of this object to the set of known members
+                self.allobjs.add(id(obj))
 
             if start is None:
                 # initialize a string structure to keep track of array names
@@ -97,15 +97,151 @@ def dig_node(x):
         arrays[name] = (bytes, ar)
     return arrays, _format_dig(arrays)
 
+# objects which are not part of the state of a node
+_SKIPPED_TYPES = (type, types.ModuleType, types.FunctionType,
+                  types.BuiltinFunctionType, types.MethodType,
+                  type(None), bool)
+if hasattr(types, 'ClassType'):
+    # old-style classes in Python 2
+    _SKIPPED_TYPES += (types.ClassType,)
+# types of objects without children
+_SCALAR_TYPES = set([int, float, complex, type(''), type(b''), type(u'')])
+if hasattr(types, 'LongType'):
+    _SCALAR_TYPES.add(types.LongType)
+
+def _buffer_owner(array):
+    """Return the array which owns the memory of array (following the
+    chain of views) and the object which holds the buffer."""
+    while isinstance(array.base, mdp.numx.ndarray):
+        array = array.base
+    if array.base is None:
+        return array, array
+    # the memory belongs to another object, e.g. an mmap or a bytes object
+    return array, array.base
+
+class _SizeWalk(object):
+    """Crawl an object and add up the memory of its arrays and of the
+    other Python objects it references.
+
+    The objects are visited once (in the order of their attributes), so
+    that shared objects are not counted twice, and the memory of an array
+    is counted once for the buffer which holds it, i.e. views of an array
+    do not add to the size. The sizes are also collected by attribute path,
+    up to the given depth (a path like 'nodes[0].v' has depth 3).
+    """
+
+    def __init__(self, depth=1):
+        self.depth = depth
+        self.total = 0
+        self.sizes = {}
+        self._visited = set()
+        self._buffers = set()
+
+    def _add(self, path, size):
+        self.total += size
+        key = ''.join(path)
+        self.sizes[key] = self.sizes.get(key, 0) + size
+
+    def __call__(self, x):
+        visited = self._visited
+        ndarray = mdp.numx.ndarray
+        # iterative depth-first walk, to support deep networks
+        stack = [(x, ())]
+        while stack:
+            obj, path = stack.pop()
+            if id(obj) in visited:
+                continue
+            visited.add(id(obj))
+            if type(obj) in _SCALAR_TYPES:
+                self._add(path, sys.getsizeof(obj))
+                continue
+            if isinstance(obj, _SKIPPED_TYPES):
+                continue
+            if isinstance(obj, ndarray):
+                owner, buffer_ = _buffer_owner(obj)
+                if id(buffer_) not in self._buffers:
+                    self._buffers.add(id(buffer_))
+                    self._add(path, owner.nbytes)
+                if not obj.dtype.hasobject:
+                    continue
+            else:
+                self._add(path, sys.getsizeof(obj))
+            named = len(path) < self.depth
+            children = self._children(obj, path, named)
+            if named:
+                stack.extend((child, path + (name,))
+                             for name, child in reversed(children))
+            else:
+                # the path is not extended beyond the depth
+                stack.extend((child, path) for child in reversed(children))
+        return self.total
+
+    def _children(self, obj, path, named):
+        """Return the list of the children of obj, as tuples
+        (path component, child) if named is True."""
+        if isinstance(obj, mdp.numx.ndarray):
+            # array of objects
+            items = obj.ravel().tolist()
+            if named:
+                return [('[%d]' % i, item) for i, item in enumerate(items)]
+            return items
+        if isinstance(obj, dict):
+            if named:
+                return [('[%r]' % key, obj[key]) for key in _sorted_keys(obj)]
+            return [obj[key] for key in _sorted_keys(obj)]
+        if isinstance(obj, (list, tuple)):
+            if named:
+                return [('[%d]' % i, item) for i, item in enumerate(obj)]
+            return list(obj)
+        if isinstance(obj, (set, frozenset)):
+            if named:
+                return [('[]', item) for item in obj]
+            return list(obj)
+        children = []
+        attrs = getattr(obj, '__dict__', None)
+        if isinstance(attrs, dict) and id(attrs) not in self._visited:
+            self._visited.add(id(attrs))
+            self._add(path, sys.getsizeof(attrs))
+            children = [(name, attrs[name]) for name in _sorted_keys(attrs)]
+        for name in getattr(type(obj), '__slots__', ()):
+            if hasattr(obj, name):
+                children.append((name, getattr(obj, name)))
+        if not named:
+            return [child for _, child in children]
+        if path:
+            return [('.' + name, child) for name, child in children]
+        return children
+
+def _sorted_keys(dict_):
+    try:
+        return sorted(dict_)
+    except TypeError:
+        # keys of mixed types in Python 3
+        return sorted(dict_, key=repr)
+
 def get_node_size(x):
-    """Return node total byte-size using cPickle with protocol=2.
+    """Return the total byte-size of a node, a flow or any other object.
+
+    The size is the memory of the arrays (counted once per buffer, so
+    that views of an array are not counted twice) and of the other Python
+    objects referenced by the instance attributes. Classes, modules,
+    functions and methods are not included.
+    """
+    return _SizeWalk()(x)
+
+def get_node_size_breakdown(x, depth=1):
+    """Return a dict with the byte-sizes of the attributes of x.
 
-    The byte-size is related to the memory needed by the node).
+    The keys are the attribute paths of depth up to `depth` (e.g. 'v',
+    'nodes' and 'nodes[0]' for depth=2) and the values are the sizes of
+    the objects below these paths, as in `get_node_size`. The size of the
+    object x itself is stored under the empty path ''. For a Flow or a
+    Layer, ``depth=2`` gives the size of each node (under 'flow[i]' and
+    'nodes[i]').
     """
-    # TODO: add check for problematic node types, like NoiseNode?
-    # TODO: replace this with sys.getsizeof for Python >= 2.6
-    size = len(pickle.dumps(x, protocol = 2))
-    return size
+    walk = _SizeWalk(depth=depth)
+    walk(x)
+    return walk.sizes
 
 def get_node_size_str(x, si_units=False):
     """Return node total byte-size as a well readable string.
@@ -91,7 +91,8 @@ def setup_package():
           long_description = long_description,
           classifiers = classifiers,
           packages = ['mdp', 'mdp.nodes', 'mdp.utils', 'mdp.hinet',
-                      'mdp.test', 'mdp.graph', 'mdp.caching',
+                      'mdp.test', 'mdp.test.benchmarks', 'mdp.graph',
+                      'mdp.caching', 'mdp.profiling',
                       'mdp.parallel', 'bimdp', 'bimdp.hinet', 'bimdp.inspection',
                       'bimdp.nodes', 'bimdp.parallel', 'bimdp.test'],
           package_data = {'mdp.hinet': ['hinet.css'],